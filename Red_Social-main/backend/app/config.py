@@ -42,7 +42,98 @@ class Settings(BaseSettings):
     
     # Configuración de base de datos
     DATABASE_URL: Optional[str] = None
-    
+
+    # Configuración de búsqueda de usuarios
+    SEARCH_INDEX_REFRESH_SECONDS: int = int(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "300"))
+    RELACIONES_CACHE_TTL_SECONDS: int = int(os.getenv("RELACIONES_CACHE_TTL_SECONDS", "60"))
+    RELACIONES_CACHE_MAX_USUARIOS: int = int(os.getenv("RELACIONES_CACHE_MAX_USUARIOS", "5000"))
+
+    # Configuración de búsqueda de publicaciones y comentarios
+    CONTENT_INDEX_SNAPSHOT: str = os.getenv("CONTENT_INDEX_SNAPSHOT", "indices/contenido.pkl")
+
+    # Configuración del timeline personalizado (ver app/services/timeline.py)
+    TIMELINE_MAX_POSTS: int = int(os.getenv("TIMELINE_MAX_POSTS", "500"))
+    TIMELINE_CIRCULO_TTL_SECONDS: int = int(os.getenv("TIMELINE_CIRCULO_TTL_SECONDS", "300"))
+    # Vida media de las interacciones en el orden "relevante" (ver app/services/relevancia.py).
+    # Si se cambia, volver a correr el recálculo de crear_relevancia.sql
+    RELEVANCE_HALF_LIFE_HOURS: float = float(os.getenv("RELEVANCE_HALF_LIFE_HOURS", "24"))
+
+    # Configuración de importación de notas en bloque (ver app/services/importacion_notas.py)
+    GRADE_IMPORT_MAX_ROWS: int = int(os.getenv("GRADE_IMPORT_MAX_ROWS", "20000"))
+    GRADE_IMPORT_BATCH_SIZE: int = int(os.getenv("GRADE_IMPORT_BATCH_SIZE", "500"))
+
+    # Configuración de estadísticas de notas (ver app/services/estadisticas_notas.py)
+    GRADE_PASS_MARK: float = float(os.getenv("GRADE_PASS_MARK", "51"))
+    GRADE_STATS_TTL_SECONDS: int = int(os.getenv("GRADE_STATS_TTL_SECONDS", "600"))
+    GRADE_STATS_MAX_MATERIAS: int = int(os.getenv("GRADE_STATS_MAX_MATERIAS", "500"))
+
+    # Configuración de mensajería (ver app/services/conversaciones.py)
+    MEMBERSHIP_CACHE_TTL_SECONDS: int = int(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "300"))
+    MEMBERSHIP_CACHE_MAX_USERS: int = int(os.getenv("MEMBERSHIP_CACHE_MAX_USERS", "10000"))
+
+    # Configuración de sincronización delta (ver app/services/sincronizacion.py)
+    SYNC_MAX_CHANGES: int = int(os.getenv("SYNC_MAX_CHANGES", "500"))
+
+    # Configuración de lotes de peticiones (ver app/utils/lotes.py)
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+    # Configuración de consultas en paralelo (ver app/utils/concurrencia.py)
+    QUERY_FANOUT_THREADS: int = int(os.getenv("QUERY_FANOUT_THREADS", "16"))
+    QUERY_FANOUT_TIMEOUT_SECONDS: float = float(os.getenv("QUERY_FANOUT_TIMEOUT_SECONDS", "10"))
+
+    # Configuración de reconciliación de usuarios (ver app/services/reconciliacion.py)
+    RECONCILE_BATCH_SIZE: int = int(os.getenv("RECONCILE_BATCH_SIZE", "500"))
+    RECONCILE_CONCURRENCY: int = int(os.getenv("RECONCILE_CONCURRENCY", "4"))
+
+    # Configuración del resumen de reacciones (ver app/services/reacciones.py)
+    REACTION_SUMMARY_USERS: int = int(os.getenv("REACTION_SUMMARY_USERS", "3"))
+    REACTION_SUMMARY_MAX_IDS: int = int(os.getenv("REACTION_SUMMARY_MAX_IDS", "100"))
+
+    # Configuración de reparación de contadores (ver app/services/contadores.py)
+    COUNTER_REPAIR_BATCH_SIZE: int = int(os.getenv("COUNTER_REPAIR_BATCH_SIZE", "1000"))
+
+    # Configuración de exportaciones CSV (ver app/services/exportacion.py)
+    EXPORT_PAGE_SIZE: int = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+    # Configuración de respuestas condicionales (ETag)
+    ETAG_MAX_AGE_SECONDS: int = int(os.getenv("ETAG_MAX_AGE_SECONDS", "30"))
+    ETAG_CACHE_MAX_ENTRIES: int = int(os.getenv("ETAG_CACHE_MAX_ENTRIES", "2000"))
+
+    # Configuración de la caché de entidades por ID (ver app/services/cache_entidades.py)
+    # ENTITY_CACHE_TTLS: "entidad=segundos,..."; 0 desactiva la caché de esa entidad
+    ENTITY_CACHE_TTLS: str = os.getenv(
+        "ENTITY_CACHE_TTLS",
+        "publicacion=60,comentario=60,ruta=30,materia=600,grupo=600,usuario=60"
+    )
+    ENTITY_CACHE_MAX_ENTRIES: int = int(os.getenv("ENTITY_CACHE_MAX_ENTRIES", "10000"))
+
+    # Configuración de arranque
+    # LAZY_STARTUP: responder /health de inmediato y cargar rutas y cliente de BD en segundo plano
+    LAZY_STARTUP: bool = os.getenv("LAZY_STARTUP", "false").lower() in ("1", "true", "yes")
+    STARTUP_IMPORT_BUDGET_MS: int = int(os.getenv("STARTUP_IMPORT_BUDGET_MS", "1000"))
+
+    # Configuración de límite de peticiones (token bucket por usuario y clase de ruta)
+    # RATE_LIMITS: "clase=capacidad/segundos,..." (ver app/utils/rate_limit.py)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+    RATE_LIMITS: str = os.getenv(
+        "RATE_LIMITS",
+        "auth=10/60,login=30/60,busqueda=30/30,sondeo=10/30,mensajeria=60/60,subidas=20/60,general=300/60"
+    )
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # RATE_LIMIT_TRUSTED_PROXIES: IPs o redes (CIDR) separadas por comas de los proxies
+    # cuyo X-Forwarded-For se respeta; vacío = usar siempre la IP de la conexión
+    RATE_LIMIT_TRUSTED_PROXIES: str = os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "")
+
+    # Configuración de control de admisión (ver app/utils/admision.py)
+    # ADMISSION_LIMITS: "clase=concurrencia/cola/espera_ms,..." por clase de ruta
+    ADMISSION_CONTROL_ENABLED: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() in ("1", "true", "yes")
+    ADMISSION_LIMITS: str = os.getenv(
+        "ADMISSION_LIMITS",
+        "auth=16/64/5000,mensajeria=32/128/5000,feed=32/64/2000,admin=8/16/3000,general=32/64/2000,lote=16/32/2000,baja=8/8/300"
+    )
+    ADMISSION_LAG_SHED_MS: int = int(os.getenv("ADMISSION_LAG_SHED_MS", "250"))
+
     # Configuración de entorno
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
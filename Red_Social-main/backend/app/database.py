@@ -1,22 +1,27 @@
 """
 Configuración de la base de datos con Supabase
 """
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
 from app.config import settings
 import logging
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 logger = logging.getLogger(__name__)
 
-# Cliente de Supabase
-supabase: Client = None
+# Cliente de Supabase (el SDK se importa al crear el cliente, no al arrancar)
+supabase: "Client" = None
 
 
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """
     Obtiene o crea el cliente de Supabase
     """
     global supabase
     if supabase is None:
+        from supabase import create_client
+
         # Intentar usar en orden la KEY de servicio (más permisos), luego la KEY estándar y por último la ANON
         keys_to_try = [
             settings.SUPABASE_SERVICE_KEY,
@@ -60,7 +65,7 @@ def init_db():
 
 
 # Dependencia para obtener el cliente de Supabase en las rutas
-async def get_db() -> Client:
+async def get_db() -> "Client":
     """
     Dependencia para inyectar el cliente de Supabase en las rutas
     """
@@ -7,18 +7,17 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
+import asyncio
+import importlib
 import logging
+import os
 import time
 
 from app.config import settings
 from app.database import init_db
-
-# Importar routers
-from app.routes import auth, usuarios, estudiantes, docentes
-from app.routes import materias, notas, horarios, grupos
-from app.routes import publicaciones, comentarios, reacciones
-from app.routes import mensajes, notificaciones
-from app.routes import rutas, pasajeros, upload, amigos
+from app.services.cache_entidades import cache_entidades
+from app.utils.admision import ControlAdmision, estado_admision
+from app.utils.rate_limit import LimitadorPeticiones, estadisticas_limites
 
 # Configurar logging
 logging.basicConfig(
@@ -27,6 +26,96 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Routers de la API en orden de registro: (módulo en app.routes, tag)
+ROUTERS = [
+    # Autenticación
+    ("auth", "Autenticación"),
+    # Gestión de usuarios
+    ("usuarios", "Usuarios"),
+    ("estudiantes", "Estudiantes"),
+    ("docentes", "Docentes"),
+    # Módulo académico
+    ("materias", "Materias"),
+    ("notas", "Notas"),
+    ("horarios", "Horarios"),
+    ("grupos", "Grupos"),
+    # Red social
+    ("publicaciones", "Publicaciones"),
+    ("comentarios", "Comentarios"),
+    ("reacciones", "Reacciones"),
+    ("busqueda", "Búsqueda"),
+    ("upload", "Upload"),
+    # Mensajería
+    ("mensajes", "Mensajes"),
+    ("notificaciones", "Notificaciones"),
+    # Amigos
+    ("amigos", "Amigos"),
+    # Carpooling
+    ("rutas", "Rutas Carpooling"),
+    ("pasajeros", "Pasajeros"),
+    # Sincronización (app móvil)
+    ("sincronizacion", "Sincronización"),
+    ("lotes", "Lotes"),
+]
+
+# Rutas que responden aunque el arranque diferido no haya terminado
+RUTAS_SIN_ESPERA = {"/", "/health"}
+
+# Estado de este proceso (con varios workers cada uno tiene el suyo)
+estado_worker = {"iniciado": time.time(), "solicitudes": 0, "en_curso": 0}
+
+
+def importar_routers() -> list:
+    """
+    Importa los módulos de rutas (la parte más lenta del arranque)
+
+    Returns:
+        Lista de (router, tag) en orden de registro
+    """
+    return [
+        (importlib.import_module(f"app.routes.{modulo}").router, tag)
+        for modulo, tag in ROUTERS
+    ]
+
+
+def registrar_routers(app: FastAPI, routers: list) -> None:
+    """
+    Incluye los routers en la aplicación con el prefijo de la API
+
+    Args:
+        app: Aplicación FastAPI
+        routers: Resultado de importar_routers()
+    """
+    for router, tag in routers:
+        app.include_router(router, prefix=settings.API_V1_STR, tags=[tag])
+    # Regenerar /openapi.json con las rutas nuevas
+    app.openapi_schema = None
+
+
+async def arranque_diferido(app: FastAPI) -> None:
+    """
+    Carga rutas y cliente de BD después de que el servidor ya acepta peticiones
+
+    Los imports y la conexión corren en un hilo para no bloquear /health; las
+    peticiones a otras rutas esperan a que termine (ver esperar_arranque).
+    """
+    inicio = time.perf_counter()
+    try:
+        routers = await asyncio.to_thread(importar_routers)
+        registrar_routers(app, routers)
+        logger.info(f"✅ Rutas cargadas en {time.perf_counter() - inicio:.2f}s")
+    except Exception as e:
+        logger.error(f"❌ Error al cargar las rutas: {e}")
+    finally:
+        app.state.rutas_listas.set()
+
+    try:
+        await asyncio.to_thread(init_db)
+        app.state.bd_lista = True
+        logger.info(f"✅ Base de datos inicializada ({time.perf_counter() - inicio:.2f}s desde el arranque)")
+    except Exception as e:
+        logger.error(f"❌ Error al inicializar base de datos: {e}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -34,17 +123,29 @@ async def lifespan(app: FastAPI):
     Manejo del ciclo de vida de la aplicación
     """
     # Startup
-    logger.info("🚀 Iniciando aplicación...")
-    try:
-        init_db()
-        logger.info("✅ Base de datos inicializada")
-    except Exception as e:
-        logger.error(f"❌ Error al inicializar base de datos: {e}")
+    logger.info(f"🚀 Iniciando aplicación (pid {os.getpid()})...")
+    # Con preload la app se importa en el maestro: contar desde que arranca el worker
+    estado_worker.update(iniciado=time.time(), solicitudes=0, en_curso=0)
+    if settings.LAZY_STARTUP:
+        app.state.arranque = asyncio.create_task(arranque_diferido(app))
+    else:
+        try:
+            init_db()
+            app.state.bd_lista = True
+            logger.info("✅ Base de datos inicializada")
+        except Exception as e:
+            logger.error(f"❌ Error al inicializar base de datos: {e}")
     
     yield
     
     # Shutdown
-    logger.info("👋 Cerrando aplicación...")
+    arranque = getattr(app.state, "arranque", None)
+    if arranque and not arranque.done():
+        arranque.cancel()
+    logger.info(
+        f"👋 Cerrando aplicación (pid {os.getpid()}, "
+        f"{estado_worker['solicitudes']} peticiones atendidas)..."
+    )
 
 
 # Crear la aplicación FastAPI
@@ -56,6 +157,15 @@ app = FastAPI(
     redoc_url="/redoc",
     lifespan=lifespan
 )
+app.state.rutas_listas = asyncio.Event()
+app.state.bd_lista = False
+
+# Control de admisión por clase de ruta (descarta con 503 cuando la BD se satura)
+app.add_middleware(ControlAdmision)
+
+# Límite de peticiones por usuario y clase de ruta (queda dentro de CORS para
+# que las respuestas 429 lleven los headers CORS y el cliente vea Retry-After)
+app.add_middleware(LimitadorPeticiones)
 
 # Configurar CORS
 app.add_middleware(
@@ -75,9 +185,14 @@ async def log_requests(request: Request, call_next):
     Middleware para registrar todas las peticiones
     """
     start_time = time.time()
+    estado_worker["solicitudes"] += 1
+    estado_worker["en_curso"] += 1
     
     # Procesar request
-    response = await call_next(request)
+    try:
+        response = await call_next(request)
+    finally:
+        estado_worker["en_curso"] -= 1
     
     # Calcular tiempo de procesamiento
     process_time = time.time() - start_time
@@ -92,6 +207,17 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+# Middleware para el arranque diferido
+@app.middleware("http")
+async def esperar_arranque(request: Request, call_next):
+    """
+    Retiene las peticiones hasta que las rutas estén cargadas (solo con LAZY_STARTUP)
+    """
+    if not app.state.rutas_listas.is_set() and request.url.path not in RUTAS_SIN_ESPERA:
+        await app.state.rutas_listas.wait()
+    return await call_next(request)
+
+
 # Manejador de errores de validación
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -161,43 +287,24 @@ async def health_check():
     return {
         "status": "healthy",
         "version": settings.VERSION,
-        "environment": settings.ENVIRONMENT
+        "environment": settings.ENVIRONMENT,
+        "ready": app.state.rutas_listas.is_set() and app.state.bd_lista,
+        "worker": {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - estado_worker["iniciado"], 1),
+            "solicitudes": estado_worker["solicitudes"],
+            "en_curso": estado_worker["en_curso"],
+            "limites": estadisticas_limites(),
+            "admision": estado_admision(),
+            "cache_entidades": cache_entidades.estadisticas()
+        }
     }
 
 
-# Incluir routers con prefijo API v1
-api_prefix = settings.API_V1_STR
-
-# Autenticación
-app.include_router(auth.router, prefix=api_prefix, tags=["Autenticación"])
-
-# Gestión de usuarios
-app.include_router(usuarios.router, prefix=api_prefix, tags=["Usuarios"])
-app.include_router(estudiantes.router, prefix=api_prefix, tags=["Estudiantes"])
-app.include_router(docentes.router, prefix=api_prefix, tags=["Docentes"])
-
-# Módulo académico
-app.include_router(materias.router, prefix=api_prefix, tags=["Materias"])
-app.include_router(notas.router, prefix=api_prefix, tags=["Notas"])
-app.include_router(horarios.router, prefix=api_prefix, tags=["Horarios"])
-app.include_router(grupos.router, prefix=api_prefix, tags=["Grupos"])
-
-# Red social
-app.include_router(publicaciones.router, prefix=api_prefix, tags=["Publicaciones"])
-app.include_router(comentarios.router, prefix=api_prefix, tags=["Comentarios"])
-app.include_router(reacciones.router, prefix=api_prefix, tags=["Reacciones"])
-app.include_router(upload.router, prefix=api_prefix, tags=["Upload"])
-
-# Mensajería
-app.include_router(mensajes.router, prefix=api_prefix, tags=["Mensajes"])
-app.include_router(notificaciones.router, prefix=api_prefix, tags=["Notificaciones"])
-
-# Amigos
-app.include_router(amigos.router, prefix=api_prefix, tags=["Amigos"])
-
-# Carpooling
-app.include_router(rutas.router, prefix=api_prefix, tags=["Rutas Carpooling"])
-app.include_router(pasajeros.router, prefix=api_prefix, tags=["Pasajeros"])
+# Incluir routers con prefijo API v1 (con LAZY_STARTUP se cargan en arranque_diferido)
+if not settings.LAZY_STARTUP:
+    registrar_routers(app, importar_routers())
+    app.state.rutas_listas.set()
 
 
 if __name__ == "__main__":
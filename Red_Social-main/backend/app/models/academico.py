@@ -2,7 +2,7 @@
 Modelos Pydantic para el módulo académico
 """
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime, date, time
 from enum import Enum
 
@@ -170,6 +170,60 @@ class Nota(NotaBase):
         from_attributes = True
 
 
+class ErrorImportacion(BaseModel):
+    """Fila rechazada en una importación de notas"""
+    fila: int  # Número de fila de datos, sin contar el encabezado
+    error: str
+
+
+class ResultadoImportacion(BaseModel):
+    """Resultado de una importación de notas en bloque"""
+    total: int
+    importadas: int
+    rechazadas: int
+    errores: List[ErrorImportacion] = []
+
+
+class TramoHistograma(BaseModel):
+    """Cantidad de notas en un tramo [desde, hasta)"""
+    desde: int
+    hasta: int
+    cantidad: int
+
+
+class ResumenNotas(BaseModel):
+    """Medidas de un conjunto de notas"""
+    cantidad: int
+    promedio: Optional[float] = None
+    mediana: Optional[float] = None
+    desviacion: Optional[float] = None
+    tasa_aprobacion: Optional[float] = None  # Proporción de notas >= nota de aprobación
+    histograma: List[TramoHistograma] = []
+
+
+class ResumenGeneralNotas(ResumenNotas):
+    """Medidas de todas las notas de la materia"""
+    estudiantes: int
+    tasa_aprobacion_estudiantes: Optional[float] = None  # Según el promedio ponderado
+
+
+class PromedioEstudiante(BaseModel):
+    """Promedio ponderado de un estudiante en la materia"""
+    id_user: str
+    cantidad_notas: int
+    promedio_ponderado: Optional[float] = None  # None si todas sus notas pesan 0
+    aprobado: Optional[bool] = None
+
+
+class EstadisticasMateria(BaseModel):
+    """Estadísticas de las notas de una materia"""
+    id_materia: str
+    id_grupo: Optional[str] = None
+    general: ResumenGeneralNotas
+    por_tipo: Dict[str, ResumenNotas]
+    estudiantes: List[PromedioEstudiante]
+
+
 # ============= HORARIO =============
 
 class DiaSemanaEnum(str, Enum):
@@ -0,0 +1,30 @@
+"""
+Modelos Pydantic para lotes de peticiones (/batch)
+"""
+from pydantic import BaseModel, Field
+from typing import Any, Optional, List
+
+
+class PeticionLote(BaseModel):
+    """Una sub-petición del lote"""
+    id: Optional[str] = None  # Se devuelve en la respuesta para identificarla
+    metodo: str = Field("GET", pattern="^(GET|POST|PUT|PATCH|DELETE)$")
+    ruta: str = Field(..., pattern="^/")  # Relativa a la API: "/auth/me", "/publicaciones?limit=10"
+    cuerpo: Optional[Any] = None  # JSON para POST/PUT/PATCH
+
+
+class Lote(BaseModel):
+    """Lote de sub-peticiones (se ejecutan en paralelo, sin orden garantizado)"""
+    peticiones: List[PeticionLote] = Field(..., min_length=1)
+
+
+class RespuestaLote(BaseModel):
+    """Respuesta de una sub-petición"""
+    id: Optional[str] = None
+    estado: int  # Código HTTP que habría devuelto la ruta
+    cuerpo: Any = None
+
+
+class RespuestasLote(BaseModel):
+    """Respuestas en el mismo orden que las peticiones"""
+    respuestas: List[RespuestaLote]
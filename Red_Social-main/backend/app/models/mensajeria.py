@@ -128,3 +128,14 @@ class MensajesNoLeidos(BaseModel):
     """Contador de mensajes no leídos"""
     total_no_leidos: int
     conversaciones: List[dict]  # Lista de conversaciones con mensajes no leídos
+
+
+class SincronizacionMensajes(BaseModel):
+    """Cambios de una conversación desde un cursor"""
+    mensajes: List[Mensaje] = []  # Nuevos o editados (o la ventana pedida)
+    eliminados: List[str] = []  # IDs de mensajes borrados
+    cursor: int  # Enviar como `since` en la próxima sincronización
+    hay_mas: bool = False  # Quedan cambios: volver a pedir con este cursor
+    hay_anteriores: Optional[bool] = None
+    hay_posteriores: Optional[bool] = None
+    leido_hasta: Optional[datetime] = None  # Marca de lectura más avanzada de los demás miembros
@@ -0,0 +1,52 @@
+"""
+Modelos Pydantic para la sincronización delta (/sync)
+"""
+from pydantic import BaseModel
+from typing import Optional, List
+
+from app.models.notificacion import Notificacion
+from app.models.relacion import RelacionUsuario
+from app.models.carpooling import Ruta, PasajeroRuta
+
+
+class CambiosColeccion(BaseModel):
+    """Cambios de una colección desde el cursor del cliente"""
+    eliminados: List[str] = []  # IDs que el cliente debe quitar de su copia
+    cursor: int  # Enviar en la próxima sincronización
+    completa: bool = False  # True: `cambios` reemplaza la copia del cliente
+
+
+class CambiosNotificaciones(CambiosColeccion):
+    """Notificaciones nuevas, leídas o eliminadas"""
+    cambios: List[Notificacion] = []
+
+
+class CambiosSolicitudes(CambiosColeccion):
+    """Solicitudes de amistad pendientes (recibidas o enviadas)"""
+    cambios: List[RelacionUsuario] = []
+
+
+class CambiosAmigos(CambiosColeccion):
+    """Amigos con el formato de GET /amigos/lista"""
+    cambios: List[dict] = []
+
+
+class CambiosRutasConductor(CambiosColeccion):
+    """Rutas propias (mis-rutas, como conductor)"""
+    cambios: List[Ruta] = []
+
+
+class CambiosRutasPasajero(CambiosColeccion):
+    """Postulaciones a rutas (mis-rutas, como pasajero)"""
+    cambios: List[PasajeroRuta] = []
+
+
+class Sincronizacion(BaseModel):
+    """Respuesta de /sync: solo las colecciones pedidas"""
+    notificaciones: Optional[CambiosNotificaciones] = None
+    solicitudes_recibidas: Optional[CambiosSolicitudes] = None
+    solicitudes_enviadas: Optional[CambiosSolicitudes] = None
+    amigos: Optional[CambiosAmigos] = None
+    rutas_conductor: Optional[CambiosRutasConductor] = None
+    rutas_pasajero: Optional[CambiosRutasPasajero] = None
+    hay_mas: bool = False  # Quedan cambios: volver a pedir con los cursores devueltos
@@ -2,7 +2,7 @@
 Modelos Pydantic para el módulo social (publicaciones, comentarios, reacciones)
 """
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -45,6 +45,7 @@ class Publicacion(PublicacionBase):
     comentarios_count: Optional[int] = 0
     reacciones_count: Optional[int] = 0
     mis_reacciones: Optional[List[str]] = []  # Reacciones del usuario actual
+    puntaje: Optional[float] = None  # Cursor del timeline ordenado por relevancia
 
     class Config:
         from_attributes = True
@@ -186,9 +187,52 @@ class Reaccion(ReaccionBase):
         from_attributes = True
 
 
+class ReaccionAlternada(Reaccion):
+    """Reacción creada o borrada por POST /reacciones"""
+    activa: bool = True  # False si el toque quitó una reacción existente
+    conteos: Dict[str, int] = {}  # tipo_reac -> cantidad en el destino
+
+
+class ResumenReacciones(BaseModel):
+    """Reacciones de una publicación o comentario, sin las filas"""
+    id_publicacion: Optional[str] = None
+    id_comentario: Optional[str] = None
+    total: int = 0
+    conteos: Dict[str, int] = {}  # tipo_reac -> cantidad
+    mis_reacciones: List[str] = []  # Tipos con los que reaccionó el usuario actual
+    usuarios: List[dict] = []  # Perfiles de los últimos que reaccionaron
+
+
 # ============= MODELOS DE RESPUESTA AGREGADOS =============
 
 class PublicacionConDetalles(Publicacion):
     """Publicación con comentarios y reacciones"""
     comentarios: List[Comentario] = []
     reacciones: List[Reaccion] = []
+
+
+# ============= BÚSQUEDA =============
+
+class OrigenBusquedaEnum(str, Enum):
+    """Dónde buscar texto"""
+    PUBLICACION = "publicacion"
+    COMENTARIO = "comentario"
+
+
+class ResultadoBusqueda(BaseModel):
+    """Publicación o comentario encontrado por la búsqueda de texto"""
+    origen: OrigenBusquedaEnum
+    id: str
+    id_publicacion: str
+    id_user: str
+    tipo: Optional[TipoPublicacionEnum] = None  # Tipo de la publicación (o de la publicación comentada)
+    fecha_creacion: Optional[datetime] = None
+    puntaje: float
+    fragmento: str  # Contenido con las coincidencias entre <mark>...</mark>
+    usuario: Optional[dict] = None  # Información del autor
+
+
+class RespuestaBusqueda(BaseModel):
+    """Página de resultados de búsqueda"""
+    total: int
+    resultados: List[ResultadoBusqueda] = []
@@ -71,6 +71,18 @@ class Usuario(UsuarioBase):
         from_attributes = True
 
 
+class UsuarioParcial(BaseModel):
+    """Usuario con solo las columnas pedidas en `fields` (ver app/utils/proyecciones.py)"""
+    id_user: str
+    nombre: Optional[str] = None
+    apellido: Optional[str] = None
+    correo: Optional[str] = None
+    rol: Optional[RolEnum] = None
+    fecha_registro: Optional[datetime] = None
+    activo: Optional[bool] = None
+    foto_perfil: Optional[str] = None
+
+
 # ============= ESTUDIANTE =============
 
 class EstudianteBase(BaseModel):
@@ -1,24 +1,10 @@
 """
 Rutas/Endpoints de la API
+
+Los módulos se importan al primer acceso (app.routes.auth, ...) y no al
+importar el paquete, para que el arranque no cargue todas las rutas.
 """
-from app.routes import (
-    auth,
-    usuarios,
-    estudiantes,
-    docentes,
-    materias,
-    notas,
-    horarios,
-    grupos,
-    publicaciones,
-    comentarios,
-    reacciones,
-    mensajes,
-    notificaciones,
-    rutas,
-    pasajeros,
-    upload,
-)
+import importlib
 
 __all__ = [
     "auth",
@@ -32,9 +18,19 @@ __all__ = [
     "publicaciones",
     "comentarios",
     "reacciones",
+    "busqueda",
     "mensajes",
     "notificaciones",
+    "amigos",
     "rutas",
     "pasajeros",
+    "sincronizacion",
+    "lotes",
     "upload",
 ]
+
+
+def __getattr__(nombre: str):
+    if nombre in __all__:
+        return importlib.import_module(f"{__name__}.{nombre}")
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
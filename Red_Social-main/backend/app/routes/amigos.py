@@ -8,6 +8,11 @@ from datetime import datetime
 
 from app.database import get_db
 from app.utils.dependencies import get_current_active_user
+from app.services.busqueda_usuarios import get_indice, relaciones_cache
+from app.services.timeline import agregar_amistad, quitar_amistad
+from app.services.sincronizacion import formato_amigo
+from app.utils.concurrencia import en_paralelo
+from app.utils.proyecciones import columnas
 from app.models.relacion import (
     RelacionUsuario,
     RelacionUsuarioCreate,
@@ -17,6 +22,9 @@ from app.models.relacion import (
 
 router = APIRouter(prefix="/amigos", tags=["amigos"])
 
+# Campos devueltos por la búsqueda de usuarios
+CAMPOS_BUSQUEDA = ("id_user", "nombre", "apellido", "correo", "rol", "foto_perfil")
+
 
 @router.post("/solicitud", response_model=RelacionUsuario)
 async def enviar_solicitud_amistad(
@@ -65,6 +73,8 @@ async def enviar_solicitud_amistad(
                 detail="Error al crear la solicitud"
             )
         
+        relaciones_cache.invalidar(current_user["id_user"], id_usuario_destino)
+        
         # Crear notificación para el destinatario
         try:
             # Obtener el nombre completo del usuario
@@ -201,8 +211,16 @@ async def responder_solicitud(
             .eq("id_relacion_usuario", id_relacion)\
             .execute()
         
-        # Crear notificación si se aceptó
+        relaciones_cache.invalidar(solicitud.data[0]["id_usuario1"], current_user["id_user"])
+        
         if accion == "aceptar":
+            # Copiar las publicaciones recientes de cada uno al timeline del otro
+            try:
+                agregar_amistad(db, solicitud.data[0]["id_usuario1"], current_user["id_user"])
+            except Exception as e:
+                print(f"Error al actualizar timelines: {e}")
+            
+            # Crear notificación
             try:
                 # Obtener el nombre completo del usuario
                 nombre_completo = f"{current_user.get('nombre', '')} {current_user.get('apellido', '')}".strip() or 'Un usuario'
@@ -238,70 +256,45 @@ async def obtener_amigos(
     try:
         print(f"Obteniendo amigos para usuario: {current_user['id_user']}")
         
-        # Obtener relaciones donde el usuario es usuario1
-        amigos1 = db.table("relacionusuario")\
-            .select("*")\
-            .eq("id_usuario1", current_user["id_user"])\
-            .eq("estado", "aceptado")\
-            .eq("tipo", "amistad")\
-            .execute()
-        
-        print(f"Amigos1 encontrados: {len(amigos1.data)}")
-        
-        # Obtener relaciones donde el usuario es usuario2
-        amigos2 = db.table("relacionusuario")\
-            .select("*")\
-            .eq("id_usuario2", current_user["id_user"])\
-            .eq("estado", "aceptado")\
-            .eq("tipo", "amistad")\
-            .execute()
-        
-        print(f"Amigos2 encontrados: {len(amigos2.data)}")
+        # Relaciones donde el usuario es usuario1 y donde es usuario2 (a la vez)
+        amigos1, amigos2 = await en_paralelo(
+            lambda: db.table("relacionusuario")
+                .select("*")
+                .eq("id_usuario1", current_user["id_user"])
+                .eq("estado", "aceptado")
+                .eq("tipo", "amistad")
+                .execute(),
+            lambda: db.table("relacionusuario")
+                .select("*")
+                .eq("id_usuario2", current_user["id_user"])
+                .eq("estado", "aceptado")
+                .eq("tipo", "amistad")
+                .execute(),
+        )
         
-        # Combinar y formatear resultados
-        amigos = []
+        print(f"Amigos encontrados: {len(amigos1.data)} + {len(amigos2.data)}")
         
-        for relacion in amigos1.data:
-            usuario = db.table("usuario")\
-                .select("id_user, nombre, apellido, correo, rol, foto_perfil")\
-                .eq("id_user", relacion["id_usuario2"])\
-                .execute()
-            
-            if usuario.data:
-                amigo = usuario.data[0]
-                amigos.append({
-                    "id_relacion": relacion['id_relacion_usuario'],
-                    "id_user": amigo['id_user'],
-                    "nombre": amigo['nombre'],
-                    "apellido": amigo.get('apellido', ''),
-                    "correo": amigo.get('correo', ''),
-                    "rol": amigo.get('rol', ''),
-                    "foto_perfil": amigo.get('foto_perfil'),
-                    "fecha_amistad": relacion.get('fecha_respuesta')
-                })
-        
-        for relacion in amigos2.data:
-            usuario = db.table("usuario")\
-                .select("id_user, nombre, apellido, correo, rol, foto_perfil")\
-                .eq("id_user", relacion["id_usuario1"])\
+        # Datos de todos los amigos en una consulta
+        relaciones = [(r, r["id_usuario2"]) for r in amigos1.data] + [(r, r["id_usuario1"]) for r in amigos2.data]
+        usuarios = {}
+        if relaciones:
+            response = db.table("usuario")\
+                .select(columnas("usuario", "resumen"))\
+                .in_("id_user", list({id_amigo for _, id_amigo in relaciones}))\
                 .execute()
-            
-            if usuario.data:
-                amigo = usuario.data[0]
-                amigos.append({
-                    "id_relacion": relacion['id_relacion_usuario'],
-                    "id_user": amigo['id_user'],
-                    "nombre": amigo['nombre'],
-                    "apellido": amigo.get('apellido', ''),
-                    "correo": amigo.get('correo', ''),
-                    "rol": amigo.get('rol', ''),
-                    "foto_perfil": amigo.get('foto_perfil'),
-                    "fecha_amistad": relacion.get('fecha_respuesta')
-                })
+            usuarios = {u["id_user"]: u for u in response.data}
+        
+        amigos = [
+            formato_amigo(relacion, usuarios[id_amigo])
+            for relacion, id_amigo in relaciones
+            if id_amigo in usuarios
+        ]
         
         print(f"Total amigos formateados: {len(amigos)}")
         return amigos
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error en obtener_amigos: {type(e).__name__}: {e}")
         import traceback
@@ -339,6 +332,14 @@ async def eliminar_amigo(
             .eq("id_relacion_usuario", id_relacion)\
             .execute()
         
+        relaciones_cache.invalidar(relacion.data[0]["id_usuario1"], relacion.data[0]["id_usuario2"])
+        
+        if relacion.data[0].get("estado") == "aceptado":
+            try:
+                quitar_amistad(db, relacion.data[0]["id_usuario1"], relacion.data[0]["id_usuario2"])
+            except Exception as e:
+                print(f"Error al actualizar timelines: {e}")
+        
         return {"message": "Amigo eliminado exitosamente"}
     
     except HTTPException:
@@ -361,34 +362,18 @@ async def buscar_usuarios(
         print(f"Buscando usuarios con query: {q}")
         print(f"Usuario actual: {current_user['id_user']}")
         
-        # Buscar usuarios - usar ilike con porcentajes en el valor
-        usuarios = db.table("usuario")\
-            .select("id_user, nombre, apellido, correo, rol, foto_perfil")\
-            .neq("id_user", current_user["id_user"])\
-            .or_(f"nombre.ilike.*{q}*,apellido.ilike.*{q}*,correo.ilike.*{q}*")\
-            .limit(20)\
-            .execute()
-        
-        print(f"Usuarios encontrados: {len(usuarios.data)}")
+        # Buscar en el índice en memoria (sin acentos, por prefijo y aproximado)
+        usuarios = (await get_indice(db)).buscar(q, limit=20, excluir=current_user["id_user"])
         
-        # Obtener todas las relaciones del usuario actual
-        relaciones = db.table("relacionusuario")\
-            .select("id_usuario1, id_usuario2, estado")\
-            .or_(f"id_usuario1.eq.{current_user['id_user']},id_usuario2.eq.{current_user['id_user']}")\
-            .execute()
+        print(f"Usuarios encontrados: {len(usuarios)}")
         
-        # Crear un mapa de estados de relación
-        estados_relacion = {}
-        for rel in relaciones.data:
-            if rel['id_usuario1'] == current_user['id_user']:
-                estados_relacion[rel['id_usuario2']] = rel['estado']
-            else:
-                estados_relacion[rel['id_usuario1']] = rel['estado']
+        # Estados de relación del usuario actual (cacheados por usuario)
+        estados_relacion = relaciones_cache.obtener(db, current_user["id_user"])
         
         # Agregar estado de relación a cada usuario
         resultado = []
-        for usuario in usuarios.data:
-            usuario_con_estado = dict(usuario)
+        for usuario in usuarios:
+            usuario_con_estado = {campo: usuario.get(campo) for campo in CAMPOS_BUSQUEDA}
             usuario_con_estado['estadoRelacion'] = estados_relacion.get(usuario['id_user'])
             resultado.append(usuario_con_estado)
         
@@ -18,7 +18,10 @@ from app.utils.security import (
     verify_token
 )
 from app.utils.dependencies import get_current_user
+from app.utils.proyecciones import COLUMNAS_LOGIN, columnas
 from app.models.usuario import UsuarioCreate, Usuario, RolEnum
+from app.services.busqueda_usuarios import indexar_usuario
+from app.utils.etag import marcar_modificado
 
 router = APIRouter(prefix="/auth")
 
@@ -76,6 +79,7 @@ async def register(
             )
         
         created_user = response.data[0]
+        indexar_usuario(created_user)
         
         # 🔧 SINCRONIZACIÓN AUTOMÁTICA: Crear registro en estudiante/docente si corresponde
         try:
@@ -102,6 +106,7 @@ async def register(
         except Exception as sync_error:
             # Log del error pero no fallar el registro
             print(f"⚠️  Error al sincronizar estudiante/docente: {str(sync_error)}")
+        marcar_modificado("usuario", "estudiante", "docente")
         
         # Crear tokens
         access_token = create_access_token(
@@ -140,7 +145,8 @@ async def login(
     """
     try:
         # Buscar usuario por correo
-        response = db.table("usuario").select("*").eq("correo", form_data.username).execute()
+        # Única consulta que pide el hash de la contraseña
+        response = db.table("usuario").select(COLUMNAS_LOGIN).eq("correo", form_data.username).execute()
         
         if not response.data:
             raise HTTPException(
@@ -214,7 +220,7 @@ async def refresh_token(
     
     # Obtener usuario
     try:
-        response = db.table("usuario").select("*").eq("id_user", user_id).execute()
+        response = db.table("usuario").select(columnas("usuario")).eq("id_user", user_id).execute()
         
         if not response.data:
             raise HTTPException(
@@ -239,14 +245,11 @@ async def refresh_token(
             data={"sub": user["id_user"]}
         )
         
-        # Preparar respuesta
-        user_response = {k: v for k, v in user.items() if k != "contrasena"}
-        
         return {
             "access_token": new_access_token,
             "refresh_token": new_refresh_token,
             "token_type": "bearer",
-            "user": user_response
+            "user": user
         }
         
     except HTTPException:
@@ -266,9 +269,7 @@ async def get_me(
     """
     Obtener información del usuario actual
     """
-    # Remover contraseña
-    user_response = {k: v for k, v in current_user.items() if k != "contrasena"}
-    return user_response
+    return current_user
 
 
 @router.post("/validate-token")
@@ -0,0 +1,61 @@
+"""
+Rutas de búsqueda de texto en publicaciones y comentarios
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional
+from datetime import datetime
+from supabase import Client
+
+from app.database import get_db
+from app.models.social import RespuestaBusqueda, OrigenBusquedaEnum, TipoPublicacionEnum
+from app.utils.dependencies import get_current_active_user
+from app.services.busqueda_contenido import fecha_utc, get_indice
+
+router = APIRouter(prefix="/busqueda")
+
+
+@router.get("", response_model=RespuestaBusqueda)
+async def buscar_contenido(
+    q: str = Query(..., min_length=2),
+    origen: Optional[OrigenBusquedaEnum] = None,
+    tipo: Optional[TipoPublicacionEnum] = None,
+    autor: Optional[str] = Query(None, description="ID del usuario autor"),
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=50),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Buscar texto en publicaciones y comentarios
+
+    Los resultados vienen ordenados por relevancia, con un fragmento del
+    contenido donde las coincidencias están entre <mark>...</mark>.
+    """
+    try:
+        total, resultados = (await get_indice(db)).buscar(
+            q,
+            origen=origen.value if origen else None,
+            tipo=tipo.value if tipo else None,
+            id_user=autor,
+            desde=fecha_utc(desde),
+            hasta=fecha_utc(hasta),
+            skip=skip,
+            limit=limit
+        )
+
+        # Completar los datos de los autores en una sola consulta
+        ids_autores = list({r["id_user"] for r in resultados if r["id_user"]})
+        if ids_autores:
+            autores = db.table("usuario")\
+                .select("id_user, nombre, apellido, foto_perfil")\
+                .in_("id_user", ids_autores)\
+                .execute()
+            por_id = {a["id_user"]: a for a in autores.data}
+            for resultado in resultados:
+                resultado["usuario"] = por_id.get(resultado["id_user"])
+
+        return {"total": total, "resultados": resultados}
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -8,6 +8,9 @@ from supabase import Client
 from app.database import get_db
 from app.models.social import Comentario, ComentarioCreate, ComentarioUpdate
 from app.utils.dependencies import get_current_active_user
+from app.services.busqueda_contenido import indexar_comentario, desindexar_comentario
+from app.services.cache_entidades import cache_entidades, leer_entidad
+from app.services.relevancia import PESO_COMENTARIO, registrar_interaccion
 
 router = APIRouter(prefix="/comentarios")
 
@@ -24,20 +27,24 @@ async def create_comentario(
         com_dict["id_user"] = current_user["id_user"]
         response = db.table("comentario").insert(com_dict).execute()
         comentario_id = response.data[0]["id_comentario"]
+        # El trigger sumó 1 a publicacion.comentarios_count
+        cache_entidades.invalidar("publicacion", comentario_data.id_publicacion)
+        indexar_comentario(response.data[0])
+        registrar_interaccion(db, comentario_data.id_publicacion, PESO_COMENTARIO, response.data[0]["fecha_creacion"])
         
         # Obtener el comentario con la información del usuario
         comentario_completo = db.table("comentario").select("*, usuario(nombre, apellido, foto_perfil)").eq("id_comentario", comentario_id).single().execute()
         
         # Crear notificación para el autor de la publicación
         try:
-            publicacion = db.table("publicacion").select("id_user, contenido").eq("id_publicacion", comentario_data.id_publicacion).single().execute()
-            if publicacion.data and publicacion.data["id_user"] != current_user["id_user"]:
+            publicacion = leer_entidad(db, "publicacion", comentario_data.id_publicacion)
+            if publicacion and publicacion["id_user"] != current_user["id_user"]:
                 # Solo notificar si el comentarista no es el autor
                 nombre_completo = f"{current_user.get('nombre', '')} {current_user.get('apellido', '')}".strip()
                 notificacion_data = {
                     "contenido": f"{nombre_completo} comentó en tu publicación",
                     "tipo": "comentario",
-                    "id_user": publicacion.data["id_user"],
+                    "id_user": publicacion["id_user"],
                     "leida": False
                 }
                 db.table("notificacion").insert(notificacion_data).execute()
@@ -75,14 +82,16 @@ async def update_comentario(
 ):
     """Actualizar un comentario"""
     try:
-        existing = db.table("comentario").select("*").eq("id_comentario", id_comentario).execute()
-        if not existing.data:
+        existing = leer_entidad(db, "comentario", id_comentario)
+        if not existing:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comentario no encontrado")
-        if existing.data[0]["id_user"] != current_user["id_user"]:
+        if existing["id_user"] != current_user["id_user"]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
         
         update_data = comentario_data.dict(exclude_unset=True)
         response = db.table("comentario").update(update_data).eq("id_comentario", id_comentario).execute()
+        cache_entidades.invalidar("comentario", id_comentario)
+        indexar_comentario(response.data[0])
         return response.data[0]
     except HTTPException:
         raise
@@ -98,13 +107,17 @@ async def delete_comentario(
 ):
     """Eliminar un comentario"""
     try:
-        existing = db.table("comentario").select("*").eq("id_comentario", id_comentario).execute()
-        if not existing.data:
+        existing = leer_entidad(db, "comentario", id_comentario)
+        if not existing:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comentario no encontrado")
-        if existing.data[0]["id_user"] != current_user["id_user"]:
+        if existing["id_user"] != current_user["id_user"]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
         
         db.table("comentario").delete().eq("id_comentario", id_comentario).execute()
+        cache_entidades.invalidar("comentario", id_comentario)
+        cache_entidades.invalidar("publicacion", existing["id_publicacion"])
+        registrar_interaccion(db, existing["id_publicacion"], PESO_COMENTARIO, existing["fecha_creacion"], signo=-1)
+        desindexar_comentario(id_comentario)
         return None
     except HTTPException:
         raise
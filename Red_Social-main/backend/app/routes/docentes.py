@@ -1,14 +1,19 @@
 """
 Rutas para gestión de docentes
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from supabase import Client
 
 from app.database import get_db
 from app.models.usuario import Docente, DocenteCreate, DocenteUpdate
-from app.utils.dependencies import get_current_active_user, require_admin
+from app.utils.dependencies import get_current_active_user, require_admin, require_docente_or_admin
 from app.utils.security import get_password_hash
+from app.services.busqueda_usuarios import indexar_usuario
+from app.utils.etag import ValidadorRespuesta, marcar_modificado
+from app.utils.proyecciones import campos_pedidos, columnas
+from app.services.exportacion import exportar_docentes
 
 router = APIRouter(prefix="/docentes")
 
@@ -57,6 +62,7 @@ async def create_docente(
             )
         
         user = user_response.data[0]
+        indexar_usuario(user)
         
         # Crear docente
         docente_dict = {
@@ -72,6 +78,7 @@ async def create_docente(
                 detail="Error al crear docente"
             )
         
+        marcar_modificado("usuario", "docente")
         docente = doc_response.data[0]
         docente["usuario"] = {k: v for k, v in user.items() if k != "contrasena"}
         
@@ -88,18 +95,33 @@ async def create_docente(
 
 @router.get("")
 async def get_docentes(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     especialidad: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Columnas del usuario a incluir, por ejemplo 'nombre,apellido,foto_perfil'"),
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
     """
     Obtener lista de docentes
+
+    Con `fields` solo se piden esas columnas del usuario (siempre con id_user).
     """
     try:
+        campos = campos_pedidos("usuario", fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    seleccion_usuario = columnas("usuario") if campos is None else ", ".join(campos)
+
+    try:
+        validador = ValidadorRespuesta(request, ("docente", "usuario"), None)
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        
         # Obtener docentes
-        query = db.table("docente").select("*")
+        query = db.table("docente").select(columnas("docente"))
         
         if especialidad:
             query = query.eq("especialidad_doc", especialidad)
@@ -108,19 +130,19 @@ async def get_docentes(
         docentes_response = query.execute()
         
         if not docentes_response.data:
-            return []
+            return validador.responder([])
         
         # Obtener IDs de usuario únicos
         user_ids = [doc["id_user"] for doc in docentes_response.data if doc.get("id_user")]
         
         if not user_ids:
-            return docentes_response.data
+            return validador.responder(docentes_response.data)
         
         # Obtener datos de usuarios
-        usuarios_response = db.table("usuario").select("*").in_("id_user", user_ids).execute()
+        usuarios_response = db.table("usuario").select(seleccion_usuario).in_("id_user", user_ids).execute()
         
         # Crear mapa de usuarios
-        usuarios_map = {u["id_user"]: {k: v for k, v in u.items() if k != "contrasena"} for u in usuarios_response.data}
+        usuarios_map = {u["id_user"]: u for u in usuarios_response.data}
         
         # Combinar datos
         result = []
@@ -130,7 +152,7 @@ async def get_docentes(
                 docente["id_user"] = usuarios_map[doc["id_user"]]
             result.append(docente)
         
-        return result
+        return validador.responder(result)
         
     except Exception as e:
         raise HTTPException(
@@ -139,6 +161,32 @@ async def get_docentes(
         )
 
 
+@router.get("/exportar")
+async def exportar_docentes_csv(
+    id_materia: Optional[str] = Query(None, description="Solo el docente de esta materia"),
+    id_grupo: Optional[str] = Query(None, description="Solo docentes de materias de este grupo"),
+    id_gestion: Optional[str] = Query(None, description="Solo docentes de materias de grupos de esta gestión"),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(require_docente_or_admin)
+):
+    """
+    Exportar la lista de docentes en CSV (docentes y administradores)
+
+    Se recorren por páginas y se envían a medida que se leen. Incluye los códigos de las materias que dicta cada uno.
+    """
+    try:
+        return StreamingResponse(
+            exportar_docentes(db, id_materia, id_grupo, id_gestion),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="docentes.csv"'}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al exportar docentes: {str(e)}"
+        )
+
+
 @router.get("/me", response_model=Docente)
 async def get_my_docente_data(
     db: Client = Depends(get_db),
@@ -166,10 +214,9 @@ async def get_my_docente_data(
         docente = response.data[0]
         
         # Obtener datos del usuario
-        user_response = db.table("usuario").select("*").eq("id_user", current_user["id_user"]).execute()
+        user_response = db.table("usuario").select(columnas("usuario")).eq("id_user", current_user["id_user"]).execute()
         if user_response.data:
-            usuario_data = {k: v for k, v in user_response.data[0].items() if k != "contrasena"}
-            docente["id_user"] = usuario_data
+            docente["id_user"] = user_response.data[0]
         
         return docente
         
@@ -204,7 +251,7 @@ async def get_docente(
         docente = docente_response.data[0]
         
         # Obtener los datos del usuario asociado
-        user_response = db.table("usuario").select("*").eq("id_user", docente["id_user"]).execute()
+        user_response = db.table("usuario").select(columnas("usuario")).eq("id_user", docente["id_user"]).execute()
         
         if not user_response.data:
             raise HTTPException(
@@ -212,10 +259,7 @@ async def get_docente(
                 detail="Usuario asociado no encontrado"
             )
             
-        usuario = user_response.data[0]
-        
-        # Remover contraseña del usuario
-        usuario_data = {k: v for k, v in usuario.items() if k != "contrasena"}
+        usuario_data = user_response.data[0]
         
         # Combinar los datos
         return {
@@ -273,17 +317,17 @@ async def update_docente(
                     detail="Error al actualizar docente"
                 )
             docente = update_response.data[0]
+            marcar_modificado("docente")
         
         # 4. Obtener datos del usuario asociado
-        user_response = db.table("usuario").select("*").eq("id_user", docente["id_user"]).execute()
+        user_response = db.table("usuario").select(columnas("usuario")).eq("id_user", docente["id_user"]).execute()
         if not user_response.data:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Usuario asociado no encontrado"
             )
             
-        usuario = user_response.data[0]
-        usuario_data = {k: v for k, v in usuario.items() if k != "contrasena"}
+        usuario_data = user_response.data[0]
         
         # 5. Retornar datos actualizados
         return {
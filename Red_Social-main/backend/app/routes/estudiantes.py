@@ -1,14 +1,19 @@
 """
 Rutas para gestión de estudiantes
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from supabase import Client
 
 from app.database import get_db
 from app.models.usuario import Estudiante, EstudianteCreate, EstudianteUpdate, RolEnum
-from app.utils.dependencies import get_current_active_user, require_estudiante, require_admin
+from app.utils.dependencies import get_current_active_user, require_estudiante, require_admin, require_docente_or_admin
 from app.utils.security import get_password_hash
+from app.services.busqueda_usuarios import indexar_usuario
+from app.utils.etag import ValidadorRespuesta, marcar_modificado
+from app.utils.proyecciones import campos_pedidos, columnas
+from app.services.exportacion import exportar_estudiantes
 
 router = APIRouter(prefix="/estudiantes")
 
@@ -57,6 +62,7 @@ async def create_estudiante(
             )
         
         user = user_response.data[0]
+        indexar_usuario(user)
         
         # Crear estudiante
         estudiante_dict = {
@@ -74,6 +80,7 @@ async def create_estudiante(
                 detail="Error al crear estudiante"
             )
         
+        marcar_modificado("usuario", "estudiante")
         estudiante = est_response.data[0]
         estudiante["usuario"] = {k: v for k, v in user.items() if k != "contrasena"}
         
@@ -90,19 +97,34 @@ async def create_estudiante(
 
 @router.get("", response_model=List[Estudiante])
 async def get_estudiantes(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     carrera: Optional[str] = None,
     semestre: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="Columnas del usuario a incluir, por ejemplo 'nombre,apellido,foto_perfil'"),
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
     """
     Obtener lista de estudiantes
+
+    Con `fields` solo se piden esas columnas del usuario (siempre con id_user).
     """
     try:
+        campos = campos_pedidos("usuario", fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    seleccion_usuario = columnas("usuario") if campos is None else ", ".join(campos)
+
+    try:
+        validador = ValidadorRespuesta(request, ("estudiante", "usuario"), List[Estudiante])
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        
         # Obtener estudiantes
-        query = db.table("estudiante").select("*")
+        query = db.table("estudiante").select(columnas("estudiante"))
         
         if carrera:
             query = query.eq("carrera", carrera)
@@ -113,19 +135,19 @@ async def get_estudiantes(
         estudiantes_response = query.execute()
         
         if not estudiantes_response.data:
-            return []
+            return validador.responder([])
         
         # Obtener IDs de usuario únicos
         user_ids = [est["id_user"] for est in estudiantes_response.data if est.get("id_user")]
         
         if not user_ids:
-            return estudiantes_response.data
+            return validador.responder(estudiantes_response.data)
         
         # Obtener datos de usuarios
-        usuarios_response = db.table("usuario").select("*").in_("id_user", user_ids).execute()
+        usuarios_response = db.table("usuario").select(seleccion_usuario).in_("id_user", user_ids).execute()
         
         # Crear mapa de usuarios
-        usuarios_map = {u["id_user"]: {k: v for k, v in u.items() if k != "contrasena"} for u in usuarios_response.data}
+        usuarios_map = {u["id_user"]: u for u in usuarios_response.data}
         
         # Combinar datos
         result = []
@@ -135,7 +157,7 @@ async def get_estudiantes(
                 estudiante["id_user"] = usuarios_map[est["id_user"]]
             result.append(estudiante)
         
-        return result
+        return validador.responder(result)
         
     except Exception as e:
         raise HTTPException(
@@ -144,6 +166,32 @@ async def get_estudiantes(
         )
 
 
+@router.get("/exportar")
+async def exportar_estudiantes_csv(
+    id_materia: Optional[str] = Query(None, description="Solo estudiantes de grupos que cursan esta materia"),
+    id_grupo: Optional[str] = Query(None, description="Solo estudiantes de este grupo"),
+    id_gestion: Optional[str] = Query(None, description="Solo estudiantes de grupos de esta gestión"),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(require_docente_or_admin)
+):
+    """
+    Exportar la lista de estudiantes en CSV (docentes y administradores)
+
+    Se recorren por páginas y se envían a medida que se leen. Incluye el grupo y si la cuenta está activa.
+    """
+    try:
+        return StreamingResponse(
+            exportar_estudiantes(db, id_materia, id_grupo, id_gestion),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="estudiantes.csv"'}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al exportar estudiantes: {str(e)}"
+        )
+
+
 @router.get("/me", response_model=Estudiante)
 async def get_my_estudiante_data(
     db: Client = Depends(get_db),
@@ -159,7 +207,6 @@ async def get_my_estudiante_data(
         )
     
     try:
-        # Obtener estudiante
         response = db.table("estudiante").select("*").eq("id_user", current_user["id_user"]).execute()
         
         if not response.data:
@@ -168,13 +215,9 @@ async def get_my_estudiante_data(
                 detail="Datos de estudiante no encontrados"
             )
         
+        # El usuario ya se leyó al validar el token
         estudiante = response.data[0]
-        
-        # Obtener datos del usuario
-        user_response = db.table("usuario").select("*").eq("id_user", current_user["id_user"]).execute()
-        if user_response.data:
-            usuario_data = {k: v for k, v in user_response.data[0].items() if k != "contrasena"}
-            estudiante["id_user"] = usuario_data
+        estudiante["id_user"] = current_user
         
         return estudiante
         
@@ -210,10 +253,9 @@ async def get_estudiante(
         
         # Obtener datos del usuario
         if estudiante.get("id_user"):
-            user_response = db.table("usuario").select("*").eq("id_user", estudiante["id_user"]).execute()
+            user_response = db.table("usuario").select(columnas("usuario")).eq("id_user", estudiante["id_user"]).execute()
             if user_response.data:
-                usuario_data = {k: v for k, v in user_response.data[0].items() if k != "contrasena"}
-                estudiante["id_user"] = usuario_data
+                estudiante["id_user"] = user_response.data[0]
         
         return estudiante
         
@@ -264,6 +306,7 @@ async def update_estudiante(
                 detail="Error al actualizar estudiante"
             )
         
+        marcar_modificado("estudiante")
         return response.data[0]
         
     except HTTPException:
@@ -346,6 +389,8 @@ async def asignar_materia_estudiante(
                 detail="Error al asignar materia al grupo"
             )
         
+        marcar_modificado("grupomateria")
+        
         return {
             "message": f"Materia asignada exitosamente al grupo del estudiante",
             "data": response.data[0]
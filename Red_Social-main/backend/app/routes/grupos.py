@@ -1,13 +1,15 @@
 """
 Rutas para gestión de grupos
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List
 from supabase import Client
 
 from app.database import get_db
 from app.models.academico import Grupo, GrupoCreate, GrupoUpdate
 from app.utils.dependencies import get_current_active_user, require_admin
+from app.utils.etag import ValidadorRespuesta, marcar_modificado
+from app.services.cache_entidades import cache_entidades, leer_entidad
 
 router = APIRouter(prefix="/grupos")
 
@@ -33,6 +35,7 @@ async def create_grupo(
             )
         
         print(f"✅ Grupo creado: {response.data[0]}")
+        marcar_modificado("grupo")
         return response.data[0]
     except HTTPException:
         raise
@@ -46,6 +49,7 @@ async def create_grupo(
 
 @router.get("", response_model=List[Grupo])
 async def get_grupos(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     db: Client = Depends(get_db),
@@ -53,8 +57,13 @@ async def get_grupos(
 ):
     """Obtener lista de grupos"""
     try:
+        validador = ValidadorRespuesta(request, ("grupo",), List[Grupo])
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        
         response = db.table("grupo").select("*").range(skip, skip + limit - 1).execute()
-        return response.data
+        return validador.responder(response.data)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -67,10 +76,10 @@ async def get_grupo(
 ):
     """Obtener un grupo por ID"""
     try:
-        response = db.table("grupo").select("*").eq("id_grupo", id_grupo).execute()
-        if not response.data:
+        grupo = leer_entidad(db, "grupo", id_grupo)
+        if not grupo:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Grupo no encontrado")
-        return response.data[0]
+        return grupo
     except HTTPException:
         raise
     except Exception as e:
@@ -90,6 +99,8 @@ async def update_grupo(
         response = db.table("grupo").update(update_data).eq("id_grupo", id_grupo).execute()
         if not response.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Grupo no encontrado")
+        marcar_modificado("grupo")
+        cache_entidades.invalidar("grupo", id_grupo)
         return response.data[0]
     except HTTPException:
         raise
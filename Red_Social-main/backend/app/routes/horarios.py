@@ -1,7 +1,7 @@
 """
 Rutas para gestión de horarios
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List
 from datetime import datetime
 from supabase import Client
@@ -9,6 +9,11 @@ from supabase import Client
 from app.database import get_db
 from app.models.academico import Horario, HorarioCreate, HorarioUpdate
 from app.utils.dependencies import get_current_active_user, require_docente_or_admin
+from app.utils.etag import ValidadorRespuesta, marcar_modificado
+from app.utils.concurrencia import en_paralelo
+
+# Tablas de las que dependen las consultas de horario
+TABLAS_HORARIO = ("estudiante", "horario", "grupomateria", "materia")
 
 router = APIRouter(prefix="/horarios")
 
@@ -22,6 +27,7 @@ async def create_horario(
     """Crear un nuevo horario"""
     try:
         response = db.table("horario").insert(horario_data.dict()).execute()
+        marcar_modificado("horario")
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -29,6 +35,7 @@ async def create_horario(
 
 @router.get("/mi-horario", response_model=List[Horario])
 async def get_my_horario(
+    request: Request,
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
@@ -37,18 +44,23 @@ async def get_my_horario(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo para estudiantes")
     
     try:
+        validador = ValidadorRespuesta(request, TABLAS_HORARIO, List[Horario], alcance=current_user["id_user"])
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        
         # Obtener grupo del estudiante
         est_response = db.table("estudiante").select("id_grupo").eq("id_user", current_user["id_user"]).execute()
         if not est_response.data or not est_response.data[0].get("id_grupo"):
-            return []
+            return validador.responder([])
         
         id_grupo = est_response.data[0]["id_grupo"]
         
-        # Obtener horarios del grupo
-        response = db.table("horario").select("*").eq("id_grupo", id_grupo).order("dia_semana, hora_inicio").execute()
-        
-        # Obtener todas las materias del grupo con sus datos completos
-        materias_response = db.table("grupomateria").select("*, materia(*)").eq("id_grupo", id_grupo).execute()
+        # Horarios del grupo y sus materias con datos completos (a la vez)
+        response, materias_response = await en_paralelo(
+            lambda: db.table("horario").select("*").eq("id_grupo", id_grupo).order("dia_semana, hora_inicio").execute(),
+            lambda: db.table("grupomateria").select("*, materia(*)").eq("id_grupo", id_grupo).execute(),
+        )
         materias_list = [gm["materia"] for gm in materias_response.data if gm.get("materia")]
         
         # Agregar información de materias a cada horario
@@ -65,7 +77,9 @@ async def get_my_horario(
                 horario["materia"] = None
             horarios.append(horario)
         
-        return horarios
+        return validador.responder(horarios)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -73,11 +87,17 @@ async def get_my_horario(
 @router.get("/grupo/{id_grupo}", response_model=List[Horario])
 async def get_horario_grupo(
     id_grupo: str,
+    request: Request,
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Obtener horarios de un grupo específico con información de materias"""
     try:
+        validador = ValidadorRespuesta(request, TABLAS_HORARIO, List[Horario])
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        
         # Obtener horarios del grupo
         response = db.table("horario").select("*").eq("id_grupo", id_grupo).order("dia_semana, hora_inicio").execute()
         
@@ -97,7 +117,7 @@ async def get_horario_grupo(
                 horario["materia"] = None
             horarios.append(horario)
         
-        return horarios
+        return validador.responder(horarios)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -105,15 +125,21 @@ async def get_horario_grupo(
 @router.get("/estudiante/{ci_est}", response_model=List[Horario])
 async def get_horario_estudiante(
     ci_est: str,
+    request: Request,
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Obtener horarios de un estudiante por su CI con información de materias"""
     try:
+        validador = ValidadorRespuesta(request, TABLAS_HORARIO, List[Horario])
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        
         # Obtener grupo del estudiante
         est_response = db.table("estudiante").select("id_grupo").eq("ci_est", ci_est).execute()
         if not est_response.data or not est_response.data[0].get("id_grupo"):
-            return []
+            return validador.responder([])
         
         id_grupo = est_response.data[0]["id_grupo"]
         
@@ -136,12 +162,7 @@ async def get_horario_estudiante(
                 horario["materia"] = None
             horarios.append(horario)
         
-        return horarios
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
-            horarios.append(horario)
-        
-        return horarios
+        return validador.responder(horarios)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -188,6 +209,7 @@ async def update_horario(
 
         # Realizar la actualización
         response = db.table("horario").update(update_data).eq("id_horario", id_horario).execute()
+        marcar_modificado("horario")
         return response.data[0]
     except HTTPException:
         raise
@@ -204,6 +226,7 @@ async def delete_horario(
     """Eliminar un horario"""
     try:
         db.table("horario").delete().eq("id_horario", id_horario).execute()
+        marcar_modificado("horario")
         return None
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,41 @@
+"""
+Ruta para ejecutar varias peticiones en una sola (lotes)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from app.config import settings
+from app.models.lotes import Lote, RespuestasLote
+from app.utils.dependencies import get_current_active_user
+from app.utils.lotes import ejecutar_lote
+
+router = APIRouter(prefix="/batch")
+
+
+@router.post("", response_model=RespuestasLote)
+async def ejecutar_peticiones(
+    lote: Lote,
+    request: Request,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Ejecutar un lote de peticiones a la API en una sola ida y vuelta
+
+    El token se verifica una vez y las sub-peticiones se ejecutan en paralelo
+    con ese usuario. Cada una devuelve su propio estado HTTP y cuerpo, así que
+    un error en una no afecta a las demás. Como máximo BATCH_MAX_REQUESTS.
+    """
+    if len(lote.peticiones) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote admite como máximo {settings.BATCH_MAX_REQUESTS} peticiones"
+        )
+    try:
+        respuestas = await ejecutar_lote(
+            request.app.router,
+            request.scope,
+            current_user,
+            [p.dict() for p in lote.peticiones]
+        )
+        return {"respuestas": respuestas}
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,13 +1,15 @@
 """
 Rutas para gestión de materias
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List, Optional
 from supabase import Client
 
 from app.database import get_db
 from app.models.academico import Materia, MateriaCreate, MateriaUpdate
 from app.utils.dependencies import get_current_active_user, require_docente_or_admin
+from app.utils.etag import ValidadorRespuesta, marcar_modificado
+from app.services.cache_entidades import cache_entidades, leer_entidad
 
 router = APIRouter(prefix="/materias")
 
@@ -21,6 +23,7 @@ async def create_materia(
     """Crear una nueva materia"""
     try:
         response = db.table("materia").insert(materia_data.dict()).execute()
+        marcar_modificado("materia")
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -28,6 +31,7 @@ async def create_materia(
 
 @router.get("", response_model=List[Materia])
 async def get_materias(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     db: Client = Depends(get_db),
@@ -35,9 +39,14 @@ async def get_materias(
 ):
     """Obtener lista de materias con información del docente"""
     try:
+        validador = ValidadorRespuesta(request, ("materia", "docente", "usuario"), List[Materia])
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        
         # Incluir información del docente y su usuario
         response = db.table("materia").select("*, docente:id_doc(ci_doc, usuario:id_user(*))").range(skip, skip + limit - 1).execute()
-        return response.data
+        return validador.responder(response.data)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -75,10 +84,10 @@ async def get_materia(
 ):
     """Obtener una materia por ID"""
     try:
-        response = db.table("materia").select("*").eq("id_materia", id_materia).execute()
-        if not response.data:
+        materia = leer_entidad(db, "materia", id_materia)
+        if not materia:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Materia no encontrada")
-        return response.data[0]
+        return materia
     except HTTPException:
         raise
     except Exception as e:
@@ -98,6 +107,8 @@ async def update_materia(
         response = db.table("materia").update(update_data).eq("id_materia", id_materia).execute()
         if not response.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Materia no encontrada")
+        marcar_modificado("materia")
+        cache_entidades.invalidar("materia", id_materia)
         return response.data[0]
     except HTTPException:
         raise
@@ -1,17 +1,21 @@
 """
 Rutas para gestión de mensajes y conversaciones
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from typing import List, Optional
 from supabase import Client
 
 from app.database import get_db
 from app.models.mensajeria import (
     Conversacion, ConversacionCreate,
     Mensaje, MensajeCreate,
-    MensajesNoLeidos
+    MensajesNoLeidos, SincronizacionMensajes
 )
 from app.utils.dependencies import get_current_active_user
+from app.utils.proyecciones import columnas
+from app.services.conversaciones import buscar_directa, clave_directa, crear_conversacion, membresias
+from app.services.lecturas import marcar_leida, marcar_leidos, no_leidos_por_conversacion
+from app.services import sincronizacion_mensajes
 
 router = APIRouter(prefix="/mensajes")
 
@@ -19,10 +23,15 @@ router = APIRouter(prefix="/mensajes")
 @router.post("/conversaciones", response_model=Conversacion, status_code=status.HTTP_201_CREATED)
 async def create_conversacion(
     conv_data: ConversacionCreate,
+    response: Response,
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Crear una nueva conversación"""
+    """
+    Crear una nueva conversación
+
+    Si es privada entre dos usuarios y ya existe, devuelve la existente (200).
+    """
     try:
         # Verificar que el usuario actual no esté en la lista (se agregará automáticamente)
         participantes = [p for p in conv_data.participantes if p != current_user["id_user"]]
@@ -38,21 +47,34 @@ async def create_conversacion(
                 detail="Debe proporcionar al menos un participante además del usuario actual"
             )
 
-        # Crear conversación
-        conv_dict = {"tipo": conv_data.tipo.value, "nombre": conv_data.nombre}
-        response = db.table("conversacion").insert(conv_dict).execute()
-        conversacion = response.data[0]
-        
-        # Agregar participantes
-        for id_usuario in participantes:
-            user_conv = {
-                "id_usuario": id_usuario,
-                "id_conversacion": conversacion["id_conversacion"],
-                "rol": "admin" if id_usuario == current_user["id_user"] else "miembro"
-            }
-            db.table("usuarioconversacion").insert(user_conv).execute()
+        # Crear conversación con todos los participantes (o reutilizar el chat directo)
+        conversacion, creada = crear_conversacion(
+            db, conv_data.tipo.value, conv_data.nombre, current_user["id_user"], participantes
+        )
+        if not creada:
+            response.status_code = status.HTTP_200_OK
         
         return conversacion
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/conversaciones/directa/{id_usuario}", response_model=Conversacion)
+async def get_conversacion_directa(
+    id_usuario: str,
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Obtener el chat directo con otro usuario (404 si todavía no existe)"""
+    try:
+        conversacion = buscar_directa(db, clave_directa(current_user["id_user"], id_usuario))
+        if not conversacion:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No hay conversación con este usuario")
+        return conversacion
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -72,9 +94,16 @@ async def get_my_conversaciones(
             .eq("id_usuario", current_user["id_user"])\
             .execute()
 
+        membresias.guardar(
+            current_user["id_user"],
+            (item["conversacion"]["id_conversacion"] for item in query.data if item.get("conversacion"))
+        )
         if not query.data:
             return []
 
+        # No leídos de todas las conversaciones en una consulta
+        no_leidos = no_leidos_por_conversacion(db, current_user["id_user"])
+
         # Procesar las conversaciones
         resultado = []
         conv_processed = set()  # Para evitar duplicados
@@ -107,16 +136,9 @@ async def get_my_conversaciones(
                 .execute()
 
             conv["ultimo_mensaje"] = ultimo_mensaje.data[0] if ultimo_mensaje.data else None
-
-            # Contar mensajes no leídos
-            mensajes_no_leidos = db.table("mensaje")\
-                .select("id_mensaje")\
-                .eq("id_conversacion", conv_id)\
-                .eq("leido", False)\
-                .neq("id_user", current_user["id_user"])\
-                .execute()
-
-            conv["mensajes_no_leidos"] = len(mensajes_no_leidos.data)
+            conv["mensajes_no_leidos"] = no_leidos.get(conv_id, 0)
+            if conv["ultimo_mensaje"] and conv["ultimo_mensaje"]["id_user"] != current_user["id_user"]:
+                conv["ultimo_mensaje"]["leido"] = conv["mensajes_no_leidos"] == 0
 
             resultado.append(conv)
 
@@ -131,12 +153,17 @@ async def send_mensaje(
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Enviar un mensaje"""
+    """Enviar un mensaje (solo a conversaciones de las que el usuario es miembro)"""
     try:
+        if not membresias.es_miembro(db, current_user["id_user"], mensaje_data.id_conversacion):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes acceso a esta conversación")
+        
         msg_dict = mensaje_data.dict()
         msg_dict["id_user"] = current_user["id_user"]
         response = db.table("mensaje").insert(msg_dict).execute()
         return response.data[0]
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -150,8 +177,7 @@ async def get_conversacion_info(
     """Obtener información detallada de una conversación incluyendo todos los participantes"""
     try:
         # Verificar que el usuario está en la conversación
-        user_conv = db.table("usuarioconversacion").select("*").eq("id_conversacion", id_conversacion).eq("id_usuario", current_user["id_user"]).execute()
-        if not user_conv.data:
+        if not membresias.es_miembro(db, current_user["id_user"], id_conversacion):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes acceso a esta conversación")
         
         # Obtener datos de la conversación
@@ -168,7 +194,7 @@ async def get_conversacion_info(
         participantes = []
         for p in participantes_ids.data:
             user_data = db.table("usuario")\
-                .select("*")\
+                .select(columnas("usuario", "resumen"))\
                 .eq("id_user", p["id_usuario"])\
                 .single()\
                 .execute()
@@ -195,9 +221,13 @@ async def get_mensajes_conversacion(
 ):
     """Obtener mensajes de una conversación"""
     try:
-        # Verificar que el usuario está en la conversación
-        user_conv = db.table("usuarioconversacion").select("*").eq("id_conversacion", id_conversacion).eq("id_usuario", current_user["id_user"]).execute()
-        if not user_conv.data:
+        # Marcas de lectura de los miembros (y verificar que el usuario es uno)
+        miembros = db.table("usuarioconversacion")\
+            .select("id_usuario, ultima_lectura")\
+            .eq("id_conversacion", id_conversacion)\
+            .execute()
+        marcas = {m["id_usuario"]: m.get("ultima_lectura") for m in miembros.data}
+        if current_user["id_user"] not in marcas:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes acceso a esta conversación")
         
         # Obtener mensajes
@@ -207,7 +237,65 @@ async def get_mensajes_conversacion(
             .order("fecha_envio")\
             .range(skip, skip + limit - 1)\
             .execute()
-        return response.data
+        return marcar_leidos(response.data, marcas, current_user["id_user"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/conversacion/{id_conversacion}/sincronizar", response_model=SincronizacionMensajes)
+async def sincronizar_conversacion(
+    id_conversacion: str,
+    since: Optional[int] = Query(None, ge=0, description="Cursor de la sincronización anterior"),
+    alrededor: Optional[str] = Query(None, description="ID de mensaje al que saltar"),
+    limit: int = Query(100, ge=1, le=200),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Sincronizar los mensajes de una conversación
+
+    - Con `since`: solo los mensajes creados o editados después del cursor y
+      los IDs de los eliminados. Sin cambios, las listas vienen vacías.
+    - Con `alrededor`: la ventana de mensajes alrededor de ese mensaje.
+    - Sin ninguno: la última página.
+
+    Siempre devuelve `cursor`, que el cliente envía como `since` la próxima vez.
+    """
+    try:
+        # Marcas de lectura de los miembros (y verificar que el usuario es uno)
+        miembros = db.table("usuarioconversacion")\
+            .select("id_usuario, ultima_lectura")\
+            .eq("id_conversacion", id_conversacion)\
+            .execute()
+        marcas = {m["id_usuario"]: m.get("ultima_lectura") for m in miembros.data}
+        if current_user["id_user"] not in marcas:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes acceso a esta conversación")
+
+        if since is not None:
+            resultado = sincronizacion_mensajes.cambios(db, id_conversacion, since, limit)
+        else:
+            cursor = sincronizacion_mensajes.cursor_actual(db)
+            if alrededor:
+                ventana = sincronizacion_mensajes.alrededor_de(db, id_conversacion, alrededor, limit)
+                if ventana is None:
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mensaje no encontrado")
+                mensajes, hay_anteriores, hay_posteriores = ventana
+            else:
+                mensajes, hay_anteriores = sincronizacion_mensajes.ultima_pagina(db, id_conversacion, limit)
+                hay_posteriores = False
+            resultado = {
+                "mensajes": mensajes,
+                "cursor": cursor,
+                "hay_anteriores": hay_anteriores,
+                "hay_posteriores": hay_posteriores,
+            }
+
+        marcar_leidos(resultado["mensajes"], marcas, current_user["id_user"])
+        otras = [marca for usuario, marca in marcas.items() if usuario != current_user["id_user"] and marca]
+        resultado["leido_hasta"] = max(otras) if otras else None
+        return resultado
     except HTTPException:
         raise
     except Exception as e:
@@ -220,12 +308,21 @@ async def marcar_mensaje_leido(
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Marcar un mensaje como leído"""
+    """
+    Marcar un mensaje como leído
+
+    Avanza la marca de lectura del usuario hasta este mensaje (y los anteriores).
+    """
     try:
-        response = db.table("mensaje").update({"leido": True}).eq("id_mensaje", id_mensaje).execute()
+        response = db.table("mensaje").select("*").eq("id_mensaje", id_mensaje).execute()
         if not response.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mensaje no encontrado")
-        return response.data[0]
+        mensaje = response.data[0]
+        leidos = marcar_leida(db, current_user["id_user"], mensaje["id_conversacion"], mensaje["fecha_envio"])
+        if leidos is None:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes acceso a esta conversación")
+        mensaje["leido"] = True
+        return mensaje
     except HTTPException:
         raise
     except Exception as e:
@@ -284,7 +381,8 @@ async def eliminar_mensaje(
         if mensaje_actual.data[0]["id_user"] != current_user["id_user"]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permiso para eliminar este mensaje")
         
-        # Eliminar el mensaje
+        # Eliminar el mensaje (el trigger de sincronizacion_mensajes.sql deja la lápida
+        # que reciben los clientes en /sincronizar)
         response = db.table("mensaje").delete().eq("id_mensaje", id_mensaje).execute()
         
         return {
@@ -305,17 +403,14 @@ async def marcar_conversacion_leida(
 ):
     """Marcar todos los mensajes de una conversación como leídos para el usuario actual"""
     try:
-        # Marcar como leídos todos los mensajes de la conversación que no son del usuario actual
-        response = db.table("mensaje")\
-            .update({"leido": True})\
-            .eq("id_conversacion", id_conversacion)\
-            .neq("id_user", current_user["id_user"])\
-            .eq("leido", False)\
-            .execute()
+        # Avanzar la marca de lectura del usuario hasta el último mensaje
+        leidos = marcar_leida(db, current_user["id_user"], id_conversacion)
+        if leidos is None:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes acceso a esta conversación")
         
         return {
             "success": True,
-            "mensajes_actualizados": len(response.data) if response.data else 0,
+            "mensajes_actualizados": leidos,
             "mensaje": "Mensajes marcados como leídos exitosamente"
         }
     except HTTPException:
@@ -331,19 +426,14 @@ async def get_mensajes_no_leidos(
 ):
     """Obtener contador de mensajes no leídos"""
     try:
-        # Obtener conversaciones del usuario
-        user_convs = db.table("usuarioconversacion").select("id_conversacion").eq("id_usuario", current_user["id_user"]).execute()
-        conv_ids = [uc["id_conversacion"] for uc in user_convs.data]
-        
-        if not conv_ids:
-            return {"total_no_leidos": 0, "conversaciones": []}
-        
-        # Contar mensajes no leídos
-        response = db.table("mensaje").select("*").in_("id_conversacion", conv_ids).eq("leido", False).neq("id_user", current_user["id_user"]).execute()
+        no_leidos = no_leidos_por_conversacion(db, current_user["id_user"])
         
         return {
-            "total_no_leidos": len(response.data),
-            "conversaciones": []  # TODO: agrupar por conversación
+            "total_no_leidos": sum(no_leidos.values()),
+            "conversaciones": [
+                {"id_conversacion": id_conversacion, "no_leidos": cantidad}
+                for id_conversacion, cantidad in no_leidos.items()
+            ]
         }
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
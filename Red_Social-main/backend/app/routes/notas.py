@@ -1,16 +1,36 @@
 """
 Rutas para gestión de notas
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from postgrest.exceptions import APIError
 from supabase import Client
 
 from app.database import get_db
-from app.models.academico import Nota, NotaCreate, NotaUpdate
+from app.models.academico import Nota, NotaCreate, NotaUpdate, ResultadoImportacion, EstadisticasMateria
 from app.utils.dependencies import get_current_active_user, require_docente_or_admin
+from app.services.importacion_notas import ImportadorNotas, filas_csv, filas_json
+from app.services.estadisticas_notas import estadisticas_materia, invalidar_materia, parsear_pesos
+from app.services.cache_entidades import leer_entidad
+from app.services.exportacion import exportar_notas, materias_del_docente
+from app.utils.proyecciones import embebido
 
 router = APIRouter(prefix="/notas")
 
+# unique_violation de PostgreSQL (uq_nota_user_materia_tipo, ver notas_unicas.sql)
+VIOLACION_UNICA = "23505"
+
+
+def _error_nota(e: APIError) -> HTTPException:
+    """409 si ya hay una nota del mismo tipo para el estudiante en la materia, 500 si no"""
+    if e.code == VIOLACION_UNICA:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="El estudiante ya tiene una nota de ese tipo en la materia"
+        )
+    return HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
 
 @router.get("", response_model=List[Nota])
 async def get_all_notas(
@@ -19,7 +39,7 @@ async def get_all_notas(
 ):
     """Obtener todas las notas (admin/docente)"""
     try:
-        response = db.table("nota").select("*, materia(*), usuario(*)").execute()
+        response = db.table("nota").select(f"*, materia(*), {embebido('usuario', 'resumen')}").execute()
         return response.data
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -34,7 +54,82 @@ async def create_nota(
     """Crear una nueva nota"""
     try:
         response = db.table("nota").insert(nota_data.dict()).execute()
+        invalidar_materia(nota_data.id_materia)
         return response.data[0]
+    except APIError as e:
+        raise _error_nota(e)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/importar", response_model=ResultadoImportacion)
+async def importar_notas(
+    request: Request,
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(require_docente_or_admin)
+):
+    """
+    Importar notas en bloque
+
+    El cuerpo es un CSV con encabezado (Content-Type: text/csv) o un arreglo
+    JSON de objetos (application/json) con las columnas: id_user o ci_est,
+    id_materia o codigo_materia, tipo_nota, nota y opcionalmente origen. Una
+    nota que ya existe para el mismo estudiante, materia y tipo se actualiza.
+    Las filas inválidas se informan con su número y no impiden guardar las demás.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "json" in content_type:
+        filas = filas_json(request.stream())
+    elif "csv" in content_type or "text/plain" in content_type:
+        filas = filas_csv(request.stream())
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Enviar las notas como text/csv o application/json"
+        )
+
+    importador = ImportadorNotas(db, current_user)
+    try:
+        async for fila in filas:
+            importador.agregar(fila)
+        return importador.terminar()
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{e}. Notas ya guardadas de lotes anteriores: {importador.importadas}"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/exportar")
+async def exportar_notas_csv(
+    id_materia: Optional[str] = Query(None, description="Solo notas de esta materia"),
+    id_grupo: Optional[str] = Query(None, description="Solo estudiantes de este grupo"),
+    id_gestion: Optional[str] = Query(None, description="Solo estudiantes de grupos de esta gestión"),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(require_docente_or_admin)
+):
+    """
+    Exportar notas en CSV
+
+    Se recorren por páginas y se envían a medida que se leen, sin armar la
+    lista completa en memoria. Un docente solo exporta las materias que dicta.
+    """
+    try:
+        materias_permitidas = None
+        if current_user["rol"] == "docente":
+            materias_permitidas = materias_del_docente(db, current_user["id_user"])
+            if id_materia and id_materia not in materias_permitidas:
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No dicta esta materia")
+
+        return StreamingResponse(
+            exportar_notas(db, id_materia, id_grupo, id_gestion, materias_permitidas),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="notas.csv"'}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -55,6 +150,42 @@ async def get_my_notas(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/estadisticas/{id_materia}", response_model=EstadisticasMateria)
+async def get_estadisticas_materia(
+    id_materia: str,
+    id_grupo: Optional[str] = Query(None, description="Solo estudiantes de este grupo"),
+    pesos: Optional[str] = Query(None, description="Pesos por tipo de nota: 'Primer Parcial=30,Examen Final=40'"),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(require_docente_or_admin)
+):
+    """
+    Estadísticas de las notas de una materia
+
+    Promedio, mediana, desviación estándar, tasa de aprobación e histograma de
+    la materia y de cada tipo de nota, y el promedio ponderado de cada
+    estudiante. Un docente solo puede consultar las materias que dicta.
+    """
+    try:
+        try:
+            pesos_por_tipo = parsear_pesos(pesos)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        materia = leer_entidad(db, "materia", id_materia)
+        if not materia:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Materia no encontrada")
+        if current_user["rol"] == "docente":
+            docente = db.table("docente").select("ci_doc").eq("id_user", current_user["id_user"]).execute()
+            if not docente.data or docente.data[0]["ci_doc"] != materia.get("id_doc"):
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No dicta esta materia")
+
+        return estadisticas_materia(db, id_materia, id_grupo, pesos_por_tipo)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.get("/estudiante/{id_user}", response_model=List[Nota])
 async def get_notas_estudiante(
     id_user: str,
@@ -82,9 +213,12 @@ async def update_nota(
         response = db.table("nota").update(update_data).eq("id_nota", id_nota).execute()
         if not response.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nota no encontrada")
+        invalidar_materia(response.data[0]["id_materia"])
         return response.data[0]
     except HTTPException:
         raise
+    except APIError as e:
+        raise _error_nota(e)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -97,7 +231,8 @@ async def delete_nota(
 ):
     """Eliminar una nota"""
     try:
-        db.table("nota").delete().eq("id_nota", id_nota).execute()
+        response = db.table("nota").delete().eq("id_nota", id_nota).execute()
+        invalidar_materia(*{nota["id_materia"] for nota in response.data})
         return None
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -9,6 +9,7 @@ from datetime import datetime
 from app.database import get_db
 from app.models.carpooling import PasajeroRuta, PasajeroRutaCreate, PasajeroRutaUpdate
 from app.utils.dependencies import get_current_active_user
+from app.services.cache_entidades import leer_entidad
 
 router = APIRouter(prefix="/pasajeros")
 
@@ -22,12 +23,12 @@ async def postular_como_pasajero(
     """Postularse como pasajero en una ruta"""
     try:
         # Verificar que la ruta existe y está activa
-        ruta = db.table("ruta").select("*").eq("id_ruta", pasajero_data.id_ruta).eq("activa", True).execute()
-        if not ruta.data:
+        ruta = leer_entidad(db, "ruta", pasajero_data.id_ruta)
+        if not ruta or not ruta.get("activa"):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ruta no encontrada o inactiva")
         
         # Verificar que no sea el conductor
-        if ruta.data[0]["id_user"] == current_user["id_user"]:
+        if ruta["id_user"] == current_user["id_user"]:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No puedes ser pasajero de tu propia ruta")
         
         # Verificar que no esté ya postulado ACTIVAMENTE (pendiente o aceptado)
@@ -51,10 +52,10 @@ async def postular_como_pasajero(
         
         # Crear notificación para el conductor
         try:
-            conductor_id = ruta.data[0]["id_user"]
+            conductor_id = ruta["id_user"]
             nombre_completo = f"{current_user.get('nombre', '')} {current_user.get('apellido', '')}".strip() or 'Un usuario'
-            punto_inicio = ruta.data[0].get('punto_inicio', 'Mi ubicación actual')
-            punto_destino = ruta.data[0].get('punto_destino', 'Campus Las Delicias (Univalle)')
+            punto_inicio = ruta.get('punto_inicio', 'Mi ubicación actual')
+            punto_destino = ruta.get('punto_destino', 'Campus Las Delicias (Univalle)')
             
             notificacion = {
                 "id_user": conductor_id,
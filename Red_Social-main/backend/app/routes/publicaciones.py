@@ -1,13 +1,18 @@
 """
 Rutas para gestión de publicaciones
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from typing import List, Optional
+from datetime import datetime
 from supabase import Client
 
 from app.database import get_db
 from app.models.social import Publicacion, PublicacionCreate, PublicacionUpdate
 from app.utils.dependencies import get_current_active_user
+from app.services.busqueda_contenido import indexar_publicacion, desindexar_publicacion
+from app.services.cache_entidades import cache_entidades, leer_entidad
+from app.services.timeline import distribuir_publicacion, leer_timeline
+from app.services.relevancia import relevancia_inicial
 
 router = APIRouter(prefix="/publicaciones")
 
@@ -15,6 +20,7 @@ router = APIRouter(prefix="/publicaciones")
 @router.post("", response_model=Publicacion, status_code=status.HTTP_201_CREATED)
 async def create_publicacion(
     publicacion_data: PublicacionCreate,
+    background_tasks: BackgroundTasks,
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
@@ -22,8 +28,12 @@ async def create_publicacion(
     try:
         pub_dict = publicacion_data.dict(exclude={"media_urls"})
         pub_dict["id_user"] = current_user["id_user"]
+        pub_dict["relevancia"] = relevancia_inicial(datetime.utcnow())
         response = db.table("publicacion").insert(pub_dict).execute()
         publicacion_id = response.data[0]["id_publicacion"]
+        indexar_publicacion(response.data[0])
+        # Copiar a los timelines de amigos y compañeros después de responder
+        background_tasks.add_task(distribuir_publicacion, db, response.data[0], current_user)
         
         # Crear registros de media si hay URLs
         if publicacion_data.media_urls:
@@ -58,20 +68,43 @@ async def get_publicaciones(
 ):
     """Obtener feed de publicaciones"""
     try:
-        # Obtener publicaciones con información del usuario y media
+        # Obtener publicaciones con información del usuario y media; los
+        # contadores vienen en la fila (ver contadores_publicacion.sql)
         response = db.table("publicacion").select("*, usuario(nombre, apellido, foto_perfil), media(*)").order("fecha_creacion", desc=True).range(skip, skip + limit - 1).execute()
+        return response.data
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/timeline", response_model=List[Publicacion])
+async def get_timeline(
+    antes: Optional[datetime] = Query(None, description="Cursor: fecha_creacion de la última publicación recibida"),
+    limit: int = Query(20, ge=1, le=50),
+    orden: str = Query("reciente", pattern="^(reciente|relevante)$"),
+    bajo_puntaje: Optional[float] = Query(None, description="Cursor del orden relevante: puntaje de la última publicación recibida"),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Obtener el timeline personalizado (propias, amigos, grupo y docentes), por fecha o por relevancia"""
+    try:
+        pagina = leer_timeline(db, current_user["id_user"], antes, limit, orden, bajo_puntaje)
+        ids = [id_publicacion for id_publicacion, _ in pagina]
+        if not ids:
+            return []
         
-        # Agregar contadores de comentarios y reacciones
-        publicaciones = response.data
-        for pub in publicaciones:
-            # Contar comentarios
-            comentarios_response = db.table("comentario").select("id_comentario", count="exact").eq("id_publicacion", pub["id_publicacion"]).execute()
-            pub["comentarios_count"] = comentarios_response.count or 0
-            
-            # Contar reacciones
-            reacciones_response = db.table("reaccion").select("id_reaccion", count="exact").eq("id_publicacion", pub["id_publicacion"]).execute()
-            pub["reacciones_count"] = reacciones_response.count or 0
+        response = db.table("publicacion")\
+            .select("*, usuario(nombre, apellido, foto_perfil), media(*)")\
+            .in_("id_publicacion", ids)\
+            .execute()
+        por_id = {pub["id_publicacion"]: pub for pub in response.data}
         
+        publicaciones = []
+        for id_publicacion, clave in pagina:
+            pub = por_id.get(id_publicacion)
+            if pub:  # Eliminada entre la lectura del timeline y la de publicaciones
+                if orden == "relevante":
+                    pub["puntaje"] = clave
+                publicaciones.append(pub)
         return publicaciones
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -85,10 +118,10 @@ async def get_publicacion(
 ):
     """Obtener una publicación por ID"""
     try:
-        response = db.table("publicacion").select("*, usuario(*), media(*)").eq("id_publicacion", id_publicacion).execute()
-        if not response.data:
+        publicacion = leer_entidad(db, "publicacion", id_publicacion)
+        if not publicacion:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Publicación no encontrada")
-        return response.data[0]
+        return publicacion
     except HTTPException:
         raise
     except Exception as e:
@@ -105,14 +138,16 @@ async def update_publicacion(
     """Actualizar una publicación"""
     try:
         # Verificar que es del usuario
-        existing = db.table("publicacion").select("*").eq("id_publicacion", id_publicacion).execute()
-        if not existing.data:
+        existing = leer_entidad(db, "publicacion", id_publicacion)
+        if not existing:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Publicación no encontrada")
-        if existing.data[0]["id_user"] != current_user["id_user"]:
+        if existing["id_user"] != current_user["id_user"]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
         
         update_data = publicacion_data.dict(exclude_unset=True)
         response = db.table("publicacion").update(update_data).eq("id_publicacion", id_publicacion).execute()
+        cache_entidades.invalidar("publicacion", id_publicacion)
+        indexar_publicacion(response.data[0])
         return response.data[0]
     except HTTPException:
         raise
@@ -129,13 +164,15 @@ async def delete_publicacion(
     """Eliminar una publicación"""
     try:
         # Verificar que es del usuario
-        existing = db.table("publicacion").select("*").eq("id_publicacion", id_publicacion).execute()
-        if not existing.data:
+        existing = leer_entidad(db, "publicacion", id_publicacion)
+        if not existing:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Publicación no encontrada")
-        if existing.data[0]["id_user"] != current_user["id_user"]:
+        if existing["id_user"] != current_user["id_user"]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
         
         db.table("publicacion").delete().eq("id_publicacion", id_publicacion).execute()
+        cache_entidades.invalidar("publicacion", id_publicacion)
+        desindexar_publicacion(id_publicacion)
         return None
     except HTTPException:
         raise
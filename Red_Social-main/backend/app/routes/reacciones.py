@@ -1,24 +1,34 @@
 """
 Rutas para gestión de reacciones
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import List, Optional
+from datetime import datetime
 from supabase import Client
 
+from app.config import settings
 from app.database import get_db
-from app.models.social import Reaccion, ReaccionCreate
+from app.models.social import Reaccion, ReaccionAlternada, ReaccionCreate, ResumenReacciones, TipoReaccionEnum
 from app.utils.dependencies import get_current_active_user
+from app.services.cache_entidades import cache_entidades
+from app.services.reacciones import alternar_reaccion, resumir, texto_notificacion
+from app.services.relevancia import PESO_REACCION, registrar_interaccion
 
 router = APIRouter(prefix="/reacciones")
 
 
-@router.post("", response_model=Reaccion, status_code=status.HTTP_201_CREATED)
+@router.post("", response_model=ReaccionAlternada, status_code=status.HTTP_201_CREATED)
 async def create_reaccion(
     reaccion_data: ReaccionCreate,
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Crear o actualizar una reacción"""
+    """
+    Crear o quitar una reacción (toggle)
+
+    Si el usuario ya tenía esa reacción en el destino, la quita. La respuesta
+    trae `activa` y los conteos por tipo del destino después del cambio.
+    """
     try:
         # Validar que no se proporcionen ambos IDs
         if reaccion_data.id_publicacion and reaccion_data.id_comentario:
@@ -34,73 +44,161 @@ async def create_reaccion(
                 detail="Debe proporcionar id_publicacion o id_comentario"
             )
 
-        # Verificar si ya existe una reacción del mismo tipo
-        query = db.table("reaccion").select("*").eq("id_user", current_user["id_user"]).eq("tipo_reac", reaccion_data.tipo_reac.value)
-        
+        # Borrar o crear, relevancia, conteos y notificación en una transacción
+        tipo_reac = reaccion_data.tipo_reac.value
+        notificacion = None
         if reaccion_data.id_publicacion:
-            query = query.eq("id_publicacion", reaccion_data.id_publicacion)
-        else:
-            query = query.eq("id_comentario", reaccion_data.id_comentario)
-        
-        existing = query.execute()
-        
-        if existing.data:
-            # Si ya existe, eliminarla (toggle)
-            db.table("reaccion").delete().eq("id_reaccion", existing.data[0]["id_reaccion"]).execute()
-            return existing.data[0]
-        else:
-            # Crear nueva reacción
-            reac_dict = reaccion_data.dict(exclude_unset=True)
-            reac_dict["id_user"] = current_user["id_user"]  # Agregar id_user del usuario autenticado
-            response = db.table("reaccion").insert(reac_dict).execute()
-            
-            # Crear notificación para el autor de la publicación/comentario
-            try:
-                if reaccion_data.id_publicacion:
-                    publicacion = db.table("publicacion").select("id_user").eq("id_publicacion", reaccion_data.id_publicacion).single().execute()
-                    if publicacion.data and publicacion.data["id_user"] != current_user["id_user"]:
-                        nombre_completo = f"{current_user.get('nombre', '')} {current_user.get('apellido', '')}".strip()
-                        emoji_reaccion = {"like": "👍", "love": "❤️", "wow": "😮", "sad": "😢", "angry": "😠"}.get(reaccion_data.tipo_reac.value, "👍")
-                        notificacion_data = {
-                            "contenido": f"{nombre_completo} reaccionó {emoji_reaccion} a tu publicación",
-                            "tipo": "reaccion",
-                            "id_user": publicacion.data["id_user"],
-                            "leida": False
-                        }
-                        db.table("notificacion").insert(notificacion_data).execute()
-            except Exception as notif_error:
-                print(f"Error creando notificación: {notif_error}")
-            
-            return response.data[0]
-            
+            notificacion = texto_notificacion(current_user, tipo_reac)
+        resultado = alternar_reaccion(
+            db, current_user["id_user"], tipo_reac,
+            reaccion_data.id_publicacion, reaccion_data.id_comentario, notificacion
+        )
+        if resultado is None:
+            detalle = "Publicación no encontrada" if reaccion_data.id_publicacion else "Comentario no encontrado"
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detalle)
+        if reaccion_data.id_publicacion:
+            cache_entidades.invalidar("publicacion", reaccion_data.id_publicacion)
+
+        return {**resultado["reaccion"], "activa": resultado["activa"], "conteos": resultado["conteos"]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+def _separar_ids(texto: Optional[str]) -> List[str]:
+    """IDs separados por comas, sin vacíos ni repetidos"""
+    return list(dict.fromkeys(i.strip() for i in (texto or "").split(",") if i.strip()))
+
+
+def _listar_reacciones(
+    db: Client,
+    columna: str,
+    id_destino: str,
+    tipo: Optional[TipoReaccionEnum],
+    antes: Optional[datetime],
+    antes_id: Optional[str],
+    limit: int
+) -> List[dict]:
+    """Página de reacciones de un destino con el perfil de cada usuario, de la más nueva a la más vieja"""
+    query = db.table("reaccion")\
+        .select("*, usuario(nombre, apellido, foto_perfil)")\
+        .eq(columna, id_destino)
+    if tipo:
+        query = query.eq("tipo_reac", tipo.value)
+    if antes and antes_id:
+        # Desempate por id_reaccion para no saltear reacciones con la misma fecha
+        fecha = antes.isoformat()
+        query = query.or_(
+            f"fecha_creacion_reac.lt.{fecha},"
+            f"and(fecha_creacion_reac.eq.{fecha},id_reaccion.lt.{antes_id})"
+        )
+    elif antes:
+        query = query.lt("fecha_creacion_reac", antes.isoformat())
+    return query\
+        .order("fecha_creacion_reac", desc=True)\
+        .order("id_reaccion", desc=True)\
+        .limit(limit)\
+        .execute().data
+
+
+@router.get("/resumen", response_model=List[ResumenReacciones])
+async def get_resumen_reacciones(
+    publicaciones: Optional[str] = Query(None, description="IDs de publicaciones separados por comas"),
+    comentarios: Optional[str] = Query(None, description="IDs de comentarios separados por comas"),
+    usuarios: int = Query(settings.REACTION_SUMMARY_USERS, ge=0, le=20, description="Perfiles de los últimos que reaccionaron"),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Resúmenes de reacciones de varias publicaciones y comentarios en una llamada
+
+    Los IDs que no existen se omiten de la respuesta.
+    """
+    try:
+        ids_publicaciones = _separar_ids(publicaciones)
+        ids_comentarios = _separar_ids(comentarios)
+        if len(ids_publicaciones) + len(ids_comentarios) > settings.REACTION_SUMMARY_MAX_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Máximo {settings.REACTION_SUMMARY_MAX_IDS} publicaciones y comentarios por llamada"
+            )
+        return resumir(db, current_user["id_user"], ids_publicaciones, ids_comentarios, usuarios)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@router.get("/publicacion/{id_publicacion}", response_model=List[Reaccion])
+@router.get("/publicacion/{id_publicacion}", response_model=ResumenReacciones)
 async def get_reacciones_publicacion(
     id_publicacion: str,
+    usuarios: int = Query(settings.REACTION_SUMMARY_USERS, ge=0, le=20, description="Perfiles de los últimos que reaccionaron"),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Resumen de reacciones de una publicación (el listado completo está en /usuarios)"""
+    try:
+        resumenes = resumir(db, current_user["id_user"], [id_publicacion], [], usuarios)
+        if not resumenes:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Publicación no encontrada")
+        return resumenes[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/publicacion/{id_publicacion}/usuarios", response_model=List[Reaccion])
+async def get_reaccionantes_publicacion(
+    id_publicacion: str,
+    tipo: Optional[TipoReaccionEnum] = Query(None, description="Solo reacciones de este tipo"),
+    antes: Optional[datetime] = Query(None, description="Cursor: fecha_creacion_reac de la última reacción recibida"),
+    antes_id: Optional[str] = Query(None, description="Cursor: id_reaccion de la última reacción recibida"),
+    limit: int = Query(50, ge=1, le=100),
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Obtener reacciones de una publicación"""
+    """Reacciones de una publicación con el perfil de quien reaccionó, paginadas con `antes` y `antes_id`"""
     try:
-        response = db.table("reaccion").select("*").eq("id_publicacion", id_publicacion).execute()
-        return response.data
+        return _listar_reacciones(db, "id_publicacion", id_publicacion, tipo, antes, antes_id, limit)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@router.get("/comentario/{id_comentario}", response_model=List[Reaccion])
+@router.get("/comentario/{id_comentario}", response_model=ResumenReacciones)
 async def get_reacciones_comentario(
     id_comentario: str,
+    usuarios: int = Query(settings.REACTION_SUMMARY_USERS, ge=0, le=20, description="Perfiles de los últimos que reaccionaron"),
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Obtener reacciones de un comentario"""
+    """Resumen de reacciones de un comentario (el listado completo está en /usuarios)"""
     try:
-        response = db.table("reaccion").select("*").eq("id_comentario", id_comentario).execute()
-        return response.data
+        resumenes = resumir(db, current_user["id_user"], [], [id_comentario], usuarios)
+        if not resumenes:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comentario no encontrado")
+        return resumenes[0]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/comentario/{id_comentario}/usuarios", response_model=List[Reaccion])
+async def get_reaccionantes_comentario(
+    id_comentario: str,
+    tipo: Optional[TipoReaccionEnum] = Query(None, description="Solo reacciones de este tipo"),
+    antes: Optional[datetime] = Query(None, description="Cursor: fecha_creacion_reac de la última reacción recibida"),
+    antes_id: Optional[str] = Query(None, description="Cursor: id_reaccion de la última reacción recibida"),
+    limit: int = Query(50, ge=1, le=100),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Reacciones de un comentario con el perfil de quien reaccionó, paginadas con `antes` y `antes_id`"""
+    try:
+        return _listar_reacciones(db, "id_comentario", id_comentario, tipo, antes, antes_id, limit)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -120,6 +218,12 @@ async def delete_reaccion(
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
         
         db.table("reaccion").delete().eq("id_reaccion", id_reaccion).execute()
+        if existing.data[0].get("id_publicacion"):
+            registrar_interaccion(
+                db, existing.data[0]["id_publicacion"], PESO_REACCION,
+                existing.data[0]["fecha_creacion_reac"], signo=-1
+            )
+            cache_entidades.invalidar("publicacion", existing.data[0]["id_publicacion"])
         return None
     except HTTPException:
         raise
@@ -8,6 +8,9 @@ from supabase import Client
 from app.database import get_db
 from app.models.carpooling import Ruta, RutaCreate, RutaUpdate, MisRutas
 from app.utils.dependencies import get_current_active_user
+from app.services.cache_entidades import cache_entidades, leer_entidad
+from app.services.sincronizacion import rutas_de_conductor
+from app.utils.concurrencia import en_paralelo
 
 router = APIRouter(prefix="/rutas-carpooling")
 
@@ -80,33 +83,21 @@ async def get_mis_rutas(
 ):
     """Obtener rutas del usuario (como conductor y pasajero)"""
     try:
-        # Rutas como conductor
-        conductor_response = db.table("ruta")\
-            .select("*, usuario:usuario(nombre, apellido, foto_perfil)")\
-            .eq("id_user", current_user["id_user"])\
-            .execute()
-        
-        # Calcular pasajeros aceptados para cada ruta como conductor
-        rutas_conductor = conductor_response.data
-        for ruta in rutas_conductor:
-            pasajeros_response = db.table("pasajeroruta")\
-                .select("*")\
-                .eq("id_ruta", ruta["id_ruta"])\
-                .eq("estado", "aceptado")\
-                .execute()
-            ruta["pasajeros_aceptados"] = len(pasajeros_response.data) if pasajeros_response.data else 0
-            ruta["lugares_disponibles"] = ruta["capacidad_ruta"] - ruta["pasajeros_aceptados"]
-        
-        # Rutas como pasajero
-        pasajero_response = db.table("pasajeroruta")\
-            .select("*, ruta:ruta(*), usuario:usuario(nombre, apellido, foto_perfil)")\
-            .eq("id_user", current_user["id_user"])\
-            .execute()
+        # Rutas como conductor y como pasajero (a la vez)
+        rutas_conductor, pasajero_response = await en_paralelo(
+            lambda: rutas_de_conductor(db, current_user["id_user"]),
+            lambda: db.table("pasajeroruta")
+                .select("*, ruta:ruta(*), usuario:usuario(nombre, apellido, foto_perfil)")
+                .eq("id_user", current_user["id_user"])
+                .execute(),
+        )
         
         return {
             "como_conductor": rutas_conductor,
             "como_pasajero": pasajero_response.data
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -119,15 +110,11 @@ async def get_ruta(
 ):
     """Obtener una ruta por ID"""
     try:
-        response = db.table("ruta")\
-            .select("*, usuario:usuario(*), parada:parada(*)")\
-            .eq("id_ruta", id_ruta)\
-            .execute()
-        if not response.data:
+        ruta = leer_entidad(db, "ruta", id_ruta)
+        if not ruta:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ruta no encontrada")
         
-        ruta = response.data[0]
-        # Calcular pasajeros aceptados
+        # Calcular pasajeros aceptados (no se cachea: cambia con cada solicitud)
         pasajeros_response = db.table("pasajeroruta")\
             .select("*")\
             .eq("id_ruta", ruta["id_ruta"])\
@@ -153,14 +140,15 @@ async def update_ruta(
     """Actualizar una ruta"""
     try:
         # Verificar que es del conductor
-        existing = db.table("ruta").select("*").eq("id_ruta", id_ruta).execute()
-        if not existing.data:
+        existing = leer_entidad(db, "ruta", id_ruta)
+        if not existing:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ruta no encontrada")
-        if existing.data[0]["id_user"] != current_user["id_user"]:
+        if existing["id_user"] != current_user["id_user"]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
         
         update_data = ruta_data.dict(exclude_unset=True)
         response = db.table("ruta").update(update_data).eq("id_ruta", id_ruta).execute()
+        cache_entidades.invalidar("ruta", id_ruta)
         return response.data[0]
     except HTTPException:
         raise
@@ -176,14 +164,15 @@ async def delete_ruta(
 ):
     """Eliminar una ruta (desactivarla)"""
     try:
-        existing = db.table("ruta").select("*").eq("id_ruta", id_ruta).execute()
-        if not existing.data:
+        existing = leer_entidad(db, "ruta", id_ruta)
+        if not existing:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ruta no encontrada")
-        if existing.data[0]["id_user"] != current_user["id_user"]:
+        if existing["id_user"] != current_user["id_user"]:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
         
         # Desactivar en lugar de eliminar
         db.table("ruta").update({"activa": False}).eq("id_ruta", id_ruta).execute()
+        cache_entidades.invalidar("ruta", id_ruta)
         return None
     except HTTPException:
         raise
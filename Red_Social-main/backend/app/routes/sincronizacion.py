@@ -0,0 +1,50 @@
+"""
+Ruta de sincronización delta para clientes móviles
+"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional
+from supabase import Client
+
+from app.config import settings
+from app.database import get_db
+from app.models.sincronizacion import Sincronizacion
+from app.utils.dependencies import get_current_active_user
+from app.services.sincronizacion import COLECCIONES, sincronizar
+
+router = APIRouter(prefix="/sync")
+
+
+@router.get("", response_model=Sincronizacion, response_model_exclude_unset=True)
+async def sincronizar_colecciones(
+    notificaciones: Optional[int] = Query(None, ge=0),
+    solicitudes_recibidas: Optional[int] = Query(None, ge=0),
+    solicitudes_enviadas: Optional[int] = Query(None, ge=0),
+    amigos: Optional[int] = Query(None, ge=0),
+    rutas_conductor: Optional[int] = Query(None, ge=0),
+    rutas_pasajero: Optional[int] = Query(None, ge=0),
+    db: Client = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """
+    Sincronizar notificaciones, solicitudes, amigos y mis rutas
+
+    Cada parámetro es el cursor de una colección (el `cursor` devuelto por la
+    sincronización anterior); solo se devuelven las colecciones pedidas, con
+    lo que cambió y los IDs eliminados desde ese cursor. Con 0 la colección
+    viene completa. Sin parámetros se devuelven todas completas.
+    """
+    try:
+        pedidos = {
+            "notificaciones": notificaciones,
+            "solicitudes_recibidas": solicitudes_recibidas,
+            "solicitudes_enviadas": solicitudes_enviadas,
+            "amigos": amigos,
+            "rutas_conductor": rutas_conductor,
+            "rutas_pasajero": rutas_pasajero,
+        }
+        cursores = {c: cursor for c, cursor in pedidos.items() if cursor is not None}
+        if not cursores:
+            cursores = dict.fromkeys(COLECCIONES, 0)
+        return sincronizar(db, current_user["id_user"], cursores, settings.SYNC_MAX_CHANGES)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
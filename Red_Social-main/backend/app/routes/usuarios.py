@@ -1,7 +1,7 @@
 """
 Rutas para gestión de usuarios
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from typing import List, Optional
 from supabase import Client
 from datetime import datetime
@@ -9,6 +9,7 @@ from datetime import datetime
 from app.database import get_db
 from app.models.usuario import (
     Usuario,
+    UsuarioParcial,
     UsuarioUpdate,
     UsuarioInDB
 )
@@ -17,24 +18,36 @@ from app.utils.dependencies import (
     require_admin
 )
 from app.utils.security import get_password_hash
+from app.services.busqueda_usuarios import get_indice, indexar_usuario
+from app.services.cache_entidades import cache_entidades
+from app.utils.etag import ValidadorRespuesta, marcar_modificado
+from app.utils.proyecciones import campos_pedidos, columnas
 
 router = APIRouter(prefix="/usuarios")
 
 
-@router.get("", response_model=List[Usuario])
+@router.get("", response_model=List[UsuarioParcial], response_model_exclude_unset=True)
 async def get_usuarios(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     rol: Optional[str] = None,
     activo: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="Columnas a incluir, por ejemplo 'nombre,apellido,correo'"),
     db: Client = Depends(get_db),
     current_user: dict = Depends(require_admin)
 ):
     """
     Obtener lista de usuarios (solo administradores)
+
+    Con `fields` solo se piden esas columnas (siempre con id_user).
     """
     try:
-        query = db.table("usuario").select("*")
+        campos = campos_pedidos("usuario", fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        query = db.table("usuario").select(columnas("usuario") if campos is None else ", ".join(campos))
         
         # Filtros opcionales
         if rol:
@@ -47,13 +60,7 @@ async def get_usuarios(
         
         response = query.execute()
         
-        # Remover contraseñas
-        usuarios = [
-            {k: v for k, v in user.items() if k != "contrasena"}
-            for user in response.data
-        ]
-        
-        return usuarios
+        return response.data
         
     except Exception as e:
         raise HTTPException(
@@ -65,6 +72,7 @@ async def get_usuarios(
 @router.get("/{id_user}", response_model=Usuario)
 async def get_usuario(
     id_user: str,
+    request: Request,
     db: Client = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
@@ -72,7 +80,18 @@ async def get_usuario(
     Obtener un usuario por ID
     """
     try:
-        response = db.table("usuario").select("*").eq("id_user", id_user).execute()
+        # Solo admins o el mismo usuario pueden ver detalles completos
+        detalles_completos = current_user["id_user"] == id_user or current_user["rol"] == "administrador"
+        vista = "completo" if detalles_completos else "publico"
+        validador = ValidadorRespuesta(
+            request, ("usuario",), Usuario if detalles_completos else None,
+            alcance=vista
+        )
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        
+        response = db.table("usuario").select(columnas("usuario", vista)).eq("id_user", id_user).execute()
         
         if not response.data:
             raise HTTPException(
@@ -80,23 +99,7 @@ async def get_usuario(
                 detail="Usuario no encontrado"
             )
         
-        user = response.data[0]
-        
-        # Solo admins o el mismo usuario pueden ver detalles completos
-        if current_user["id_user"] != id_user and current_user["rol"] != "administrador":
-            # Retornar solo información pública
-            user = {
-                "id_user": user["id_user"],
-                "nombre": user["nombre"],
-                "apellido": user["apellido"],
-                "rol": user["rol"],
-                "foto_perfil": user.get("foto_perfil")
-            }
-        else:
-            # Remover contraseña
-            user = {k: v for k, v in user.items() if k != "contrasena"}
-        
-        return user
+        return validador.responder(response.data[0])
         
     except HTTPException:
         raise
@@ -160,6 +163,9 @@ async def update_usuario(
             )
         
         updated_user = response.data[0]
+        indexar_usuario(updated_user)
+        marcar_modificado("usuario")
+        cache_entidades.invalidar("usuario", id_user)
         
         # Remover contraseña
         user_response = {k: v for k, v in updated_user.items() if k != "contrasena"}
@@ -197,6 +203,9 @@ async def delete_usuario(
         
         # Desactivar en lugar de eliminar
         db.table("usuario").update({"activo": False}).eq("id_user", id_user).execute()
+        indexar_usuario({"id_user": id_user, "activo": False})
+        marcar_modificado("usuario")
+        cache_entidades.invalidar("usuario", id_user)
         
         return None
         
@@ -220,12 +229,10 @@ async def search_usuarios(
     Buscar usuarios por nombre, apellido o correo
     """
     try:
-        # Buscar en nombre, apellido o correo
-        response = db.table("usuario").select("*").or_(
-            f"nombre.ilike.%{q}%,apellido.ilike.%{q}%,correo.ilike.%{q}%"
-        ).eq("activo", True).limit(limit).execute()
+        # Buscar en nombre, apellido o correo usando el índice en memoria
+        encontrados = (await get_indice(db)).buscar(q, limit=limit, solo_activos=True)
         
-        if not response.data:
+        if not encontrados:
             return []
             
         # Retornar solo información pública
@@ -240,7 +247,7 @@ async def search_usuarios(
                 "activo": user.get("activo", True),
                 "fecha_registro": user.get("fecha_registro", datetime.now().isoformat())
             }
-            for user in response.data
+            for user in encontrados
         ]
         
         return usuarios
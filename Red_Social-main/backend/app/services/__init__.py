@@ -0,0 +1,3 @@
+"""
+Servicios de la aplicación (índices, cachés y lógica compartida entre rutas)
+"""
@@ -0,0 +1,609 @@
+"""
+Índice de texto completo para publicaciones y comentarios
+
+Índice invertido en memoria con análisis para español:
+- Normalización sin acentos ni mayúsculas (misma que la búsqueda de usuarios)
+- Eliminación de palabras vacías ("el", "de", "para", ...)
+- Reducción ligera de plurales y género ("profesores" == "profesora" == "profesor")
+- Ranking BM25 y fragmentos con las coincidencias resaltadas
+
+Se actualiza de forma incremental desde publicaciones.py y comentarios.py y se
+recarga completo en segundo plano cada SEARCH_INDEX_REFRESH_SECONDS (cada
+worker tiene su propia copia). El script reconstruir_indice_contenido.py lo
+reconstruye fuera de línea y guarda una instantánea que los workers cargan al
+arrancar en lugar de leer las dos tablas completas.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import html
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+import time
+
+from supabase import Client
+
+from app.config import settings
+from app.services.busqueda_usuarios import normalizar
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_PUBLICACION = "id_publicacion, contenido, fecha_creacion, tipo, id_user"
+COLUMNAS_COMENTARIO = "id_comentario, contenido, fecha_creacion, id_user, id_publicacion"
+
+# Tamaño de página al cargar desde PostgREST (su límite por defecto es 1000)
+TAMANO_PAGINA_CARGA = 1000
+
+# Parámetros de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Largo aproximado del fragmento devuelto (en caracteres)
+LARGO_FRAGMENTO = 160
+MARCA_INICIO = "<mark>"
+MARCA_FIN = "</mark>"
+
+PALABRAS_VACIAS = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde
+durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este
+esto estos fue ha hay la las le les lo los mas me mi mis muy nada ni no nos o os otra
+otro para pero poco por porque que quien se sea ser si sin sobre su sus tambien te
+tiene tu tus un una unas uno unos y ya yo
+""".split())
+
+_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+
+def raiz(palabra: str) -> str:
+    """
+    Reduce una palabra normalizada a su raíz (stemmer ligero para español)
+
+    Solo quita plurales y la vocal final de género/número, que es lo que más
+    varía entre cómo se escribe un anuncio y cómo se busca.
+
+    Args:
+        palabra: Palabra normalizada (sin acentos, en minúsculas)
+
+    Returns:
+        Raíz de la palabra
+    """
+    if len(palabra) <= 3:
+        return palabra
+    if palabra.endswith("ces"):
+        return palabra[:-3] + "z"
+    if palabra.endswith("s"):
+        palabra = palabra[:-1]
+    if len(palabra) > 4 and palabra[-1] in "aeo":
+        palabra = palabra[:-1]
+    return palabra
+
+
+def analizar(texto: Optional[str]) -> List[str]:
+    """
+    Convierte un texto en la lista de términos que se indexan
+
+    Args:
+        texto: Texto original
+
+    Returns:
+        Raíces de las palabras que no son palabras vacías
+    """
+    terminos = []
+    for palabra in _PALABRA.findall(normalizar(texto)):
+        if palabra in PALABRAS_VACIAS:
+            continue
+        terminos.append(raiz(palabra))
+    return terminos
+
+
+def fragmento(texto: str, terminos: set, largo: int = LARGO_FRAGMENTO) -> str:
+    """
+    Extrae el trozo del texto con más coincidencias y las resalta
+
+    Args:
+        texto: Contenido original
+        terminos: Raíces buscadas
+        largo: Largo aproximado del fragmento
+
+    Returns:
+        Fragmento escapado para HTML con las coincidencias entre MARCA_INICIO y MARCA_FIN
+    """
+    coincidencias = [
+        m for m in _PALABRA.finditer(texto)
+        if raiz(normalizar(m.group())) in terminos
+    ]
+    if not coincidencias:
+        return html.escape(texto[:largo]) + ("…" if len(texto) > largo else "")
+
+    # Ventana que contiene más coincidencias empezando en alguna de ellas
+    mejor_inicio, mejor_cantidad, fin = 0, 0, 0
+    for i, m in enumerate(coincidencias):
+        while fin < len(coincidencias) and coincidencias[fin].end() - m.start() <= largo:
+            fin += 1
+        if fin - i > mejor_cantidad:
+            mejor_inicio, mejor_cantidad = i, fin - i
+
+    centro = coincidencias[mejor_inicio].start()
+    inicio = max(0, centro - largo // 4)
+    # No cortar palabras al inicio
+    if inicio > 0:
+        espacio = texto.rfind(" ", 0, inicio)
+        inicio = espacio + 1 if espacio != -1 else 0
+    final = min(len(texto), inicio + largo)
+    if final < len(texto):
+        espacio = texto.rfind(" ", inicio, final)
+        if espacio > centro:
+            final = espacio
+
+    partes = ["…" if inicio > 0 else ""]
+    cursor = inicio
+    for m in coincidencias:
+        if m.start() < inicio or m.end() > final:
+            continue
+        partes.append(html.escape(texto[cursor:m.start()]))
+        partes.append(f"{MARCA_INICIO}{html.escape(m.group())}{MARCA_FIN}")
+        cursor = m.end()
+    partes.append(html.escape(texto[cursor:final]))
+    partes.append("…" if final < len(texto) else "")
+    return "".join(partes)
+
+
+def fecha_utc(valor) -> Optional[datetime]:
+    """
+    Fecha en UTC sin zona horaria, como se guardan en el índice
+
+    Args:
+        valor: datetime o texto ISO; los que traen zona se convierten a UTC
+            y los que no se toman como UTC
+
+    Returns:
+        La fecha, o None si falta o no se puede leer
+    """
+    if valor is None:
+        return None
+    if not isinstance(valor, datetime):
+        try:
+            valor = datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if valor.tzinfo is not None:
+        valor = valor.astimezone(timezone.utc).replace(tzinfo=None)
+    return valor
+
+
+class IndiceContenido:
+    """
+    Índice invertido de publicaciones y comentarios
+
+    Cada documento se identifica por (origen, id), con origen "publicacion" o
+    "comentario". Guarda solo lo necesario para filtrar, puntuar y armar el
+    fragmento; los datos del autor se completan en la ruta.
+    """
+
+    def __init__(self):
+        # (origen, id) -> datos del documento
+        self._docs: Dict[Tuple[str, str], dict] = {}
+        # término -> {(origen, id): frecuencia}
+        self._postings: Dict[str, Dict[Tuple[str, str], int]] = {}
+        # (origen, id) -> cantidad de términos (para normalizar BM25)
+        self._largos: Dict[Tuple[str, str], int] = {}
+        self._largo_total = 0
+        # id_publicacion -> ids de sus comentarios (para borrar en cascada)
+        self._comentarios: Dict[str, set] = {}
+        self._lock = threading.RLock()
+        self.cargado = False
+        self.cargado_en = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado["_lock"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.RLock()
+
+    # ----------------------------------------------------------------- escritura
+
+    def agregar_publicacion(self, publicacion: dict) -> None:
+        """
+        Agrega o actualiza una publicación
+
+        Args:
+            publicacion: Fila de la tabla publicacion
+        """
+        clave = ("publicacion", publicacion["id_publicacion"])
+        with self._lock:
+            anterior = self._docs.get(clave, {})
+            self._agregar(clave, {
+                "origen": "publicacion",
+                "id": publicacion["id_publicacion"],
+                "id_publicacion": publicacion["id_publicacion"],
+                "contenido": publicacion.get("contenido", anterior.get("contenido", "")),
+                "tipo": publicacion.get("tipo", anterior.get("tipo")),
+                "id_user": publicacion.get("id_user", anterior.get("id_user")),
+                "fecha_creacion": fecha_utc(publicacion.get("fecha_creacion", anterior.get("fecha_creacion"))),
+            })
+
+    def agregar_comentario(self, comentario: dict) -> None:
+        """
+        Agrega o actualiza un comentario
+
+        Args:
+            comentario: Fila de la tabla comentario
+        """
+        clave = ("comentario", comentario["id_comentario"])
+        with self._lock:
+            anterior = self._docs.get(clave, {})
+            self._agregar(clave, {
+                "origen": "comentario",
+                "id": comentario["id_comentario"],
+                "id_publicacion": comentario.get("id_publicacion", anterior.get("id_publicacion")),
+                "contenido": comentario.get("contenido", anterior.get("contenido", "")),
+                "tipo": None,
+                "id_user": comentario.get("id_user", anterior.get("id_user")),
+                "fecha_creacion": fecha_utc(comentario.get("fecha_creacion", anterior.get("fecha_creacion"))),
+            })
+
+    def eliminar_publicacion(self, id_publicacion: str) -> None:
+        """
+        Quita una publicación y sus comentarios (la BD los borra en cascada)
+
+        Args:
+            id_publicacion: ID de la publicación
+        """
+        with self._lock:
+            self._quitar(("publicacion", id_publicacion))
+            for id_comentario in list(self._comentarios.get(id_publicacion, ())):
+                self._quitar(("comentario", id_comentario))
+
+    def eliminar_comentario(self, id_comentario: str) -> None:
+        """
+        Quita un comentario
+
+        Args:
+            id_comentario: ID del comentario
+        """
+        with self._lock:
+            self._quitar(("comentario", id_comentario))
+
+    def _agregar(self, clave: Tuple[str, str], doc: dict) -> None:
+        self._quitar(clave)
+        terminos = Counter(analizar(doc["contenido"]))
+        for termino, frecuencia in terminos.items():
+            self._postings.setdefault(termino, {})[clave] = frecuencia
+        largo = sum(terminos.values())
+        self._docs[clave] = doc
+        self._largos[clave] = largo
+        self._largo_total += largo
+        if clave[0] == "comentario":
+            self._comentarios.setdefault(doc["id_publicacion"], set()).add(clave[1])
+
+    def _quitar(self, clave: Tuple[str, str]) -> None:
+        doc = self._docs.pop(clave, None)
+        if doc is None:
+            return
+        self._largo_total -= self._largos.pop(clave, 0)
+        if clave[0] == "comentario":
+            hermanos = self._comentarios.get(doc["id_publicacion"])
+            if hermanos is not None:
+                hermanos.discard(clave[1])
+                if not hermanos:
+                    del self._comentarios[doc["id_publicacion"]]
+        for termino in set(analizar(doc["contenido"])):
+            postings = self._postings.get(termino)
+            if postings is None:
+                continue
+            postings.pop(clave, None)
+            if not postings:
+                del self._postings[termino]
+
+    # ------------------------------------------------------------------ lectura
+
+    def buscar(
+        self,
+        q: str,
+        origen: Optional[str] = None,
+        tipo: Optional[str] = None,
+        id_user: Optional[str] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> Tuple[int, List[dict]]:
+        """
+        Busca publicaciones y comentarios ordenados por relevancia (BM25)
+
+        Un documento debe contener todos los términos de la consulta.
+
+        Args:
+            q: Texto de búsqueda
+            origen: "publicacion" o "comentario" para buscar solo en uno
+            tipo: Tipo de publicación (los comentarios heredan el de su publicación)
+            id_user: Autor
+            desde: Fecha mínima de creación
+            hasta: Fecha máxima de creación
+            skip: Resultados a saltar
+            limit: Cantidad máxima de resultados
+
+        Returns:
+            Tupla (total de coincidencias, resultados de la página con puntaje y fragmento)
+        """
+        terminos = list(dict.fromkeys(analizar(q)))
+        if not terminos:
+            return 0, []
+
+        with self._lock:
+            postings = [self._postings.get(t) for t in terminos]
+            if not all(postings):
+                return 0, []
+            postings.sort(key=len)
+
+            cantidad_docs = len(self._docs)
+            largo_medio = self._largo_total / cantidad_docs if cantidad_docs else 0
+            idf = [
+                math.log(1 + (cantidad_docs - len(p) + 0.5) / (len(p) + 0.5))
+                for p in postings
+            ]
+
+            candidatos = []
+            for clave in postings[0]:
+                if not all(clave in p for p in postings[1:]):
+                    continue
+                doc = self._docs[clave]
+                if origen and doc["origen"] != origen:
+                    continue
+                if tipo and self._tipo(doc) != tipo:
+                    continue
+                if id_user and doc["id_user"] != id_user:
+                    continue
+                fecha = doc["fecha_creacion"]
+                if desde and (fecha is None or fecha < desde):
+                    continue
+                if hasta and (fecha is None or fecha > hasta):
+                    continue
+
+                normalizacion = BM25_K1 * (1 - BM25_B + BM25_B * self._largos[clave] / (largo_medio or 1))
+                puntaje = 0.0
+                for p, peso in zip(postings, idf):
+                    frecuencia = p[clave]
+                    puntaje += peso * frecuencia * (BM25_K1 + 1) / (frecuencia + normalizacion)
+                candidatos.append((puntaje, fecha or datetime.min, clave))
+
+            pagina = heapq.nlargest(skip + limit, candidatos, key=lambda c: (c[0], c[1]))[skip:]
+            buscados = set(terminos)
+            resultados = []
+            for puntaje, _, clave in pagina:
+                doc = self._docs[clave]
+                resultados.append({
+                    "origen": doc["origen"],
+                    "id": doc["id"],
+                    "id_publicacion": doc["id_publicacion"],
+                    "id_user": doc["id_user"],
+                    "tipo": self._tipo(doc),
+                    "fecha_creacion": doc["fecha_creacion"],
+                    "puntaje": round(puntaje, 4),
+                    "fragmento": fragmento(doc["contenido"], buscados),
+                })
+            return len(candidatos), resultados
+
+    def _tipo(self, doc: dict) -> Optional[str]:
+        if doc["origen"] == "publicacion":
+            return doc["tipo"]
+        publicacion = self._docs.get(("publicacion", doc["id_publicacion"]))
+        return publicacion["tipo"] if publicacion else None
+
+
+# Instancia global (una por worker)
+_indice = IndiceContenido()
+_recarga_en_curso = threading.Lock()
+# Serializa indexar_*/desindexar_* con el reemplazo del índice
+_escrituras = threading.Lock()
+# Escrituras hechas durante una carga (método, argumento), para repetirlas sobre el índice nuevo
+_pendientes: Optional[List[Tuple[str, object]]] = None
+
+
+def _leer_tabla(db: Client, tabla: str, columnas: str, orden: str) -> List[dict]:
+    filas = []
+    desde = 0
+    while True:
+        pagina = db.table(tabla)\
+            .select(columnas)\
+            .order(orden)\
+            .range(desde, desde + TAMANO_PAGINA_CARGA - 1)\
+            .execute()
+        filas.extend(pagina.data)
+        if len(pagina.data) < TAMANO_PAGINA_CARGA:
+            return filas
+        desde += TAMANO_PAGINA_CARGA
+
+
+def construir_indice(db: Client) -> IndiceContenido:
+    """
+    Construye un índice nuevo leyendo publicaciones y comentarios por páginas
+
+    Args:
+        db: Cliente de base de datos
+
+    Returns:
+        Índice cargado
+    """
+    inicio = time.perf_counter()
+    indice = IndiceContenido()
+    for publicacion in _leer_tabla(db, "publicacion", COLUMNAS_PUBLICACION, "id_publicacion"):
+        indice.agregar_publicacion(publicacion)
+    for comentario in _leer_tabla(db, "comentario", COLUMNAS_COMENTARIO, "id_comentario"):
+        indice.agregar_comentario(comentario)
+
+    indice.cargado = True
+    indice.cargado_en = time.monotonic()
+    logger.info(
+        f"Índice de contenido cargado: {len(indice)} documentos "
+        f"en {time.perf_counter() - inicio:.2f}s"
+    )
+    return indice
+
+
+def guardar_instantanea(indice: IndiceContenido, ruta: str) -> None:
+    """
+    Guarda el índice en disco para que los workers arranquen sin leer las tablas
+
+    Args:
+        indice: Índice a guardar
+        ruta: Archivo de destino
+    """
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "wb") as archivo:
+        pickle.dump(indice, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, ruta)
+
+
+def cargar_instantanea(ruta: str) -> Optional[IndiceContenido]:
+    """
+    Carga un índice guardado con guardar_instantanea
+
+    La antigüedad del archivo cuenta como antigüedad del índice, así que una
+    instantánea vieja se refresca en segundo plano en la primera búsqueda.
+
+    Args:
+        ruta: Archivo de la instantánea
+
+    Returns:
+        Índice cargado o None si no existe o no se puede leer
+    """
+    if not ruta or not os.path.exists(ruta):
+        return None
+    try:
+        with open(ruta, "rb") as archivo:
+            indice = pickle.load(archivo)
+    except Exception as e:
+        logger.error(f"No se pudo leer la instantánea del índice de contenido: {e}")
+        return None
+    indice.cargado = True
+    indice.cargado_en = time.monotonic() - (time.time() - os.path.getmtime(ruta))
+    return indice
+
+
+def _reconstruir(db: Client, instantanea: Optional[str] = None) -> None:
+    """
+    Carga un índice nuevo (de la instantánea si se indica, si no de las tablas)
+    y lo pone en lugar del actual
+
+    Las escrituras que llegan mientras tanto se aplican al índice actual y se
+    anotan en `_pendientes`; antes del reemplazo se repiten sobre el índice
+    nuevo bajo el mismo candado, así no se pierde una publicación creada ni
+    reaparece una eliminada durante la recarga.
+    """
+    global _indice, _pendientes
+    with _escrituras:
+        _pendientes = []
+    try:
+        nuevo = (cargar_instantanea(instantanea) if instantanea else None) or construir_indice(db)
+        with _escrituras:
+            for metodo, argumento in _pendientes:
+                getattr(nuevo, metodo)(argumento)
+            _indice = nuevo
+    finally:
+        with _escrituras:
+            _pendientes = None
+
+
+def _recargar_en_segundo_plano(db: Client) -> None:
+    try:
+        _reconstruir(db)
+    except Exception as e:
+        logger.error(f"Error al recargar el índice de contenido: {e}")
+    finally:
+        _recarga_en_curso.release()
+
+
+def _primera_carga(db: Client) -> None:
+    with _recarga_en_curso:
+        if not _indice.cargado:
+            _reconstruir(db, settings.CONTENT_INDEX_SNAPSHOT)
+
+
+async def get_indice(db: Client) -> IndiceContenido:
+    """
+    Devuelve el índice, cargándolo la primera vez y refrescándolo si está viejo
+
+    La primera carga usa la instantánea en disco si existe; si no, lee las
+    tablas. Se hace en un hilo del pool para no bloquear el event loop.
+
+    Args:
+        db: Cliente de base de datos
+
+    Returns:
+        Índice de contenido listo para buscar
+    """
+    if not _indice.cargado:
+        await asyncio.get_running_loop().run_in_executor(None, _primera_carga, db)
+        return _indice
+
+    antiguedad = time.monotonic() - _indice.cargado_en
+    if antiguedad > settings.SEARCH_INDEX_REFRESH_SECONDS and _recarga_en_curso.acquire(blocking=False):
+        threading.Thread(target=_recargar_en_segundo_plano, args=(db,), daemon=True).start()
+    return _indice
+
+
+def _aplicar(metodo: str, argumento) -> None:
+    """Aplica una escritura al índice actual y la anota si hay una carga en curso"""
+    with _escrituras:
+        if _indice.cargado:
+            getattr(_indice, metodo)(argumento)
+        if _pendientes is not None:
+            _pendientes.append((metodo, argumento))
+
+
+def indexar_publicacion(publicacion: Optional[dict]) -> None:
+    """
+    Actualiza el índice tras crear o editar una publicación
+
+    Args:
+        publicacion: Fila de la tabla publicacion
+    """
+    if publicacion:
+        _aplicar("agregar_publicacion", publicacion)
+
+
+def indexar_comentario(comentario: Optional[dict]) -> None:
+    """
+    Actualiza el índice tras crear o editar un comentario
+
+    Args:
+        comentario: Fila de la tabla comentario
+    """
+    if comentario:
+        _aplicar("agregar_comentario", comentario)
+
+
+def desindexar_publicacion(id_publicacion: str) -> None:
+    """
+    Quita una publicación (y sus comentarios) del índice
+
+    Args:
+        id_publicacion: ID de la publicación eliminada
+    """
+    _aplicar("eliminar_publicacion", id_publicacion)
+
+
+def desindexar_comentario(id_comentario: str) -> None:
+    """
+    Quita un comentario del índice
+
+    Args:
+        id_comentario: ID del comentario eliminado
+    """
+    _aplicar("eliminar_comentario", id_comentario)
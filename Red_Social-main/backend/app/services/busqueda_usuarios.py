@@ -0,0 +1,586 @@
+"""
+Índice en memoria para la búsqueda de usuarios
+
+Reemplaza el `or_(nombre.ilike.*q*, ...)` (un escaneo secuencial de la tabla
+usuario por cada tecla) por un índice invertido con:
+- Normalización sin acentos ni mayúsculas ("José" == "jose")
+- Búsqueda por prefijo de palabra sobre nombre, apellido y correo
+- Búsqueda aproximada por trigramas cuando los prefijos no alcanzan
+- Ranking por tipo de coincidencia y campo
+
+El índice se carga una vez desde la base de datos y luego se actualiza de
+forma incremental desde las rutas que crean o modifican usuarios. Como cada
+worker tiene su propia copia, se recarga completo en segundo plano cada
+SEARCH_INDEX_REFRESH_SECONDS para recoger cambios hechos en otros workers.
+"""
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set
+import asyncio
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from supabase import Client
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Columnas públicas que se guardan en el índice (nunca la contraseña)
+COLUMNAS_INDICE = "id_user, nombre, apellido, correo, rol, foto_perfil, activo, fecha_registro"
+
+# Tamaño de página al cargar desde PostgREST (su límite por defecto es 1000)
+TAMANO_PAGINA_CARGA = 1000
+
+# Peso de cada campo en el ranking
+PESO_CAMPO = {"nombre": 1.0, "apellido": 1.0, "correo": 0.6}
+
+# Puntaje por tipo de coincidencia
+PUNTAJE_EXACTO = 3.0
+PUNTAJE_PREFIJO = 2.0
+PUNTAJE_TRIGRAMA = 1.0
+
+# Similitud mínima entre palabras (índice de Jaccard sobre trigramas, como pg_trgm)
+UMBRAL_TRIGRAMAS = 0.3
+
+_SEPARADORES = re.compile(r"[^a-z0-9]+")
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """
+    Pasa el texto a minúsculas y elimina acentos y diacríticos
+
+    Args:
+        texto: Texto original
+
+    Returns:
+        Texto normalizado
+    """
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    """
+    Divide un texto normalizado en palabras
+
+    Args:
+        texto: Texto a dividir
+
+    Returns:
+        Lista de palabras sin vacíos
+    """
+    return [t for t in _SEPARADORES.split(normalizar(texto)) if t]
+
+
+def trigramas(palabra: str) -> Set[str]:
+    """
+    Obtiene los trigramas de una palabra ya normalizada
+
+    Args:
+        palabra: Palabra normalizada
+
+    Returns:
+        Conjunto de trigramas (con relleno como en pg_trgm)
+    """
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceUsuarios:
+    """
+    Índice invertido de usuarios por palabra, prefijo y trigrama
+
+    Cada lista de postings se mantiene ordenada por (apellido, nombre), así las
+    consultas recorren los niveles de puntaje de mayor a menor y se detienen
+    apenas ningún candidato restante puede entrar en los `limit` primeros.
+    Los trigramas se indexan sobre el vocabulario de nombres y apellidos (no
+    por usuario): un error de tipeo se corrige a palabras existentes y luego se
+    usan sus postings como cualquier otra coincidencia.
+    """
+
+    def __init__(self):
+        self._docs: Dict[str, dict] = {}
+        # Clave de orden alfabético de cada usuario: (apellido, nombre, id)
+        self._orden: Dict[str, tuple] = {}
+        # campo ("nombre" o "correo") -> palabra -> lista ordenada de claves de orden
+        self._postings: Dict[str, Dict[str, List[tuple]]] = {"nombre": {}, "correo": {}}
+        # Lista ordenada de todas las palabras para búsqueda por prefijo con bisect
+        self._palabras_ordenadas: List[str] = []
+        # trigrama -> palabras de nombre/apellido que lo contienen
+        self._trigramas: Dict[str, Set[str]] = {}
+        # id_user -> {palabra: peso} para puntuar y desindexar
+        self._palabras_doc: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.RLock()
+        self.cargado = False
+        self.cargado_en = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ----------------------------------------------------------------- escritura
+
+    def agregar(self, usuario: dict) -> None:
+        """
+        Agrega o actualiza un usuario en el índice
+
+        Args:
+            usuario: Fila de la tabla usuario (puede incluir la contraseña, se descarta)
+        """
+        with self._lock:
+            self._agregar(usuario, ordenar=True)
+
+    def agregar_lote(self, usuarios) -> None:
+        """
+        Agrega muchos usuarios y ordena las listas una sola vez al final
+
+        Args:
+            usuarios: Iterable de filas de la tabla usuario
+        """
+        with self._lock:
+            for usuario in usuarios:
+                self._agregar(usuario, ordenar=False)
+            self._palabras_ordenadas.sort()
+            for por_campo in self._postings.values():
+                for lista in por_campo.values():
+                    lista.sort()
+
+    def eliminar(self, id_user: str) -> None:
+        """
+        Quita un usuario del índice
+
+        Args:
+            id_user: ID del usuario
+        """
+        with self._lock:
+            self._quitar(id_user)
+
+    def _agregar(self, usuario: dict, ordenar: bool) -> None:
+        id_user = usuario.get("id_user")
+        if not id_user:
+            return
+
+        doc = {**self._docs.get(id_user, {}), **{k: v for k, v in usuario.items() if k != "contrasena"}}
+        self._quitar(id_user)
+
+        palabras: Dict[str, float] = {}
+        for campo, peso in PESO_CAMPO.items():
+            for palabra in tokenizar(doc.get(campo)):
+                if peso > palabras.get(palabra, 0):
+                    palabras[palabra] = peso
+        clave = (normalizar(doc.get("apellido")), normalizar(doc.get("nombre")), id_user)
+
+        for palabra, peso in palabras.items():
+            if not any(palabra in por_campo for por_campo in self._postings.values()):
+                if ordenar:
+                    insort(self._palabras_ordenadas, palabra)
+                else:
+                    self._palabras_ordenadas.append(palabra)
+            campo = self._campo(peso)
+            lista = self._postings[campo].get(palabra)
+            if lista is None:
+                lista = self._postings[campo][palabra] = []
+                if campo == "nombre":
+                    for trig in trigramas(palabra):
+                        self._trigramas.setdefault(trig, set()).add(palabra)
+            if ordenar:
+                insort(lista, clave)
+            else:
+                lista.append(clave)
+
+        self._docs[id_user] = doc
+        self._orden[id_user] = clave
+        self._palabras_doc[id_user] = palabras
+
+    def _quitar(self, id_user: str) -> None:
+        self._docs.pop(id_user, None)
+        palabras = self._palabras_doc.pop(id_user, None)
+        clave = self._orden.pop(id_user, None)
+        if not palabras:
+            return
+        for palabra, peso in palabras.items():
+            campo = self._campo(peso)
+            lista = self._postings[campo].get(palabra)
+            if lista is None:
+                continue
+            pos = bisect_left(lista, clave)
+            if pos < len(lista) and lista[pos] == clave:
+                del lista[pos]
+            if lista:
+                continue
+            del self._postings[campo][palabra]
+            if campo == "nombre":
+                for trig in trigramas(palabra):
+                    vocabulario = self._trigramas.get(trig)
+                    if vocabulario is not None:
+                        vocabulario.discard(palabra)
+                        if not vocabulario:
+                            del self._trigramas[trig]
+            if not any(palabra in por_campo for por_campo in self._postings.values()):
+                pos = bisect_left(self._palabras_ordenadas, palabra)
+                if pos < len(self._palabras_ordenadas) and self._palabras_ordenadas[pos] == palabra:
+                    del self._palabras_ordenadas[pos]
+
+    @staticmethod
+    def _campo(peso: float) -> str:
+        return "nombre" if peso == PESO_CAMPO["nombre"] else "correo"
+
+    # ------------------------------------------------------------------ lectura
+
+    def _expandir(self, termino: str, aproximado: bool) -> Dict[str, Dict[str, float]]:
+        """
+        Palabras del índice que coinciden con un término y su puntaje base
+
+        Returns:
+            Diccionario campo -> {palabra: puntaje}
+        """
+        inicio = bisect_left(self._palabras_ordenadas, termino)
+        fin = bisect_left(self._palabras_ordenadas, termino + "\uffff", lo=inicio)
+
+        expansion: Dict[str, Dict[str, float]] = {"nombre": {}, "correo": {}}
+        for palabra in self._palabras_ordenadas[inicio:fin]:
+            base = PUNTAJE_EXACTO if palabra == termino else PUNTAJE_PREFIJO
+            for campo, por_campo in self._postings.items():
+                if palabra in por_campo:
+                    expansion[campo][palabra] = base * PESO_CAMPO[campo]
+
+        if aproximado and len(termino) >= 3:
+            for palabra, similitud in self._similares(termino).items():
+                if palabra not in expansion["nombre"]:
+                    expansion["nombre"][palabra] = PUNTAJE_TRIGRAMA * similitud
+        return expansion
+
+    def _similares(self, termino: str) -> Dict[str, float]:
+        """Palabras del vocabulario con similitud de trigramas >= UMBRAL_TRIGRAMAS"""
+        trigs = trigramas(termino)
+        conteo = Counter()
+        for trig in trigs:
+            conteo.update(self._trigramas.get(trig, ()))
+        similares = {}
+        for palabra, compartidos in conteo.items():
+            similitud = compartidos / (len(trigs) + len(palabra) + 1 - compartidos)
+            if similitud >= UMBRAL_TRIGRAMAS:
+                similares[palabra] = similitud
+        return similares
+
+    def _niveles(self, expansion: Dict[str, Dict[str, float]]) -> List[tuple]:
+        """Agrupa las listas de postings por puntaje, de mayor a menor"""
+        niveles: Dict[float, List[List[tuple]]] = {}
+        for campo, palabras in expansion.items():
+            for palabra, puntaje in palabras.items():
+                niveles.setdefault(puntaje, []).append(self._postings[campo][palabra])
+        return sorted(niveles.items(), key=lambda nivel: -nivel[0])
+
+    @staticmethod
+    def _puntaje(palabras_doc: Dict[str, float], expansion: Dict[str, Dict[str, float]]) -> float:
+        """Mejor puntaje de un término (ya expandido) contra las palabras de un usuario"""
+        mejor = 0.0
+        for palabra, peso in palabras_doc.items():
+            puntaje = expansion["nombre" if peso == PESO_CAMPO["nombre"] else "correo"].get(palabra, 0.0)
+            if puntaje > mejor:
+                mejor = puntaje
+        return mejor
+
+    def _buscar(
+        self,
+        terminos: List[str],
+        limit: int,
+        aceptado,
+        aproximado: bool
+    ) -> List[str]:
+        expansiones = [self._expandir(t, aproximado) for t in terminos]
+        maximos = [
+            max((p for palabras in e.values() for p in palabras.values()), default=0.0)
+            for e in expansiones
+        ]
+        if not all(maximos):
+            return []
+
+        # Partir del término con menos candidatos y verificar los demás contra
+        # las palabras de cada candidato
+        def tamano(i: int) -> int:
+            return sum(
+                len(self._postings[campo][palabra])
+                for campo, palabras in expansiones[i].items()
+                for palabra in palabras
+            )
+        base = min(range(len(terminos)), key=tamano)
+        otros = [i for i in range(len(terminos)) if i != base]
+        maximo_otros = sum(maximos[i] for i in otros)
+
+        encontrados: Dict[str, float] = {}
+        for puntaje_nivel, listas in self._niveles(expansiones[base]):
+            techo = puntaje_nivel + maximo_otros
+            # Ningún candidato pendiente supera `techo`: si ya hay `limit`
+            # resultados con más puntaje, el resto no puede entrar
+            if sum(1 for p in encontrados.values() if p > techo) >= limit:
+                break
+
+            mayores = sum(1 for p in encontrados.values() if p > techo)
+            en_techo = 0
+            fuente = listas[0] if len(listas) == 1 else heapq.merge(*listas)
+            for _, _, id_user in fuente:
+                if id_user in encontrados or not aceptado(id_user):
+                    continue
+                total = puntaje_nivel
+                palabras_doc = self._palabras_doc[id_user]
+                for i in otros:
+                    parcial = self._puntaje(palabras_doc, expansiones[i])
+                    if not parcial:
+                        total = 0.0
+                        break
+                    total += parcial
+                encontrados[id_user] = total
+                # Los pendientes de este nivel vienen después en orden alfabético
+                if total >= techo:
+                    en_techo += 1
+                    if mayores + en_techo >= limit:
+                        break
+            else:
+                continue
+            break
+
+        mejores = heapq.nsmallest(
+            limit,
+            (item for item in encontrados.items() if item[1] > 0),
+            key=lambda item: (-item[1], self._orden[item[0]])
+        )
+        return [id_user for id_user, _ in mejores]
+
+    def buscar(
+        self,
+        q: str,
+        limit: int = 20,
+        excluir: Optional[str] = None,
+        solo_activos: bool = False
+    ) -> List[dict]:
+        """
+        Busca usuarios por nombre, apellido o correo
+
+        Primero busca por palabra exacta y prefijo; si no alcanza para `limit`
+        resultados, repite la búsqueda admitiendo palabras parecidas.
+
+        Args:
+            q: Texto de búsqueda
+            limit: Cantidad máxima de resultados
+            excluir: ID de usuario a excluir (normalmente el usuario actual)
+            solo_activos: Si True, omite usuarios desactivados
+
+        Returns:
+            Lista de usuarios ordenada por relevancia
+        """
+        terminos = list(dict.fromkeys(tokenizar(q)))
+        if not terminos:
+            return []
+
+        def aceptado(id_user: str) -> bool:
+            if id_user == excluir:
+                return False
+            if solo_activos and not self._docs[id_user].get("activo", True):
+                return False
+            return True
+
+        with self._lock:
+            resultado = self._buscar(terminos, limit, aceptado, aproximado=False)
+            if len(resultado) < limit and any(len(t) >= 3 for t in terminos):
+                # Los exactos/prefijos conservan su puntaje, así que siguen primero
+                resultado = self._buscar(terminos, limit, aceptado, aproximado=True)
+            return [dict(self._docs[id_user]) for id_user in resultado]
+
+
+class CacheRelaciones:
+    """
+    Caché por usuario del estado de sus relaciones (id_otro -> estado)
+
+    Evita volver a leer todas las relaciones del usuario en cada tecla de la
+    búsqueda. Se invalida desde las rutas de amigos cuando cambia una relación.
+    """
+
+    def __init__(self, ttl_segundos: int, max_usuarios: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_usuarios = max_usuarios
+        self._datos: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, db: Client, id_user: str) -> Dict[str, str]:
+        """
+        Obtiene los estados de relación del usuario, leyendo la BD si no están en caché
+
+        Args:
+            db: Cliente de base de datos
+            id_user: ID del usuario
+
+        Returns:
+            Diccionario id del otro usuario -> estado de la relación
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(id_user)
+            if entrada and entrada[0] > ahora:
+                self._datos.move_to_end(id_user)
+                return entrada[1]
+
+        relaciones = db.table("relacionusuario")\
+            .select("id_usuario1, id_usuario2, estado")\
+            .or_(f"id_usuario1.eq.{id_user},id_usuario2.eq.{id_user}")\
+            .execute()
+
+        estados = {}
+        for rel in relaciones.data:
+            otro = rel["id_usuario2"] if rel["id_usuario1"] == id_user else rel["id_usuario1"]
+            estados[otro] = rel["estado"]
+
+        with self._lock:
+            self._datos[id_user] = (ahora + self.ttl_segundos, estados)
+            self._datos.move_to_end(id_user)
+            while len(self._datos) > self.max_usuarios:
+                self._datos.popitem(last=False)
+        return estados
+
+    def invalidar(self, *ids_usuarios: str) -> None:
+        """
+        Descarta la caché de los usuarios indicados
+
+        Args:
+            ids_usuarios: IDs de los usuarios cuya relación cambió
+        """
+        with self._lock:
+            for id_user in ids_usuarios:
+                self._datos.pop(id_user, None)
+
+
+# Instancias globales (una por worker)
+_indice = IndiceUsuarios()
+_recarga_en_curso = threading.Lock()
+# Serializa indexar_usuario con el reemplazo del índice
+_escrituras = threading.Lock()
+# Escrituras hechas durante una carga, para repetirlas sobre el índice nuevo
+_pendientes: Optional[List[dict]] = None
+relaciones_cache = CacheRelaciones(
+    ttl_segundos=settings.RELACIONES_CACHE_TTL_SECONDS,
+    max_usuarios=settings.RELACIONES_CACHE_MAX_USUARIOS,
+)
+
+
+def construir_indice(db: Client) -> IndiceUsuarios:
+    """
+    Construye un índice nuevo leyendo la tabla usuario por páginas
+
+    Args:
+        db: Cliente de base de datos
+
+    Returns:
+        Índice cargado
+    """
+    inicio = time.perf_counter()
+    usuarios = []
+    desde = 0
+    while True:
+        pagina = db.table("usuario")\
+            .select(COLUMNAS_INDICE)\
+            .order("id_user")\
+            .range(desde, desde + TAMANO_PAGINA_CARGA - 1)\
+            .execute()
+        usuarios.extend(pagina.data)
+        if len(pagina.data) < TAMANO_PAGINA_CARGA:
+            break
+        desde += TAMANO_PAGINA_CARGA
+
+    indice = IndiceUsuarios()
+    indice.agregar_lote(usuarios)
+
+    indice.cargado = True
+    indice.cargado_en = time.monotonic()
+    logger.info(
+        f"Índice de usuarios cargado: {len(indice)} usuarios "
+        f"en {time.perf_counter() - inicio:.2f}s"
+    )
+    return indice
+
+
+def _reconstruir(db: Client) -> None:
+    """
+    Construye un índice nuevo y lo pone en lugar del actual
+
+    Las escrituras que llegan mientras se leen las tablas se aplican al índice
+    actual y además se anotan en `_pendientes`; antes del reemplazo se repiten
+    sobre el índice nuevo (bajo el mismo candado que indexar_usuario), así un
+    usuario desactivado durante la recarga no vuelve a aparecer.
+    """
+    global _indice, _pendientes
+    with _escrituras:
+        _pendientes = []
+    try:
+        nuevo = construir_indice(db)
+        with _escrituras:
+            for usuario in _pendientes:
+                nuevo.agregar(usuario)
+            _indice = nuevo
+    finally:
+        with _escrituras:
+            _pendientes = None
+
+
+def _recargar_en_segundo_plano(db: Client) -> None:
+    try:
+        _reconstruir(db)
+    except Exception as e:
+        logger.error(f"Error al recargar el índice de usuarios: {e}")
+    finally:
+        _recarga_en_curso.release()
+
+
+def _primera_carga(db: Client) -> None:
+    with _recarga_en_curso:
+        if not _indice.cargado:
+            _reconstruir(db)
+
+
+async def get_indice(db: Client) -> IndiceUsuarios:
+    """
+    Devuelve el índice, cargándolo la primera vez y refrescándolo si está viejo
+
+    La primera carga se hace en un hilo del pool (las peticiones que llegan
+    mientras tanto la esperan sin bloquear el event loop); las recargas
+    periódicas se hacen en un hilo mientras se sigue respondiendo con el
+    índice anterior.
+
+    Args:
+        db: Cliente de base de datos
+
+    Returns:
+        Índice de usuarios listo para buscar
+    """
+    if not _indice.cargado:
+        await asyncio.get_running_loop().run_in_executor(None, _primera_carga, db)
+        return _indice
+
+    antiguedad = time.monotonic() - _indice.cargado_en
+    if antiguedad > settings.SEARCH_INDEX_REFRESH_SECONDS and _recarga_en_curso.acquire(blocking=False):
+        threading.Thread(target=_recargar_en_segundo_plano, args=(db,), daemon=True).start()
+    return _indice
+
+
+def indexar_usuario(usuario: Optional[dict]) -> None:
+    """
+    Actualiza el índice tras crear o modificar un usuario
+
+    Si hay una carga en curso, el cambio también se repite sobre el índice
+    nuevo antes de reemplazar al actual.
+
+    Args:
+        usuario: Fila de la tabla usuario
+    """
+    if not usuario:
+        return
+    with _escrituras:
+        if _indice.cargado:
+            _indice.agregar(usuario)
+        if _pendientes is not None:
+            _pendientes.append(usuario)
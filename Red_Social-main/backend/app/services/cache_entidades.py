@@ -0,0 +1,279 @@
+"""
+Caché de lectura (read-through) para entidades que se leen por ID
+
+Muchas rutas vuelven a leer la misma fila: el detalle de una publicación, el
+dueño antes de editar o borrar, el autor al que hay que notificar de un
+comentario o una reacción, una ruta de carpooling, una materia o un grupo.
+`leer_entidad(db, entidad, id)` devuelve la fila desde la caché y solo
+consulta la BD si no está o venció. Cada entidad se lee siempre con la misma
+selección (ENTIDADES), así todas las rutas comparten la entrada.
+
+- Cada entidad tiene su TTL (ENTITY_CACHE_TTLS); el total de entradas está
+  acotado por ENTITY_CACHE_MAX_ENTRIES con desalojo LRU.
+- Las rutas de escritura llaman a `invalidar(entidad, id)` después de
+  modificar la fila, así el mismo worker nunca responde datos viejos. Otros
+  workers los ven como máximo hasta que vence el TTL.
+- El autor de publicaciones y rutas no se guarda dentro de ellas: su perfil
+  es otra entrada ("usuario") que se agrega al leer (CON_AUTOR). Editar el
+  perfil invalida solo esa entrada en lugar de todo lo que publicó.
+- El almacenamiento es intercambiable (`configurar_backend`): por defecto un
+  diccionario del proceso, o cualquier implementación de BackendCache sobre un
+  almacén compartido.
+- `estadisticas()` expone aciertos, fallos y tasa de aciertos por entidad.
+"""
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+import copy
+import logging
+import threading
+import time
+
+from app.config import settings
+from app.utils.proyecciones import columnas
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Entidad -> (tabla, columnas y relaciones, columna del ID)
+ENTIDADES = {
+    "publicacion": ("publicacion", "*, media(*)", "id_publicacion"),
+    "comentario": ("comentario", "*", "id_comentario"),
+    "ruta": ("ruta", "*, parada:parada(*)", "id_ruta"),
+    "materia": ("materia", "*", "id_materia"),
+    "grupo": ("grupo", "*", "id_grupo"),
+    "usuario": ("usuario", columnas("usuario", "resumen"), "id_user"),
+}
+
+# Entidades que se devuelven con el perfil de su autor en "usuario"
+CON_AUTOR = {"publicacion", "ruta"}
+
+# TTL para entidades sin entrada en ENTITY_CACHE_TTLS
+TTL_POR_DEFECTO = 60
+
+
+def parsear_ttls(texto: str) -> Dict[str, int]:
+    """
+    Lee los TTL por entidad
+
+    Args:
+        texto: "entidad=segundos,..." (por ejemplo "materia=600,ruta=30")
+
+    Returns:
+        Diccionario entidad -> segundos
+
+    Raises:
+        ValueError: Si alguna entrada está mal formada
+    """
+    ttls = {}
+    for entrada in texto.split(","):
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+        try:
+            entidad, segundos = entrada.split("=")
+            ttls[entidad.strip()] = int(segundos)
+        except ValueError:
+            raise ValueError(f"TTL mal formado en ENTITY_CACHE_TTLS: '{entrada}'")
+    return ttls
+
+
+class BackendCache:
+    """
+    Interfaz del almacenamiento de la caché
+
+    Los valores son diccionarios serializables a JSON (filas de Supabase), así
+    que una implementación compartida puede guardarlos serializados.
+    """
+
+    def leer(self, clave: str) -> Optional[Any]:
+        """Valor vigente de la clave o None si no está o venció"""
+        raise NotImplementedError
+
+    def escribir(self, clave: str, valor: Any, ttl: int) -> None:
+        """Guarda el valor por `ttl` segundos"""
+        raise NotImplementedError
+
+    def borrar(self, clave: str) -> None:
+        """Elimina la clave si existe"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return 0
+
+
+class BackendMemoria(BackendCache):
+    """
+    Diccionario del proceso con TTL por entrada y desalojo LRU
+
+    Devuelve copias para que una ruta que modifica la fila leída (por ejemplo
+    agregando contadores) no altere lo guardado.
+    """
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._datos: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def leer(self, clave: str) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            valor = entrada[1]
+        return copy.deepcopy(valor)
+
+    def escribir(self, clave: str, valor: Any, ttl: int) -> None:
+        valor = copy.deepcopy(valor)
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def borrar(self, clave: str) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+class CacheEntidades:
+    """
+    Caché read-through por entidad e ID con invalidación desde las escrituras
+    """
+
+    def __init__(self, backend: BackendCache, ttls: Dict[str, int]):
+        """
+        Args:
+            backend: Almacenamiento de las entradas
+            ttls: Segundos de vigencia por entidad
+        """
+        self.backend = backend
+        self.ttls = ttls
+        self._lock = threading.Lock()
+        # Invalidaciones por entidad: si cambia mientras se carga, no se guarda
+        self._versiones: Dict[str, int] = {}
+        self._estadisticas: Dict[str, Dict[str, int]] = {}
+
+    def _contar(self, entidad: str, campo: str) -> None:
+        with self._lock:
+            contadores = self._estadisticas.setdefault(
+                entidad, {"aciertos": 0, "fallos": 0, "invalidaciones": 0}
+            )
+            contadores[campo] += 1
+
+    def obtener(self, entidad: str, id_entidad: str, cargar: Callable[[], Optional[dict]]) -> Optional[dict]:
+        """
+        Devuelve la entidad desde la caché o la carga y la guarda
+
+        Args:
+            entidad: Nombre de la entidad (por ejemplo "publicacion")
+            id_entidad: ID de la fila
+            cargar: Función que consulta la BD y devuelve la fila o None
+
+        Returns:
+            La fila (una copia), o None si no existe. Los inexistentes no se
+            guardan, para que un 404 no se repita después de crear la fila.
+        """
+        ttl = self.ttls.get(entidad, TTL_POR_DEFECTO)
+        if ttl <= 0:
+            return cargar()
+
+        clave = f"{entidad}:{id_entidad}"
+        valor = self.backend.leer(clave)
+        if valor is not None:
+            self._contar(entidad, "aciertos")
+            return valor
+
+        self._contar(entidad, "fallos")
+        with self._lock:
+            version = self._versiones.get(entidad, 0)
+        valor = cargar()
+        if valor is not None:
+            with self._lock:
+                vigente = self._versiones.get(entidad, 0) == version
+            if vigente:
+                self.backend.escribir(clave, valor, ttl)
+        return valor
+
+    def invalidar(self, entidad: str, *ids: str) -> None:
+        """
+        Descarta las entradas de la entidad con esos IDs (llamar después de escribir)
+
+        Args:
+            entidad: Nombre de la entidad
+            ids: IDs de las filas modificadas o eliminadas
+        """
+        with self._lock:
+            self._versiones[entidad] = self._versiones.get(entidad, 0) + 1
+        for id_entidad in ids:
+            self.backend.borrar(f"{entidad}:{id_entidad}")
+        self._contar(entidad, "invalidaciones")
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """
+        Métricas de uso por entidad
+
+        Returns:
+            Entradas guardadas y, por entidad, aciertos, fallos,
+            invalidaciones y tasa de aciertos
+        """
+        with self._lock:
+            por_entidad = {
+                entidad: {
+                    **contadores,
+                    "tasa_aciertos": round(
+                        contadores["aciertos"] / max(1, contadores["aciertos"] + contadores["fallos"]), 3
+                    ),
+                }
+                for entidad, contadores in self._estadisticas.items()
+            }
+        return {"entradas": len(self.backend), "entidades": por_entidad}
+
+
+cache_entidades = CacheEntidades(
+    BackendMemoria(settings.ENTITY_CACHE_MAX_ENTRIES),
+    parsear_ttls(settings.ENTITY_CACHE_TTLS)
+)
+
+
+def leer_entidad(db: "Client", entidad: str, id_entidad: str) -> Optional[dict]:
+    """
+    Lee una fila por ID pasando por la caché de entidades
+
+    Args:
+        db: Cliente de base de datos
+        entidad: Clave de ENTIDADES (por ejemplo "publicacion")
+        id_entidad: ID de la fila
+
+    Returns:
+        La fila (una copia que se puede modificar) o None si no existe
+    """
+    tabla, seleccion, columna_id = ENTIDADES[entidad]
+
+    def cargar():
+        response = db.table(tabla).select(seleccion).eq(columna_id, id_entidad).execute()
+        return response.data[0] if response.data else None
+
+    fila = cache_entidades.obtener(entidad, id_entidad, cargar)
+    if fila is not None and entidad in CON_AUTOR:
+        fila["usuario"] = leer_entidad(db, "usuario", fila["id_user"]) if fila.get("id_user") else None
+    return fila
+
+
+def configurar_backend(backend: BackendCache) -> None:
+    """
+    Reemplaza el almacenamiento de la caché (por ejemplo por uno compartido)
+
+    Args:
+        backend: Implementación de BackendCache
+    """
+    cache_entidades.backend = backend
+    logger.info(f"Caché de entidades usando {type(backend).__name__}")
@@ -0,0 +1,66 @@
+"""
+Contadores de comentarios y reacciones guardados en la publicación
+
+publicacion.comentarios_count y reacciones_count (y comentario.reacciones_count)
+los mantienen los triggers de contadores_publicacion.sql: cada comentario o
+reacción que se crea o se borra suma o resta 1 en la misma transacción, así
+que el feed los lee con la fila sin contar nada.
+
+Si algo se escapa de los triggers (borrados en cascada, cargas con los
+triggers desactivados, restauraciones), `reparar` recorre las publicaciones
+en lotes por id_publicacion y recuenta cada lote en una transacción corta con
+reparar_contadores, corrigiendo solo las filas que difieren. Pensado para
+correr periódicamente (ver reparar_contadores.py).
+"""
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+def reparar_lote(db: "Client", despues: Optional[str], limite: int) -> dict:
+    """
+    Recuenta las `limite` publicaciones siguientes a `despues`
+
+    Args:
+        db: Cliente de base de datos
+        despues: Último id_publicacion del lote anterior (None para empezar)
+        limite: Publicaciones por lote
+
+    Returns:
+        {"ultimo", "revisadas", "corregidas", "comentarios_corregidos"}
+    """
+    response = db.rpc("reparar_contadores", {"p_despues": despues, "p_limite": limite}).execute()
+    return response.data
+
+
+def reparar(
+    db: "Client",
+    tamano_lote: int,
+    desde: Optional[str] = None,
+    progreso: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """
+    Recuenta todas las publicaciones, lote por lote
+
+    Args:
+        db: Cliente de base de datos
+        tamano_lote: Publicaciones por lote
+        desde: Continuar después de este id_publicacion
+        progreso: Se llama con el resultado de cada lote
+
+    Returns:
+        Totales de "lotes", "revisadas", "corregidas" y "comentarios_corregidos"
+    """
+    totales = {"lotes": 0, "revisadas": 0, "corregidas": 0, "comentarios_corregidos": 0}
+    despues = desde
+    while True:
+        lote = reparar_lote(db, despues, tamano_lote)
+        if not lote["revisadas"]:
+            return totales
+        totales["lotes"] += 1
+        for clave in ("revisadas", "corregidas", "comentarios_corregidos"):
+            totales[clave] += lote[clave]
+        if progreso:
+            progreso(lote)
+        despues = lote["ultimo"]
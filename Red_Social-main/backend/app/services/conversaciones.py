@@ -0,0 +1,223 @@
+"""
+Creación de conversaciones
+
+- Los participantes se guardan con un solo insert de todas las filas de
+  usuarioconversacion (antes era un insert por participante). Si ese insert
+  falla se borra la conversación recién creada, para no dejarla sin miembros.
+- Las conversaciones privadas entre dos usuarios llevan `clave_directa`
+  ("<id menor>:<id mayor>", con índice único; ver conversaciones_directas.sql).
+  Abrir un chat con alguien con quien ya existe uno devuelve el existente con
+  una búsqueda por esa clave, y si dos pedidos llegan a la vez el índice
+  rechaza el segundo insert y se devuelve la conversación del primero.
+
+La pertenencia a conversaciones se verifica con `membresias`, una caché por
+usuario del conjunto de sus conversaciones. El camino frecuente (un miembro
+que lee o envía en su chat) no consulta la BD; si la conversación no está en
+el conjunto se confirma con una consulta antes de negar el acceso, porque el
+usuario pudo ser agregado desde otro worker. Las entradas vencen a los
+MEMBERSHIP_CACHE_TTL_SECONDS, lo que acota cuánto tarda otro worker en ver
+que alguien ya no es miembro.
+"""
+from collections import OrderedDict
+from typing import TYPE_CHECKING, FrozenSet, List, Optional, Tuple
+import threading
+import time
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+class CacheMembresias:
+    """
+    Caché por usuario de los IDs de sus conversaciones
+
+    Se llena al primer uso de cada usuario y se invalida cuando cambian los
+    participantes (ver crear_conversacion).
+    """
+
+    def __init__(self, ttl_segundos: int, max_usuarios: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_usuarios = max_usuarios
+        self._datos: "OrderedDict[str, Tuple[float, FrozenSet[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guardar(self, id_user: str, conversaciones) -> FrozenSet[str]:
+        """
+        Guarda el conjunto completo de conversaciones del usuario
+
+        Args:
+            id_user: ID del usuario
+            conversaciones: Todos sus id_conversacion (por ejemplo, ya leídos
+                para listar sus conversaciones)
+
+        Returns:
+            El conjunto guardado
+        """
+        conversaciones = frozenset(conversaciones)
+        with self._lock:
+            self._datos[id_user] = (time.monotonic() + self.ttl_segundos, conversaciones)
+            self._datos.move_to_end(id_user)
+            while len(self._datos) > self.max_usuarios:
+                self._datos.popitem(last=False)
+        return conversaciones
+
+    def obtener(self, db: "Client", id_user: str) -> FrozenSet[str]:
+        """
+        Conversaciones del usuario, leyendo la BD si no están en caché
+
+        Args:
+            db: Cliente de base de datos
+            id_user: ID del usuario
+
+        Returns:
+            Conjunto de id_conversacion
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(id_user)
+            if entrada and entrada[0] > ahora:
+                self._datos.move_to_end(id_user)
+                return entrada[1]
+
+        response = db.table("usuarioconversacion")\
+            .select("id_conversacion")\
+            .eq("id_usuario", id_user)\
+            .execute()
+        return self.guardar(id_user, (fila["id_conversacion"] for fila in response.data))
+
+    def es_miembro(self, db: "Client", id_user: str, id_conversacion: str) -> bool:
+        """
+        Indica si el usuario participa en la conversación
+
+        Args:
+            db: Cliente de base de datos
+            id_user: ID del usuario
+            id_conversacion: ID de la conversación
+
+        Returns:
+            True si es miembro
+        """
+        if id_conversacion in self.obtener(db, id_user):
+            return True
+        # Pudo ser agregado después de llenar la caché (otro worker)
+        response = db.table("usuarioconversacion")\
+            .select("id_conversacion")\
+            .eq("id_usuario", id_user)\
+            .eq("id_conversacion", id_conversacion)\
+            .execute()
+        if not response.data:
+            return False
+        with self._lock:
+            entrada = self._datos.get(id_user)
+            if entrada:
+                self._datos[id_user] = (entrada[0], entrada[1] | {id_conversacion})
+        return True
+
+    def invalidar(self, *ids_usuarios: str) -> None:
+        """
+        Descarta la caché de los usuarios indicados
+
+        Args:
+            ids_usuarios: Usuarios agregados o quitados de alguna conversación
+        """
+        with self._lock:
+            for id_user in ids_usuarios:
+                self._datos.pop(id_user, None)
+
+
+# Instancia global (una por worker)
+membresias = CacheMembresias(
+    ttl_segundos=settings.MEMBERSHIP_CACHE_TTL_SECONDS,
+    max_usuarios=settings.MEMBERSHIP_CACHE_MAX_USERS,
+)
+
+
+def clave_directa(id_usuario1: str, id_usuario2: str) -> str:
+    """
+    Clave canónica de un chat directo (no depende del orden)
+
+    Args:
+        id_usuario1: Uno de los participantes
+        id_usuario2: El otro participante
+
+    Returns:
+        "<id menor>:<id mayor>"
+    """
+    menor, mayor = sorted((id_usuario1, id_usuario2))
+    return f"{menor}:{mayor}"
+
+
+def buscar_directa(db: "Client", clave: str) -> Optional[dict]:
+    """
+    Conversación directa con esa clave, si existe
+
+    Args:
+        db: Cliente de base de datos
+        clave: Resultado de clave_directa
+
+    Returns:
+        La conversación o None
+    """
+    response = db.table("conversacion").select("*").eq("clave_directa", clave).limit(1).execute()
+    return response.data[0] if response.data else None
+
+
+def crear_conversacion(
+    db: "Client",
+    tipo: str,
+    nombre: Optional[str],
+    id_creador: str,
+    participantes: List[str]
+) -> Tuple[dict, bool]:
+    """
+    Crea una conversación con sus participantes, o devuelve el chat directo existente
+
+    Args:
+        db: Cliente de base de datos
+        tipo: "privada" o "grupal"
+        nombre: Nombre (obligatorio en las grupales)
+        id_creador: Usuario que la crea (queda como admin)
+        participantes: IDs de todos los participantes, incluido el creador
+
+    Returns:
+        (conversación, creada): creada es False si ya existía el chat directo
+    """
+    participantes = list(dict.fromkeys(participantes))
+    clave = None
+    if tipo == "privada" and len(participantes) == 2:
+        clave = clave_directa(*participantes)
+        existente = buscar_directa(db, clave)
+        if existente:
+            return existente, False
+
+    conv_dict = {"tipo": tipo, "nombre": nombre}
+    if clave:
+        conv_dict["clave_directa"] = clave
+    try:
+        response = db.table("conversacion").insert(conv_dict).execute()
+    except Exception:
+        # Otro pedido creó el mismo chat directo entre la búsqueda y el insert
+        existente = buscar_directa(db, clave) if clave else None
+        if existente:
+            return existente, False
+        raise
+    conversacion = response.data[0]
+
+    filas = [
+        {
+            "id_usuario": id_usuario,
+            "id_conversacion": conversacion["id_conversacion"],
+            "rol": "admin" if id_usuario == id_creador else "miembro"
+        }
+        for id_usuario in participantes
+    ]
+    try:
+        db.table("usuarioconversacion").insert(filas).execute()
+    except Exception:
+        db.table("conversacion").delete().eq("id_conversacion", conversacion["id_conversacion"]).execute()
+        raise
+    finally:
+        membresias.invalidar(*participantes)
+    return conversacion, True
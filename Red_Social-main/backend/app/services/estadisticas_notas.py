@@ -0,0 +1,287 @@
+"""
+Estadísticas de notas por materia calculadas en el servidor
+
+En lugar de descargar todas las notas con sus relaciones y promediar en el
+cliente, `estadisticas_materia` trae las notas de una materia con una sola
+consulta de tres columnas (id_user, tipo_nota, nota), las convierte en
+arreglos de NumPy y calcula de forma vectorizada:
+
+- Para la materia y para cada tipo_nota: cantidad, promedio, mediana,
+  desviación estándar, tasa de aprobación (nota >= GRADE_PASS_MARK) e
+  histograma en tramos de 10 puntos.
+- Para cada estudiante: promedio ponderado por tipo_nota con los pesos
+  pedidos (por defecto todos iguales).
+
+Los resultados se guardan por materia (y grupo y pesos) hasta que cambia
+alguna nota de esa materia: las rutas de notas llaman a `invalidar_materia`.
+Como en la caché de entidades, otros workers los ven como máximo hasta que
+vence GRADE_STATS_TTL_SECONDS.
+"""
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+import threading
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.exportacion import paginar
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Límites de los tramos del histograma: [0, 10), [10, 20), ..., [90, 100]
+TRAMOS_HISTOGRAMA = np.linspace(0, 100, 11)
+
+
+def parsear_pesos(texto: Optional[str]) -> Dict[str, float]:
+    """
+    Lee los pesos por tipo de nota
+
+    Args:
+        texto: "tipo=peso,..." (por ejemplo "Primer Parcial=30,Examen Final=40"),
+            o vacío para pesos iguales
+
+    Returns:
+        Diccionario tipo_nota -> peso
+
+    Raises:
+        ValueError: Si alguna entrada está mal formada o tiene peso negativo
+    """
+    pesos = {}
+    for entrada in (texto or "").split(","):
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+        try:
+            tipo, peso = entrada.rsplit("=", 1)
+            pesos[tipo.strip()] = float(peso)
+        except ValueError:
+            raise ValueError(f"Peso mal formado: '{entrada}'")
+        if pesos[tipo.strip()] < 0:
+            raise ValueError(f"Peso negativo: '{entrada}'")
+    return pesos
+
+
+def _redondear(valor: float) -> Optional[float]:
+    return None if np.isnan(valor) else round(float(valor), 2)
+
+
+def resumen(notas: np.ndarray, aprobacion: float) -> Dict[str, Any]:
+    """
+    Medidas de un conjunto de notas
+
+    Args:
+        notas: Arreglo de notas (0 a 100)
+        aprobacion: Nota mínima para aprobar
+
+    Returns:
+        Cantidad, promedio, mediana, desviación estándar (poblacional),
+        tasa de aprobación e histograma
+    """
+    if notas.size == 0:
+        return {
+            "cantidad": 0, "promedio": None, "mediana": None, "desviacion": None,
+            "tasa_aprobacion": None, "histograma": [],
+        }
+    conteos, _ = np.histogram(notas, bins=TRAMOS_HISTOGRAMA)
+    return {
+        "cantidad": int(notas.size),
+        "promedio": _redondear(notas.mean()),
+        "mediana": _redondear(np.median(notas)),
+        "desviacion": _redondear(notas.std()),
+        "tasa_aprobacion": _redondear(np.count_nonzero(notas >= aprobacion) / notas.size),
+        "histograma": [
+            {"desde": int(desde), "hasta": int(hasta), "cantidad": int(cantidad)}
+            for desde, hasta, cantidad in zip(TRAMOS_HISTOGRAMA[:-1], TRAMOS_HISTOGRAMA[1:], conteos)
+        ],
+    }
+
+
+def calcular_estadisticas(
+    id_users: np.ndarray,
+    tipos: np.ndarray,
+    notas: np.ndarray,
+    pesos: Optional[Dict[str, float]] = None,
+    aprobacion: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Estadísticas de la materia, por tipo de nota y por estudiante
+
+    Args:
+        id_users: Estudiante de cada nota
+        tipos: tipo_nota de cada nota
+        notas: Valor de cada nota
+        pesos: Peso por tipo_nota para el promedio de cada estudiante; los
+            tipos que no figuran pesan 0. Vacío o None: todos pesan igual
+        aprobacion: Nota mínima para aprobar (por defecto GRADE_PASS_MARK)
+
+    Returns:
+        Diccionario con "general", "por_tipo" (tipo -> resumen) y
+        "estudiantes" (lista de id_user, cantidad de notas, promedio ponderado
+        y si aprueba), ordenados por promedio de mayor a menor
+    """
+    aprobacion = settings.GRADE_PASS_MARK if aprobacion is None else aprobacion
+    notas = np.asarray(notas, dtype=float)
+
+    # Por tipo: ordenar por código de tipo y cortar en grupos contiguos
+    nombres_tipo, codigo_tipo = np.unique(tipos, return_inverse=True)
+    orden = np.argsort(codigo_tipo, kind="stable")
+    cortes = np.cumsum(np.bincount(codigo_tipo, minlength=len(nombres_tipo)))[:-1]
+    por_tipo = {
+        str(tipo): resumen(grupo, aprobacion)
+        for tipo, grupo in zip(nombres_tipo, np.split(notas[orden], cortes))
+    }
+
+    # Por estudiante: sumas ponderadas con bincount sobre el código de estudiante
+    if pesos:
+        peso_tipo = np.array([pesos.get(str(tipo), 0.0) for tipo in nombres_tipo])
+    else:
+        peso_tipo = np.ones(len(nombres_tipo))
+    peso_nota = peso_tipo[codigo_tipo] if notas.size else np.zeros(0)
+    estudiantes, codigo_est = np.unique(id_users, return_inverse=True)
+    suma_pesos = np.bincount(codigo_est, weights=peso_nota, minlength=len(estudiantes))
+    suma_ponderada = np.bincount(codigo_est, weights=peso_nota * notas, minlength=len(estudiantes))
+    cantidad = np.bincount(codigo_est, minlength=len(estudiantes))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        promedios = np.where(suma_pesos > 0, suma_ponderada / suma_pesos, np.nan)
+
+    con_promedio = promedios[~np.isnan(promedios)]
+    general = resumen(notas, aprobacion)
+    general["estudiantes"] = int(len(estudiantes))
+    general["tasa_aprobacion_estudiantes"] = (
+        _redondear(np.count_nonzero(con_promedio >= aprobacion) / con_promedio.size)
+        if con_promedio.size else None
+    )
+
+    # Convertir columnas completas a listas de Python y armar las filas al final
+    orden_est = np.argsort(np.where(np.isnan(promedios), -np.inf, promedios))[::-1]
+    promedios = promedios[orden_est]
+    filas = zip(
+        estudiantes[orden_est].tolist(),
+        cantidad[orden_est].tolist(),
+        np.round(promedios, 2).tolist(),
+        (promedios >= aprobacion).tolist(),
+    )
+    return {
+        "general": general,
+        "por_tipo": por_tipo,
+        "estudiantes": [
+            {
+                "id_user": str(id_user),
+                "cantidad_notas": cantidad_notas,
+                "promedio_ponderado": promedio if promedio == promedio else None,  # NaN -> None
+                "aprobado": aprobado if promedio == promedio else None,
+            }
+            for id_user, cantidad_notas, promedio, aprobado in filas
+        ],
+    }
+
+
+class CacheEstadisticas:
+    """
+    Resultados por materia, cada una con sus variantes (grupo, pesos)
+
+    Invalidar una materia descarta todas sus variantes. Si se invalida
+    mientras se calcula, el resultado no se guarda.
+    """
+
+    def __init__(self, ttl_segundos: int, max_materias: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_materias = max_materias
+        self._datos: "OrderedDict[str, Tuple[float, Dict[tuple, dict]]]" = OrderedDict()
+        self._versiones: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, id_materia: str) -> int:
+        with self._lock:
+            return self._versiones.get(id_materia, 0)
+
+    def obtener(self, id_materia: str, variante: tuple) -> Optional[dict]:
+        with self._lock:
+            entrada = self._datos.get(id_materia)
+            if entrada is None or entrada[0] <= time.monotonic():
+                return None
+            self._datos.move_to_end(id_materia)
+            return entrada[1].get(variante)
+
+    def guardar(self, id_materia: str, variante: tuple, resultado: dict, version: int) -> None:
+        with self._lock:
+            if self._versiones.get(id_materia, 0) != version:
+                return
+            entrada = self._datos.get(id_materia)
+            if entrada is None or entrada[0] <= time.monotonic():
+                entrada = (time.monotonic() + self.ttl_segundos, {})
+                self._datos[id_materia] = entrada
+            entrada[1][variante] = resultado
+            self._datos.move_to_end(id_materia)
+            while len(self._datos) > self.max_materias:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, *ids_materia: str) -> None:
+        with self._lock:
+            for id_materia in ids_materia:
+                self._versiones[id_materia] = self._versiones.get(id_materia, 0) + 1
+                self._datos.pop(id_materia, None)
+
+
+estadisticas_cache = CacheEstadisticas(settings.GRADE_STATS_TTL_SECONDS, settings.GRADE_STATS_MAX_MATERIAS)
+
+
+def invalidar_materia(*ids_materia: str) -> None:
+    """
+    Descarta las estadísticas guardadas de las materias (llamar después de escribir notas)
+
+    Args:
+        ids_materia: Materias cuyas notas cambiaron
+    """
+    estadisticas_cache.invalidar(*ids_materia)
+
+
+def estadisticas_materia(
+    db: "Client",
+    id_materia: str,
+    id_grupo: Optional[str] = None,
+    pesos: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Estadísticas de las notas de una materia, opcionalmente de un grupo
+
+    Args:
+        db: Cliente de base de datos
+        id_materia: ID de la materia
+        id_grupo: Solo estudiantes de este grupo
+        pesos: Peso por tipo_nota para los promedios ponderados
+
+    Returns:
+        Resultado de calcular_estadisticas con id_materia e id_grupo
+    """
+    variante = (id_grupo, tuple(sorted((pesos or {}).items())))
+    guardado = estadisticas_cache.obtener(id_materia, variante)
+    if guardado is not None:
+        return guardado
+
+    version = estadisticas_cache.version(id_materia)
+    # Por páginas: un select sin paginar se corta en el límite de PostgREST (1000 filas)
+    filas = [
+        fila
+        for pagina in paginar(db, "nota", "id_nota, id_user, tipo_nota, nota", "id_nota", igualdades={"id_materia": id_materia})
+        for fila in pagina
+    ]
+    # Texto de ancho fijo: np.unique ordena más rápido que con objetos de Python
+    id_users = np.array([f["id_user"] for f in filas], dtype=str)
+    tipos = np.array([f["tipo_nota"] for f in filas], dtype=str)
+    notas = np.array([f["nota"] for f in filas], dtype=float)
+
+    if id_grupo:
+        miembros = [
+            m["id_user"]
+            for pagina in paginar(db, "estudiante", "ci_est, id_user", "ci_est", igualdades={"id_grupo": id_grupo})
+            for m in pagina
+        ]
+        del_grupo = np.isin(id_users, miembros)
+        id_users, tipos, notas = id_users[del_grupo], tipos[del_grupo], notas[del_grupo]
+
+    resultado = {"id_materia": id_materia, "id_grupo": id_grupo, **calcular_estadisticas(id_users, tipos, notas, pesos)}
+    estadisticas_cache.guardar(id_materia, variante, resultado, version)
+    return resultado
@@ -0,0 +1,362 @@
+"""
+Exportación en CSV de notas, estudiantes y docentes
+
+GET /notas devuelve todas las notas de la universidad en un solo JSON, con el
+usuario completo embebido. Las exportaciones en cambio:
+
+- Recorren la tabla por páginas de EXPORT_PAGE_SIZE con paginación por clave
+  (`clave > última`, ordenado por la clave primaria), que cuesta lo mismo en
+  la primera página que en la última.
+- Escriben cada página como filas CSV y la entregan enseguida: los
+  generadores son síncronos, así StreamingResponse los recorre en el pool de
+  hilos sin bloquear el event loop con el cliente de Supabase, y la memoria
+  no depende del total de filas.
+- Seleccionan columnas explícitas; nunca sale la contraseña.
+- Los textos que empiezan con `=`, `+`, `-` o `@` salen con un `'` delante
+  para que Excel no los ejecute como fórmula (un nombre o un origen lo
+  escribe cualquiera).
+
+Los filtros por materia, grupo y gestión se traducen primero a listas de IDs
+(grupos, estudiantes, docentes) que se aplican con `in` en tramos de
+TAMANO_IN para no exceder el largo de la URL.
+"""
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import csv
+import io
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# IDs por filtro `in` (cada ID ocupa ~40 caracteres en la URL)
+TAMANO_IN = 200
+
+# Primeros caracteres con los que una hoja de cálculo interpreta una fórmula
+INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def paginar(
+    db: "Client",
+    tabla: str,
+    columnas: str,
+    clave: str,
+    igualdades: Optional[Dict[str, str]] = None,
+    incluidos: Optional[Dict[str, List[str]]] = None,
+    por_tramos: Optional[Tuple[str, Sequence[str]]] = None,
+    tamano: Optional[int] = None
+) -> Iterator[List[dict]]:
+    """
+    Recorre una tabla por páginas con paginación por clave
+
+    Args:
+        db: Cliente de base de datos
+        tabla: Tabla a recorrer
+        columnas: Selección (debe incluir `clave`)
+        clave: Columna única por la que se ordena y pagina
+        igualdades: Filtros columna = valor
+        incluidos: Filtros columna in (valores) con listas cortas
+        por_tramos: (columna, valores) con una lista que puede ser larga; se
+            recorre un tramo de TAMANO_IN valores a la vez. Lista vacía: no
+            hay filas
+        tamano: Filas por página (por defecto EXPORT_PAGE_SIZE)
+
+    Yields:
+        Cada página no vacía
+    """
+    tamano = tamano or settings.EXPORT_PAGE_SIZE
+    if por_tramos is None:
+        tramos = [None]
+    else:
+        valores = list(por_tramos[1])
+        tramos = [valores[i:i + TAMANO_IN] for i in range(0, len(valores), TAMANO_IN)]
+
+    for tramo in tramos:
+        ultima = None
+        while True:
+            query = db.table(tabla).select(columnas)
+            for columna, valor in (igualdades or {}).items():
+                query = query.eq(columna, valor)
+            for columna, valores in (incluidos or {}).items():
+                query = query.in_(columna, valores)
+            if tramo is not None:
+                query = query.in_(por_tramos[0], tramo)
+            if ultima is not None:
+                query = query.gt(clave, ultima)
+            filas = query.order(clave).limit(tamano).execute().data
+            if filas:
+                yield filas
+            if len(filas) < tamano:
+                break
+            ultima = filas[-1][clave]
+
+
+def celda_segura(valor):
+    """Antepone `'` a los textos que una hoja de cálculo tomaría como fórmula"""
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def escribir_csv(
+    encabezado: List[str],
+    paginas: Iterator[List[dict]],
+    convertir: Callable[[List[dict]], List[list]]
+) -> Iterator[bytes]:
+    """
+    Convierte páginas de filas en bloques de CSV
+
+    Args:
+        encabezado: Nombres de columna
+        paginas: Páginas de filas de la BD
+        convertir: Recibe una página y devuelve sus filas CSV (puede hacer
+            una consulta por página para completar datos)
+
+    Yields:
+        El encabezado (con BOM, para que Excel reconozca UTF-8) y luego un
+        bloque por página
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(encabezado)
+    yield ("﻿" + buffer.getvalue()).encode("utf-8")
+    for pagina in paginas:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows([celda_segura(valor) for valor in fila] for fila in convertir(pagina))
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _ids(db: "Client", tabla: str, columna: str, filtro: str, valores: Sequence[str]) -> Set[str]:
+    """Valores de `columna` en las filas con `filtro` in (valores), en tramos"""
+    resultado: Set[str] = set()
+    valores = list(valores)
+    for inicio in range(0, len(valores), TAMANO_IN):
+        response = db.table(tabla)\
+            .select(columna)\
+            .in_(filtro, valores[inicio:inicio + TAMANO_IN])\
+            .execute()
+        resultado |= {fila[columna] for fila in response.data if fila.get(columna)}
+    return resultado
+
+
+def grupos_filtrados(
+    db: "Client",
+    id_grupo: Optional[str] = None,
+    id_gestion: Optional[str] = None,
+    id_materia: Optional[str] = None
+) -> Optional[Set[str]]:
+    """
+    Grupos que cumplen todos los filtros dados
+
+    Args:
+        db: Cliente de base de datos
+        id_grupo: Ese grupo
+        id_gestion: Grupos de esa gestión académica
+        id_materia: Grupos que cursan esa materia
+
+    Returns:
+        Conjunto de id_grupo, o None si no se pidió ningún filtro
+    """
+    grupos: Optional[Set[str]] = None
+    if id_grupo:
+        grupos = {id_grupo}
+    if id_gestion:
+        response = db.table("grupo").select("id_grupo").eq("gestion_grupo", id_gestion).execute()
+        de_gestion = {fila["id_grupo"] for fila in response.data}
+        grupos = de_gestion if grupos is None else grupos & de_gestion
+    if id_materia:
+        response = db.table("grupomateria").select("id_grupo").eq("id_materia", id_materia).execute()
+        con_materia = {fila["id_grupo"] for fila in response.data}
+        grupos = con_materia if grupos is None else grupos & con_materia
+    return grupos
+
+
+def materias_del_docente(db: "Client", id_user: str) -> List[str]:
+    """
+    Materias que dicta un docente
+
+    Args:
+        db: Cliente de base de datos
+        id_user: Usuario del docente
+
+    Returns:
+        Lista de id_materia (vacía si no es docente o no dicta ninguna)
+    """
+    docente = db.table("docente").select("ci_doc").eq("id_user", id_user).execute()
+    if not docente.data:
+        return []
+    materias = db.table("materia").select("id_materia").eq("id_doc", docente.data[0]["ci_doc"]).execute()
+    return [fila["id_materia"] for fila in materias.data]
+
+
+def exportar_notas(
+    db: "Client",
+    id_materia: Optional[str] = None,
+    id_grupo: Optional[str] = None,
+    id_gestion: Optional[str] = None,
+    materias_permitidas: Optional[List[str]] = None
+) -> Iterator[bytes]:
+    """
+    CSV de notas con estudiante y materia
+
+    Args:
+        db: Cliente de base de datos
+        id_materia: Solo notas de esta materia
+        id_grupo: Solo estudiantes de este grupo
+        id_gestion: Solo estudiantes de grupos de esta gestión
+        materias_permitidas: Restringe a estas materias (docentes)
+
+    Yields:
+        Bloques del CSV
+    """
+    grupos = grupos_filtrados(db, id_grupo, id_gestion)
+    por_tramos = None
+    if grupos is not None:
+        por_tramos = ("id_user", sorted(_ids(db, "estudiante", "id_user", "id_grupo", grupos)))
+
+    paginas = paginar(
+        db, "nota",
+        "id_nota, id_user, tipo_nota, nota, origen, fecha_registro_nota, "
+        "usuario(nombre, apellido, correo), materia(codigo_materia, nombre_materia)",
+        "id_nota",
+        igualdades={"id_materia": id_materia} if id_materia else None,
+        incluidos={"id_materia": materias_permitidas} if materias_permitidas is not None else None,
+        por_tramos=por_tramos,
+    )
+
+    def convertir(pagina: List[dict]) -> List[list]:
+        ids = list({nota["id_user"] for nota in pagina})
+        estudiantes = db.table("estudiante").select("id_user, ci_est").in_("id_user", ids).execute()
+        ci_por_usuario = {est["id_user"]: est["ci_est"] for est in estudiantes.data}
+        filas = []
+        for nota in pagina:
+            usuario = nota.get("usuario") or {}
+            materia = nota.get("materia") or {}
+            filas.append([
+                nota["id_nota"], ci_por_usuario.get(nota["id_user"], ""),
+                usuario.get("nombre", ""), usuario.get("apellido", ""), usuario.get("correo", ""),
+                materia.get("codigo_materia", ""), materia.get("nombre_materia", ""),
+                nota["tipo_nota"], nota["nota"], nota.get("origen", ""), nota.get("fecha_registro_nota", ""),
+            ])
+        return filas
+
+    return escribir_csv(
+        ["id_nota", "ci_est", "nombre", "apellido", "correo", "codigo_materia", "materia",
+         "tipo_nota", "nota", "origen", "fecha_registro_nota"],
+        paginas, convertir
+    )
+
+
+def _usuarios(db: "Client", pagina: List[dict]) -> Dict[str, dict]:
+    ids = list({fila["id_user"] for fila in pagina if fila.get("id_user")})
+    if not ids:
+        return {}
+    response = db.table("usuario").select("id_user, nombre, apellido, correo, activo").in_("id_user", ids).execute()
+    return {usuario["id_user"]: usuario for usuario in response.data}
+
+
+def exportar_estudiantes(
+    db: "Client",
+    id_materia: Optional[str] = None,
+    id_grupo: Optional[str] = None,
+    id_gestion: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    CSV de estudiantes (lista de clase) con su grupo
+
+    Args:
+        db: Cliente de base de datos
+        id_materia: Solo estudiantes de grupos que cursan esta materia
+        id_grupo: Solo estudiantes de este grupo
+        id_gestion: Solo estudiantes de grupos de esta gestión
+
+    Yields:
+        Bloques del CSV
+    """
+    grupos = grupos_filtrados(db, id_grupo, id_gestion, id_materia)
+    paginas = paginar(
+        db, "estudiante", "ci_est, id_user, carrera, semestre, id_grupo", "ci_est",
+        por_tramos=("id_grupo", sorted(grupos)) if grupos is not None else None,
+    )
+    nombres_grupo: Dict[str, dict] = {}
+
+    def convertir(pagina: List[dict]) -> List[list]:
+        usuarios = _usuarios(db, pagina)
+        nuevos = list({e["id_grupo"] for e in pagina if e.get("id_grupo") and e["id_grupo"] not in nombres_grupo})
+        if nuevos:
+            response = db.table("grupo").select("id_grupo, nombre_grupo, gestion_grupo").in_("id_grupo", nuevos).execute()
+            nombres_grupo.update({g["id_grupo"]: g for g in response.data})
+        filas = []
+        for est in pagina:
+            usuario = usuarios.get(est["id_user"], {})
+            grupo = nombres_grupo.get(est.get("id_grupo"), {})
+            filas.append([
+                est["ci_est"], usuario.get("nombre", ""), usuario.get("apellido", ""), usuario.get("correo", ""),
+                est.get("carrera", ""), est.get("semestre", ""), grupo.get("nombre_grupo", ""),
+                grupo.get("gestion_grupo", ""), usuario.get("activo", ""),
+            ])
+        return filas
+
+    return escribir_csv(
+        ["ci_est", "nombre", "apellido", "correo", "carrera", "semestre", "grupo", "id_gestion", "activo"],
+        paginas, convertir
+    )
+
+
+def exportar_docentes(
+    db: "Client",
+    id_materia: Optional[str] = None,
+    id_grupo: Optional[str] = None,
+    id_gestion: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    CSV de docentes con las materias que dictan
+
+    Args:
+        db: Cliente de base de datos
+        id_materia: Solo el docente de esta materia
+        id_grupo: Solo docentes de materias de este grupo
+        id_gestion: Solo docentes de materias de grupos de esta gestión
+
+    Yields:
+        Bloques del CSV
+    """
+    docentes: Optional[Set[str]] = None
+    grupos = grupos_filtrados(db, id_grupo, id_gestion)
+    if grupos is not None:
+        materias = _ids(db, "grupomateria", "id_materia", "id_grupo", grupos)
+        docentes = _ids(db, "materia", "id_doc", "id_materia", materias)
+    if id_materia:
+        response = db.table("materia").select("id_doc").eq("id_materia", id_materia).execute()
+        de_materia = {fila["id_doc"] for fila in response.data if fila.get("id_doc")}
+        docentes = de_materia if docentes is None else docentes & de_materia
+
+    paginas = paginar(
+        db, "docente", "ci_doc, id_user, especialidad_doc", "ci_doc",
+        por_tramos=("ci_doc", sorted(docentes)) if docentes is not None else None,
+    )
+
+    def convertir(pagina: List[dict]) -> List[list]:
+        usuarios = _usuarios(db, pagina)
+        materias = db.table("materia")\
+            .select("id_doc, codigo_materia")\
+            .in_("id_doc", [doc["ci_doc"] for doc in pagina])\
+            .execute()
+        por_docente: Dict[str, List[str]] = {}
+        for materia in materias.data:
+            por_docente.setdefault(materia["id_doc"], []).append(materia["codigo_materia"])
+        filas = []
+        for doc in pagina:
+            usuario = usuarios.get(doc["id_user"], {})
+            filas.append([
+                doc["ci_doc"], usuario.get("nombre", ""), usuario.get("apellido", ""), usuario.get("correo", ""),
+                doc.get("especialidad_doc", ""), " ".join(sorted(por_docente.get(doc["ci_doc"], []))),
+                usuario.get("activo", ""),
+            ])
+        return filas
+
+    return escribir_csv(
+        ["ci_doc", "nombre", "apellido", "correo", "especialidad", "materias", "activo"],
+        paginas, convertir
+    )
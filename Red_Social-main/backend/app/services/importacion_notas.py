@@ -0,0 +1,347 @@
+"""
+Importación de notas en bloque (CSV o JSON)
+
+Un docente que carga un parcial de 60 estudiantes con POST /notas hace 60
+peticiones, cada una con su validación de token. POST /notas/importar recibe
+todas las filas en un solo cuerpo y:
+
+- Las lee a medida que llegan (`filas_csv`, `filas_json`), sin cargar el
+  archivo completo en memoria.
+- Las agrupa en lotes de GRADE_IMPORT_BATCH_SIZE. Por lote resuelve los
+  estudiantes (id_user o ci_est) y las materias (id_materia o codigo_materia)
+  con una consulta cada uno, y valida todas las filas con las reglas de
+  NotaCreate en una sola llamada de Pydantic.
+- Hace upsert del lote por (id_user, id_materia, tipo_nota) (ver
+  notas_unicas.sql), así volver a importar el mismo archivo corrige notas en
+  lugar de duplicarlas.
+- Devuelve el número de fila y el motivo de cada fila rechazada; las válidas
+  se guardan igual.
+
+Un docente solo puede importar notas de las materias que dicta.
+"""
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple
+import codecs
+import csv
+import json
+import logging
+
+from postgrest.types import ReturnMethod
+from pydantic import TypeAdapter, ValidationError
+
+from app.config import settings
+from app.models.academico import NotaCreate
+from app.services.estadisticas_notas import invalidar_materia
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Columnas aceptadas para identificar al estudiante y a la materia
+COLUMNAS_ESTUDIANTE = ("id_user", "ci_est")
+COLUMNAS_MATERIA = ("id_materia", "codigo_materia")
+
+# Máximo de errores detallados en la respuesta (el total se cuenta igual)
+MAX_ERRORES_REPORTADOS = 1000
+
+_validador_lote = TypeAdapter(List[NotaCreate])
+
+
+async def filas_csv(fragmentos: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, str]]:
+    """
+    Lee un CSV con encabezado a medida que llegan los bytes
+
+    Acepta coma o punto y coma como separador (Excel en español exporta con
+    punto y coma) y UTF-8 con o sin BOM. Los campos no pueden contener saltos
+    de línea.
+
+    Args:
+        fragmentos: Bytes del cuerpo de la petición
+
+    Yields:
+        Un diccionario columna -> valor por fila no vacía
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    pendiente = ""
+    encabezado: Optional[List[str]] = None
+    separador = ","
+
+    def procesar(lineas: List[str]):
+        for valores in csv.reader(lineas, delimiter=separador):
+            if any(v.strip() for v in valores):
+                yield dict(zip(encabezado, (v.strip() for v in valores)))
+
+    async for fragmento in fragmentos:
+        pendiente += decodificador.decode(fragmento)
+        lineas = pendiente.split("\n")
+        pendiente = lineas.pop()
+        if encabezado is None and lineas:
+            primera = lineas.pop(0)
+            separador = ";" if primera.count(";") > primera.count(",") else ","
+            encabezado = [c.strip().lower() for c in next(csv.reader([primera], delimiter=separador))]
+        for fila in procesar(lineas):
+            yield fila
+
+    pendiente += decodificador.decode(b"", final=True)
+    if encabezado is None:  # Vacío o solo encabezado
+        return
+    for fila in procesar([pendiente]):
+        yield fila
+
+
+async def filas_json(fragmentos: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Lee un arreglo JSON de objetos elemento por elemento
+
+    Args:
+        fragmentos: Bytes del cuerpo de la petición
+
+    Yields:
+        Cada elemento del arreglo
+
+    Raises:
+        ValueError: Si el cuerpo no es un arreglo JSON completo
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    parser = json.JSONDecoder()
+    buffer = ""
+    abierto = terminado = False
+
+    async for fragmento in fragmentos:
+        buffer += decodificador.decode(fragmento)
+        pos = 0
+        while not terminado:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                if buffer[pos] == "," and not abierto:
+                    raise ValueError("El JSON debe ser un arreglo de objetos")
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not abierto:
+                if buffer[pos] != "[":
+                    raise ValueError("El JSON debe ser un arreglo de objetos")
+                abierto = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                terminado = True
+                pos += 1
+                break
+            try:
+                elemento, pos = parser.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # Elemento incompleto: esperar más bytes
+            yield elemento
+        buffer = buffer[pos:]
+
+    buffer += decodificador.decode(b"", final=True)
+    if not terminado or buffer.strip():
+        raise ValueError("JSON mal formado o incompleto: se esperaba un arreglo de objetos")
+
+
+def _identificador(fila: dict, columnas: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    """Primera columna identificadora con valor: (columna, valor)"""
+    for columna in columnas:
+        valor = fila.get(columna)
+        if valor not in (None, ""):
+            return columna, str(valor).strip()
+    return None
+
+
+class ImportadorNotas:
+    """
+    Acumula filas, las valida y guarda por lotes, y lleva el resultado
+
+    Uso:
+        importador = ImportadorNotas(db, current_user)
+        async for fila in filas_csv(request.stream()):
+            importador.agregar(fila)
+        resultado = importador.terminar()
+    """
+
+    def __init__(self, db: "Client", usuario: dict, tamano_lote: Optional[int] = None):
+        """
+        Args:
+            db: Cliente de base de datos
+            usuario: Usuario que importa (docente o administrador)
+            tamano_lote: Filas por lote (por defecto GRADE_IMPORT_BATCH_SIZE)
+        """
+        self.db = db
+        self.usuario = usuario
+        self.tamano_lote = tamano_lote or settings.GRADE_IMPORT_BATCH_SIZE
+        self.total = 0
+        self.importadas = 0
+        self.errores: List[dict] = []
+        self.cantidad_errores = 0
+        self._lote: List[Tuple[int, Any]] = []
+        # (columna, valor) -> id_user / (id_materia, id_doc); None si no existe
+        self._estudiantes: Dict[Tuple[str, str], Optional[str]] = {}
+        self._materias: Dict[Tuple[str, str], Optional[Tuple[str, Optional[str]]]] = {}
+        self._ci_docente: Optional[str] = None
+        if usuario.get("rol") == "docente":
+            docente = db.table("docente").select("ci_doc").eq("id_user", usuario["id_user"]).execute()
+            self._ci_docente = docente.data[0]["ci_doc"] if docente.data else ""
+
+    def agregar(self, fila: Any) -> None:
+        """
+        Agrega una fila; al completar un lote lo procesa
+
+        Args:
+            fila: Diccionario con estudiante, materia, tipo_nota, nota y
+                opcionalmente origen
+
+        Raises:
+            ValueError: Si se supera GRADE_IMPORT_MAX_ROWS
+        """
+        self.total += 1
+        if self.total > settings.GRADE_IMPORT_MAX_ROWS:
+            raise ValueError(f"Máximo {settings.GRADE_IMPORT_MAX_ROWS} filas por importación")
+        # Número de fila de datos (sin contar el encabezado del CSV)
+        self._lote.append((self.total, fila))
+        if len(self._lote) >= self.tamano_lote:
+            self._procesar_lote()
+
+    def terminar(self) -> dict:
+        """
+        Procesa el último lote y devuelve el resultado
+
+        Returns:
+            Diccionario con total, importadas, rechazadas y errores (fila, error)
+        """
+        if self._lote:
+            self._procesar_lote()
+        return {
+            "total": self.total,
+            "importadas": self.importadas,
+            "rechazadas": self.cantidad_errores,
+            "errores": self.errores,
+        }
+
+    def _error(self, fila: int, mensaje: str) -> None:
+        self.cantidad_errores += 1
+        if len(self.errores) < MAX_ERRORES_REPORTADOS:
+            self.errores.append({"fila": fila, "error": mensaje})
+
+    def _resolver(self, lote: List[Tuple[int, Any]]) -> None:
+        """Busca en una consulta por columna los estudiantes y materias nuevos del lote"""
+        faltantes_est: Dict[str, set] = {c: set() for c in COLUMNAS_ESTUDIANTE}
+        faltantes_mat: Dict[str, set] = {c: set() for c in COLUMNAS_MATERIA}
+        for _, fila in lote:
+            if not isinstance(fila, dict):
+                continue
+            est = _identificador(fila, COLUMNAS_ESTUDIANTE)
+            if est and est not in self._estudiantes:
+                faltantes_est[est[0]].add(est[1])
+            mat = _identificador(fila, COLUMNAS_MATERIA)
+            if mat and mat not in self._materias:
+                faltantes_mat[mat[0]].add(mat[1])
+
+        for columna, valores in faltantes_est.items():
+            if not valores:
+                continue
+            response = self.db.table("estudiante")\
+                .select("id_user, ci_est")\
+                .in_(columna, list(valores))\
+                .execute()
+            for valor in valores:
+                self._estudiantes[(columna, valor)] = None
+            for est in response.data:
+                self._estudiantes[(columna, str(est[columna]))] = est["id_user"]
+
+        for columna, valores in faltantes_mat.items():
+            if not valores:
+                continue
+            response = self.db.table("materia")\
+                .select("id_materia, codigo_materia, id_doc")\
+                .in_(columna, list(valores))\
+                .execute()
+            for valor in valores:
+                self._materias[(columna, valor)] = None
+            for mat in response.data:
+                self._materias[(columna, str(mat[columna]))] = (mat["id_materia"], mat.get("id_doc"))
+
+    def _procesar_lote(self) -> None:
+        lote, self._lote = self._lote, []
+        self._resolver(lote)
+
+        # Armar las filas candidatas; los errores de referencia se detectan aquí
+        candidatas: List[Tuple[int, dict]] = []
+        for numero, fila in lote:
+            if not isinstance(fila, dict):
+                self._error(numero, "La fila debe ser un objeto")
+                continue
+            est = _identificador(fila, COLUMNAS_ESTUDIANTE)
+            mat = _identificador(fila, COLUMNAS_MATERIA)
+            if not est:
+                self._error(numero, "Falta el estudiante (id_user o ci_est)")
+                continue
+            if not mat:
+                self._error(numero, "Falta la materia (id_materia o codigo_materia)")
+                continue
+            id_user = self._estudiantes.get(est)
+            materia = self._materias.get(mat)
+            if not id_user:
+                self._error(numero, f"Estudiante no encontrado: {est[1]}")
+                continue
+            if not materia:
+                self._error(numero, f"Materia no encontrada: {mat[1]}")
+                continue
+            if self._ci_docente is not None and materia[1] != self._ci_docente:
+                self._error(numero, f"No dicta la materia {mat[1]}")
+                continue
+
+            nota = fila.get("nota")
+            if isinstance(nota, str):
+                nota = nota.strip().replace(",", ".")  # 85,5 -> 85.5
+            candidata = {
+                "nota": nota,
+                "tipo_nota": fila.get("tipo_nota"),
+                "id_user": id_user,
+                "id_materia": materia[0],
+            }
+            if fila.get("origen") not in (None, ""):
+                candidata["origen"] = fila["origen"]
+            candidatas.append((numero, candidata))
+
+        # Validar todo el lote con las reglas de NotaCreate en una llamada
+        invalidas: Dict[int, List[str]] = {}
+        try:
+            notas = _validador_lote.validate_python([c for _, c in candidatas])
+        except ValidationError as e:
+            for error in e.errors():
+                indice, campo = error["loc"][0], error["loc"][1] if len(error["loc"]) > 1 else ""
+                invalidas.setdefault(indice, []).append(f"{campo}: {error['msg']}")
+            validas = [c for i, c in enumerate(candidatas) if i not in invalidas]
+            notas = _validador_lote.validate_python([c for _, c in validas])
+            for indice, mensajes in sorted(invalidas.items()):
+                self._error(candidatas[indice][0], "; ".join(mensajes))
+            candidatas = validas
+
+        # La misma nota repetida en el lote: gana la última (como en lotes distintos)
+        por_clave: Dict[Tuple[str, str, str], Tuple[int, dict]] = {}
+        for (numero, _), nota in zip(candidatas, notas):
+            por_clave[(nota.id_user, nota.id_materia, nota.tipo_nota)] = (numero, nota.dict())
+        self._guardar(list(por_clave.values()), duplicadas=len(candidatas) - len(por_clave))
+
+    def _guardar(self, filas: List[Tuple[int, dict]], duplicadas: int = 0) -> None:
+        """Upsert del lote; si falla, fila por fila para identificar las culpables"""
+        if not filas:
+            return
+        try:
+            self._upsert([nota for _, nota in filas])
+            self.importadas += len(filas) + duplicadas
+        except Exception as e:
+            logger.warning(f"Lote de {len(filas)} notas rechazado, reintentando por fila: {e}")
+            self.importadas += duplicadas
+            for numero, nota in filas:
+                try:
+                    self._upsert([nota])
+                    self.importadas += 1
+                except Exception as e:
+                    self._error(numero, str(e))
+        invalidar_materia(*{nota["id_materia"] for _, nota in filas})
+
+    def _upsert(self, notas: List[dict]) -> None:
+        self.db.table("nota")\
+            .upsert(notas, on_conflict="id_user,id_materia,tipo_nota", returning=ReturnMethod.minimal)\
+            .execute()
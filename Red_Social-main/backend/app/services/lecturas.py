@@ -0,0 +1,83 @@
+"""
+Mensajes leídos por miembro de conversación
+
+Cada fila de usuarioconversacion guarda `ultima_lectura` (y el mensaje que
+la fijó): el usuario leyó todo lo enviado hasta esa fecha. Así:
+
+- Marcar una conversación o un mensaje como leído es avanzar una sola fila
+  (función marcar_leida de lecturas_mensajes.sql), sin importar cuántos
+  mensajes nuevos haya.
+- Los no leídos son los mensajes de otros con fecha_envio posterior a la
+  marca, contados con el índice (id_conversacion, fecha_envio).
+- En los grupos cada miembro tiene su propio estado.
+
+Para no romper a los clientes, los mensajes se siguen devolviendo con
+`leido`, calculado con `marcar_leidos`: un mensaje recibido está leído si
+cae dentro de la marca del usuario, y uno enviado si algún otro miembro ya
+lo leyó (lo que antes significaba el flag).
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+def marcar_leida(db: "Client", id_usuario: str, id_conversacion: str, hasta: Optional[str] = None) -> Optional[int]:
+    """
+    Avanza la marca de lectura del usuario en la conversación
+
+    Args:
+        db: Cliente de base de datos
+        id_usuario: Usuario que leyó
+        id_conversacion: Conversación
+        hasta: fecha_envio del último mensaje leído (por defecto, todos)
+
+    Returns:
+        Cantidad de mensajes de otros que pasaron a leídos, o None si el
+        usuario no es miembro de la conversación
+    """
+    response = db.rpc("marcar_leida", {
+        "p_id_usuario": id_usuario,
+        "p_id_conversacion": id_conversacion,
+        "p_hasta": hasta,
+    }).execute()
+    return response.data
+
+
+def no_leidos_por_conversacion(db: "Client", id_usuario: str) -> Dict[str, int]:
+    """
+    Mensajes no leídos del usuario en cada conversación
+
+    Args:
+        db: Cliente de base de datos
+        id_usuario: Usuario
+
+    Returns:
+        id_conversacion -> no leídos (solo las que tienen alguno)
+    """
+    response = db.rpc("contar_no_leidos", {"p_id_usuario": id_usuario}).execute()
+    return {fila["id_conversacion"]: int(fila["no_leidos"]) for fila in response.data or []}
+
+
+def marcar_leidos(mensajes: List[dict], marcas: Dict[str, Optional[str]], id_usuario: str) -> List[dict]:
+    """
+    Completa `leido` en los mensajes a partir de las marcas de los miembros
+
+    Args:
+        mensajes: Mensajes de una conversación (con id_user y fecha_envio)
+        marcas: id_usuario -> ultima_lectura de cada miembro
+        id_usuario: Usuario que pide los mensajes
+
+    Returns:
+        Los mismos mensajes, modificados
+    """
+    propia = marcas.get(id_usuario)
+    otras = [marca for usuario, marca in marcas.items() if usuario != id_usuario and marca]
+    mas_avanzada = max(otras) if otras else None
+    for mensaje in mensajes:
+        fecha = mensaje.get("fecha_envio")
+        if mensaje.get("id_user") == id_usuario:
+            mensaje["leido"] = bool(mas_avanzada and fecha and fecha <= mas_avanzada)
+        else:
+            mensaje["leido"] = bool(propia and fecha and fecha <= propia)
+    return mensajes
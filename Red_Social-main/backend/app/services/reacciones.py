@@ -0,0 +1,117 @@
+"""
+Alternar reacciones en una sola operación y resumirlas
+
+Antes, reaccionar eran cuatro viajes a la BD (buscar la reacción, borrarla o
+insertarla, leer el autor, crear la notificación) y dos toques seguidos
+podían insertar la misma reacción dos veces. Ahora todo lo hace la función
+alternar_reaccion de reacciones_atomicas.sql en una transacción:
+
+- Índices únicos parciales por (destino, id_user, tipo_reac): el segundo de
+  dos toques simultáneos no inserta un duplicado sino que alterna el primero.
+- Los conteos por tipo_reac se guardan en publicacion.conteo_reacciones y
+  comentario.conteo_reacciones (los mantiene un trigger de reaccion) y se
+  devuelven con la reacción, sin contar filas.
+- La relevancia de la publicación y la notificación al autor se escriben en
+  la misma transacción.
+
+Para mostrar las reacciones no se devuelven todas las filas sino un resumen
+(función resumen_reacciones de resumen_reacciones.sql): conteos por tipo,
+con qué tipos reaccionó quien pregunta y los perfiles de los últimos
+REACTION_SUMMARY_USERS que reaccionaron. Los resúmenes de muchas
+publicaciones y comentarios salen de una sola llamada.
+"""
+from typing import TYPE_CHECKING, List, Optional
+
+from app.services.relevancia import LAMBDA, PESO_REACCION
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+EMOJIS = {"like": "👍", "love": "❤️", "wow": "😮", "sad": "😢", "angry": "😠"}
+
+
+def texto_notificacion(usuario: dict, tipo_reac: str) -> str:
+    """Contenido de la notificación al autor de la publicación"""
+    nombre_completo = f"{usuario.get('nombre', '')} {usuario.get('apellido', '')}".strip()
+    return f"{nombre_completo} reaccionó {EMOJIS.get(tipo_reac, '👍')} a tu publicación"
+
+
+def alternar_reaccion(
+    db: "Client",
+    id_usuario: str,
+    tipo_reac: str,
+    id_publicacion: Optional[str] = None,
+    id_comentario: Optional[str] = None,
+    notificacion: Optional[str] = None
+) -> Optional[dict]:
+    """
+    Crea la reacción si no existe o la borra si ya existe
+
+    Args:
+        db: Cliente de base de datos
+        id_usuario: Usuario que reacciona
+        tipo_reac: Tipo de reacción
+        id_publicacion: Publicación (o None si es a un comentario)
+        id_comentario: Comentario (o None si es a una publicación)
+        notificacion: Contenido de la notificación al autor si se crea
+            (no se envía si el autor es el mismo usuario)
+
+    Returns:
+        {"activa", "reaccion", "conteos", "autor"}: si la reacción quedó
+        creada, la fila creada o borrada, los conteos por tipo del destino y
+        su autor; None si la publicación o el comentario no existe
+    """
+    response = db.rpc("alternar_reaccion", {
+        "p_id_user": id_usuario,
+        "p_tipo_reac": tipo_reac,
+        "p_id_publicacion": id_publicacion,
+        "p_id_comentario": id_comentario,
+        "p_peso": PESO_REACCION,
+        "p_lambda": LAMBDA,
+        "p_notificacion": notificacion,
+    }).execute()
+    return response.data
+
+
+def resumir(
+    db: "Client",
+    id_usuario: str,
+    publicaciones: List[str],
+    comentarios: List[str],
+    usuarios: int
+) -> List[dict]:
+    """
+    Resúmenes de reacciones de varias publicaciones y comentarios
+
+    Args:
+        db: Cliente de base de datos
+        id_usuario: Usuario que pregunta (para `mis_reacciones`)
+        publicaciones: IDs de publicaciones
+        comentarios: IDs de comentarios
+        usuarios: Cantidad de perfiles de los últimos que reaccionaron
+
+    Returns:
+        Un resumen por cada destino que existe ("id_publicacion" o
+        "id_comentario", "total", "conteos", "mis_reacciones", "usuarios");
+        los IDs que no existen se omiten
+    """
+    if not publicaciones and not comentarios:
+        return []
+    response = db.rpc("resumen_reacciones", {
+        "p_publicaciones": publicaciones,
+        "p_comentarios": comentarios,
+        "p_id_user": id_usuario,
+        "p_usuarios": usuarios,
+    }).execute()
+    resumenes = []
+    for fila in response.data or []:
+        conteos = {tipo: int(cantidad) for tipo, cantidad in (fila["conteos"] or {}).items()}
+        resumenes.append({
+            "id_publicacion": fila["id_publicacion"],
+            "id_comentario": fila["id_comentario"],
+            "total": sum(conteos.values()),
+            "conteos": conteos,
+            "mis_reacciones": fila["mis_reacciones"] or [],
+            "usuarios": fila["usuarios"] or [],
+        })
+    return resumenes
@@ -0,0 +1,374 @@
+"""
+Reconciliación de usuario con estudiante y docente
+
+Cada usuario con rol estudiante debe tener su fila en `estudiante`, y cada
+docente la suya en `docente`. El registro las crea, pero importaciones,
+cambios de rol o fallos a mitad de camino dejan huecos. En vez de recorrer
+usuario por usuario:
+
+- Lee las tres tablas por páginas (solo las columnas necesarias) y calcula
+  las diferencias con operaciones de conjuntos sobre id_user: faltantes
+  (rol sin fila), sobrantes (fila sin el rol) y estudiantes con CI inválido
+  (UUIDs parciales o CIs temporales "EST1a2b3c4d" de scripts anteriores).
+- Arma un plan de operaciones, dividido en lotes de RECONCILE_BATCH_SIZE
+  filas; cada lote es un upsert o un delete con `in`, y se aplican hasta
+  RECONCILE_CONCURRENCY lotes a la vez.
+- Guarda el plan y los lotes terminados en un punto de control: si el proceso
+  se corta, `aplicar` continúa con los lotes que faltan. Los lotes son
+  idempotentes (repetir uno ya aplicado no cambia nada).
+
+El CI nuevo es el `ci_user` del usuario si es válido y está libre; si no, un
+número de 8 dígitos sin usar. Los CIs de docente no se corrigen: materia.id_doc
+apunta a docente.ci_doc con ON DELETE SET NULL y se perdería la asignación.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Set
+import json
+import logging
+import os
+import re
+
+from postgrest.types import ReturnMethod
+
+from app.config import settings
+from app.services.exportacion import TAMANO_IN, paginar
+from app.utils.proyecciones import columnas
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Tabla por rol: clave primaria y valores por defecto de una fila nueva
+TABLAS = {
+    "estudiante": {"clave": "ci_est", "valores": {"carrera": "Sin especificar", "semestre": 1}},
+    "docente": {"clave": "ci_doc", "valores": {"especialidad_doc": "Sin especificar"}},
+}
+
+# Primer CI generado cuando el usuario no tiene uno válido
+CI_BASE = 10000000
+
+# Máximo de errores detallados en el resultado (el total se cuenta igual)
+MAX_ERRORES_REPORTADOS = 1000
+
+
+def es_ci_valido(ci: Optional[str]) -> bool:
+    """
+    Indica si un CI parece real
+
+    Son inválidos los vacíos, los que tienen guiones o más de 15 caracteres
+    (UUIDs) y los de letras seguidas de hexadecimales (UUIDs parciales).
+
+    Args:
+        ci: CI a revisar
+
+    Returns:
+        True si es válido
+    """
+    if not ci:
+        return False
+    if "-" in ci or len(ci) > 15:
+        return False
+    return not re.match(r"^[A-Z]+[0-9a-f]{8,}$", ci)
+
+
+def _leer_usuarios(db: "Client") -> List[dict]:
+    """Usuarios estudiante y docente; sin ci_user si la columna no existe"""
+    roles = {"rol": list(TABLAS)}
+    try:
+        return list(chain.from_iterable(paginar(db, "usuario", "id_user, rol, ci_user", "id_user", incluidos=roles)))
+    except Exception as e:
+        logger.warning(f"No se pudo leer usuario.ci_user, se generarán CIs: {e}")
+        return list(chain.from_iterable(paginar(db, "usuario", "id_user, rol", "id_user", incluidos=roles)))
+
+
+def _generador_ci(usados: Set[str]) -> Iterator[str]:
+    numero = CI_BASE
+    while True:
+        ci = f"{numero:08d}"
+        numero += 1
+        if ci not in usados:
+            usados.add(ci)
+            yield ci
+
+
+def planificar(db: "Client", eliminar_sobrantes: bool = False) -> dict:
+    """
+    Compara usuario con estudiante y docente y arma el plan de correcciones
+
+    Args:
+        db: Cliente de base de datos
+        eliminar_sobrantes: Incluir el borrado de filas cuyo usuario ya no
+            tiene ese rol (por defecto solo se informan)
+
+    Returns:
+        {"resumen": {tabla: conteos}, "operaciones": [{"tipo", "tabla", "filas"}]}
+        con tipo crear (filas nuevas), corregir_ci ({"anterior", "fila"}) o
+        eliminar (claves)
+    """
+    usuarios = _leer_usuarios(db)
+    resumen, operaciones = {}, []
+
+    for tabla, config in TABLAS.items():
+        clave = config["clave"]
+        esperados = {u["id_user"]: u for u in usuarios if u["rol"] == tabla}
+        filas = list(chain.from_iterable(paginar(db, tabla, columnas(tabla), clave)))
+        por_usuario = {fila["id_user"]: fila for fila in filas}
+
+        faltantes = sorted(esperados.keys() - por_usuario.keys())
+        sobrantes = sorted(por_usuario.keys() - esperados.keys())
+        invalidas = sorted(
+            (fila for fila in filas if fila["id_user"] in esperados and not es_ci_valido(fila[clave])),
+            key=lambda fila: fila["id_user"]
+        )
+
+        usados = {fila[clave] for fila in filas}
+        generados = _generador_ci(usados)
+
+        def nuevo_ci(id_user: str) -> str:
+            ci = esperados[id_user].get("ci_user")
+            if es_ci_valido(ci) and ci not in usados:
+                usados.add(ci)
+                return ci
+            return next(generados)
+
+        resumen[tabla] = {
+            "usuarios": len(esperados),
+            "registros": len(filas),
+            "faltantes": len(faltantes),
+            "ci_invalidos": len(invalidas),
+            "sobrantes": len(sobrantes),
+        }
+
+        if faltantes:
+            operaciones.append({
+                "tipo": "crear",
+                "tabla": tabla,
+                "filas": [{clave: nuevo_ci(id_user), "id_user": id_user, **config["valores"]} for id_user in faltantes],
+            })
+        if invalidas and tabla == "estudiante":
+            operaciones.append({
+                "tipo": "corregir_ci",
+                "tabla": tabla,
+                "filas": [{"anterior": fila[clave], "fila": {**fila, clave: nuevo_ci(fila["id_user"])}} for fila in invalidas],
+            })
+        if sobrantes and eliminar_sobrantes:
+            operaciones.append({
+                "tipo": "eliminar",
+                "tabla": tabla,
+                "filas": [por_usuario[id_user][clave] for id_user in sobrantes],
+            })
+
+    return {"resumen": resumen, "operaciones": operaciones}
+
+
+def dividir_en_lotes(plan: dict, tamano: Optional[int] = None) -> List[dict]:
+    """
+    Divide las operaciones del plan en lotes
+
+    Args:
+        plan: Resultado de planificar()
+        tamano: Filas por lote (por defecto RECONCILE_BATCH_SIZE; los borrados
+            usan como máximo TAMANO_IN para no exceder el largo de la URL)
+
+    Returns:
+        [{"id", "tipo", "tabla", "filas"}], con un id estable para el punto de control
+    """
+    tamano = tamano or settings.RECONCILE_BATCH_SIZE
+    lotes = []
+    for operacion in plan["operaciones"]:
+        por_lote = min(tamano, TAMANO_IN) if operacion["tipo"] != "crear" else tamano
+        filas = operacion["filas"]
+        for numero, inicio in enumerate(range(0, len(filas), por_lote)):
+            lotes.append({
+                "id": f"{operacion['tipo']}:{operacion['tabla']}:{numero}",
+                "tipo": operacion["tipo"],
+                "tabla": operacion["tabla"],
+                "filas": filas[inicio:inicio + por_lote],
+            })
+    return lotes
+
+
+def _insertar(db: "Client", tabla: str, filas: List[dict]) -> None:
+    # Si el CI ya existe (lote repetido al reanudar) no se pisa la fila
+    db.table(tabla)\
+        .upsert(filas, on_conflict=TABLAS[tabla]["clave"], ignore_duplicates=True, returning=ReturnMethod.minimal)\
+        .execute()
+
+
+def _borrar(db: "Client", tabla: str, claves: List[str]) -> None:
+    db.table(tabla)\
+        .delete(returning=ReturnMethod.minimal)\
+        .in_(TABLAS[tabla]["clave"], claves)\
+        .execute()
+
+
+def aplicar_lote(db: "Client", lote: dict) -> List[dict]:
+    """
+    Aplica un lote; si el lote completo falla, fila por fila
+
+    Args:
+        db: Cliente de base de datos
+        lote: Lote de dividir_en_lotes()
+
+    Returns:
+        Errores [{"lote", "clave", "error"}] de las filas que no se pudieron aplicar
+    """
+    tabla, clave = lote["tabla"], TABLAS[lote["tabla"]]["clave"]
+
+    def ejecutar(filas: list) -> None:
+        if lote["tipo"] == "crear":
+            _insertar(db, tabla, filas)
+        elif lote["tipo"] == "corregir_ci":
+            # La clave primaria cambia: borrar la fila vieja antes de insertar
+            # la nueva (id_user es único). Si se corta entre los dos pasos,
+            # repetir el lote desde el punto de control la completa
+            _borrar(db, tabla, [f["anterior"] for f in filas])
+            _insertar(db, tabla, [f["fila"] for f in filas])
+        else:
+            _borrar(db, tabla, filas)
+
+    def identificar(fila) -> str:
+        if lote["tipo"] == "crear":
+            return fila[clave]
+        if lote["tipo"] == "corregir_ci":
+            return fila["anterior"]
+        return fila
+
+    try:
+        ejecutar(lote["filas"])
+        return []
+    except Exception as e:
+        logger.warning(f"Lote {lote['id']} rechazado, reintentando por fila: {e}")
+
+    errores = []
+    for fila in lote["filas"]:
+        try:
+            ejecutar([fila])
+        except Exception as e:
+            errores.append({"lote": lote["id"], "clave": identificar(fila), "error": str(e)})
+    return errores
+
+
+class PuntoControl:
+    """
+    Plan y lotes terminados de una reconciliación
+
+    El plan se escribe una vez (archivo temporal + rename, nunca queda a medio
+    escribir) y cada lote terminado agrega una línea a un diario aparte, así
+    guardar el avance no cuesta más al crecer el plan. Una línea cortada por
+    una caída se ignora: ese lote se vuelve a aplicar.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.ruta_diario = f"{ruta}.hechos"
+
+    def existe(self) -> bool:
+        return os.path.exists(self.ruta)
+
+    def iniciar(self, plan: dict, tamano_lote: int) -> dict:
+        """
+        Guarda un plan nuevo y vacía el diario
+
+        Returns:
+            Estado inicial para aplicar()
+        """
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"plan": plan, "tamano_lote": tamano_lote}, archivo, ensure_ascii=False)
+        open(self.ruta_diario, "w").close()
+        os.replace(temporal, self.ruta)
+        return {"plan": plan, "tamano_lote": tamano_lote, "hechos": []}
+
+    def cargar(self) -> dict:
+        """
+        Returns:
+            {"plan", "tamano_lote", "hechos": [ids de lote], "errores", "cantidad_errores"}
+        """
+        with open(self.ruta, encoding="utf-8") as archivo:
+            estado = json.load(archivo)
+        estado.update(hechos=[], errores=[], cantidad_errores=0)
+        if os.path.exists(self.ruta_diario):
+            with open(self.ruta_diario, encoding="utf-8") as diario:
+                for linea in diario:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        continue
+                    estado["hechos"].append(registro["lote"])
+                    estado["cantidad_errores"] += len(registro["errores"])
+                    estado["errores"].extend(registro["errores"][:MAX_ERRORES_REPORTADOS - len(estado["errores"])])
+        return estado
+
+    def marcar(self, id_lote: str, errores: List[dict]) -> None:
+        """Registra un lote terminado (con las filas que fallaron)"""
+        with open(self.ruta_diario, "a", encoding="utf-8") as diario:
+            diario.write(json.dumps({"lote": id_lote, "errores": errores}, ensure_ascii=False) + "\n")
+
+    def borrar(self) -> None:
+        for ruta in (self.ruta, self.ruta_diario):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+
+def aplicar(
+    db: "Client",
+    estado: dict,
+    punto_control: Optional[PuntoControl] = None,
+    concurrencia: Optional[int] = None,
+    progreso: Optional[Callable[[int, int, dict], None]] = None
+) -> dict:
+    """
+    Aplica los lotes pendientes del plan con concurrencia acotada
+
+    Args:
+        db: Cliente de base de datos (compartido entre hilos)
+        estado: {"plan", "tamano_lote", "hechos", ...}; con un estado
+            cargado del punto de control se saltan los lotes ya hechos
+        punto_control: Dónde guardar el avance después de cada lote
+        concurrencia: Lotes a la vez (por defecto RECONCILE_CONCURRENCY)
+        progreso: Se llama con (filas hechas, filas totales, lote) al
+            terminar cada lote
+
+    Returns:
+        El estado final; `errores` trae las filas que no se pudieron aplicar
+        (hasta MAX_ERRORES_REPORTADOS) y `cantidad_errores` el total
+    """
+    lotes = dividir_en_lotes(estado["plan"], estado.get("tamano_lote"))
+    hechos = set(estado.get("hechos", []))
+    estado.setdefault("errores", [])
+    estado.setdefault("cantidad_errores", 0)
+    hilos = concurrencia or settings.RECONCILE_CONCURRENCY
+    total = sum(len(lote["filas"]) for lote in lotes)
+    filas_hechas = sum(len(lote["filas"]) for lote in lotes if lote["id"] in hechos)
+    pendientes = iter([lote for lote in lotes if lote["id"] not in hechos])
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        en_curso = {}
+
+        def lanzar(cantidad: int) -> None:
+            # Solo se encolan los lotes que entran en el pool: al cortar con
+            # Ctrl+C no queda trabajo pendiente fuera del punto de control
+            for lote in [lote for _, lote in zip(range(cantidad), pendientes)]:
+                en_curso[pool.submit(aplicar_lote, db, lote)] = lote
+
+        lanzar(hilos)
+        while en_curso:
+            terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                lote = en_curso.pop(futuro)
+                errores = futuro.result()
+                hechos.add(lote["id"])
+                filas_hechas += len(lote["filas"])
+                estado["cantidad_errores"] += len(errores)
+                estado["errores"].extend(errores[:MAX_ERRORES_REPORTADOS - len(estado["errores"])])
+                estado["hechos"] = sorted(hechos)
+                if punto_control:
+                    punto_control.marcar(lote["id"], errores)
+                if progreso:
+                    progreso(filas_hechas, total, lote)
+            lanzar(len(terminados))
+
+    return estado
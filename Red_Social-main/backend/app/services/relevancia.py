@@ -0,0 +1,137 @@
+"""
+Puntaje de relevancia de publicaciones para el timeline "relevante"
+
+Cada publicación acumula interacciones (la propia publicación, comentarios y
+reacciones) que pierden peso con el tiempo con una vida media de
+RELEVANCE_HALF_LIFE_HOURS. En lugar de recalcular el decaimiento en cada
+lectura, se guarda en escala logarítmica respecto de un origen fijo:
+
+    relevancia = ln( Σ peso_i · e^(λ·t_i) ),  λ = ln 2 / vida media
+
+El puntaje real en el instante t es e^(relevancia - λ·t); como el factor
+e^(-λ·t) es el mismo para todas las publicaciones, ordenar por `relevancia`
+es ordenar por puntaje decaído, y sumar o restar una interacción es una
+operación local (ln-suma-exp) que no toca a las demás.
+
+La afinidad del lector con el autor (propio, amigo, compañero de grupo,
+docente de sus materias) multiplica el puntaje, así que en escala logarítmica
+se suma: cada fila del timeline guarda `afinidad` y `puntaje = afinidad +
+relevancia`, con un índice por (id_user, puntaje). La función
+sumar_relevancia (ver crear_relevancia.sql) actualiza en la misma transacción
+la publicación y sus filas del timeline cuando llega un comentario o una
+reacción; una página ordenada por relevancia cuesta lo mismo que una
+cronológica.
+"""
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Union
+import logging
+import math
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada interacción en el puntaje
+PESO_PUBLICACION = 1.0
+PESO_COMENTARIO = 3.0
+PESO_REACCION = 1.0
+
+# Bono multiplicativo según la relación del lector con el autor
+AFINIDAD = {
+    "propio": 0.2,
+    "grupo": 0.3,
+    "amigo": 0.6,
+    "docente": 1.0,  # Docente de alguna materia del grupo del lector
+}
+
+LAMBDA = math.log(2) / (settings.RELEVANCE_HALF_LIFE_HOURS * 3600)
+
+
+def _segundos(fecha: Union[datetime, str]) -> float:
+    """Segundos desde epoch; las fechas sin zona se toman como UTC (como las guarda la BD)"""
+    if isinstance(fecha, str):
+        fecha = datetime.fromisoformat(fecha.replace("Z", "+00:00"))
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return fecha.timestamp()
+
+
+def log_evento(peso: float, fecha: Union[datetime, str]) -> float:
+    """
+    Aporte de una interacción en escala logarítmica
+
+    Args:
+        peso: Peso de la interacción (PESO_*)
+        fecha: Momento de la interacción
+
+    Returns:
+        ln(peso) + λ·t
+    """
+    return math.log(peso) + LAMBDA * _segundos(fecha)
+
+
+def relevancia_inicial(fecha: Union[datetime, str]) -> float:
+    """Relevancia de una publicación recién creada (sin interacciones)"""
+    return log_evento(PESO_PUBLICACION, fecha)
+
+
+def log_afinidad(tipo: str) -> float:
+    """
+    Afinidad en escala logarítmica para sumarla a la relevancia
+
+    Args:
+        tipo: Clave de AFINIDAD
+
+    Returns:
+        ln(1 + bono)
+    """
+    return math.log1p(AFINIDAD[tipo])
+
+
+def puntaje_actual(relevancia: float, ahora: datetime = None) -> float:
+    """
+    Puntaje decaído en un instante (para mostrar o comparar con umbrales)
+
+    Args:
+        relevancia: Valor guardado en publicacion.relevancia o timeline.puntaje
+        ahora: Instante de evaluación (por defecto ahora)
+
+    Returns:
+        Suma de los pesos de las interacciones, cada uno decaído a `ahora`
+    """
+    ahora = ahora or datetime.now(timezone.utc)
+    return math.exp(relevancia - LAMBDA * _segundos(ahora))
+
+
+def registrar_interaccion(
+    db: "Client",
+    id_publicacion: str,
+    peso: float,
+    fecha: Union[datetime, str],
+    signo: int = 1
+) -> None:
+    """
+    Suma (o resta, al borrar) una interacción a la relevancia de la publicación
+
+    Actualiza la publicación y sus filas del timeline en la misma transacción.
+    Un error se registra y no interrumpe la escritura del comentario o la
+    reacción.
+
+    Args:
+        db: Cliente de base de datos
+        id_publicacion: Publicación comentada o reaccionada
+        peso: Peso de la interacción (PESO_COMENTARIO, PESO_REACCION)
+        fecha: Momento de la interacción; al restar, el de su creación
+        signo: 1 al crear la interacción, -1 al eliminarla
+    """
+    try:
+        db.rpc("sumar_relevancia", {
+            "p_id_publicacion": id_publicacion,
+            "p_log_peso": log_evento(peso, fecha),
+            "p_signo": signo,
+        }).execute()
+    except Exception as e:
+        logger.error(f"❌ Error al actualizar la relevancia de {id_publicacion}: {e}")
@@ -0,0 +1,284 @@
+"""
+Sincronización delta para la app móvil (/sync)
+
+Al volver al primer plano la app pedía completas las notificaciones, las
+solicitudes de amistad, los amigos y mis rutas. Ahora manda un cursor por
+colección y recibe solo lo que cambió.
+
+Los triggers de sincronizacion.sql escriben en cambio_sincronizacion una
+fila por usuario afectado y entidad modificada, con el ID de la transacción
+que la escribió. Los cursores nunca pasan de cursor_confirmado() (todas las
+transacciones por debajo ya terminaron), así una escritura que se confirma
+tarde no queda detrás de un cursor ya entregado.
+Para cada fuente se leen las filas posteriores al cursor, se carga el estado
+actual de esas entidades y lo que ya no pertenece a la colección (borrado,
+rechazado, solicitud que pasó a amistad) se devuelve en `eliminados`.
+
+Varias colecciones comparten una fuente: un cambio en relacionusuario puede
+sacar una solicitud de `solicitudes_recibidas` y ponerla en `amigos`.
+Con cursor 0 la colección se devuelve completa (`completa: True`).
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from app.utils.proyecciones import columnas
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+# Límite de notificaciones de una sincronización completa (igual que GET /notificaciones)
+NOTIFICACIONES_COMPLETAS = 50
+
+
+def formato_amigo(relacion: dict, amigo: dict) -> dict:
+    """
+    Amigo como lo devuelve GET /amigos/lista
+
+    Args:
+        relacion: Fila de relacionusuario aceptada
+        amigo: Usuario del otro lado de la relación
+
+    Returns:
+        Diccionario del amigo
+    """
+    return {
+        "id_relacion": relacion["id_relacion_usuario"],
+        "id_user": amigo["id_user"],
+        "nombre": amigo["nombre"],
+        "apellido": amigo.get("apellido", ""),
+        "correo": amigo.get("correo", ""),
+        "rol": amigo.get("rol", ""),
+        "foto_perfil": amigo.get("foto_perfil"),
+        "fecha_amistad": relacion.get("fecha_respuesta"),
+    }
+
+
+def _notificaciones(db: "Client", id_user: str, ids: Optional[List[str]]) -> Dict[str, Dict[str, dict]]:
+    query = db.table("notificacion").select("*").eq("id_user", id_user)
+    if ids is None:
+        query = query.order("fecha_envio", desc=True).limit(NOTIFICACIONES_COMPLETAS)
+    else:
+        query = query.in_("id_notificacion", ids)
+    return {"notificaciones": {n["id_notificacion"]: n for n in query.execute().data}}
+
+
+def _amistades(db: "Client", id_user: str, ids: Optional[List[str]]) -> Dict[str, Dict[str, dict]]:
+    query = db.table("relacionusuario")\
+        .select("*")\
+        .eq("tipo", "amistad")\
+        .in_("estado", ["pendiente", "aceptado"])
+    if ids is None:
+        query = query.or_(f"id_usuario1.eq.{id_user},id_usuario2.eq.{id_user}")
+    else:
+        query = query.in_("id_relacion_usuario", ids)
+    relaciones = [
+        r for r in query.execute().data
+        if id_user in (r["id_usuario1"], r["id_usuario2"])
+    ]
+
+    otros = {r["id_usuario2"] if r["id_usuario1"] == id_user else r["id_usuario1"] for r in relaciones}
+    usuarios = {}
+    if otros:
+        response = db.table("usuario")\
+            .select(columnas("usuario", "resumen"))\
+            .in_("id_user", list(otros))\
+            .execute()
+        usuarios = {u["id_user"]: u for u in response.data}
+
+    resultado = {"solicitudes_recibidas": {}, "solicitudes_enviadas": {}, "amigos": {}}
+    for rel in relaciones:
+        enviada = rel["id_usuario1"] == id_user
+        otro = usuarios.get(rel["id_usuario2"] if enviada else rel["id_usuario1"])
+        if not otro:
+            continue
+        clave = rel["id_relacion_usuario"]
+        if rel["estado"] == "aceptado":
+            resultado["amigos"][clave] = formato_amigo(rel, otro)
+        elif enviada:
+            resultado["solicitudes_enviadas"][clave] = {**rel, "usuario2": otro}
+        else:
+            resultado["solicitudes_recibidas"][clave] = {**rel, "usuario1": otro}
+    return resultado
+
+
+def rutas_de_conductor(db: "Client", id_user: str, ids: Optional[List[str]] = None) -> List[dict]:
+    """
+    Rutas de un conductor como las devuelve GET /rutas-carpooling/mis-rutas
+
+    Args:
+        db: Cliente de Supabase
+        id_user: ID del conductor
+        ids: Solo estas rutas (None: todas)
+
+    Returns:
+        Rutas con pasajeros_aceptados y lugares_disponibles
+    """
+    query = db.table("ruta")\
+        .select("*, usuario:usuario(nombre, apellido, foto_perfil)")\
+        .eq("id_user", id_user)
+    if ids is not None:
+        query = query.in_("id_ruta", ids)
+    rutas = query.execute().data
+
+    # Pasajeros aceptados de todas las rutas en una consulta
+    aceptados = {}
+    if rutas:
+        response = db.table("pasajeroruta")\
+            .select("id_ruta")\
+            .in_("id_ruta", [r["id_ruta"] for r in rutas])\
+            .eq("estado", "aceptado")\
+            .execute()
+        for fila in response.data:
+            aceptados[fila["id_ruta"]] = aceptados.get(fila["id_ruta"], 0) + 1
+    for ruta in rutas:
+        ruta["pasajeros_aceptados"] = aceptados.get(ruta["id_ruta"], 0)
+        ruta["lugares_disponibles"] = ruta["capacidad_ruta"] - ruta["pasajeros_aceptados"]
+    return rutas
+
+
+def _rutas_conductor(db: "Client", id_user: str, ids: Optional[List[str]]) -> Dict[str, Dict[str, dict]]:
+    return {"rutas_conductor": {r["id_ruta"]: r for r in rutas_de_conductor(db, id_user, ids)}}
+
+
+def _rutas_pasajero(db: "Client", id_user: str, ids: Optional[List[str]]) -> Dict[str, Dict[str, dict]]:
+    query = db.table("pasajeroruta")\
+        .select("*, ruta:ruta(*), usuario:usuario(nombre, apellido, foto_perfil)")\
+        .eq("id_user", id_user)
+    if ids is not None:
+        query = query.in_("id_pasajero_ruta", ids)
+    return {"rutas_pasajero": {p["id_pasajero_ruta"]: p for p in query.execute().data}}
+
+
+# Fuente del registro de cambios -> (colecciones que alimenta, cargador)
+# El cargador recibe los IDs cambiados (None = todo) y devuelve, por
+# colección, las entidades que hoy pertenecen a ella
+FUENTES = {
+    "notificaciones": (("notificaciones",), _notificaciones),
+    "amistades": (("solicitudes_recibidas", "solicitudes_enviadas", "amigos"), _amistades),
+    "rutas_conductor": (("rutas_conductor",), _rutas_conductor),
+    "rutas_pasajero": (("rutas_pasajero",), _rutas_pasajero),
+}
+
+FUENTE_DE = {coleccion: fuente for fuente, (colecciones, _) in FUENTES.items() for coleccion in colecciones}
+COLECCIONES = tuple(FUENTE_DE)
+
+
+def cursor_actual(db: "Client") -> int:
+    """
+    Cursor hasta el que todas las transacciones terminaron
+
+    Es global (no depende del usuario) y nunca es 0, así un usuario sin
+    cambios registrados no vuelve a pedir sus colecciones completas.
+
+    Args:
+        db: Cliente de base de datos
+
+    Returns:
+        ID de transacción más alto por debajo de la más vieja en curso
+    """
+    return db.rpc("cursor_confirmado", {}).execute().data
+
+
+def leer_cambios(
+    db: "Client",
+    id_user: str,
+    desde: Dict[str, int],
+    limite: int
+) -> Tuple[List[dict], int, bool]:
+    """
+    Filas del registro posteriores al cursor de cada fuente, en una consulta
+
+    Args:
+        db: Cliente de base de datos
+        id_user: Usuario
+        desde: fuente -> cursor
+        limite: Máximo de filas (una transacción más grande se entrega entera)
+
+    Returns:
+        (filas en orden de transacción, cursor hasta el que se leyó todo,
+        hay más filas)
+    """
+    tope = cursor_actual(db)
+    filtro = ",".join(
+        f"and(fuente.eq.{fuente},id_transaccion.gt.{cursor})" for fuente, cursor in desde.items()
+    )
+
+    def consulta():
+        return db.table("cambio_sincronizacion")\
+            .select("version, id_transaccion, fuente, id_entidad")\
+            .eq("id_user", id_user)\
+            .or_(filtro)\
+            .order("id_transaccion")\
+            .order("version")
+
+    filas = consulta().lte("id_transaccion", tope).limit(limite).execute().data
+    if len(filas) < limite:
+        return filas, tope, False
+
+    # Cortar entre transacciones: la última puede haber quedado a medias
+    ultima = filas[-1]["id_transaccion"]
+    completas = [f for f in filas if f["id_transaccion"] < ultima]
+    if completas:
+        return completas, ultima - 1, True
+    return consulta().eq("id_transaccion", ultima).execute().data, ultima, True
+
+
+def sincronizar(db: "Client", id_user: str, cursores: Dict[str, int], limite: int) -> dict:
+    """
+    Cambios de cada colección pedida desde su cursor
+
+    Args:
+        db: Cliente de base de datos
+        id_user: Usuario
+        cursores: colección -> cursor (0 = devolverla completa)
+        limite: Máximo de filas del registro por pedido
+
+    Returns:
+        {colección: {"cambios", "eliminados", "cursor", "completa"}, "hay_mas"}
+    """
+    completas = [c for c, cursor in cursores.items() if cursor == 0]
+    parciales = {c: cursor for c, cursor in cursores.items() if cursor > 0}
+    resultado = {}
+
+    if completas:
+        # Se lee antes que los datos: lo que cambie mientras tanto llega en el próximo pedido
+        tope = cursor_actual(db)
+        for fuente in dict.fromkeys(FUENTE_DE[c] for c in completas):
+            cargadas = FUENTES[fuente][1](db, id_user, None)
+            for coleccion in completas:
+                if FUENTE_DE[coleccion] == fuente:
+                    resultado[coleccion] = {
+                        "cambios": list(cargadas[coleccion].values()),
+                        "eliminados": [],
+                        "cursor": tope,
+                        "completa": True,
+                    }
+
+    hay_mas = False
+    if parciales:
+        desde = {}
+        for coleccion, cursor in parciales.items():
+            fuente = FUENTE_DE[coleccion]
+            desde[fuente] = min(cursor, desde.get(fuente, cursor))
+        filas, hasta, hay_mas = leer_cambios(db, id_user, desde, limite)
+
+        for fuente in desde:
+            propias = [f for f in filas if f["fuente"] == fuente]
+            ids = list(dict.fromkeys(f["id_entidad"] for f in propias))
+            cargadas = FUENTES[fuente][1](db, id_user, ids) if ids else {}
+            for coleccion, cursor in parciales.items():
+                if FUENTE_DE[coleccion] != fuente:
+                    continue
+                nuevas = [f for f in propias if f["id_transaccion"] > cursor]
+                cambiadas = list(dict.fromkeys(f["id_entidad"] for f in nuevas))
+                actuales = cargadas.get(coleccion, {})
+                resultado[coleccion] = {
+                    "cambios": [actuales[i] for i in cambiadas if i in actuales],
+                    "eliminados": [i for i in cambiadas if i not in actuales],
+                    # Todas las fuentes quedan leídas hasta el mismo punto
+                    "cursor": max(cursor, hasta),
+                    "completa": False,
+                }
+
+    resultado["hay_mas"] = hay_mas
+    return resultado
@@ -0,0 +1,178 @@
+"""
+Sincronización incremental de mensajes
+
+Cada mensaje tiene una `version` (secuencia global) que se renueva al
+editarlo, y cada borrado deja una lápida en mensaje_eliminado con su propia
+versión (ver sincronizacion_mensajes.sql). El cliente guarda el `cursor` de
+la última respuesta y en el siguiente sondeo pide solo lo que cambió
+después: mensajes nuevos o editados y los IDs de los borrados. Una
+conversación sin cambios responde listas vacías.
+
+El cursor es un ID de transacción (`id_transaccion`) y nunca pasa de
+cursor_confirmado(): las versiones se confirman en cualquier orden, pero
+todas las transacciones por debajo de ese tope ya terminaron, así que lo
+que se confirme después siempre queda por encima del cursor entregado.
+
+Sin cursor se devuelve la última página, y con `alrededor` la ventana de
+mensajes que rodea a uno (saltar a un mensaje). Ambas incluyen el cursor
+desde el que seguir sincronizando.
+"""
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+
+COLUMNAS_MENSAJE = "*, usuario:usuario(nombre, apellido, foto_perfil)"
+COLUMNAS_LAPIDA = "id_mensaje, version, id_transaccion"
+
+
+def cursor_actual(db: "Client") -> int:
+    """
+    Cursor hasta el que todas las transacciones terminaron
+
+    Se lee antes que la página, así lo que cambie mientras tanto llega en la
+    próxima sincronización.
+
+    Args:
+        db: Cliente de base de datos
+
+    Returns:
+        ID de transacción más alto por debajo de la más vieja en curso
+    """
+    return db.rpc("cursor_confirmado", {}).execute().data
+
+
+def _posteriores(
+    db: "Client",
+    tabla: str,
+    columnas: str,
+    id_conversacion: str,
+    desde: int,
+    tope: int,
+    limite: Optional[int]
+) -> List[dict]:
+    """Filas de la conversación con desde < id_transaccion <= tope, en orden"""
+    query = db.table(tabla)\
+        .select(columnas)\
+        .eq("id_conversacion", id_conversacion)\
+        .gt("id_transaccion", desde)\
+        .lte("id_transaccion", tope)\
+        .order("id_transaccion")\
+        .order("version")
+    if limite is not None:
+        query = query.limit(limite)
+    return query.execute().data
+
+
+def cambios(db: "Client", id_conversacion: str, desde: int, limite: int) -> dict:
+    """
+    Mensajes creados o editados y mensajes borrados después del cursor
+
+    Args:
+        db: Cliente de base de datos
+        id_conversacion: Conversación
+        desde: Cursor de la sincronización anterior
+        limite: Máximo de mensajes y de lápidas por respuesta
+
+    Returns:
+        {"mensajes", "eliminados", "cursor", "hay_mas"}; si hay_mas es True
+        el cliente vuelve a pedir con el cursor devuelto
+    """
+    tope = cursor_actual(db)
+    mensajes = _posteriores(db, "mensaje", COLUMNAS_MENSAJE, id_conversacion, desde, tope, limite)
+    lapidas = _posteriores(db, "mensaje_eliminado", COLUMNAS_LAPIDA, id_conversacion, desde, tope, limite)
+
+    # Si alguna de las dos listas se cortó, solo se entregan las transacciones
+    # que llegaron completas en ambas; el resto viene en el pedido siguiente
+    topes = [filas[-1]["id_transaccion"] for filas in (mensajes, lapidas) if len(filas) == limite]
+    hasta = min(topes) if topes else None
+    if hasta is not None:
+        mensajes = [m for m in mensajes if m["id_transaccion"] < hasta]
+        lapidas = [l for l in lapidas if l["id_transaccion"] < hasta]
+        if mensajes or lapidas:
+            cursor = hasta - 1
+        else:
+            # Una sola transacción con más filas que el límite: va entera
+            mensajes = _posteriores(db, "mensaje", COLUMNAS_MENSAJE, id_conversacion, hasta - 1, hasta, None)
+            lapidas = _posteriores(db, "mensaje_eliminado", COLUMNAS_LAPIDA, id_conversacion, hasta - 1, hasta, None)
+            cursor = hasta
+    else:
+        cursor = max(desde, tope)
+
+    return {
+        "mensajes": sorted(mensajes, key=lambda m: m["fecha_envio"]),
+        "eliminados": [l["id_mensaje"] for l in lapidas],
+        "cursor": cursor,
+        "hay_mas": hasta is not None,
+    }
+
+
+def ultima_pagina(db: "Client", id_conversacion: str, limite: int) -> Tuple[List[dict], bool]:
+    """
+    Los mensajes más recientes de la conversación
+
+    Args:
+        db: Cliente de base de datos
+        id_conversacion: Conversación
+        limite: Cantidad de mensajes
+
+    Returns:
+        (mensajes en orden de envío, hay anteriores)
+    """
+    response = db.table("mensaje")\
+        .select(COLUMNAS_MENSAJE)\
+        .eq("id_conversacion", id_conversacion)\
+        .order("fecha_envio", desc=True)\
+        .limit(limite + 1)\
+        .execute()
+    filas = response.data
+    return list(reversed(filas[:limite])), len(filas) > limite
+
+
+def alrededor_de(
+    db: "Client",
+    id_conversacion: str,
+    id_mensaje: str,
+    limite: int
+) -> Optional[Tuple[List[dict], bool, bool]]:
+    """
+    Ventana de mensajes centrada en uno (para saltar a un mensaje)
+
+    Args:
+        db: Cliente de base de datos
+        id_conversacion: Conversación
+        id_mensaje: Mensaje al que se salta
+        limite: Tamaño total de la ventana
+
+    Returns:
+        (mensajes en orden de envío, hay anteriores, hay posteriores), o None
+        si el mensaje no existe en esa conversación
+    """
+    centro = db.table("mensaje")\
+        .select(COLUMNAS_MENSAJE)\
+        .eq("id_mensaje", id_mensaje)\
+        .eq("id_conversacion", id_conversacion)\
+        .execute().data
+    if not centro:
+        return None
+    fecha = centro[0]["fecha_envio"]
+    mitad = (limite - 1) // 2
+
+    anteriores = db.table("mensaje")\
+        .select(COLUMNAS_MENSAJE)\
+        .eq("id_conversacion", id_conversacion)\
+        .lt("fecha_envio", fecha)\
+        .order("fecha_envio", desc=True)\
+        .limit(mitad + 1)\
+        .execute().data
+    posteriores = db.table("mensaje")\
+        .select(COLUMNAS_MENSAJE)\
+        .eq("id_conversacion", id_conversacion)\
+        .gt("fecha_envio", fecha)\
+        .order("fecha_envio")\
+        .limit(limite - 1 - mitad + 1)\
+        .execute().data
+
+    mensajes = list(reversed(anteriores[:mitad])) + centro + posteriores[:limite - 1 - mitad]
+    return mensajes, len(anteriores) > mitad, len(posteriores) > limite - 1 - mitad
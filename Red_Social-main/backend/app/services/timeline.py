@@ -0,0 +1,367 @@
+"""
+Timeline personalizado: publicaciones propias, de amigos y del grupo
+
+Se precalcula por usuario en la tabla `timeline` (ver crear_timeline.sql)
+como una lista de IDs de publicación ordenada por fecha:
+- Al crear una publicación se copia una fila a cada usuario de la audiencia
+  del autor (él mismo, sus amigos aceptados y los compañeros de su grupo),
+  en lotes (fan-out on write).
+- Al aceptar una amistad se copian las publicaciones recientes de cada uno al
+  timeline del otro; al eliminarla se quitan, salvo que sigan siendo
+  compañeros de grupo.
+- La primera vez que un worker lee un timeline con menos de una página (un
+  usuario nuevo, o anterior a la tabla) lo rellena desde las publicaciones
+  recientes de su círculo.
+
+Docentes y administradores pueden tener miles de seguidores, así que sus
+publicaciones no se copian: al leer se mezclan (pull) las de los docentes que
+el usuario tiene como amigos o que dictan materias en su grupo.
+
+Además del orden cronológico, `leer_timeline(..., orden="relevante")` ordena
+por `puntaje`: la relevancia de la publicación (interacciones con decaimiento,
+mantenida por app/services/relevancia.py al comentar o reaccionar) más la
+afinidad del lector con el autor, guardada en cada fila al copiarla.
+
+La tabla se mantiene acotada a TIMELINE_MAX_POSTS por usuario con
+recortar_timelines.py; las lecturas nunca pasan de ese tamaño.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+import logging
+import threading
+import time
+
+from app.config import settings
+from app.services.relevancia import log_afinidad, relevancia_inicial
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Autores cuyas publicaciones se mezclan al leer en lugar de copiarse
+ROLES_CELEBRIDAD = ("docente", "administrador")
+
+# Filas por upsert al distribuir una publicación
+TAMANO_LOTE = 500
+
+ORDENES = ("reciente", "relevante")
+
+
+class CacheCirculos:
+    """
+    Caché por usuario de su círculo: (autores que se copian, autores que se mezclan),
+    cada uno con la afinidad del usuario con ese autor
+
+    Cada worker tiene la suya; se invalida desde las rutas de amigos y vence
+    a los TIMELINE_CIRCULO_TTL_SECONDS para recoger cambios de otros workers
+    (por ejemplo un estudiante que cambió de grupo).
+    """
+
+    def __init__(self, ttl_segundos: int, max_usuarios: int = 5000):
+        self.ttl_segundos = ttl_segundos
+        self.max_usuarios = max_usuarios
+        self._datos: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, id_user: str) -> Optional[Tuple[Dict[str, float], Dict[str, float]]]:
+        with self._lock:
+            entrada = self._datos.get(id_user)
+            if entrada and entrada[0] > time.monotonic():
+                self._datos.move_to_end(id_user)
+                return entrada[1]
+        return None
+
+    def guardar(self, id_user: str, circulo: Tuple[Dict[str, float], Dict[str, float]]) -> None:
+        with self._lock:
+            self._datos[id_user] = (time.monotonic() + self.ttl_segundos, circulo)
+            self._datos.move_to_end(id_user)
+            while len(self._datos) > self.max_usuarios:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, *ids: str) -> None:
+        with self._lock:
+            for id_user in ids:
+                self._datos.pop(id_user, None)
+
+
+circulos_cache = CacheCirculos(settings.TIMELINE_CIRCULO_TTL_SECONDS)
+
+# Usuarios cuyo timeline ya se rellenó en este worker
+_rellenados: "OrderedDict[str, bool]" = OrderedDict()
+
+
+def _amigos(db: "Client", id_user: str) -> Set[str]:
+    relaciones = db.table("relacionusuario")\
+        .select("id_usuario1, id_usuario2")\
+        .or_(f"id_usuario1.eq.{id_user},id_usuario2.eq.{id_user}")\
+        .eq("estado", "aceptado")\
+        .eq("tipo", "amistad")\
+        .execute()
+    return {
+        rel["id_usuario2"] if rel["id_usuario1"] == id_user else rel["id_usuario1"]
+        for rel in relaciones.data
+    }
+
+
+def _grupo(db: "Client", id_user: str) -> Tuple[Optional[str], Set[str]]:
+    """Grupo del estudiante y los usuarios de sus compañeros"""
+    estudiante = db.table("estudiante").select("id_grupo").eq("id_user", id_user).execute()
+    if not estudiante.data or not estudiante.data[0].get("id_grupo"):
+        return None, set()
+    id_grupo = estudiante.data[0]["id_grupo"]
+    companeros = db.table("estudiante").select("id_user").eq("id_grupo", id_grupo).execute()
+    return id_grupo, {fila["id_user"] for fila in companeros.data}
+
+
+def _docentes_del_grupo(db: "Client", id_grupo: str) -> Set[str]:
+    response = db.table("grupomateria")\
+        .select("materia(docente:id_doc(id_user))")\
+        .eq("id_grupo", id_grupo)\
+        .execute()
+    docentes = set()
+    for fila in response.data:
+        docente = (fila.get("materia") or {}).get("docente") or {}
+        if docente.get("id_user"):
+            docentes.add(docente["id_user"])
+    return docentes
+
+
+def circulo(db: "Client", id_user: str) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """
+    Autores que el usuario ve en su timeline
+
+    Args:
+        db: Cliente de base de datos
+        id_user: ID del usuario
+
+    Returns:
+        Tupla (autores cuyas publicaciones se copian, autores que se mezclan al leer),
+        cada una como diccionario autor -> afinidad en escala logarítmica.
+        El primero es también la audiencia del usuario cuando publica (las
+        relaciones son simétricas, así que la afinidad vale en ambos sentidos).
+        No modificar: es el valor guardado en la caché.
+    """
+    guardado = circulos_cache.obtener(id_user)
+    if guardado is not None:
+        return guardado
+
+    id_grupo, companeros = _grupo(db, id_user)
+    amigos = _amigos(db, id_user)
+    candidatos = amigos | companeros
+    candidatos.discard(id_user)
+
+    docentes = _docentes_del_grupo(db, id_grupo) if id_grupo else set()
+    celebridades = set(docentes)
+    if candidatos:
+        roles = db.table("usuario")\
+            .select("id_user, rol")\
+            .in_("id_user", list(candidatos))\
+            .in_("rol", list(ROLES_CELEBRIDAD))\
+            .execute()
+        celebridades |= {fila["id_user"] for fila in roles.data if fila["id_user"] in candidatos}
+
+    def afinidad(autor: str) -> float:
+        if autor in docentes:
+            return log_afinidad("docente")
+        return log_afinidad("amigo" if autor in amigos else "grupo")
+
+    copiados = {autor: afinidad(autor) for autor in candidatos - celebridades}
+    copiados[id_user] = log_afinidad("propio")
+    resultado = (copiados, {autor: afinidad(autor) for autor in celebridades - {id_user}})
+    circulos_cache.guardar(id_user, resultado)
+    return resultado
+
+
+def _fila(id_user: str, pub: dict, afinidad: float) -> dict:
+    relevancia = pub.get("relevancia")
+    if relevancia is None:  # Publicación anterior a crear_relevancia.sql
+        relevancia = relevancia_inicial(pub["fecha_creacion"])
+    return {
+        "id_user": id_user,
+        "id_publicacion": pub["id_publicacion"],
+        "id_autor": pub["id_user"],
+        "fecha_creacion": pub["fecha_creacion"],
+        "afinidad": afinidad,
+        "puntaje": afinidad + relevancia,
+    }
+
+
+def _insertar(db: "Client", filas: List[dict], actualizar: bool = False) -> None:
+    """Upsert en lotes; con `actualizar` se reescriben afinidad y puntaje de filas existentes"""
+    for inicio in range(0, len(filas), TAMANO_LOTE):
+        db.table("timeline")\
+            .upsert(filas[inicio:inicio + TAMANO_LOTE], ignore_duplicates=not actualizar)\
+            .execute()
+
+
+def distribuir_publicacion(db: "Client", publicacion: dict, autor: dict) -> int:
+    """
+    Copia una publicación nueva a los timelines de la audiencia del autor
+
+    Args:
+        db: Cliente de base de datos
+        publicacion: Fila de la publicación recién creada
+        autor: Usuario autor (necesita id_user y rol)
+
+    Returns:
+        Cantidad de timelines actualizados (0 si falló; corre después de
+        responder, así que el error solo se registra)
+    """
+    try:
+        if autor.get("rol") in ROLES_CELEBRIDAD:
+            # Sus seguidores la mezclan al leer; solo va a su propio timeline
+            destinatarios = {autor["id_user"]: log_afinidad("propio")}
+        else:
+            destinatarios, _ = circulo(db, autor["id_user"])
+        _insertar(db, [
+            _fila(destinatario, publicacion, afinidad)
+            for destinatario, afinidad in destinatarios.items()
+        ])
+        return len(destinatarios)
+    except Exception as e:
+        logger.error(f"❌ Error al distribuir la publicación {publicacion.get('id_publicacion')}: {e}")
+        return 0
+
+
+def _recientes(
+    db: "Client",
+    autores,
+    limite: int,
+    orden: str = "reciente",
+    cursor=None
+) -> List[dict]:
+    """Publicaciones de los autores por fecha o por relevancia, desde el cursor"""
+    if not autores:
+        return []
+    columna = "fecha_creacion" if orden == "reciente" else "relevancia"
+    query = db.table("publicacion")\
+        .select("id_publicacion, id_user, fecha_creacion, relevancia")\
+        .in_("id_user", list(autores))
+    if cursor is not None:
+        query = query.lt(columna, cursor)
+    return query.order(columna, desc=True).limit(limite).execute().data
+
+
+def _rellenar(db: "Client", id_user: str) -> None:
+    """Carga en el timeline vacío las publicaciones recientes del círculo"""
+    copiados, _ = circulo(db, id_user)
+    recientes = _recientes(db, copiados, settings.TIMELINE_MAX_POSTS)
+    _insertar(db, [_fila(id_user, pub, copiados[pub["id_user"]]) for pub in recientes])
+    _rellenados[id_user] = True
+    while len(_rellenados) > 10000:
+        _rellenados.popitem(last=False)
+
+
+def agregar_amistad(db: "Client", id_usuario1: str, id_usuario2: str) -> None:
+    """
+    Copia las publicaciones recientes de cada amigo al timeline del otro
+
+    Las que ya estaban (por ser compañeros de grupo) pasan a la afinidad de amigo.
+
+    Args:
+        db: Cliente de base de datos
+        id_usuario1: Uno de los usuarios de la amistad aceptada
+        id_usuario2: El otro usuario
+    """
+    circulos_cache.invalidar(id_usuario1, id_usuario2)
+    for lector, autor in ((id_usuario1, id_usuario2), (id_usuario2, id_usuario1)):
+        copiados, _ = circulo(db, lector)
+        if autor in copiados:
+            recientes = _recientes(db, [autor], settings.TIMELINE_MAX_POSTS)
+            _insertar(db, [_fila(lector, pub, copiados[autor]) for pub in recientes], actualizar=True)
+
+
+def quitar_amistad(db: "Client", id_usuario1: str, id_usuario2: str) -> None:
+    """
+    Quita del timeline de cada uno las publicaciones del otro
+
+    Se conservan si siguen siendo compañeros de grupo.
+
+    Args:
+        db: Cliente de base de datos
+        id_usuario1: Uno de los usuarios de la amistad eliminada
+        id_usuario2: El otro usuario
+    """
+    circulos_cache.invalidar(id_usuario1, id_usuario2)
+    for lector, autor in ((id_usuario1, id_usuario2), (id_usuario2, id_usuario1)):
+        copiados, _ = circulo(db, lector)
+        if autor not in copiados:
+            db.table("timeline")\
+                .delete()\
+                .eq("id_user", lector)\
+                .eq("id_autor", autor)\
+                .execute()
+
+
+def leer_timeline(
+    db: "Client",
+    id_user: str,
+    antes: Optional[datetime] = None,
+    limite: int = 20,
+    orden: str = "reciente",
+    bajo_puntaje: Optional[float] = None
+) -> List[Tuple[str, object]]:
+    """
+    Página del timeline: filas precalculadas mezcladas con las de docentes
+
+    Args:
+        db: Cliente de base de datos
+        id_user: ID del lector
+        antes: Cursor del orden "reciente"; solo publicaciones anteriores a esta fecha
+        limite: Máximo de publicaciones
+        orden: "reciente" (por fecha) o "relevante" (por puntaje)
+        bajo_puntaje: Cursor del orden "relevante"; solo puntajes menores a este
+
+    Returns:
+        Lista de (id_publicacion, fecha_creacion) de la más nueva a la más vieja,
+        o de (id_publicacion, puntaje) de mayor a menor puntaje
+
+    Raises:
+        ValueError: Si el orden no es uno de ORDENES
+    """
+    if orden not in ORDENES:
+        raise ValueError(f"Orden de timeline desconocido: '{orden}'")
+    if orden == "reciente":
+        columna, cursor = "fecha_creacion", antes.isoformat() if antes else None
+    else:
+        columna, cursor = "puntaje", bajo_puntaje
+
+    def precalculadas():
+        query = db.table("timeline")\
+            .select(f"id_publicacion, {columna}")\
+            .eq("id_user", id_user)
+        if cursor is not None:
+            query = query.lt(columna, cursor)
+        return query.order(columna, desc=True).limit(limite).execute().data
+
+    filas = precalculadas()
+    # Timeline nuevo o incompleto (usuarios anteriores a la tabla): rellenar una vez
+    if len(filas) < limite and cursor is None and id_user not in _rellenados:
+        _rellenar(db, id_user)
+        filas = precalculadas()
+
+    _, celebridades = circulo(db, id_user)
+    if orden == "reciente":
+        filas += _recientes(db, celebridades, limite, orden, cursor)
+    else:
+        # El puntaje de un docente es relevancia + afinidad: una consulta por
+        # cada afinidad distinta para poder aplicar el cursor en la BD
+        por_afinidad: Dict[float, List[str]] = {}
+        for autor, afinidad in celebridades.items():
+            por_afinidad.setdefault(afinidad, []).append(autor)
+        for afinidad, autores in por_afinidad.items():
+            limite_relevancia = cursor - afinidad if cursor is not None else None
+            for pub in _recientes(db, autores, limite, orden, limite_relevancia):
+                relevancia = pub.get("relevancia")
+                if relevancia is None:
+                    relevancia = relevancia_inicial(pub["fecha_creacion"])
+                filas.append({"id_publicacion": pub["id_publicacion"], "puntaje": afinidad + relevancia})
+
+    vistas, pagina = set(), []
+    for fila in sorted(filas, key=lambda f: f[columna] if f[columna] is not None else float("-inf"), reverse=True):
+        if fila["id_publicacion"] not in vistas:
+            vistas.add(fila["id_publicacion"])
+            pagina.append((fila["id_publicacion"], fila[columna]))
+    return pagina[:limite]
@@ -0,0 +1,344 @@
+"""
+Control de admisión y descarte de carga cuando la base de datos se satura
+
+Cada clase de ruta tiene un máximo de peticiones en curso, una cola acotada y
+un tiempo máximo de espera en la cola. Si la cola está llena o se vence la
+espera se responde 503 de inmediato en lugar de dejar que la petición ocupe el
+worker hasta el timeout. Las clases de baja prioridad (búsquedas, listados,
+contadores de no leídos) tienen colas chicas y esperas cortas, así que son las
+primeras en descartarse; login y envío de mensajes tienen margen amplio.
+
+Las rutas llaman al cliente síncrono de Supabase dentro de funciones async,
+por lo que una consulta lenta bloquea el event loop del worker y las
+peticiones se acumulan antes de llegar a cualquier middleware. Para detectar
+esa situación un monitor mide el retraso del loop (cuánto tarda en despertar
+un sleep corto): si supera ADMISSION_LAG_SHED_MS se descarta la prioridad
+baja sin tocar la BD, y si supera cuatro veces ese valor también la normal.
+
+/batch ocupa lugar en su propia clase ("lote") y además cada sub-petición
+pide el suyo en la clase de su ruta (ver app/utils/lotes.py), así un lote de
+búsquedas se descarta igual que las búsquedas sueltas. La clase propia evita
+que un lote espere lugar en la misma clase que ya ocupa.
+"""
+from collections import deque
+from typing import Dict, Optional, Tuple
+import asyncio
+import json
+import time
+
+from app.config import settings
+
+# (método o None para cualquiera, prefijo sin API_V1_STR, solo ruta exacta, clase)
+# Gana la primera regla que coincide
+REGLAS_ADMISION = (
+    (None, "/auth", False, "auth"),
+    (None, "/batch", True, "lote"),
+    (None, "/notificaciones/no-leidas", False, "baja"),
+    (None, "/mensajes/no-leidos", False, "baja"),
+    (None, "/mensajes", False, "mensajeria"),
+    (None, "/notificaciones", False, "mensajeria"),
+    (None, "/amigos/buscar", False, "baja"),
+    (None, "/usuarios/search", False, "baja"),
+    (None, "/busqueda", False, "baja"),
+    (None, "/publicaciones", False, "feed"),
+    (None, "/comentarios", False, "feed"),
+    (None, "/reacciones", False, "feed"),
+    (None, "/upload", False, "feed"),
+    ("GET", "/usuarios", True, "baja"),
+    ("GET", "/estudiantes", True, "baja"),
+    ("GET", "/docentes", True, "baja"),
+    ("GET", "/materias", True, "baja"),
+    ("GET", "/grupos", True, "baja"),
+    ("GET", "/notas", True, "baja"),
+    ("GET", "/rutas-carpooling", True, "baja"),
+)
+METODOS_ESCRITURA = ("POST", "PUT", "PATCH", "DELETE")
+PREFIJOS_ADMIN = ("/materias", "/notas", "/horarios", "/grupos", "/docentes", "/estudiantes")
+CLASE_POR_DEFECTO = "general"
+
+# 0 = nunca se descarta por retraso del loop, 1 = normal, 2 = baja
+PRIORIDADES = {"auth": 0, "mensajeria": 0, "admin": 1, "feed": 1, "general": 1, "lote": 1, "baja": 2}
+
+INTERVALO_MONITOR = 0.05
+DECAIMIENTO_RETRASO = 0.8
+
+
+def clase_de_peticion(metodo: str, path: str) -> Optional[str]:
+    """
+    Clase de admisión de una petición
+
+    Args:
+        metodo: Método HTTP
+        path: Ruta de la petición
+
+    Returns:
+        Nombre de la clase; None si la ruta no está bajo la API
+    """
+    if not path.startswith(settings.API_V1_STR):
+        return None
+    resto = path[len(settings.API_V1_STR):].rstrip("/")
+    for metodo_regla, prefijo, exacto, clase in REGLAS_ADMISION:
+        if metodo_regla and metodo_regla != metodo:
+            continue
+        if resto == prefijo or (not exacto and resto.startswith(prefijo + "/")):
+            return clase
+    if metodo in METODOS_ESCRITURA and resto.startswith(PREFIJOS_ADMIN):
+        return "admin"
+    return CLASE_POR_DEFECTO
+
+
+class ClaseAdmision:
+    """
+    Límite de concurrencia con cola FIFO acotada y espera máxima
+
+    Se usa solo desde el event loop del worker, sin locks.
+    """
+
+    def __init__(self, nombre: str, concurrencia: int, cola: int, espera: float):
+        """
+        Args:
+            nombre: Nombre de la clase
+            concurrencia: Máximo de peticiones en curso
+            cola: Máximo de peticiones esperando turno
+            espera: Segundos máximos de espera en la cola
+        """
+        self.nombre = nombre
+        self.prioridad = PRIORIDADES.get(nombre, 1)
+        self.concurrencia = concurrencia
+        self.cola = cola
+        self.espera = espera
+        self.en_curso = 0
+        self._esperando: deque = deque()
+        self.estadisticas = {"admitidas": 0, "encoladas": 0, "cola_llena": 0, "vencidas": 0, "por_retraso": 0}
+
+    async def entrar(self) -> Optional[str]:
+        """
+        Espera turno para atender la petición
+
+        Returns:
+            None si se admitió (hay que llamar a salir() al terminar); si no,
+            el motivo del rechazo ("cola_llena" o "vencidas")
+        """
+        if self.en_curso < self.concurrencia and not self._esperando:
+            self.en_curso += 1
+            self.estadisticas["admitidas"] += 1
+            return None
+        if len(self._esperando) >= self.cola:
+            self.estadisticas["cola_llena"] += 1
+            return "cola_llena"
+
+        turno = asyncio.get_running_loop().create_future()
+        self._esperando.append(turno)
+        self.estadisticas["encoladas"] += 1
+        try:
+            await asyncio.wait_for(turno, self.espera)
+        except asyncio.TimeoutError:
+            self._quitar(turno)
+            self.estadisticas["vencidas"] += 1
+            return "vencidas"
+        except BaseException:
+            # Cliente desconectado: devolver el turno si ya se lo habían pasado
+            self._quitar(turno)
+            if turno.done() and not turno.cancelled():
+                self.salir()
+            raise
+        self.estadisticas["admitidas"] += 1
+        return None
+
+    def salir(self) -> None:
+        """Libera el lugar, pasándolo al siguiente de la cola si hay uno esperando"""
+        while self._esperando:
+            turno = self._esperando.popleft()
+            if not turno.done():
+                turno.set_result(None)
+                return
+        self.en_curso -= 1
+
+    def _quitar(self, turno) -> None:
+        try:
+            self._esperando.remove(turno)
+        except ValueError:
+            pass
+
+    def estado(self) -> Dict[str, int]:
+        return {"en_curso": self.en_curso, "esperando": len(self._esperando), **self.estadisticas}
+
+
+def parsear_clases(texto: str) -> Dict[str, ClaseAdmision]:
+    """
+    Lee la configuración de admisión
+
+    Args:
+        texto: "clase=concurrencia/cola/espera_ms,..." (por ejemplo "baja=8/8/300")
+
+    Returns:
+        Diccionario clase -> ClaseAdmision
+
+    Raises:
+        ValueError: Si alguna entrada está mal formada
+    """
+    clases = {}
+    for entrada in texto.split(","):
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+        try:
+            nombre, valor = entrada.split("=")
+            concurrencia, cola, espera_ms = (int(v) for v in valor.split("/"))
+        except ValueError:
+            raise ValueError(f"Clase mal formada en ADMISSION_LIMITS: '{entrada}'")
+        if concurrencia < 1 or cola < 0 or espera_ms < 0:
+            raise ValueError(f"Clase inválida en ADMISSION_LIMITS: '{entrada}'")
+        nombre = nombre.strip()
+        clases[nombre] = ClaseAdmision(nombre, concurrencia, cola, espera_ms / 1000)
+    return clases
+
+
+class MonitorRetraso:
+    """
+    Mide cuánto se atrasa el event loop respecto de un sleep de INTERVALO_MONITOR
+
+    El valor decae de a poco para que un bloqueo largo siga contando durante
+    algunos ciclos y no se alterne entre admitir y descartar en cada petición.
+    """
+
+    def __init__(self):
+        self.retraso = 0.0
+        self._ultimo = time.monotonic()
+        self._tarea: Optional[asyncio.Task] = None
+        self._loop = None
+
+    def asegurar(self) -> None:
+        """Arranca la tarea de medición en el loop actual si no está corriendo"""
+        loop = asyncio.get_running_loop()
+        if self._tarea is None or self._tarea.done() or self._loop is not loop:
+            self._loop = loop
+            self._ultimo = time.monotonic()
+            self._tarea = loop.create_task(self._medir())
+
+    async def _medir(self) -> None:
+        while True:
+            await asyncio.sleep(INTERVALO_MONITOR)
+            ahora = time.monotonic()
+            medido = max(0.0, ahora - self._ultimo - INTERVALO_MONITOR)
+            self.retraso = max(medido, self.retraso * DECAIMIENTO_RETRASO)
+            self._ultimo = ahora
+
+    def actual(self) -> float:
+        """Retraso en segundos, contando un tick que todavía no llegó"""
+        atrasado = time.monotonic() - self._ultimo - INTERVALO_MONITOR
+        return max(self.retraso, atrasado)
+
+
+# Último middleware creado (Starlette lo instancia al armar la pila)
+_control_actual: Optional["ControlAdmision"] = None
+
+
+def detalle_rechazo(clase: ClaseAdmision, motivo: str) -> dict:
+    """Cuerpo de la respuesta 503"""
+    return {
+        "detail": "El servidor está sobrecargado. Intenta de nuevo en unos segundos.",
+        "clase": clase.nombre,
+        "motivo": motivo
+    }
+
+
+class ControlAdmision:
+    """
+    Middleware ASGI de admisión por clase de ruta
+    """
+
+    def __init__(self, app, limites: Optional[str] = None, umbral_retraso_ms: Optional[float] = None):
+        """
+        Args:
+            app: Aplicación ASGI envuelta
+            limites: Configuración "clase=concurrencia/cola/espera_ms,..."
+                (por defecto ADMISSION_LIMITS)
+            umbral_retraso_ms: Retraso del loop a partir del cual se descarta
+                la prioridad baja (por defecto ADMISSION_LAG_SHED_MS; 0 lo desactiva)
+        """
+        self.app = app
+        self.clases = parsear_clases(limites if limites is not None else settings.ADMISSION_LIMITS)
+        umbral = settings.ADMISSION_LAG_SHED_MS if umbral_retraso_ms is None else umbral_retraso_ms
+        self.umbral_retraso = umbral / 1000
+        self.monitor = MonitorRetraso()
+        global _control_actual
+        _control_actual = self
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMISSION_CONTROL_ENABLED:
+            return await self.app(scope, receive, send)
+        clase, motivo = await self.admitir(scope["method"], scope["path"])
+        if clase is None:
+            return await self.app(scope, receive, send)
+        if motivo:
+            return await self._rechazar(send, clase, motivo)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            clase.salir()
+
+    async def admitir(self, metodo: str, path: str) -> Tuple[Optional[ClaseAdmision], Optional[str]]:
+        """
+        Pide lugar para una petición en la clase de su ruta
+
+        Args:
+            metodo: Método HTTP
+            path: Ruta de la petición
+
+        Returns:
+            (clase, motivo): clase es None si la ruta no tiene control; motivo
+            es None si se admitió (hay que llamar a clase.salir() al terminar)
+        """
+        nombre = clase_de_peticion(metodo, path)
+        clase = self.clases.get(nombre) if nombre else None
+        if clase is None:
+            return None, None
+
+        if self.umbral_retraso and clase.prioridad:
+            self.monitor.asegurar()
+            retraso = self.monitor.actual()
+            if retraso > self.umbral_retraso * (4 if clase.prioridad == 1 else 1):
+                clase.estadisticas["por_retraso"] += 1
+                return clase, "por_retraso"
+        return clase, await clase.entrar()
+
+    @staticmethod
+    async def _rechazar(send, clase: ClaseAdmision, motivo: str) -> None:
+        cuerpo = json.dumps(detalle_rechazo(clase, motivo), ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"retry-after", b"2" if clase.prioridad == 2 else b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    def estado(self) -> Dict[str, dict]:
+        return {
+            "retraso_loop_ms": round(self.monitor.actual() * 1000, 1),
+            "clases": {nombre: clase.estado() for nombre, clase in self.clases.items()},
+        }
+
+
+def control_admision() -> Optional[ControlAdmision]:
+    """
+    Control de admisión de la app, para las sub-peticiones de /batch
+
+    Returns:
+        El middleware; None si está desactivado o todavía no se creó
+    """
+    return _control_actual if settings.ADMISSION_CONTROL_ENABLED else None
+
+
+def estado_admision() -> Optional[Dict[str, dict]]:
+    """
+    Estado del control de admisión de la app (colas, rechazos, retraso del loop)
+
+    Returns:
+        Estado del middleware de la app; None si todavía no se creó
+    """
+    return _control_actual.estado() if _control_actual else None
@@ -0,0 +1,90 @@
+"""
+Consultas independientes en paralelo con un plazo común
+
+El cliente de Supabase es síncrono: dos consultas que no dependen una de la
+otra, escritas una detrás de otra, suman sus latencias. `en_paralelo` las
+ejecuta a la vez en un pool de hilos propio y espera a todas, con reglas de
+concurrencia estructurada:
+
+- Devuelve cuando terminaron todas, con los resultados en el orden en que se
+  pasaron las consultas.
+- Si una falla, se cancelan las que todavía no empezaron y se relanza ese
+  error; los resultados de las que ya estaban en curso se descartan.
+- Todas comparten un plazo (QUERY_FANOUT_TIMEOUT_SECONDS por defecto). Si se
+  vence se cancela lo pendiente y se responde 504.
+
+Una consulta que ya salió hacia la BD no se puede interrumpir desde Python:
+termina en su hilo y su resultado se ignora.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+import asyncio
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_pool() -> ThreadPoolExecutor:
+    """
+    Pool de hilos de las consultas en paralelo (separado del pool por defecto
+    de asyncio, que usan /batch y el arranque)
+    """
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=settings.QUERY_FANOUT_THREADS,
+            thread_name_prefix="consultas"
+        )
+    return _pool
+
+
+async def en_paralelo(*consultas: Callable[[], Any], plazo: Optional[float] = None) -> List[Any]:
+    """
+    Ejecuta funciones bloqueantes (consultas) a la vez
+
+    Args:
+        consultas: Funciones sin argumentos, por ejemplo
+            `lambda: db.table("x").select("*").execute()`
+        plazo: Segundos para que terminen todas (por defecto
+            QUERY_FANOUT_TIMEOUT_SECONDS)
+
+    Returns:
+        Los resultados, en el mismo orden que las consultas
+
+    Raises:
+        HTTPException: 504 si se vence el plazo
+        Exception: El primer error de alguna consulta
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    tareas = [loop.run_in_executor(pool, consulta) for consulta in consultas]
+    limite = plazo if plazo is not None else settings.QUERY_FANOUT_TIMEOUT_SECONDS
+
+    try:
+        hechas, pendientes = await asyncio.wait(
+            tareas, timeout=limite, return_when=asyncio.FIRST_EXCEPTION
+        )
+    except asyncio.CancelledError:
+        # Se canceló la petición: no dejar consultas encoladas
+        for tarea in tareas:
+            tarea.cancel()
+        raise
+
+    errores = [tarea.exception() for tarea in tareas if tarea in hechas and tarea.exception() is not None]
+    if errores:
+        for tarea in pendientes:
+            tarea.cancel()
+        raise errores[0]
+
+    if pendientes:
+        for tarea in pendientes:
+            tarea.cancel()
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="La consulta tardó demasiado. Intenta de nuevo."
+        )
+
+    return [tarea.result() for tarea in tareas]
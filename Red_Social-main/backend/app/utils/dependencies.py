@@ -1,11 +1,12 @@
 """
 Dependencias reutilizables para FastAPI
 """
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, List
 from app.database import get_db
 from app.utils.security import verify_token
+from app.utils.proyecciones import columnas
 from supabase import Client
 
 # Esquema de seguridad Bearer
@@ -13,13 +14,18 @@ security = HTTPBearer()
 
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Client = Depends(get_db)
 ) -> dict:
     """
     Obtiene el usuario actual desde el token JWT
     
+    En las sub-peticiones de /batch el usuario ya viene resuelto en
+    request.state y no se vuelve a verificar el token ni a leer la BD.
+    
     Args:
+        request: Petición actual
         credentials: Credenciales de autorización (token)
         db: Cliente de base de datos
         
@@ -32,6 +38,11 @@ async def get_current_user(
     import logging
     logger = logging.getLogger(__name__)
     
+    # Sub-petición de un lote: autenticada por /batch
+    usuario = getattr(request.state, "usuario_lote", None)
+    if usuario is not None:
+        return usuario
+    
     # Obtener token
     token = credentials.credentials
     logger.debug(f"Token recibido (primeros 30 chars): {token[:30]}...")
@@ -66,7 +77,7 @@ async def get_current_user(
     
     # Obtener usuario de la base de datos
     try:
-        response = db.table("usuario").select("*").eq("id_user", user_id).execute()
+        response = db.table("usuario").select(columnas("usuario")).eq("id_user", user_id).execute()
         
         if not response.data or len(response.data) == 0:
             logger.warning(f"Usuario {user_id} no encontrado en BD")
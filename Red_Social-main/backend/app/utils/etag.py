@@ -0,0 +1,182 @@
+"""
+Peticiones condicionales (ETag / If-None-Match) para endpoints de catálogo
+
+Cada tabla tiene un número de versión en memoria que las rutas de escritura
+incrementan con `marcar_modificado`. Las respuestas se guardan ya serializadas
+junto con su ETag y las versiones de las tablas de las que dependen; mientras
+esas versiones no cambien, una carga repetida se responde con 304 (o con el
+cuerpo guardado) sin volver a consultar la base de datos ni armar el payload.
+
+Como cada worker tiene sus propias versiones, una respuesta guardada se
+considera vieja pasados ETAG_MAX_AGE_SECONDS aunque no haya cambiado ninguna
+versión local; así una escritura atendida por otro worker se ve como máximo
+con ese retraso. Al reconstruir, el ETag es un hash del cuerpo, de modo que si
+el contenido no cambió el cliente igual recibe 304.
+"""
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Tuple
+import hashlib
+import json
+import threading
+import time
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.config import settings
+
+CACHE_CONTROL = "private, no-cache"
+
+_versiones: Dict[str, int] = {}
+_respuestas: "OrderedDict[str, tuple]" = OrderedDict()
+_lock = threading.Lock()
+_estadisticas = {
+    "solicitudes": 0,
+    "respuestas_304": 0,
+    "desde_cache": 0,
+    "construidas": 0,
+    "bytes_enviados": 0,
+    "bytes_ahorrados": 0,
+}
+
+
+def marcar_modificado(*tablas: str) -> None:
+    """
+    Invalida las respuestas que dependen de las tablas indicadas
+
+    Args:
+        tablas: Nombres de las tablas modificadas
+    """
+    with _lock:
+        for tabla in tablas:
+            _versiones[tabla] = _versiones.get(tabla, 0) + 1
+
+
+def estadisticas_etag() -> Dict[str, int]:
+    """
+    Contadores de uso de las respuestas condicionales
+
+    Returns:
+        Copia de los contadores (bytes enviados y ahorrados, 304, etc.)
+    """
+    with _lock:
+        return dict(_estadisticas)
+
+
+@lru_cache(maxsize=None)
+def _adaptador(modelo) -> TypeAdapter:
+    return TypeAdapter(modelo)
+
+
+def _serializar(datos: Any, modelo) -> bytes:
+    if modelo is None:
+        return json.dumps(jsonable_encoder(datos), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    adaptador = _adaptador(modelo)
+    return adaptador.dump_json(adaptador.validate_python(datos))
+
+
+def _coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ValidadorRespuesta:
+    """
+    Respuesta condicional de un endpoint GET
+
+    Uso dentro de una ruta:
+
+        validador = ValidadorRespuesta(request, ("materia",), List[Materia])
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        ...  # armar los datos como siempre
+        return validador.responder(datos)
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        tablas: Sequence[str],
+        modelo=None,
+        alcance: str = ""
+    ):
+        """
+        Args:
+            request: Petición actual
+            tablas: Tablas de las que depende la respuesta
+            modelo: Modelo de respuesta (el mismo response_model de la ruta)
+            alcance: Parte extra de la clave cuando la respuesta depende del
+                usuario que la pide (por ejemplo su ID o su rol)
+        """
+        self.clave = f"{request.url.path}?{request.url.query}#{alcance}"
+        self.tablas = tuple(tablas)
+        self.modelo = modelo
+        self.if_none_match = request.headers.get("if-none-match")
+        with _lock:
+            self.versiones = self._versiones_actuales()
+
+    def _versiones_actuales(self) -> Tuple[int, ...]:
+        return tuple(_versiones.get(tabla, 0) for tabla in self.tablas)
+
+    def desde_cache(self) -> Optional[Response]:
+        """
+        Responde sin tocar la base de datos si la respuesta guardada sigue vigente
+
+        Returns:
+            Respuesta 304 o 200 con el cuerpo guardado; None si hay que reconstruirla
+        """
+        with _lock:
+            _estadisticas["solicitudes"] += 1
+            entrada = _respuestas.get(self.clave)
+            if entrada is None:
+                return None
+            versiones, creada_en, etag, cuerpo = entrada
+            if versiones != self.versiones or time.monotonic() - creada_en > settings.ETAG_MAX_AGE_SECONDS:
+                del _respuestas[self.clave]
+                return None
+            _respuestas.move_to_end(self.clave)
+        return self._respuesta(etag, cuerpo, desde_cache=True)
+
+    def responder(self, datos: Any) -> Response:
+        """
+        Serializa los datos, guarda la respuesta y responde 304 si el cliente ya la tiene
+
+        Args:
+            datos: Payload armado por la ruta
+
+        Returns:
+            Respuesta 200 con ETag o 304 sin cuerpo
+        """
+        cuerpo = _serializar(datos, self.modelo)
+        etag = f'"{hashlib.blake2b(cuerpo, digest_size=16).hexdigest()}"'
+        with _lock:
+            _estadisticas["construidas"] += 1
+            # Si hubo una escritura mientras se armaba, no guardar datos viejos
+            if self._versiones_actuales() == self.versiones:
+                _respuestas[self.clave] = (self.versiones, time.monotonic(), etag, cuerpo)
+                _respuestas.move_to_end(self.clave)
+                while len(_respuestas) > settings.ETAG_CACHE_MAX_ENTRIES:
+                    _respuestas.popitem(last=False)
+        return self._respuesta(etag, cuerpo, desde_cache=False)
+
+    def _respuesta(self, etag: str, cuerpo: bytes, desde_cache: bool) -> Response:
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if _coincide(self.if_none_match, etag):
+            with _lock:
+                _estadisticas["respuestas_304"] += 1
+                _estadisticas["bytes_ahorrados"] += len(cuerpo)
+            return Response(status_code=304, headers=headers)
+
+        with _lock:
+            if desde_cache:
+                _estadisticas["desde_cache"] += 1
+            _estadisticas["bytes_enviados"] += len(cuerpo)
+        return Response(content=cuerpo, media_type="application/json", headers=headers)
@@ -0,0 +1,177 @@
+"""
+Ejecución de lotes de peticiones dentro del proceso (/batch)
+
+La pantalla de inicio de la app hace una docena de GET al abrir. Con /batch
+los manda en una sola petición: el token se verifica y el usuario se lee una
+vez, y cada sub-petición se despacha directo al router de la aplicación (sin
+pasar otra vez por HTTP ni por los middlewares) con el usuario ya resuelto en
+`request.state` (ver get_current_user).
+
+Las rutas usan el cliente síncrono de Supabase dentro de funciones async, así
+que varias sub-peticiones en el mismo event loop correrían una detrás de
+otra. Por eso cada una se ejecuta en un hilo con su propio loop, hasta
+BATCH_CONCURRENCY a la vez, y las consultas a la BD se solapan de verdad.
+
+Cada sub-petición consume su ficha del límite de peticiones de su clase,
+como si hubiera llegado sola; si no hay fichas responde 429 sin ejecutarse.
+También ocupa lugar en la clase de admisión de su ruta: si la clase está
+saturada responde 503 sin ejecutarse.
+"""
+from typing import Any, List, Optional, Tuple
+from urllib.parse import urlsplit
+import asyncio
+import json
+import math
+
+from starlette.exceptions import HTTPException
+
+from app.config import settings
+from app.utils.admision import control_admision, detalle_rechazo
+from app.utils.rate_limit import clase_de_ruta, get_almacen, parsear_limites
+
+RUTA_LOTE = "/batch"
+
+
+def _resultado(estado: int, cuerpo: Any, id_peticion: Optional[str]) -> dict:
+    return {"id": id_peticion, "estado": estado, "cuerpo": cuerpo}
+
+
+def armar_scope(base: dict, metodo: str, ruta: str, usuario: dict, con_cuerpo: bool) -> dict:
+    """
+    Scope ASGI de una sub-petición a partir del de /batch
+
+    Args:
+        base: Scope de la petición /batch
+        metodo: Método HTTP
+        ruta: Ruta relativa a la API ("/auth/me", "/publicaciones?limit=10")
+        usuario: Usuario ya autenticado
+        con_cuerpo: Si lleva cuerpo JSON
+
+    Returns:
+        Scope para llamar al router
+    """
+    partes = urlsplit(ruta)
+    path = partes.path
+    if not path.startswith(settings.API_V1_STR + "/"):
+        path = settings.API_V1_STR + path
+    headers = [(nombre, valor) for nombre, valor in base["headers"] if nombre == b"authorization"]
+    if con_cuerpo:
+        headers.append((b"content-type", b"application/json"))
+
+    scope = {
+        clave: valor for clave, valor in base.items()
+        if clave not in ("path", "raw_path", "query_string", "headers", "method", "state", "route", "endpoint", "path_params")
+    }
+    scope.update(
+        method=metodo,
+        path=path,
+        raw_path=path.encode(),
+        query_string=partes.query.encode(),
+        headers=headers,
+        state={**base.get("state", {}), "usuario_lote": usuario},
+    )
+    return scope
+
+
+async def _llamar(router, scope: dict, cuerpo: bytes) -> Tuple[int, dict, bytes]:
+    """Llama al router y junta la respuesta completa"""
+    enviado = False
+    desconexion = asyncio.Event()
+
+    async def receive():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {"type": "http.request", "body": cuerpo, "more_body": False}
+        # Las respuestas en streaming escuchan la desconexión: no llega nunca
+        await desconexion.wait()
+        return {"type": "http.disconnect"}
+
+    estado = 500
+    headers = {}
+    partes = []
+
+    async def send(mensaje):
+        nonlocal estado, headers
+        if mensaje["type"] == "http.response.start":
+            estado = mensaje["status"]
+            headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in mensaje.get("headers", [])}
+        elif mensaje["type"] == "http.response.body":
+            partes.append(mensaje.get("body", b""))
+
+    await router(scope, receive, send)
+    return estado, headers, b"".join(partes)
+
+
+def _decodificar(headers: dict, contenido: bytes) -> Any:
+    if not contenido:
+        return None
+    if headers.get("content-type", "").startswith("application/json"):
+        return json.loads(contenido)
+    return contenido.decode("utf-8", errors="replace")
+
+
+async def _limite(clase: Optional[str], id_user: str) -> float:
+    """Consume la ficha de la sub-petición; devuelve la espera si no hay"""
+    if not settings.RATE_LIMIT_ENABLED or clase is None:
+        return 0.0
+    limite = parsear_limites(settings.RATE_LIMITS).get(clase)
+    if limite is None:
+        return 0.0
+    return await get_almacen().consumir(f"{clase}|u:{id_user}", *limite)
+
+
+async def ejecutar_lote(router, base: dict, usuario: dict, peticiones: List[dict]) -> List[dict]:
+    """
+    Ejecuta las sub-peticiones en paralelo
+
+    Args:
+        router: Router de la aplicación (request.app.router)
+        base: Scope de la petición /batch
+        usuario: Usuario autenticado
+        peticiones: [{"id", "metodo", "ruta", "cuerpo"}]
+
+    Returns:
+        Una respuesta {"id", "estado", "cuerpo"} por sub-petición, en el mismo orden
+    """
+    semaforo = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def una(peticion: dict) -> dict:
+        id_peticion = peticion.get("id")
+        metodo = peticion["metodo"]
+        con_cuerpo = peticion.get("cuerpo") is not None
+        scope = armar_scope(base, metodo, peticion["ruta"], usuario, con_cuerpo)
+        if scope["path"].rstrip("/") == settings.API_V1_STR + RUTA_LOTE:
+            return _resultado(400, {"detail": "No se puede anidar /batch"}, id_peticion)
+
+        espera = await _limite(clase_de_ruta(scope["path"]), usuario["id_user"])
+        if espera:
+            segundos = max(1, math.ceil(espera))
+            return _resultado(429, {
+                "detail": f"Demasiadas peticiones. Intenta de nuevo en {segundos} segundos.",
+                "retry_after": segundos
+            }, id_peticion)
+
+        # Lugar en la clase de admisión de la ruta, en el loop del worker
+        control = control_admision()
+        clase, motivo = await control.admitir(metodo, scope["path"]) if control else (None, None)
+        if motivo:
+            return _resultado(503, detalle_rechazo(clase, motivo), id_peticion)
+
+        cuerpo = json.dumps(peticion["cuerpo"]).encode() if con_cuerpo else b""
+        try:
+            async with semaforo:
+                estado, headers, contenido = await asyncio.to_thread(
+                    asyncio.run, _llamar(router, scope, cuerpo)
+                )
+        except HTTPException as e:
+            # Ruta inexistente o método no permitido (lo lanza el router)
+            return _resultado(e.status_code, {"detail": e.detail}, id_peticion)
+        except Exception as e:
+            return _resultado(500, {"detail": f"Error interno del servidor: {e}"}, id_peticion)
+        finally:
+            if clase is not None:
+                clase.salir()
+        return _resultado(estado, _decodificar(headers, contenido), id_peticion)
+
+    return await asyncio.gather(*(una(p) for p in peticiones))
@@ -0,0 +1,97 @@
+"""
+Proyecciones: conjuntos de columnas con nombre por entidad
+
+En lugar de `select("*")` y borrar la contraseña en Python, las consultas
+piden solo las columnas de una vista:
+
+- publico: lo que cualquier usuario autenticado puede ver de otro
+- resumen: listados y tarjetas (agrega el correo)
+- completo: todas las columnas que devuelve la API
+
+Ninguna vista incluye `usuario.contrasena`: solo el login la pide, con
+COLUMNAS_LOGIN. Los endpoints de listados aceptan además `fields=` para
+elegir un subconjunto de la vista completa.
+"""
+from typing import Dict, List, Optional, Tuple
+
+PROYECCIONES: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "usuario": {
+        "publico": ("id_user", "nombre", "apellido", "rol", "foto_perfil"),
+        "resumen": ("id_user", "nombre", "apellido", "correo", "rol", "foto_perfil"),
+        "completo": ("id_user", "nombre", "apellido", "correo", "rol", "foto_perfil", "activo", "fecha_registro"),
+    },
+    "estudiante": {
+        "publico": ("ci_est", "id_user", "carrera"),
+        "resumen": ("ci_est", "id_user", "carrera", "semestre", "id_grupo"),
+        "completo": ("ci_est", "id_user", "carrera", "semestre", "id_grupo"),
+    },
+    "docente": {
+        "publico": ("ci_doc", "id_user", "especialidad_doc"),
+        "resumen": ("ci_doc", "id_user", "especialidad_doc"),
+        "completo": ("ci_doc", "id_user", "especialidad_doc"),
+    },
+}
+
+# Columna que siempre se incluye con `fields=` (para combinar y paginar)
+CLAVES = {"usuario": "id_user", "estudiante": "ci_est", "docente": "ci_doc"}
+
+# Única consulta que trae el hash: verificar la contraseña al iniciar sesión
+COLUMNAS_LOGIN = ", ".join(PROYECCIONES["usuario"]["completo"] + ("contrasena",))
+
+
+def columnas(entidad: str, vista: str = "completo") -> str:
+    """
+    Columnas de una vista, listas para select()
+
+    Args:
+        entidad: Entidad de PROYECCIONES
+        vista: publico, resumen o completo
+
+    Returns:
+        "col1, col2, ..."
+    """
+    return ", ".join(PROYECCIONES[entidad][vista])
+
+
+def embebido(entidad: str, vista: str = "publico", alias: Optional[str] = None) -> str:
+    """
+    Relación embebida con las columnas de una vista
+
+    Args:
+        entidad: Entidad relacionada (nombre de la tabla)
+        vista: Vista de la entidad relacionada
+        alias: Nombre de la clave en la respuesta ("alias:tabla(...)")
+
+    Returns:
+        Fragmento de select(), por ejemplo "usuario(id_user, nombre, ...)"
+    """
+    prefijo = f"{alias}:" if alias else ""
+    return f"{prefijo}{entidad}({columnas(entidad, vista)})"
+
+
+def campos_pedidos(entidad: str, fields: Optional[str], vista: str = "completo") -> Optional[List[str]]:
+    """
+    Lee el parámetro `fields=` de un listado
+
+    Args:
+        entidad: Entidad de PROYECCIONES
+        fields: "col1,col2,..." o vacío para la vista completa
+        vista: Vista que limita qué columnas se pueden pedir
+
+    Returns:
+        Columnas pedidas con la clave primero, o None si no se pidió nada
+
+    Raises:
+        ValueError: Si se pide una columna que no está en la vista
+    """
+    pedidos = [campo.strip() for campo in (fields or "").split(",") if campo.strip()]
+    if not pedidos:
+        return None
+    permitidos = PROYECCIONES[entidad][vista]
+    desconocidos = [campo for campo in pedidos if campo not in permitidos]
+    if desconocidos:
+        raise ValueError(
+            f"Campos no disponibles: {', '.join(desconocidos)}. Permitidos: {', '.join(permitidos)}"
+        )
+    clave = CLAVES[entidad]
+    return [clave] + [campo for campo in dict.fromkeys(pedidos) if campo != clave]
@@ -0,0 +1,400 @@
+"""
+Límite de peticiones por usuario y clase de ruta (token bucket)
+
+Cada par (clase de ruta, usuario) tiene un balde con `capacidad` fichas que se
+rellena a `capacidad / segundos` fichas por segundo; cada petición consume una.
+Si el balde está vacío se responde 429 con Retry-After indicando cuándo habrá
+una ficha disponible. Así se permiten ráfagas cortas (abrir la app, refrescar)
+pero no un cliente que consulta /notificaciones/no-leidas en un bucle.
+
+El usuario se toma del `sub` del JWT de acceso. La firma se verifica solo la
+primera vez que se ve un token y el resultado queda en memoria, de modo que en
+las peticiones siguientes obtener el usuario es una búsqueda en un diccionario.
+Las peticiones sin token válido (registro, refresh) se limitan por IP, y
+POST /auth/login por el correo enviado junto con la IP: así los usuarios
+detrás de un mismo NAT no comparten el balde y adivinar la contraseña de una
+cuenta sigue limitado. Cada login gasta además una ficha del balde de la IP
+en la clase `login`, más holgada, que acota probar muchas cuentas distintas
+desde una misma dirección. La IP sale de X-Forwarded-For solo si la conexión
+viene de un proxy de RATE_LIMIT_TRUSTED_PROXIES (o ya la reescribió uvicorn
+con --proxy-headers y --forwarded-allow-ips); si no, cualquiera podría
+inventarse una IP por petición.
+
+Los baldes viven en un `AlmacenLimites`. El de memoria es por worker: con N
+workers de Gunicorn el límite efectivo es hasta N veces el configurado. Para
+un límite exacto entre workers se puede registrar con `configurar_almacen` una
+implementación sobre un almacén compartido (Redis, Postgres) que haga la misma
+cuenta de forma atómica del lado del servidor.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs
+import ipaddress
+import json
+import math
+import time
+
+from app.config import settings
+
+# Prefijos (sin API_V1_STR) y su clase; gana el primero que coincide
+CLASES_RUTA = (
+    ("/auth", "auth"),
+    ("/amigos/buscar", "busqueda"),
+    ("/usuarios/search", "busqueda"),
+    ("/busqueda", "busqueda"),
+    ("/notificaciones/no-leidas", "sondeo"),
+    ("/mensajes/no-leidos", "sondeo"),
+    ("/mensajes", "mensajeria"),
+    ("/upload", "subidas"),
+)
+CLASE_POR_DEFECTO = "general"
+
+# Ruta cuyo balde se separa por correo (sin API_V1_STR) y tamaño máximo del formulario que se lee
+RUTA_LOGIN = "/auth/login"
+# Clase del balde por IP que comparten todos los intentos de login desde una dirección
+CLASE_LOGIN_IP = "login"
+MAX_CUERPO_LOGIN = 4096
+
+# Tokens verificados: token -> (id_user o None si es inválido, expiración)
+MAX_TOKENS_EN_CACHE = 10000
+
+_estadisticas = {"permitidas": 0, "rechazadas": 0}
+
+
+def parsear_limites(texto: str) -> Dict[str, Tuple[float, float]]:
+    """
+    Lee la configuración de límites
+
+    Args:
+        texto: "clase=capacidad/segundos,..." (por ejemplo "sondeo=10/30")
+
+    Returns:
+        Diccionario clase -> (capacidad, fichas por segundo)
+
+    Raises:
+        ValueError: Si alguna entrada está mal formada
+    """
+    limites = {}
+    for entrada in texto.split(","):
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+        try:
+            clase, valor = entrada.split("=")
+            capacidad, segundos = valor.split("/")
+            capacidad, segundos = float(capacidad), float(segundos)
+        except ValueError:
+            raise ValueError(f"Límite mal formado en RATE_LIMITS: '{entrada}'")
+        if capacidad < 1 or segundos <= 0:
+            raise ValueError(f"Límite inválido en RATE_LIMITS: '{entrada}'")
+        limites[clase.strip()] = (capacidad, capacidad / segundos)
+    return limites
+
+
+def parsear_proxies(texto: str) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    """
+    Lee la lista de proxies de confianza
+
+    Args:
+        texto: IPs o redes CIDR separadas por comas ("10.0.0.0/8,127.0.0.1")
+
+    Returns:
+        Lista de redes
+
+    Raises:
+        ValueError: Si alguna entrada no es una IP o red válida
+    """
+    redes = []
+    for entrada in texto.split(","):
+        entrada = entrada.strip()
+        if not entrada:
+            continue
+        try:
+            redes.append(ipaddress.ip_network(entrada, strict=False))
+        except ValueError:
+            raise ValueError(f"Proxy inválido en RATE_LIMIT_TRUSTED_PROXIES: '{entrada}'")
+    return redes
+
+
+def _es_proxy(ip: str, proxies: list) -> bool:
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in proxies)
+
+
+def ip_cliente(scope, proxies: list) -> str:
+    """
+    IP del cliente de una petición
+
+    Si la conexión viene de un proxy de confianza se recorre X-Forwarded-For
+    de derecha a izquierda y se toma la primera IP que no es otro proxy de
+    confianza (las de más a la izquierda las pudo escribir el cliente).
+
+    Args:
+        scope: Scope ASGI de la petición
+        proxies: Redes de confianza (parsear_proxies)
+
+    Returns:
+        IP del cliente, o "-" si no se conoce
+    """
+    cliente = scope.get("client")
+    ip = cliente[0] if cliente else "-"
+    if not proxies or not _es_proxy(ip, proxies):
+        return ip
+    reenviadas = [
+        valor.decode("latin-1")
+        for nombre, valor in scope["headers"]
+        if nombre == b"x-forwarded-for"
+    ]
+    saltos = [s.strip() for s in ",".join(reenviadas).split(",") if s.strip()]
+    for salto in reversed(saltos):
+        ip = salto
+        if not _es_proxy(salto, proxies):
+            break
+    return ip
+
+
+def clase_de_ruta(path: str) -> Optional[str]:
+    """
+    Clase de límite de una ruta
+
+    Args:
+        path: Ruta de la petición
+
+    Returns:
+        Nombre de la clase; None si la ruta no está bajo la API (/, /health, /docs)
+    """
+    if not path.startswith(settings.API_V1_STR):
+        return None
+    resto = path[len(settings.API_V1_STR):]
+    for prefijo, clase in CLASES_RUTA:
+        if resto.startswith(prefijo):
+            return clase
+    return CLASE_POR_DEFECTO
+
+
+class AlmacenLimites:
+    """
+    Interfaz de almacenamiento de los baldes
+
+    Una implementación compartida debe hacer la recarga y el consumo de forma
+    atómica (por ejemplo un script Lua en Redis o una función SQL) para que dos
+    workers no consuman la misma ficha.
+    """
+
+    async def consumir(self, clave: str, capacidad: float, tasa: float) -> float:
+        """
+        Consume una ficha del balde
+
+        Args:
+            clave: Identificador del balde (clase y usuario)
+            capacidad: Máximo de fichas del balde
+            tasa: Fichas que se recuperan por segundo
+
+        Returns:
+            0 si la petición se permite; si no, segundos hasta la próxima ficha
+        """
+        raise NotImplementedError
+
+
+class AlmacenMemoria(AlmacenLimites):
+    """
+    Baldes en un diccionario del proceso
+
+    Solo se usa desde el event loop, así que no necesita lock. Cuando supera
+    `max_claves` se descartan los baldes que ya estarían llenos, que equivalen
+    a no tener entrada.
+    """
+
+    def __init__(self, max_claves: int = 100000):
+        self.max_claves = max_claves
+        self._baldes: Dict[str, list] = {}
+
+    async def consumir(self, clave: str, capacidad: float, tasa: float) -> float:
+        ahora = time.monotonic()
+        balde = self._baldes.get(clave)
+        if balde is None:
+            if len(self._baldes) >= self.max_claves:
+                self._podar(ahora)
+            self._baldes[clave] = [capacidad - 1, ahora, capacidad, tasa]
+            return 0.0
+
+        fichas = min(capacidad, balde[0] + (ahora - balde[1]) * tasa)
+        balde[1] = ahora
+        if fichas >= 1:
+            balde[0] = fichas - 1
+            return 0.0
+        balde[0] = fichas
+        return (1 - fichas) / tasa
+
+    def _podar(self, ahora: float) -> None:
+        llenos = [
+            clave for clave, (fichas, ultimo, capacidad, tasa) in self._baldes.items()
+            if fichas + (ahora - ultimo) * tasa >= capacidad
+        ]
+        for clave in llenos:
+            del self._baldes[clave]
+        # Si todos siguen activos, empezar de cero antes que crecer sin límite
+        if len(self._baldes) >= self.max_claves:
+            self._baldes.clear()
+
+    def __len__(self) -> int:
+        return len(self._baldes)
+
+
+_almacen: Optional[AlmacenLimites] = None
+
+
+def get_almacen() -> AlmacenLimites:
+    """
+    Almacén de baldes en uso (el de memoria si no se configuró otro)
+    """
+    global _almacen
+    if _almacen is None:
+        _almacen = AlmacenMemoria(settings.RATE_LIMIT_MAX_KEYS)
+    return _almacen
+
+
+def configurar_almacen(almacen: AlmacenLimites) -> None:
+    """
+    Reemplaza el almacén de baldes (por ejemplo por uno compartido entre workers)
+
+    Args:
+        almacen: Implementación de AlmacenLimites
+    """
+    global _almacen
+    _almacen = almacen
+
+
+def estadisticas_limites() -> Dict[str, int]:
+    """
+    Contadores de peticiones permitidas y rechazadas en este worker
+    """
+    return dict(_estadisticas)
+
+
+class LimitadorPeticiones:
+    """
+    Middleware ASGI que aplica los límites antes de llegar a las rutas
+
+    Es ASGI puro (no BaseHTTPMiddleware) para no sumar una tarea ni envolver
+    el cuerpo de la respuesta en cada petición.
+    """
+
+    def __init__(self, app, limites: Optional[str] = None, almacen: Optional[AlmacenLimites] = None):
+        """
+        Args:
+            app: Aplicación ASGI envuelta
+            limites: Configuración "clase=capacidad/segundos,..." (por defecto RATE_LIMITS)
+            almacen: Almacén de baldes (por defecto get_almacen())
+        """
+        self.app = app
+        self.limites = parsear_limites(limites if limites is not None else settings.RATE_LIMITS)
+        self.almacen = almacen
+        self.proxies = parsear_proxies(settings.RATE_LIMIT_TRUSTED_PROXIES)
+        self._tokens: Dict[str, Tuple[Optional[str], float]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or not settings.RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        clase = clase_de_ruta(scope["path"])
+        limite = self.limites.get(clase) if clase else None
+        if limite is None:
+            return await self.app(scope, receive, send)
+
+        if scope["method"] == "POST" and scope["path"] == settings.API_V1_STR + RUTA_LOGIN:
+            sujeto, ip, receive = await self._sujeto_login(scope, receive)
+            baldes = [(clase, sujeto), (CLASE_LOGIN_IP, f"ip:{ip}")]
+        else:
+            baldes = [(clase, self._sujeto(scope))]
+
+        almacen = self.almacen or get_almacen()
+        for clase_balde, sujeto in baldes:
+            limite = self.limites.get(clase_balde)
+            if limite is None:
+                continue
+            espera = await almacen.consumir(f"{clase_balde}|{sujeto}", *limite)
+            if espera:
+                _estadisticas["rechazadas"] += 1
+                return await self._rechazar(send, clase_balde, espera)
+        _estadisticas["permitidas"] += 1
+        await self.app(scope, receive, send)
+
+    def _sujeto(self, scope) -> str:
+        """Usuario del token de acceso o, si no hay uno válido, la IP del cliente"""
+        for nombre, valor in scope["headers"]:
+            if nombre == b"authorization":
+                id_user = self._usuario_de_token(valor.decode("latin-1"))
+                if id_user:
+                    return f"u:{id_user}"
+                break
+        return f"ip:{ip_cliente(scope, self.proxies)}"
+
+    async def _sujeto_login(self, scope, receive):
+        """
+        Correo del formulario de login junto con la IP del cliente
+
+        Lee el cuerpo (un formulario de pocos bytes) y devuelve, además del
+        sujeto y la IP, un `receive` que se lo vuelve a entregar a la ruta.
+        """
+        mensajes, cuerpo = [], b""
+        while len(cuerpo) <= MAX_CUERPO_LOGIN:
+            mensaje = await receive()
+            mensajes.append(mensaje)
+            if mensaje["type"] != "http.request":
+                break
+            cuerpo += mensaje.get("body", b"")
+            if not mensaje.get("more_body"):
+                break
+
+        async def repetir():
+            return mensajes.pop(0) if mensajes else await receive()
+
+        ip = ip_cliente(scope, self.proxies)
+        correo = parse_qs(cuerpo.decode("utf-8", "replace")).get("username", [""])[0].strip().lower()
+        if not correo:
+            return f"ip:{ip}", ip, repetir
+        return f"login:{correo}|ip:{ip}", ip, repetir
+
+    def _usuario_de_token(self, autorizacion: str) -> Optional[str]:
+        token = autorizacion[7:].strip() if autorizacion[:7].lower() == "bearer " else autorizacion.strip()
+        entrada = self._tokens.get(token)
+        if entrada is None:
+            from app.utils.security import verify_token
+
+            payload = verify_token(token, token_type="access")
+            if payload and payload.get("sub"):
+                entrada = (str(payload["sub"]), float(payload["exp"]))
+            else:
+                # Cachear también los inválidos, reintentar en un minuto
+                entrada = (None, time.time() + 60)
+            if len(self._tokens) >= MAX_TOKENS_EN_CACHE:
+                self._tokens.clear()
+            self._tokens[token] = entrada
+
+        id_user, expira = entrada
+        if expira < time.time():
+            del self._tokens[token]
+            return None
+        return id_user
+
+    @staticmethod
+    async def _rechazar(send, clase: str, espera: float) -> None:
+        segundos = max(1, math.ceil(espera))
+        cuerpo = json.dumps({
+            "detail": f"Demasiadas peticiones. Intenta de nuevo en {segundos} segundos.",
+            "clase": clase,
+            "retry_after": segundos
+        }, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"retry-after", str(segundos).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
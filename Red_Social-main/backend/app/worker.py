@@ -0,0 +1,24 @@
+"""
+Worker de Gunicorn para producción (ver gunicorn.conf.py)
+"""
+import os
+
+from uvicorn_worker import UvicornWorker
+
+
+class WorkerProduccion(UvicornWorker):
+    """
+    Worker Uvicorn con ciclo de vida y apagado ordenado
+
+    Al recibir SIGTERM deja de aceptar conexiones, cierra las keep-alive
+    inactivas y espera a que terminen las peticiones en curso hasta
+    GRACEFUL_TIMEOUT segundos (menos un margen para que corra el shutdown del
+    lifespan antes de que Gunicorn mate el proceso).
+    """
+
+    CONFIG_KWARGS = {
+        "loop": "auto",
+        "http": "auto",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": max(1, int(os.getenv("GRACEFUL_TIMEOUT", "30")) - 2),
+    }
@@ -0,0 +1,95 @@
+"""
+Benchmark del índice de búsqueda de usuarios
+
+Genera usuarios sintéticos (por defecto 100.000), construye el índice en
+memoria y mide la latencia de búsqueda para consultas típicas del buscador
+(prefijos que crecen tecla a tecla, nombres con y sin acentos, correos y
+errores de tipeo).
+
+Uso:
+    python benchmarks/benchmark_busqueda_usuarios.py [cantidad_usuarios]
+"""
+import os
+import random
+import sys
+import time
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.busqueda_usuarios import IndiceUsuarios
+
+NOMBRES = [
+    "José", "María", "Juan", "Ana", "Luis", "Carla", "Jorge", "Lucía", "Andrés", "Sofía",
+    "Miguel", "Valeria", "Diego", "Camila", "Sebastián", "Daniela", "Mateo", "Gabriela",
+    "Nicolás", "Paola", "Álvaro", "Renata", "Iñaki", "Belén", "Rodrigo", "Ximena",
+]
+APELLIDOS = [
+    "Pérez", "Gutiérrez", "Mamani", "Quispe", "Fernández", "López", "Rodríguez", "Vargas",
+    "Choque", "Flores", "Rojas", "Mendoza", "Condori", "Suárez", "Ortiz", "Castillo",
+    "Guzmán", "Peña", "Ibáñez", "Aguilar", "Salazar", "Villarroel", "Zambrana", "Céspedes",
+]
+CONSULTAS = [
+    "j", "jo", "jos", "jose", "maria", "MARÍA", "gutierrez", "gutiérrez", "perez jose",
+    "qui", "quispe ana", "mam", "luis.rojas", "villaroel", "zambrna", "cesp", "ib", "iña",
+    "sofia mendoza", "daniela o", "rod", "xim", "castillo n", "renata s",
+]
+
+
+def generar_usuarios(cantidad: int):
+    random.seed(42)
+    for i in range(cantidad):
+        nombre = random.choice(NOMBRES)
+        apellido = f"{random.choice(APELLIDOS)} {random.choice(APELLIDOS)}"
+        correo = f"{nombre.lower()}.{apellido.split()[0].lower()}{i}@est.univalle.edu"
+        yield {
+            "id_user": f"{i:08d}-0000-0000-0000-000000000000",
+            "nombre": nombre,
+            "apellido": apellido,
+            "correo": correo,
+            "rol": "estudiante",
+            "activo": i % 50 != 0,
+            "foto_perfil": None,
+        }
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    inicio = time.perf_counter()
+    indice = IndiceUsuarios()
+    indice.agregar_lote(generar_usuarios(cantidad))
+    print(f"Índice construido con {len(indice)} usuarios en {time.perf_counter() - inicio:.2f}s")
+
+    tiempos = []
+    for _ in range(20):
+        for q in CONSULTAS:
+            t0 = time.perf_counter()
+            indice.buscar(q, limit=20, solo_activos=True)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+
+    print(f"Consultas: {len(tiempos)}")
+    print(f"p50: {percentil(tiempos, 0.50):.2f} ms")
+    print(f"p95: {percentil(tiempos, 0.95):.2f} ms")
+    print(f"p99: {percentil(tiempos, 0.99):.2f} ms")
+    print(f"max: {max(tiempos):.2f} ms")
+
+    # Actualizaciones incrementales (registro o edición de perfil)
+    t0 = time.perf_counter()
+    for i, usuario in enumerate(generar_usuarios(200)):
+        indice.agregar({**usuario, "nombre": f"Editado{i}"})
+    print(f"Actualización incremental: {(time.perf_counter() - t0) / 200 * 1000:.2f} ms por usuario")
+
+    print("\nEjemplos:")
+    for q in ("jose", "gutierrez", "zambrna"):
+        resultados = indice.buscar(q, limit=3)
+        print(f"  {q!r}: " + ", ".join(f"{u['nombre']} {u['apellido']}" for u in resultados))
+
+
+if __name__ == "__main__":
+    main()
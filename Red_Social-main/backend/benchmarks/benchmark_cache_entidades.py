@@ -0,0 +1,105 @@
+"""
+Benchmark de la caché de entidades (read-through con invalidación)
+
+Simula el patrón de acceso de las rutas: lecturas por ID con distribución Zipf
+(unas pocas publicaciones concentran la mayoría de las visitas, detalle +
+chequeos de dueño + notificaciones) y un porcentaje de escrituras que
+invalidan la entrada. Compara consultas a la BD y latencia con y sin caché, y
+verifica que después de una escritura nunca se lee un valor viejo.
+
+Uso:
+    python benchmarks/benchmark_cache_entidades.py [lecturas] [latencia_bd_ms]
+"""
+import os
+import random
+import sys
+import time
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.cache_entidades import CacheEntidades, BackendMemoria
+
+ENTIDADES = 20000
+PROPORCION_ESCRITURAS = 0.02
+
+
+class BaseSimulada:
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+        self.filas = {
+            str(i): {"id_publicacion": str(i), "id_user": f"u{i % 500}", "contenido": f"Publicación {i}", "version": 0}
+            for i in range(ENTIDADES)
+        }
+        self.consultas = 0
+
+    def leer(self, id_publicacion: str):
+        self.consultas += 1
+        time.sleep(self.latencia)
+        fila = self.filas.get(id_publicacion)
+        return dict(fila) if fila else None
+
+    def escribir(self, id_publicacion: str):
+        self.filas[id_publicacion]["version"] += 1
+
+
+def ids_zipf(cantidad: int, semilla: int = 7):
+    aleatorio = random.Random(semilla)
+    pesos = [1 / (rango + 1) for rango in range(ENTIDADES)]
+    return [str(i) for i in aleatorio.choices(range(ENTIDADES), weights=pesos, k=cantidad)]
+
+
+def correr(ids, latencia: float, con_cache: bool):
+    bd = BaseSimulada(latencia)
+    cache = CacheEntidades(BackendMemoria(5000), {"publicacion": 60})
+    aleatorio = random.Random(11)
+    tiempos, viejas = [], 0
+
+    for id_publicacion in ids:
+        if aleatorio.random() < PROPORCION_ESCRITURAS:
+            bd.escribir(id_publicacion)
+            cache.invalidar("publicacion", id_publicacion)
+            continue
+        inicio = time.perf_counter()
+        if con_cache:
+            fila = cache.obtener("publicacion", id_publicacion, lambda: bd.leer(id_publicacion))
+        else:
+            fila = bd.leer(id_publicacion)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if fila["version"] != bd.filas[id_publicacion]["version"]:
+            viejas += 1
+
+    tiempos.sort()
+    return {
+        "consultas": bd.consultas,
+        "p50": tiempos[len(tiempos) // 2],
+        "p95": tiempos[int(len(tiempos) * 0.95)],
+        "total_s": sum(tiempos) / 1000,
+        "viejas": viejas,
+        "estadisticas": cache.estadisticas(),
+    }
+
+
+def main():
+    lecturas = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    latencia = (float(sys.argv[2]) if len(sys.argv) > 2 else 2.0) / 1000
+    ids = ids_zipf(lecturas)
+    print(f"{lecturas} operaciones sobre {ENTIDADES} publicaciones (Zipf), "
+          f"{PROPORCION_ESCRITURAS:.0%} escrituras, latencia BD {latencia * 1000:.1f} ms, LRU de 5000\n")
+
+    print(f"{'Modo':12} {'consultas BD':>13} {'p50 ms':>8} {'p95 ms':>8} {'tiempo s':>9} {'lecturas viejas':>16}")
+    for nombre, con_cache in (("Sin caché", False), ("Con caché", True)):
+        r = correr(ids, latencia, con_cache)
+        print(f"{nombre:12} {r['consultas']:13} {r['p50']:8.3f} {r['p95']:8.3f} {r['total_s']:9.2f} {r['viejas']:16}")
+    stats = r["estadisticas"]["entidades"]["publicacion"]
+    print(f"\nTasa de aciertos: {stats['tasa_aciertos']:.1%} "
+          f"({stats['aciertos']} aciertos, {stats['fallos']} fallos, {stats['invalidaciones']} invalidaciones)")
+
+    if r["viejas"]:
+        print("❌ Se leyeron valores viejos después de una escritura")
+        sys.exit(1)
+    print("✅ Ninguna lectura vieja después de invalidar")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Benchmark de las consultas en paralelo dentro de las rutas (en_paralelo)
+
+Llama a las rutas convertidas (amigos, mis-rutas y
+mi horario) con un cliente simulado en el que cada consulta tarda una
+latencia fija, y compara el tiempo con un pool de un solo hilo (las consultas
+una detrás de otra, como antes) contra el pool normal. Muestra cuántas
+consultas hace cada ruta y cuántas quedan en el camino crítico.
+
+También verifica las reglas de en_paralelo: resultados en orden, 504 al
+vencerse el plazo, y que un error cancela las consultas que no empezaron.
+
+Uso:
+    python benchmarks/benchmark_concurrencia.py [latencia_bd_ms] [repeticiones]
+"""
+import asyncio
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.utils import concurrencia
+from app.utils.concurrencia import en_paralelo
+from app.routes.amigos import obtener_amigos
+from app.routes.rutas import get_mis_rutas
+from app.routes.horarios import get_my_horario
+from benchmarks import simulado
+
+YO = "u0"
+AMIGOS = 30
+RUTAS = 8
+AHORA = datetime(2025, 3, 10, 8, 0).isoformat()
+DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"]
+
+
+class BaseSimulada(simulado.BaseSimulada):
+    def __init__(self, latencia: float):
+        super().__init__(latencia)
+        usuarios = [
+            {"id_user": f"u{i}", "nombre": f"Nombre{i}", "apellido": "Apellido", "correo": f"u{i}@univalle.edu",
+             "rol": "estudiante", "foto_perfil": None, "activo": True}
+            for i in range(AMIGOS + 1)
+        ]
+        self.tablas = {
+            "usuario": usuarios,
+            "relacionusuario": [
+                {"id_relacion_usuario": f"r{i}", "id_usuario1": YO if i % 2 else f"u{i}",
+                 "id_usuario2": f"u{i}" if i % 2 else YO, "estado": "aceptado", "tipo": "amistad",
+                 "fecha_respuesta": AHORA}
+                for i in range(1, AMIGOS + 1)
+            ],
+            "ruta": [
+                {"id_ruta": f"ruta{i}", "id_user": YO, "capacidad_ruta": 4, "fecha_creacion": AHORA}
+                for i in range(RUTAS)
+            ],
+            "pasajeroruta": [
+                {"id_pasajero_ruta": f"p{i}", "id_ruta": f"ruta{i % RUTAS}", "id_user": f"u{i + 1}",
+                 "estado": "aceptado" if i % 3 else "pendiente", "fecha_union": AHORA}
+                for i in range(RUTAS * 2)
+            ],
+            "estudiante": [{"id_estudiante": "e0", "id_user": YO, "ci_est": "1234567", "id_grupo": "g1"}],
+            "horario": [
+                {"id_horario": f"h{i}", "id_grupo": "g1", "dia_semana": DIAS[i % len(DIAS)],
+                 "hora_inicio": "08:00:00", "hora_fin": "10:00:00", "aula": f"A-{i}"}
+                for i in range(10)
+            ],
+            "grupomateria": [
+                {"id_grupo": "g1", "id_materia": f"m{i}", "materia": {"id_materia": f"m{i}", "nombre": f"Materia {i}"}}
+                for i in range(6)
+            ],
+        }
+
+
+_numero = itertools.count()
+
+
+def peticion(ruta: str) -> Request:
+    # Query distinta en cada llamada para no responder desde la caché de ETag
+    query = f"n={next(_numero)}".encode()
+    return Request({"type": "http", "method": "GET", "path": ruta, "query_string": query, "headers": []})
+
+
+USUARIO = {"id_user": YO, "rol": "estudiante", "activo": True}
+
+RUTAS_CONVERTIDAS = [
+    ("GET /amigos/lista", lambda db: obtener_amigos(db=db, current_user=USUARIO)),
+    ("GET /rutas-carpooling/mis-rutas", lambda db: get_mis_rutas(db=db, current_user=USUARIO)),
+    ("GET /horarios/mi-horario", lambda db: get_my_horario(request=peticion("/horarios/mi-horario"), db=db, current_user=USUARIO)),
+]
+
+
+async def medir(llamar, latencia: float, repeticiones: int, hilos: int):
+    concurrencia._pool = ThreadPoolExecutor(max_workers=hilos)
+    bd = BaseSimulada(latencia)
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = await llamar(bd)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    concurrencia._pool.shutdown()
+    concurrencia._pool = None
+    return sum(tiempos) / len(tiempos), bd.consultas // repeticiones, resultado
+
+
+async def verificar_reglas() -> bool:
+    ok = True
+
+    def tarda(segundos, valor):
+        def consulta():
+            time.sleep(segundos)
+            return valor
+        return consulta
+
+    resultados = await en_paralelo(tarda(0.05, "a"), tarda(0.01, "b"), tarda(0.03, "c"))
+    if resultados != ["a", "b", "c"]:
+        print(f"❌ Orden de resultados incorrecto: {resultados}")
+        ok = False
+
+    inicio = time.perf_counter()
+    try:
+        await en_paralelo(tarda(0.01, "a"), tarda(1.0, "b"), plazo=0.1)
+        print("❌ El plazo vencido no respondió 504")
+        ok = False
+    except HTTPException as e:
+        espera = time.perf_counter() - inicio
+        if e.status_code != 504 or espera > 0.5:
+            print(f"❌ Plazo vencido: estado {e.status_code} tras {espera:.2f}s")
+            ok = False
+
+    # Con dos hilos: "lenta" está en curso cuando "falla" termina, y el hilo
+    # libre puede tomar a lo sumo una consulta más antes de la cancelación
+    concurrencia._pool = ThreadPoolExecutor(max_workers=2)
+    ejecutadas = []
+
+    def falla():
+        time.sleep(0.02)
+        raise ValueError("fallo de la consulta")
+
+    def anotar(nombre):
+        def consulta():
+            ejecutadas.append(nombre)
+            time.sleep(0.05)
+        return consulta
+
+    inicio = time.perf_counter()
+    try:
+        await en_paralelo(falla, anotar("lenta"), *(anotar(f"cola{i}") for i in range(5)))
+        print("❌ El error de una consulta no se propagó")
+        ok = False
+    except ValueError:
+        espera = time.perf_counter() - inicio
+        if espera > 0.04:
+            print(f"❌ El error tardó {espera * 1000:.0f}ms en propagarse (esperó a las demás)")
+            ok = False
+    await asyncio.sleep(0)
+    concurrencia._pool.shutdown(wait=True)
+    concurrencia._pool = None
+    en_cola = [nombre for nombre in ejecutadas if nombre.startswith("cola")]
+    if len(en_cola) > 1:
+        print(f"❌ Consultas en cola que se ejecutaron igual tras el error: {en_cola}")
+        ok = False
+
+    return ok
+
+
+async def main():
+    latencia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    latencia = latencia_ms / 1000
+
+    print(f"Latencia simulada por consulta: {latencia_ms:.0f} ms, {repeticiones} repeticiones\n")
+    print(f"{'Ruta':<28} {'consultas':>9} {'en serie':>10} {'paralelo':>10} {'camino crítico':>16}")
+
+    ok = True
+    for nombre, llamar in RUTAS_CONVERTIDAS:
+        serie, consultas, esperado = await medir(llamar, latencia, repeticiones, 1)
+        paralelo, _, obtenido = await medir(llamar, latencia, repeticiones, 16)
+        critico = round(paralelo / max(latencia_ms, 1.0))
+        print(f"{nombre:<28} {consultas:>9} {serie:>8.1f}ms {paralelo:>8.1f}ms {critico:>7} de {consultas} consultas")
+        if _comparable(obtenido) != _comparable(esperado):
+            print(f"❌ {nombre}: la respuesta cambia con el pool")
+            ok = False
+        if paralelo >= serie:
+            print(f"❌ {nombre}: sin mejora en el camino crítico")
+            ok = False
+
+    print()
+    if not await verificar_reglas():
+        ok = False
+
+    if ok:
+        print("✅ Las consultas independientes se solapan y en_paralelo cumple plazo, orden y cancelación")
+    else:
+        print("❌ Falló alguna verificación")
+        sys.exit(1)
+
+
+def _comparable(resultado):
+    # Las respuestas de horarios son JSONResponse (con ETag); comparar el cuerpo
+    return getattr(resultado, "body", resultado)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+Benchmark de los contadores guardados en la publicación
+
+Compara una página de GET /publicaciones contando comentarios y reacciones
+en cada lectura (dos COUNT por publicación, como antes) con la ruta actual,
+que los lee de la fila. La base simulada tarda una latencia fija por
+consulta.
+
+También recorre una base con contadores desviados con `reparar` (la función
+reparar_contadores se simula en Python con la misma paginación por
+id_publicacion) y verifica que corrige todo en lotes y que una segunda
+pasada no encuentra nada.
+
+Uso:
+    python benchmarks/benchmark_contadores.py [latencia_bd_ms] [publicaciones]
+"""
+import asyncio
+import os
+import random
+import sys
+import itertools
+import time
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routes.publicaciones import get_publicaciones
+from app.services.contadores import reparar
+from benchmarks import simulado
+
+PAGINA = 50
+TAMANO_LOTE = 200
+
+
+class BaseSimulada(simulado.BaseSimulada):
+    def __init__(self, publicaciones: int, latencia: float, semilla: int = 5):
+        super().__init__(latencia)
+        aleatorio = random.Random(semilla)
+        self.tablas = {"publicacion": [], "comentario": [], "reaccion": []}
+        for i in range(publicaciones):
+            id_publicacion = f"p{i:06d}"
+            comentarios = aleatorio.randint(0, 20)
+            reacciones = aleatorio.randint(0, 60)
+            self.tablas["publicacion"].append({
+                "id_publicacion": id_publicacion, "id_user": "u0", "contenido": "hola", "tipo": "texto",
+                "fecha_creacion": f"2025-03-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+                "comentarios_count": comentarios, "reacciones_count": reacciones,
+            })
+            self.tablas["comentario"] += [{"id_publicacion": id_publicacion} for _ in range(comentarios)]
+            self.tablas["reaccion"] += [{"id_publicacion": id_publicacion} for _ in range(reacciones)]
+
+        # Como el índice por id_publicacion de comentario y reaccion
+        self.indice = {
+            tabla: {
+                id_publicacion: list(filas)
+                for id_publicacion, filas in itertools.groupby(self.tablas[tabla], key=lambda f: f["id_publicacion"])
+            }
+            for tabla in ("comentario", "reaccion")
+        }
+
+    def filas(self, consulta):
+        por_publicacion = [valor for operador, columna, valor in consulta.filtros if (operador, columna) == ("eq", "id_publicacion")]
+        if consulta.tabla in self.indice and por_publicacion:
+            return self.indice[consulta.tabla].get(por_publicacion[0], [])
+        return super().filas(consulta)
+
+    def reparar_contadores(self, parametros):
+        """Recuenta el lote siguiente y corrige lo que difiere"""
+        despues = parametros["p_despues"]
+        lote = sorted(
+            (p for p in self.tablas["publicacion"] if despues is None or p["id_publicacion"] > despues),
+            key=lambda p: p["id_publicacion"]
+        )[:parametros["p_limite"]]
+        corregidas = 0
+        for pub in lote:
+            reales = self.recuento(pub["id_publicacion"])
+            if (pub["comentarios_count"], pub["reacciones_count"]) != reales:
+                pub["comentarios_count"], pub["reacciones_count"] = reales
+                corregidas += 1
+        return {
+            "ultimo": lote[-1]["id_publicacion"] if lote else None,
+            "revisadas": len(lote),
+            "corregidas": corregidas,
+            "comentarios_corregidos": 0,
+        }
+
+    def recuento(self, id_publicacion):
+        return tuple(len(self.indice[tabla].get(id_publicacion, [])) for tabla in ("comentario", "reaccion"))
+
+
+async def feed_contando(db):
+    """GET /publicaciones como antes: dos COUNT por publicación de la página"""
+    response = db.table("publicacion").select("*").order("fecha_creacion", desc=True).range(0, PAGINA - 1).execute()
+    for pub in response.data:
+        comentarios = db.table("comentario").select("id_comentario", count="exact").eq("id_publicacion", pub["id_publicacion"]).execute()
+        pub["comentarios_count"] = comentarios.count or 0
+        reacciones = db.table("reaccion").select("id_reaccion", count="exact").eq("id_publicacion", pub["id_publicacion"]).execute()
+        pub["reacciones_count"] = reacciones.count or 0
+    return response.data
+
+
+async def medir(nombre, base, feed):
+    base.consultas = 0
+    inicio = time.perf_counter()
+    pagina = await feed(base)
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<22} {duracion * 1000:8.1f} ms  {base.consultas:4d} consultas")
+    return pagina, duracion
+
+
+def main():
+    latencia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    publicaciones = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    base = BaseSimulada(publicaciones, latencia_ms / 1000)
+    print(f"{publicaciones} publicaciones, página de {PAGINA}, latencia {latencia_ms:.1f} ms por consulta\n")
+
+    ok = True
+    antes, duracion_antes = asyncio.run(medir("Contando al leer", base, feed_contando))
+    ahora, duracion_ahora = asyncio.run(medir(
+        "Contadores en la fila", base,
+        lambda db: get_publicaciones(skip=0, limit=PAGINA, db=db, current_user={"id_user": "u0"})
+    ))
+    claves = ("id_publicacion", "comentarios_count", "reacciones_count")
+    if [tuple(p[c] for c in claves) for p in antes] != [tuple(p[c] for c in claves) for p in ahora]:
+        print("❌ Los contadores guardados no coinciden con el recuento")
+        ok = False
+    print(f"\nFeed: {duracion_antes / duracion_ahora:.1f}x más rápido")
+
+    # Desviar algunos contadores (como un borrado en cascada sin trigger)
+    aleatorio = random.Random(9)
+    desviadas = aleatorio.sample(base.tablas["publicacion"], publicaciones // 20)
+    for pub in desviadas:
+        pub["comentarios_count"] += aleatorio.choice([-2, -1, 1, 3])
+    base.consultas = 0
+    inicio = time.perf_counter()
+    totales = reparar(base, TAMANO_LOTE)
+    print(f"\nReparación: {totales['revisadas']} revisadas en {totales['lotes']} lotes "
+          f"({base.consultas} llamadas, {time.perf_counter() - inicio:.2f}s), {totales['corregidas']} corregidas")
+    if totales["corregidas"] != len(desviadas) or totales["revisadas"] != publicaciones:
+        print(f"❌ Esperaba {len(desviadas)} corregidas de {publicaciones}")
+        ok = False
+    if reparar(base, TAMANO_LOTE)["corregidas"]:
+        print("❌ Una segunda pasada todavía encuentra diferencias")
+        ok = False
+    if reparar(base, TAMANO_LOTE, desde=desviadas[0]["id_publicacion"])["revisadas"] >= publicaciones:
+        print("❌ --desde no continúa desde el ID indicado")
+        ok = False
+
+    if ok and duracion_ahora < duracion_antes:
+        print("\n✅ Feed sin conteos y contadores reparados en lotes")
+    else:
+        print("\n❌ Falló alguna verificación")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
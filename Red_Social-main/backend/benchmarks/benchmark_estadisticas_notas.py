@@ -0,0 +1,178 @@
+"""
+Benchmark de las estadísticas de notas por materia
+
+Genera las notas de una materia (estudiantes x tipos de nota) y compara:
+- cálculo en Python puro, fila por fila (lo que hacía el cliente con
+  GET /notas), con el módulo statistics
+- calcular_estadisticas con NumPy sobre arreglos por columna
+- estadisticas_materia con la caché (acierto después de la primera consulta)
+
+Verifica que ambos cálculos coinciden, que estadisticas_materia lee todas
+las páginas (PostgREST corta un select sin paginar en 1000 filas) y que la
+caché se descarta al invalidar la materia.
+
+Uso:
+    python benchmarks/benchmark_estadisticas_notas.py [estudiantes] [latencia_bd_ms]
+"""
+from collections import defaultdict
+import os
+import random
+import statistics
+import sys
+import time
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.config import settings
+from app.services.estadisticas_notas import calcular_estadisticas, estadisticas_materia, invalidar_materia
+
+TIPOS = {"Primer Parcial": 25, "Segundo Parcial": 25, "Prácticas": 20, "Examen Final": 30}
+REPETICIONES = 20
+
+
+def generar_notas(estudiantes: int, semilla: int = 5):
+    aleatorio = random.Random(semilla)
+    return [
+        {
+            "id_nota": f"n{i:07d}-{j}", "id_user": f"u{i}", "tipo_nota": tipo,
+            "nota": round(min(100, max(0, aleatorio.gauss(62, 18))), 1)
+        }
+        for i in range(estudiantes)
+        for j, tipo in enumerate(TIPOS)
+    ]
+
+
+def calcular_python(filas, pesos):
+    """Versión fila por fila para comparar tiempos y resultados"""
+    aprobacion = settings.GRADE_PASS_MARK
+    por_tipo = defaultdict(list)
+    suma = defaultdict(float)
+    suma_pesos = defaultdict(float)
+    for fila in filas:
+        por_tipo[fila["tipo_nota"]].append(fila["nota"])
+        peso = pesos.get(fila["tipo_nota"], 0)
+        suma[fila["id_user"]] += peso * fila["nota"]
+        suma_pesos[fila["id_user"]] += peso
+    todas = [fila["nota"] for fila in filas]
+
+    def resumir(notas):
+        return {
+            "promedio": round(statistics.fmean(notas), 2),
+            "mediana": round(statistics.median(notas), 2),
+            "desviacion": round(statistics.pstdev(notas), 2),
+            "tasa_aprobacion": round(sum(1 for n in notas if n >= aprobacion) / len(notas), 2),
+        }
+
+    return {
+        "general": resumir(todas),
+        "por_tipo": {tipo: resumir(notas) for tipo, notas in por_tipo.items()},
+        "promedios": {u: round(suma[u] / suma_pesos[u], 2) for u in suma if suma_pesos[u] > 0},
+    }
+
+
+class ClienteSimulado:
+    """Responde las páginas de notas de una materia (por id_nota) con latencia"""
+
+    def __init__(self, filas, latencia: float):
+        self.filas = sorted(filas, key=lambda f: f["id_nota"])
+        self.latencia = latencia
+        self.consultas = 0
+
+    def table(self, nombre):
+        self.desde, self.limite = None, None
+        return self
+
+    def select(self, columnas):
+        return self
+
+    def eq(self, columna, valor):
+        return self
+
+    def gt(self, columna, valor):
+        self.desde = valor
+        return self
+
+    def order(self, columna):
+        return self
+
+    def limit(self, cantidad):
+        self.limite = cantidad
+        return self
+
+    def execute(self):
+        self.consultas += 1
+        time.sleep(self.latencia)
+        filas = [f for f in self.filas if self.desde is None or f["id_nota"] > self.desde]
+        return type("Respuesta", (), {"data": filas[:self.limite]})()
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / REPETICIONES * 1000, resultado
+
+
+def main():
+    estudiantes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latencia = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+    filas = generar_notas(estudiantes)
+    print(f"{len(filas)} notas ({estudiantes} estudiantes x {len(TIPOS)} tipos), latencia BD {latencia * 1000:.0f} ms\n")
+
+    ms_python, esperado = medir(lambda: calcular_python(filas, TIPOS))
+
+    def con_numpy():
+        id_users = np.array([f["id_user"] for f in filas], dtype=str)
+        tipos = np.array([f["tipo_nota"] for f in filas], dtype=str)
+        notas = np.array([f["nota"] for f in filas], dtype=float)
+        return calcular_estadisticas(id_users, tipos, notas, TIPOS)
+
+    ms_numpy, obtenido = medir(con_numpy)
+
+    cliente = ClienteSimulado(filas, latencia)
+    inicio = time.perf_counter()
+    completo = estadisticas_materia(cliente, "m1", pesos=TIPOS)
+    consultas_por_lectura = cliente.consultas
+    ms_primera = (time.perf_counter() - inicio) * 1000
+    ms_cache, _ = medir(lambda: estadisticas_materia(cliente, "m1", pesos=TIPOS))
+    consultas_con_cache = cliente.consultas
+    invalidar_materia("m1")
+    estadisticas_materia(cliente, "m1", pesos=TIPOS)
+
+    print(f"{'Cálculo':28} {'ms':>9}")
+    print(f"{'Python fila por fila':28} {ms_python:9.2f}")
+    print(f"{'NumPy (incluye armar arreglos)':28} {ms_numpy:9.2f}")
+    print(f"{'Primera consulta (BD + NumPy)':28} {ms_primera:9.2f}")
+    print(f"{'Desde la caché':28} {ms_cache:9.3f}")
+    print(f"\nConsultas a la BD: {consultas_por_lectura} páginas en la primera lectura, "
+          f"{consultas_con_cache - consultas_por_lectura} en {REPETICIONES} lecturas desde la caché, "
+          f"{cliente.consultas - consultas_con_cache} después de invalidar\n")
+
+    errores = []
+    for clave in ("promedio", "mediana", "desviacion", "tasa_aprobacion"):
+        if obtenido["general"][clave] != esperado["general"][clave]:
+            errores.append(f"general.{clave}")
+        for tipo in TIPOS:
+            if obtenido["por_tipo"][tipo][clave] != esperado["por_tipo"][tipo][clave]:
+                errores.append(f"{tipo}.{clave}")
+    promedios = {e["id_user"]: e["promedio_ponderado"] for e in obtenido["estudiantes"]}
+    if any(abs(promedios[u] - p) > 0.011 for u, p in esperado["promedios"].items()):
+        errores.append("promedios ponderados")
+
+    if errores:
+        print(f"❌ NumPy y Python no coinciden en: {', '.join(errores)}")
+        sys.exit(1)
+    if completo["general"]["cantidad"] != len(filas):
+        print(f"❌ estadisticas_materia leyó {completo['general']['cantidad']} de {len(filas)} notas")
+        sys.exit(1)
+    if consultas_con_cache != consultas_por_lectura or cliente.consultas != 2 * consultas_por_lectura:
+        print("❌ La caché no evitó consultas o no se descartó al invalidar")
+        sys.exit(1)
+    print("✅ Resultados idénticos; la caché se descarta al cambiar las notas")
+
+
+if __name__ == "__main__":
+    main()
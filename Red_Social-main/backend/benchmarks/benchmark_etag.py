@@ -0,0 +1,120 @@
+"""
+Benchmark de respuestas condicionales (ETag / If-None-Match)
+
+Monta una app mínima con un endpoint como GET /materias (100 materias con su
+docente) que usa ValidadorRespuesta, simula la latencia de la consulta a
+Supabase y compara la primera carga con cargas repetidas:
+- sin If-None-Match (cuerpo guardado, sin consultar la BD)
+- con If-None-Match (304 sin cuerpo)
+- después de una escritura (se reconstruye el payload)
+
+Uso:
+    python benchmarks/benchmark_etag.py [latencia_bd_ms]
+"""
+import os
+import sys
+import time
+from typing import List
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.models.academico import Materia
+from app.utils.etag import ValidadorRespuesta, marcar_modificado, estadisticas_etag
+
+REPETICIONES = 200
+
+
+def generar_materias(cantidad: int = 100):
+    return [
+        {
+            "id_materia": f"{i:08d}-0000-0000-0000-000000000000",
+            "nombre_materia": f"Materia de prueba número {i}",
+            "codigo_materia": f"MAT-{i:03d}",
+            "id_doc": f"DOC{i % 15:04d}",
+            "origen": "SIU",
+            "docente": {
+                "ci_doc": f"DOC{i % 15:04d}",
+                "usuario": {
+                    "id_user": f"{i % 15:08d}-1111-1111-1111-111111111111",
+                    "nombre": "Docente",
+                    "apellido": f"Apellido {i % 15}",
+                    "correo": f"docente{i % 15}@univalle.edu",
+                    "rol": "docente",
+                    "foto_perfil": None,
+                    "activo": True,
+                    "fecha_registro": "2025-01-15T10:30:00",
+                },
+            },
+        }
+        for i in range(cantidad)
+    ]
+
+
+def crear_app(latencia_bd: float) -> FastAPI:
+    app = FastAPI()
+    materias = generar_materias()
+
+    @app.get("/materias", response_model=List[Materia])
+    async def get_materias(request: Request):
+        validador = ValidadorRespuesta(request, ("materia", "docente", "usuario"), List[Materia])
+        cacheada = validador.desde_cache()
+        if cacheada:
+            return cacheada
+        time.sleep(latencia_bd)  # Consulta a Supabase
+        return validador.responder(materias)
+
+    return app
+
+
+def medir(cliente: TestClient, headers=None, antes=None):
+    tiempos, tamanos, codigos = [], [], set()
+    for _ in range(REPETICIONES):
+        if antes:
+            antes()
+        t0 = time.perf_counter()
+        respuesta = cliente.get("/materias", headers=headers or {})
+        tiempos.append((time.perf_counter() - t0) * 1000)
+        tamanos.append(len(respuesta.content))
+        codigos.add(respuesta.status_code)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2], tiempos[int(len(tiempos) * 0.95)], sum(tamanos) / len(tamanos), codigos
+
+
+def main():
+    latencia_bd = (float(sys.argv[1]) if len(sys.argv) > 1 else 40.0) / 1000
+    cliente = TestClient(crear_app(latencia_bd))
+
+    primera = cliente.get("/materias")
+    etag = primera.headers["etag"]
+    print(f"Primera carga: {len(primera.content)} bytes, ETag {etag}\n")
+
+    escenarios = [
+        ("Sin caché (escritura antes de cada carga)", None, lambda: marcar_modificado("materia")),
+        ("Repetida sin If-None-Match", None, None),
+        ("Repetida con If-None-Match", {"If-None-Match": etag}, None),
+    ]
+    print(f"{'Escenario':45} {'p50 ms':>8} {'p95 ms':>8} {'bytes':>8}  códigos")
+    for nombre, headers, antes in escenarios:
+        p50, p95, tamano, codigos = medir(cliente, headers, antes)
+        print(f"{nombre:45} {p50:8.2f} {p95:8.2f} {tamano:8.0f}  {sorted(codigos)}")
+
+    # Tras una escritura que no cambia el contenido, el ETag se recalcula igual
+    marcar_modificado("docente")
+    respuesta = cliente.get("/materias", headers={"If-None-Match": etag})
+    print(f"\nTras escritura sin cambios de contenido: {respuesta.status_code}")
+
+    stats = estadisticas_etag()
+    print(
+        f"\nBytes enviados: {stats['bytes_enviados']:,}  "
+        f"ahorrados con 304: {stats['bytes_ahorrados']:,}  "
+        f"(304: {stats['respuestas_304']}, desde caché: {stats['desde_cache']}, "
+        f"construidas: {stats['construidas']})"
+    )
+
+
+if __name__ == "__main__":
+    main()
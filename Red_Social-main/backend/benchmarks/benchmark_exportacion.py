@@ -0,0 +1,145 @@
+"""
+Benchmark de la exportación de notas en CSV
+
+Recorre exportar_notas contra un cliente de Supabase simulado con N notas
+(por defecto 20000) y mide con tracemalloc el pico de memoria mientras se
+consume el CSV, comparado con armar la respuesta de GET /notas (todas las
+notas con usuario y materia embebidos) en una sola lista. Repite con el doble
+de notas para verificar que el pico no crece con el total, que el CSV tiene
+una fila por nota, que los filtros por grupo y gestión se respetan y que la
+contraseña no aparece en la salida.
+
+Uso:
+    python benchmarks/benchmark_exportacion.py [notas]
+"""
+import csv
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.exportacion import exportar_notas
+from benchmarks import simulado
+
+NOTAS_POR_ESTUDIANTE = 10
+GRUPOS = 20
+HASH = "$2b$12$" + "x" * 53
+
+
+class ClienteSimulado(simulado.BaseSimulada):
+    """Notas generadas al vuelo para que la tabla no cuente en la memoria medida"""
+
+    def __init__(self, notas: int):
+        super().__init__()
+        self.notas = notas
+        self.estudiantes = notas // NOTAS_POR_ESTUDIANTE
+        # Sin filas guardadas: las genera filas_de
+        self.tablas = dict.fromkeys(("nota", "estudiante", "grupo", "usuario", "materia"))
+
+    def filas_de(self, tabla, desde=None):
+        if tabla == "nota":
+            for i in range(int(desde[1:]) + 1 if desde else 0, self.notas):
+                yield {"id_nota": f"n{i:08d}", "id_user": f"u{i // NOTAS_POR_ESTUDIANTE:07d}",
+                       "id_materia": f"m{i % NOTAS_POR_ESTUDIANTE}", "tipo_nota": "Examen Final",
+                       "nota": 60 + i % 40, "origen": "manual", "fecha_registro_nota": "2025-06-01"}
+        elif tabla == "estudiante":
+            for i in range(self.estudiantes):
+                yield {"id_user": f"u{i:07d}", "ci_est": f"{7000000 + i}", "id_grupo": f"g{i % GRUPOS}"}
+        elif tabla == "grupo":
+            for i in range(GRUPOS):
+                yield {"id_grupo": f"g{i}", "gestion_grupo": "2025-1" if i < GRUPOS // 2 else "2024-2"}
+
+    def filas(self, consulta):
+        # Como el índice de la clave primaria: se empieza después del gt del cursor
+        desde = [valor for operador, columna, valor in consulta.filtros if (operador, columna) == ("gt", "id_nota")]
+        return self.filas_de(consulta.tabla, desde[0] if desde else None)
+
+    def en_orden(self, consulta):
+        # Las filas se generan ordenadas por su clave
+        return consulta.orden == [(simulado.clave(consulta.tabla), False)]
+
+    def buscar(self, tabla, valor):
+        if tabla == "usuario":
+            i = int(valor[1:])
+            return {"id_user": valor, "nombre": f"Nombre{i}", "apellido": f"Apellido{i}",
+                    "correo": f"e{i}@est.univalle.edu", "contrasena": HASH}
+        return {"id_materia": valor, "codigo_materia": "MAT-" + valor, "nombre_materia": "Materia " + valor}
+
+
+def medir_exportacion(notas: int, **filtros):
+    cliente = ClienteSimulado(notas)
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    filas = 0
+    contiene_hash = False
+    for bloque in exportar_notas(cliente, **filtros):
+        texto = bloque.decode("utf-8")
+        filas += texto.count("\n")
+        contiene_hash = contiene_hash or HASH in texto
+    duracion = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"filas": filas - 1, "pico": pico, "segundos": duracion,
+            "consultas": cliente.consultas, "hash": contiene_hash}
+
+
+def medir_lista(notas: int):
+    """Lo que hace GET /notas: todas las filas con usuario(*) y materia(*) y luego JSON"""
+    cliente = ClienteSimulado(notas)
+    tracemalloc.start()
+    filas = [dict(f, usuario=cliente.buscar("usuario", f["id_user"]), materia={"id_materia": f["id_materia"]})
+             for f in cliente.filas_de("nota")]
+    cuerpo = json.dumps(filas)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico, HASH in cuerpo
+
+
+def main():
+    notas = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{notas} notas, páginas de {settings.EXPORT_PAGE_SIZE}\n")
+
+    simple = medir_exportacion(notas)
+    doble = medir_exportacion(notas * 2)
+    pico_lista, lista_con_hash = medir_lista(notas)
+
+    print(f"{'Modo':34} {'filas':>8} {'pico MB':>9} {'s':>7} {'consultas':>10}")
+    print(f"{'Lista completa (GET /notas)':34} {notas:8d} {pico_lista / 2**20:9.1f} {'':>7} {1:10d}")
+    for nombre, r in (("CSV por páginas", simple), ("CSV por páginas (doble)", doble)):
+        print(f"{nombre:34} {r['filas']:8d} {r['pico'] / 2**20:9.1f} {r['segundos']:7.2f} {r['consultas']:10d}")
+
+    # Filtros: gestión 2025-1 = grupos g0..g9 = la mitad de los estudiantes
+    por_gestion = medir_exportacion(notas, id_gestion="2025-1")
+    por_grupo = medir_exportacion(notas, id_grupo="g3")
+    print(f"\nGestión 2025-1: {por_gestion['filas']} filas; grupo g3: {por_grupo['filas']} filas")
+    print(f"Contraseña en la salida: lista {lista_con_hash}, CSV {simple['hash']}\n")
+
+    estudiantes = notas // NOTAS_POR_ESTUDIANTE
+    errores = []
+    if simple["filas"] != notas or doble["filas"] != notas * 2:
+        errores.append("el CSV no tiene una fila por nota")
+    if doble["pico"] > simple["pico"] * 1.5:
+        errores.append("el pico de memoria crece con el total de filas")
+    if por_gestion["filas"] != notas // 2 or por_grupo["filas"] != (estudiantes // GRUPOS) * NOTAS_POR_ESTUDIANTE:
+        errores.append("los filtros por gestión o grupo no se respetan")
+    if simple["hash"]:
+        errores.append("la contraseña aparece en el CSV")
+    if errores:
+        print("❌ " + "; ".join(errores))
+        sys.exit(1)
+
+    # El CSV se puede leer de vuelta (encabezado sin BOM para csv.reader)
+    muestra = b"".join(exportar_notas(ClienteSimulado(5))).decode("utf-8-sig")
+    encabezado = next(csv.reader(io.StringIO(muestra)))
+    print(f"Columnas: {', '.join(encabezado)}")
+    print("✅ Memoria constante respecto del total de filas, filtros respetados y sin contraseñas")
+
+
+if __name__ == "__main__":
+    main()
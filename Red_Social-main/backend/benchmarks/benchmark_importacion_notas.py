@@ -0,0 +1,113 @@
+"""
+Benchmark de la importación de notas en bloque
+
+Genera un CSV de notas (por defecto 5000 filas, con un 2% de filas inválidas)
+y lo pasa por filas_csv + ImportadorNotas contra un cliente de Supabase
+simulado con latencia por consulta. Compara con cargar las mismas notas con
+POST /notas una por una (validación de token + insert por nota) y verifica
+que las filas inválidas se informan con su número y que reimportar el archivo
+no duplica notas.
+
+Uso:
+    python benchmarks/benchmark_importacion_notas.py [filas] [latencia_bd_ms]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.importacion_notas import ImportadorNotas, filas_csv
+from benchmarks import simulado
+
+ESTUDIANTES = 600
+MATERIAS = 40
+TIPOS = ("Primer Parcial", "Segundo Parcial", "Examen Final", "Práctica 1", "Práctica 2")
+PROPORCION_INVALIDAS = 0.02
+
+
+class ClienteSimulado(simulado.BaseSimulada):
+    def __init__(self, latencia: float):
+        super().__init__(latencia)
+        self.tablas = {
+            "estudiante": [{"id_user": f"u{i}", "ci_est": f"{7000000 + i}"} for i in range(ESTUDIANTES)],
+            "materia": [
+                {"id_materia": f"m{i}", "codigo_materia": f"MAT-{i:03d}", "id_doc": "DOC1"}
+                for i in range(MATERIAS)
+            ],
+            "docente": [{"ci_doc": "DOC1", "id_user": "docente"}],
+            "nota": [],
+        }
+
+
+def generar_csv(filas: int, semilla: int = 3):
+    """CSV separado por punto y coma (como lo exporta Excel) y filas inválidas esperadas"""
+    aleatorio = random.Random(semilla)
+    lineas = ["ci_est;codigo_materia;tipo_nota;nota"]
+    invalidas = set()
+    for numero in range(1, filas + 1):
+        # Combinaciones distintas: cada estudiante recibe todas sus notas una vez
+        indice = numero - 1
+        ci = 7000000 + indice % ESTUDIANTES
+        materia = f"MAT-{(indice // ESTUDIANTES) % MATERIAS:03d}"
+        tipo = TIPOS[(indice // (ESTUDIANTES * MATERIAS)) % len(TIPOS)]
+        nota = f"{aleatorio.uniform(0, 100):.1f}".replace(".", ",")
+        if aleatorio.random() < PROPORCION_INVALIDAS:
+            invalidas.add(numero)
+            nota, ci = aleatorio.choice([("150", ci), ("abc", ci), (nota, 999)])
+        lineas.append(f"{ci};{materia};{tipo};{nota}")
+    return ("\n".join(lineas) + "\n").encode("utf-8"), invalidas
+
+
+async def fragmentos(datos: bytes, tamano: int = 16384):
+    for inicio in range(0, len(datos), tamano):
+        yield datos[inicio:inicio + tamano]
+
+
+async def importar(cliente, datos: bytes):
+    importador = ImportadorNotas(cliente, {"id_user": "docente", "rol": "docente"})
+    async for fila in filas_csv(fragmentos(datos)):
+        importador.agregar(fila)
+    return importador.terminar()
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latencia = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000
+    datos, invalidas = generar_csv(filas)
+    print(f"{filas} filas ({len(datos) / 1024:.0f} KB, {len(invalidas)} inválidas), "
+          f"latencia BD {latencia * 1000:.0f} ms por consulta\n")
+
+    cliente = ClienteSimulado(latencia)
+    inicio = time.perf_counter()
+    resultado = asyncio.run(importar(cliente, datos))
+    duracion = time.perf_counter() - inicio
+    print(f"Importación en bloque: {duracion:.2f} s, {cliente.consultas} consultas, "
+          f"{resultado['importadas']} importadas, {resultado['rechazadas']} rechazadas")
+
+    # Una petición por nota: validar el token (1 consulta) + insert (1 consulta)
+    estimado = (filas - len(invalidas)) * 2 * latencia
+    print(f"Una por una (estimado): {estimado:.1f} s, {(filas - len(invalidas)) * 2} consultas")
+
+    reportadas = {error["fila"] for error in resultado["errores"]}
+    notas_antes = len(cliente.tablas["nota"])
+    asyncio.run(importar(cliente, datos))
+    print(f"Reimportación: {len(cliente.tablas['nota'])} notas guardadas (antes {notas_antes})\n")
+
+    if reportadas != invalidas:
+        print("❌ Las filas rechazadas no coinciden con las inválidas")
+        sys.exit(1)
+    if len(cliente.tablas["nota"]) != notas_antes or notas_antes != filas - len(invalidas):
+        print("❌ La reimportación duplicó o perdió notas")
+        sys.exit(1)
+    if filas >= 5000 and duracion > 5:
+        print("❌ La importación tardó más de 5 s")
+        sys.exit(1)
+    print("✅ Filas inválidas informadas con su número y reimportación sin duplicados")
+
+
+if __name__ == "__main__":
+    main()
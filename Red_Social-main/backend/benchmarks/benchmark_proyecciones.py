@@ -0,0 +1,158 @@
+"""
+Benchmark de proyecciones de columnas (select("*") contra vistas y fields=)
+
+Monta el router de usuarios contra un cliente de Supabase simulado que, como
+PostgREST, devuelve solo las columnas pedidas en select(). Para GET /usuarios
+(100 usuarios) compara:
+- antes: select("*") con la contraseña y borrado en Python
+- vista completa (sin fields)
+- fields=nombre,apellido,foto_perfil
+
+Informa los bytes que viajan de la BD a la API y de la API al cliente, y el
+tiempo de CPU por petición ("antes" sin el costo de TestClient, así que la
+comparación lo favorece; la transferencia desde la BD se estima con el ancho de
+banda dado). Verifica que ninguna respuesta ni consulta trae el hash.
+
+Uso:
+    python benchmarks/benchmark_proyecciones.py [ancho_banda_bd_mbps]
+"""
+import json
+import os
+import sys
+import time
+from typing import List
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+
+from app.database import get_db
+from app.models.usuario import Usuario
+from app.routes import usuarios
+from app.utils.dependencies import require_admin
+
+REPETICIONES = 200
+ADAPTADOR = TypeAdapter(List[Usuario])
+HASH = "$2b$12$" + "R9h/cIPz0gi.URNNX3kh2O" + "PST9/PgBkqquzi.Ss7KIUgO2t0jWMUW"
+
+
+def generar_usuarios(cantidad: int = 100):
+    return [
+        {
+            "id_user": f"{i:08d}-0000-4000-8000-000000000000",
+            "nombre": f"Nombre{i}",
+            "apellido": f"Apellido Segundo{i}",
+            "correo": f"usuario{i}@est.univalle.edu",
+            "contrasena": HASH,
+            "rol": "estudiante",
+            "fecha_registro": "2025-02-10T14:32:11.123456",
+            "activo": True,
+            "foto_perfil": f"https://storage.example.com/avatars/{i:08d}.jpg",
+        }
+        for i in range(cantidad)
+    ]
+
+
+class Consulta:
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.columnas = None
+
+    def select(self, columnas):
+        self.columnas = None if columnas.strip() == "*" else [c.strip() for c in columnas.split(",")]
+        return self
+
+    def eq(self, columna, valor):
+        return self
+
+    def range(self, desde, hasta):
+        return self
+
+    def execute(self):
+        filas = self.cliente.filas
+        if self.columnas is not None:
+            filas = [{c: f[c] for c in self.columnas} for f in filas]
+        self.cliente.bytes_bd += len(json.dumps(filas))
+        self.cliente.con_hash = self.cliente.con_hash or any("contrasena" in f for f in filas)
+        return type("Respuesta", (), {"data": filas})()
+
+
+class ClienteSimulado:
+    def __init__(self, filas):
+        self.filas = filas
+        self.bytes_bd = 0
+        self.con_hash = False
+
+    def table(self, nombre):
+        return Consulta(self)
+
+
+def antes(cliente):
+    """GET /usuarios como era: select("*"), borrar la contraseña, validar con List[Usuario]"""
+    filas = cliente.table("usuario").select("*").execute().data
+    sin_hash = [{k: v for k, v in f.items() if k != "contrasena"} for f in filas]
+    return ADAPTADOR.dump_json(ADAPTADOR.validate_python(sin_hash))
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        resultado = funcion()
+    return (time.perf_counter() - inicio) / REPETICIONES * 1000, resultado
+
+
+def main():
+    mbps = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    filas = generar_usuarios()
+
+    app = FastAPI()
+    app.include_router(usuarios.router)
+    app.dependency_overrides[require_admin] = lambda: {"id_user": "admin", "rol": "administrador"}
+    cliente_http = TestClient(app)
+
+    resultados = []
+    cliente = ClienteSimulado(filas)
+    ms, cuerpo = medir(lambda: antes(cliente))
+    resultados.append(("antes: select * + borrar hash", cliente.bytes_bd / REPETICIONES, len(cuerpo), ms, cliente.con_hash))
+
+    for nombre, url in (("vista completa", "/usuarios"), ("fields=nombre,apellido,foto_perfil", "/usuarios?fields=nombre,apellido,foto_perfil")):
+        cliente = ClienteSimulado(filas)
+        app.dependency_overrides[get_db] = lambda: cliente
+        ms, respuesta = medir(lambda: cliente_http.get(url))
+        if respuesta.status_code != 200:
+            print(f"❌ {url} respondió {respuesta.status_code}: {respuesta.text[:200]}")
+            sys.exit(1)
+        resultados.append((nombre, cliente.bytes_bd / REPETICIONES, len(respuesta.content), ms,
+                           cliente.con_hash or HASH in respuesta.text))
+
+    mala = cliente_http.get("/usuarios?fields=nombre,contrasena")
+
+    print(f"GET /usuarios con {len(filas)} usuarios; transferencia desde la BD estimada a {mbps:.0f} Mbps\n")
+    print(f"{'Modo':38} {'B BD->API':>10} {'B API->cliente':>15} {'ms CPU':>8} {'ms red BD':>10} {'hash':>5}")
+    for nombre, bytes_bd, bytes_api, ms, con_hash in resultados:
+        red = bytes_bd * 8 / (mbps * 1e6) * 1000
+        print(f"{nombre:38} {bytes_bd:10.0f} {bytes_api:15d} {ms:8.2f} {red:10.2f} {'sí' if con_hash else 'no':>5}")
+
+    base = resultados[0]
+    for nombre, bytes_bd, bytes_api, _, _ in resultados[1:]:
+        print(f"\n{nombre}: {100 * (1 - bytes_bd / base[1]):.0f}% menos bytes desde la BD, "
+              f"{100 * (1 - bytes_api / base[2]):.0f}% menos hacia el cliente", end="")
+    print(f"\nfields=nombre,contrasena -> {mala.status_code}\n")
+
+    if any(con_hash for *_, con_hash in resultados[1:]):
+        print("❌ El hash de la contraseña salió de la BD")
+        sys.exit(1)
+    if mala.status_code != 400:
+        print("❌ Se aceptó pedir la contraseña con fields")
+        sys.exit(1)
+    if resultados[1][2] != base[2]:
+        print("❌ La vista completa no devuelve lo mismo que antes")
+        sys.exit(1)
+    print("✅ Ninguna consulta trae el hash y fields reduce la respuesta")
+
+
+if __name__ == "__main__":
+    main()
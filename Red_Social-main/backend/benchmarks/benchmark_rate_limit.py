@@ -0,0 +1,185 @@
+"""
+Benchmark y verificación del límite de peticiones
+
+Llama directamente al middleware LimitadorPeticiones (sin servidor ni red)
+envolviendo una app ASGI vacía, para medir solo lo que agrega por petición:
+- overhead con token ya verificado, sin token (por IP) y con muchos usuarios
+- que un cliente en bucle sobre /notificaciones/no-leidas recibe 429 con
+  Retry-After y que otro usuario no se ve afectado
+- que el balde se recupera pasado el Retry-After
+- que X-Forwarded-For solo se respeta si viene de un proxy de confianza y
+  que POST /auth/login separa los baldes por correo (usuarios detrás de un
+  mismo NAT) sin perder el cuerpo del formulario, y que probar muchas
+  cuentas desde una IP se corta con el balde `login` de esa IP
+
+Uso:
+    python benchmarks/benchmark_rate_limit.py [repeticiones]
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.utils.rate_limit import LimitadorPeticiones, AlmacenMemoria, ip_cliente, parsear_proxies
+from app.utils.security import create_access_token
+
+OBJETIVO_US = 50
+API = settings.API_V1_STR
+
+
+async def app_vacia(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def crear_scope(path: str, token: str = None, ip: str = "10.0.0.1") -> dict:
+    headers = [(b"host", b"api.local"), (b"user-agent", b"app-movil/1.0")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": "GET", "path": path, "headers": headers, "client": (ip, 5000)}
+
+
+class RespuestaASGI:
+    """`send` de ASGI que guarda el estado y los headers de la respuesta"""
+
+    def __init__(self):
+        self.status, self.headers = None, {}
+
+    async def __call__(self, mensaje):
+        if mensaje["type"] == "http.response.start":
+            self.status = mensaje["status"]
+            self.headers = {k.decode(): v.decode() for k, v in mensaje["headers"]}
+
+
+async def recibir():
+    return {"type": "http.request", "body": b""}
+
+
+async def medir(app, scopes, repeticiones: int) -> float:
+    """Microsegundos promedio por petición"""
+    enviar = RespuestaASGI()
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        await app(scopes[i % len(scopes)], recibir, enviar)
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+async def overhead(repeticiones: int):
+    sin_limite = "auth=1e9/1,busqueda=1e9/1,sondeo=1e9/1,mensajeria=1e9/1,subidas=1e9/1,general=1e9/1"
+    limitador = LimitadorPeticiones(app_vacia, limites=sin_limite, almacen=AlmacenMemoria())
+    tokens = [create_access_token({"sub": f"{i:08d}-0000-0000-0000-000000000000"}) for i in range(1000)]
+    rutas = [f"{API}/notificaciones/no-leidas", f"{API}/amigos/buscar", f"{API}/publicaciones", f"{API}/mensajes"]
+
+    escenarios = [
+        ("Token ya verificado (1 usuario)", [crear_scope(r, tokens[0]) for r in rutas]),
+        ("Sin token, por IP", [crear_scope(r, ip=f"10.0.{i}.1") for i, r in enumerate(rutas)]),
+        ("1.000 usuarios alternados", [crear_scope(rutas[i % 4], t) for i, t in enumerate(tokens)]),
+        ("Ruta fuera de la API (/health)", [crear_scope("/health")]),
+    ]
+    # Primera pasada: verificar las firmas (costo de una vez por token)
+    inicio = time.perf_counter()
+    await medir(limitador, escenarios[2][1], len(tokens))
+    primera = (time.perf_counter() - inicio) / len(tokens) * 1e6
+
+    base = await medir(app_vacia, escenarios[0][1], repeticiones)
+    print(f"App vacía sin middleware: {base:.2f} µs/petición\n")
+    print(f"{'Escenario':35} {'µs/petición':>12} {'overhead µs':>12}")
+    resultados = []
+    for nombre, scopes in escenarios:
+        total = await medir(limitador, scopes, repeticiones)
+        resultados.append(total - base)
+        print(f"{nombre:35} {total:12.2f} {total - base:12.2f}")
+    print(f"{'Primera vez que se ve un token':35} {primera:12.2f} {primera - base:12.2f}")
+    return max(resultados)
+
+
+async def verificar_429():
+    limitador = LimitadorPeticiones(app_vacia, limites="sondeo=5/1", almacen=AlmacenMemoria())
+    abusivo = crear_scope(f"{API}/notificaciones/no-leidas", create_access_token({"sub": "abusivo"}))
+    normal = crear_scope(f"{API}/notificaciones/no-leidas", create_access_token({"sub": "normal"}))
+
+    codigos, retry_after = [], None
+    for _ in range(50):
+        respuesta = RespuestaASGI()
+        await limitador(abusivo, recibir, respuesta)
+        codigos.append(respuesta.status)
+        retry_after = respuesta.headers.get("retry-after", retry_after)
+    print(f"\nBucle de 50 peticiones con límite 5/s: {codigos.count(200)} × 200, "
+          f"{codigos.count(429)} × 429, Retry-After: {retry_after}")
+
+    respuesta = RespuestaASGI()
+    await limitador(normal, recibir, respuesta)
+    print(f"Otro usuario en la misma ruta: {respuesta.status}")
+
+    await asyncio.sleep(float(retry_after))
+    respuesta = RespuestaASGI()
+    await limitador(abusivo, recibir, respuesta)
+    print(f"Después de esperar Retry-After: {respuesta.status}")
+    return codigos.count(200) == 5 and respuesta.status == 200
+
+
+async def verificar_sujetos():
+    proxies = parsear_proxies("10.0.0.0/8")
+    reenviada = crear_scope(f"{API}/auth/register", ip="10.0.0.5")
+    reenviada["headers"].append((b"x-forwarded-for", b"6.6.6.6, 200.87.1.10, 10.1.2.3"))
+    directa = crear_scope(f"{API}/auth/register", ip="190.1.1.1")
+    directa["headers"].append((b"x-forwarded-for", b"6.6.6.6"))
+    ips = [ip_cliente(reenviada, proxies), ip_cliente(directa, proxies), ip_cliente(reenviada, [])]
+    print(f"\nIP detrás de un proxy de confianza: {ips[0]}, X-Forwarded-For de un cliente directo: {ips[1]}, "
+          f"sin proxies configurados: {ips[2]}")
+
+    recibidos = []
+
+    async def app_login(scope, receive, send):
+        recibidos.append((await receive())["body"])
+        await app_vacia(scope, receive, send)
+
+    async def login(limitador, correo: str) -> int:
+        scope = {**crear_scope(f"{API}/auth/login", ip="200.87.1.10"), "method": "POST"}
+        cuerpo = f"username={correo}&password=x".encode()
+
+        async def recibir_formulario():
+            return {"type": "http.request", "body": cuerpo, "more_body": False}
+
+        respuesta = RespuestaASGI()
+        await limitador(scope, recibir_formulario, respuesta)
+        return respuesta.status
+
+    limitador = LimitadorPeticiones(app_login, limites="auth=3/60,login=100/60", almacen=AlmacenMemoria())
+    codigos = {}
+    for correo in ("ana@univalle.edu", "beto@univalle.edu"):
+        for _ in range(5):
+            codigos.setdefault(correo, []).append(await login(limitador, correo))
+    print("Login desde la misma IP con límite 3 por cuenta: " + ", ".join(
+        f"{correo} {c.count(200)} × 200" for correo, c in codigos.items()
+    ))
+
+    limitador = LimitadorPeticiones(app_login, limites="auth=3/60,login=10/60", almacen=AlmacenMemoria())
+    probadas = [await login(limitador, f"cuenta{i}@univalle.edu") for i in range(50)]
+    print(f"50 cuentas distintas desde una IP con límite 10 por IP: {probadas.count(200)} × 200, "
+          f"{probadas.count(429)} × 429")
+    return (
+        ips == ["200.87.1.10", "190.1.1.1", "10.0.0.5"]
+        and all(c.count(200) == 3 for c in codigos.values())
+        and probadas.count(200) == 10
+        and all(b.startswith(b"username=") for b in recibidos)
+    )
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    peor = asyncio.run(overhead(repeticiones))
+    correcto = asyncio.run(verificar_429()) and asyncio.run(verificar_sujetos())
+
+    if peor > OBJETIVO_US or not correcto:
+        print(f"\n❌ Overhead máximo {peor:.2f} µs (objetivo < {OBJETIVO_US} µs) o límites incorrectos")
+        sys.exit(1)
+    print(f"\n✅ Overhead máximo {peor:.2f} µs (objetivo < {OBJETIVO_US} µs)")
+
+
+if __name__ == "__main__":
+    main()
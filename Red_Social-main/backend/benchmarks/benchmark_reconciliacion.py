@@ -0,0 +1,209 @@
+"""
+Benchmark de la reconciliación de usuario con estudiante y docente
+
+Arma una base en memoria (con las claves únicas de estudiante y docente y
+latencia por petición) con usuarios sin registro, estudiantes con CIs
+temporales "EST..." y registros cuyo usuario cambió de rol, y:
+
+- Compara aplicar el plan fila por fila (lotes de 1, sin concurrencia, como
+  los scripts sync_* anteriores) con los lotes concurrentes.
+- Corta el proceso a mitad de camino, incluso entre el borrado y el insert
+  de un lote de CIs corregidos, y verifica que --reanudar desde el punto de
+  control deja todo consistente sin perder carrera, semestre ni grupo.
+
+Uso:
+    python benchmarks/benchmark_reconciliacion.py [usuarios] [latencia_bd_ms]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.reconciliacion import PuntoControl, aplicar, es_ci_valido, planificar
+from benchmarks import simulado
+
+PROPORCION_DOCENTES = 0.08
+PROPORCION_FALTANTES = 0.15
+PROPORCION_CI_TEMPORAL = 0.05
+PROPORCION_CAMBIO_ROL = 0.01
+
+
+class Corte(BaseException):
+    """Simula que el proceso muere (no la atrapa el reintento por fila)"""
+
+
+class BaseSimulada(simulado.BaseSimulada):
+    def __init__(self, usuarios: int, latencia: float, semilla: int = 3):
+        super().__init__(latencia)
+        self.escrituras = 0
+        self.cortar_en = None
+        self.cortar_tras_borrar = None
+        self.con_ci_user = True
+        self.tablas = {"usuario": {}, "estudiante": {}, "docente": {}}
+
+        aleatorio = random.Random(semilla)
+        for i in range(usuarios):
+            id_user = f"{i:08x}-0000-4000-8000-{aleatorio.getrandbits(48):012x}"
+            rol = "docente" if aleatorio.random() < PROPORCION_DOCENTES else "estudiante"
+            ci = str(3000000 + i)
+            self.tablas["usuario"][id_user] = {"id_user": id_user, "rol": rol, "ci_user": ci}
+            if aleatorio.random() < PROPORCION_FALTANTES:
+                continue
+            registrado = rol
+            if aleatorio.random() < PROPORCION_CAMBIO_ROL:
+                registrado = "docente" if rol == "estudiante" else "estudiante"
+            if registrado == "estudiante":
+                if aleatorio.random() < PROPORCION_CI_TEMPORAL:
+                    ci = f"EST{id_user[-8:]}"
+                self.tablas["estudiante"][ci] = {
+                    "ci_est": ci, "id_user": id_user, "carrera": f"Carrera {i % 12}",
+                    "semestre": i % 10 + 1, "id_grupo": f"g{i % 30}"
+                }
+            else:
+                self.tablas["docente"][ci] = {"ci_doc": ci, "id_user": id_user, "especialidad_doc": "Sistemas"}
+
+    def antes_de_ejecutar(self, consulta):
+        if consulta.operacion == "select":
+            if "ci_user" in simulado.parsear_columnas(consulta.columnas)[1] and not self.con_ci_user:
+                raise Exception("column usuario.ci_user does not exist")
+            return
+        self.escrituras += 1
+        if self.cortar_en == self.escrituras:
+            raise Corte()
+        if consulta.tabla != "estudiante":
+            return
+        if self.cortar_tras_borrar == "borrado" and consulta.operacion == "upsert":
+            # Entre el delete y el insert de un lote de CIs corregidos
+            self.cortar_tras_borrar = "cortado"
+            raise Corte()
+        if self.cortar_tras_borrar == "pendiente" and consulta.operacion == "delete":
+            self.cortar_tras_borrar = "borrado"
+
+    def copia(self):
+        otra = BaseSimulada.__new__(BaseSimulada)
+        otra.__dict__.update(self.__dict__)
+        otra.candado = threading.Lock()
+        otra.tablas = {t: {k: dict(f) for k, f in filas.items()} for t, filas in self.tablas.items()}
+        return otra
+
+
+def verificar(base: BaseSimulada, original: BaseSimulada) -> list:
+    """Problemas que quedan después de reconciliar"""
+    problemas = []
+    for tabla in ("estudiante", "docente"):
+        clave = simulado.clave(tabla)
+        por_usuario = {}
+        for fila in base.tablas[tabla].values():
+            por_usuario.setdefault(fila["id_user"], []).append(fila)
+        for usuario in base.tablas["usuario"].values():
+            filas = por_usuario.get(usuario["id_user"], [])
+            if usuario["rol"] == tabla and len(filas) != 1:
+                problemas.append(f"{usuario['id_user']} tiene {len(filas)} filas en {tabla}")
+            if usuario["rol"] != tabla and filas:
+                problemas.append(f"{usuario['id_user']} sigue en {tabla} sin el rol")
+            if usuario["rol"] == tabla and filas and tabla == "estudiante" and not es_ci_valido(filas[0][clave]):
+                problemas.append(f"{usuario['id_user']} sigue con CI {filas[0][clave]}")
+
+    # Los estudiantes con CI corregido conservan sus datos
+    antes = {f["id_user"]: f for f in original.tablas["estudiante"].values()}
+    for fila in base.tablas["estudiante"].values():
+        previa = antes.get(fila["id_user"])
+        if previa and any(previa[c] != fila[c] for c in ("carrera", "semestre", "id_grupo")):
+            problemas.append(f"{fila['id_user']} perdió datos al corregir el CI")
+    return problemas
+
+
+def correr(base: BaseSimulada, tamano: int, concurrencia: int, ruta: str, cortar_en=None):
+    punto_control = PuntoControl(ruta)
+    punto_control.borrar()
+    base.consultas = 0
+    inicio = time.perf_counter()
+    plan = planificar(base, eliminar_sobrantes=True)
+    lectura = time.perf_counter() - inicio
+    punto_control.iniciar(plan, tamano)
+
+    cortes = 0
+    base.cortar_en = cortar_en
+    base.cortar_tras_borrar = "pendiente" if cortar_en else None
+    while True:
+        try:
+            estado = aplicar(base, punto_control.cargar(), punto_control, concurrencia)
+            break
+        except Corte:
+            # Reanudar como lo haría --reanudar después de la caída
+            cortes += 1
+            base.cortar_en = base.escrituras + 7 if cortes < 2 else None
+    punto_control.borrar()
+    return {
+        "plan": plan,
+        "lectura_s": lectura,
+        "total_s": time.perf_counter() - inicio,
+        "peticiones": base.consultas,
+        "cortes": cortes,
+        "errores": estado["cantidad_errores"],
+    }
+
+
+def main():
+    usuarios = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    latencia_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    original = BaseSimulada(usuarios, latencia_ms / 1000)
+    ruta = os.path.join(tempfile.gettempdir(), "benchmark_reconciliacion.json")
+    print(f"{usuarios} usuarios, latencia {latencia_ms:.1f} ms por petición")
+
+    ok = True
+    resultados = {}
+    for nombre, tamano, concurrencia, cortar_en in (
+        ("Fila por fila", 1, 1, None),
+        ("Lotes concurrentes", 500, 4, None),
+        ("Lotes con caídas", 50, 4, 5),
+    ):
+        base = original.copia()
+        resultado = correr(base, tamano, concurrencia, ruta, cortar_en)
+        resultados[nombre] = resultado
+        problemas = verificar(base, original)
+        print(f"\n{nombre} (lotes de {tamano}, {concurrencia} a la vez):")
+        print(f"   Diferencias: {resultado['lectura_s']:.2f}s - Total: {resultado['total_s']:.2f}s "
+              f"- Peticiones: {resultado['peticiones']} - Caídas: {resultado['cortes']}")
+        if cortar_en and base.cortar_tras_borrar != "cortado":
+            print("❌ No se simuló la caída entre el borrado y el insert de CIs corregidos")
+            ok = False
+        if problemas or resultado["errores"]:
+            print(f"❌ {len(problemas)} inconsistencias, {resultado['errores']} errores: {problemas[:3]}")
+            ok = False
+
+    resumen = resultados["Lotes concurrentes"]["plan"]["resumen"]
+    print(f"\nPlan: {resumen}")
+    mejora = resultados["Fila por fila"]["total_s"] / resultados["Lotes concurrentes"]["total_s"]
+    print(f"Lotes concurrentes: {mejora:.1f}x más rápido que fila por fila")
+
+    # Segunda pasada sobre una base ya reconciliada: plan vacío
+    base = original.copia()
+    correr(base, 500, 4, ruta)
+    if planificar(base)["operaciones"]:
+        print("❌ Una segunda reconciliación todavía encuentra diferencias")
+        ok = False
+
+    # Sin la columna usuario.ci_user se generan CIs numéricos
+    base = original.copia()
+    base.con_ci_user = False
+    correr(base, 500, 4, ruta)
+    if verificar(base, original):
+        print("❌ Sin usuario.ci_user la reconciliación queda inconsistente")
+        ok = False
+
+    if ok and mejora > 1:
+        print("\n✅ Reconciliación consistente, reanudable y más rápida en lotes")
+    else:
+        print("\n❌ Falló alguna verificación")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark del resumen de reacciones
+
+Compara lo que viajaba antes para mostrar las reacciones de una página del
+feed (todas las filas de reaccion de cada publicación, una llamada por
+publicación) con el resumen: una sola llamada a GET /reacciones/resumen con
+toda la página, que trae conteos por tipo, las reacciones propias y los
+últimos perfiles. La función resumen_reacciones se simula en Python sobre
+una base en memoria con latencia fija por llamada.
+
+Verifica que los conteos y `mis_reacciones` coinciden con contar las filas,
+y que el listado paginado con `antes`/`antes_id` recorre todas las
+reacciones sin repetir ni saltear aunque muchas compartan la fecha.
+
+Uso:
+    python benchmarks/benchmark_resumen_reacciones.py [latencia_bd_ms] [reacciones_por_publicacion]
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.social import Reaccion, ResumenReacciones
+from app.routes.reacciones import get_reaccionantes_publicacion, get_resumen_reacciones
+from benchmarks import simulado
+
+YO = "u0000"
+PAGINA = 20
+TIPOS = ["like", "dislike", "love", "wow", "sad", "angry"]
+INICIO = datetime(2025, 3, 1)
+
+
+class BaseSimulada(simulado.BaseSimulada):
+    def __init__(self, publicaciones: int, reacciones: int, latencia: float, semilla: int = 11):
+        super().__init__(latencia)
+        aleatorio = random.Random(semilla)
+        self.publicaciones = [f"p{i:04d}" for i in range(publicaciones)]
+        perfiles = {
+            f"u{i:04d}": {"id_user": f"u{i:04d}", "nombre": f"Nombre{i}", "apellido": f"Apellido{i}", "foto_perfil": f"https://cdn/u{i}.jpg"}
+            for i in range(reacciones * 2)
+        }
+        usuarios = list(perfiles)
+        filas = []
+        for id_publicacion in self.publicaciones:
+            vistos = set()
+            while len(vistos) < aleatorio.randint(reacciones // 2, reacciones):
+                clave = (aleatorio.choice(usuarios), aleatorio.choice(TIPOS[:3] if aleatorio.random() < 0.9 else TIPOS))
+                if clave in vistos:
+                    continue
+                vistos.add(clave)
+                filas.append({
+                    "id_reaccion": f"r{len(filas):07d}", "id_user": clave[0], "tipo_reac": clave[1],
+                    "id_publicacion": id_publicacion, "id_comentario": None,
+                    "fecha_creacion_reac": (INICIO + timedelta(seconds=aleatorio.randint(0, 300))).isoformat(),
+                })
+            if aleatorio.random() < 0.5:
+                filas.append({
+                    "id_reaccion": f"r{len(filas):07d}", "id_user": YO, "tipo_reac": "love",
+                    "id_publicacion": id_publicacion, "id_comentario": None,
+                    "fecha_creacion_reac": INICIO.isoformat(),
+                })
+        perfiles[YO] = {"id_user": YO, "nombre": "Yo", "apellido": "", "foto_perfil": None}
+        self.tablas = {"usuario": perfiles, "reaccion": filas}
+
+    def resumen_reacciones(self, parametros):
+        """Conteos (ya guardados), propias y últimos perfiles"""
+        filas = []
+        for id_publicacion in parametros["p_publicaciones"]:
+            propias = [r for r in self.tablas["reaccion"] if r["id_publicacion"] == id_publicacion]
+            if not propias:
+                continue
+            ultimos = {}
+            for r in sorted(propias, key=lambda r: r["fecha_creacion_reac"], reverse=True):
+                ultimos.setdefault(r["id_user"], r)
+            filas.append({
+                "id_publicacion": id_publicacion,
+                "id_comentario": None,
+                "conteos": dict(Counter(r["tipo_reac"] for r in propias)),
+                "mis_reacciones": sorted(r["tipo_reac"] for r in propias if r["id_user"] == parametros["p_id_user"]),
+                "usuarios": [self.tablas["usuario"][u] for u in list(ultimos)[:parametros["p_usuarios"]]],
+            })
+        return filas
+
+
+def main():
+    latencia_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    reacciones = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    base = BaseSimulada(PAGINA, reacciones, latencia_ms / 1000)
+    yo = {"id_user": YO}
+    print(f"Página de {PAGINA} publicaciones con hasta {reacciones} reacciones, latencia {latencia_ms:.1f} ms\n")
+
+    ok = True
+    # Antes: todas las filas de cada publicación, una llamada por publicación
+    base.consultas = 0
+    inicio = time.perf_counter()
+    filas = {
+        p: [Reaccion(**r).model_dump(mode="json") for r in base.tablas["reaccion"] if r["id_publicacion"] == p]
+        for p in base.publicaciones
+    }
+    time.sleep(base.latencia * PAGINA)
+    duracion_antes = time.perf_counter() - inicio
+    bytes_antes = len(json.dumps(filas))
+
+    # Ahora: un resumen de toda la página en una llamada
+    base.consultas = 0
+    inicio = time.perf_counter()
+    resumenes = asyncio.run(get_resumen_reacciones(
+        publicaciones=",".join(base.publicaciones), comentarios=None, usuarios=3, db=base, current_user=yo
+    ))
+    resumenes = [ResumenReacciones(**r).model_dump(mode="json") for r in resumenes]
+    duracion_ahora = time.perf_counter() - inicio
+    bytes_ahora = len(json.dumps(resumenes))
+
+    print(f"{'Todas las filas':<20} {PAGINA:4d} llamadas  {bytes_antes / 1024:9.1f} KB  {duracion_antes * 1000:7.1f} ms")
+    print(f"{'Resumen en lote':<20} {base.consultas:4d} llamadas  {bytes_ahora / 1024:9.1f} KB  {duracion_ahora * 1000:7.1f} ms")
+    print(f"\nRespuesta {bytes_antes / bytes_ahora:.0f}x más chica")
+
+    for resumen in resumenes:
+        propias = filas[resumen["id_publicacion"]]
+        conteos = dict(Counter(r["tipo_reac"] for r in propias))
+        mias = sorted(r["tipo_reac"] for r in propias if r["id_user"] == YO)
+        if resumen["conteos"] != conteos or resumen["total"] != len(propias) or resumen["mis_reacciones"] != mias:
+            print(f"❌ El resumen de {resumen['id_publicacion']} no coincide con las filas")
+            ok = False
+        if len(resumen["usuarios"]) != min(3, len({r["id_user"] for r in propias})):
+            print(f"❌ {resumen['id_publicacion']} trae {len(resumen['usuarios'])} perfiles")
+            ok = False
+
+    # Listado paginado de una publicación con `antes`
+    id_publicacion = base.publicaciones[0]
+    vistas, antes, antes_id, paginas = [], None, None, 0
+    while True:
+        pagina = asyncio.run(get_reaccionantes_publicacion(
+            id_publicacion, tipo=None, antes=antes, antes_id=antes_id, limit=100, db=base, current_user=yo
+        ))
+        if not pagina:
+            break
+        paginas += 1
+        vistas += [r["id_reaccion"] for r in pagina]
+        antes = datetime.fromisoformat(pagina[-1]["fecha_creacion_reac"])
+        antes_id = pagina[-1]["id_reaccion"]
+    esperadas = [r["id_reaccion"] for r in base.tablas["reaccion"] if r["id_publicacion"] == id_publicacion]
+    print(f"Listado: {len(set(vistas))}/{len(esperadas)} reacciones en {paginas} páginas de 100")
+    if sorted(vistas) != sorted(esperadas):
+        print("❌ El listado paginado repite o pierde reacciones")
+        ok = False
+
+    if ok and bytes_ahora < bytes_antes:
+        print("\n✅ Resúmenes correctos y listado paginado")
+    else:
+        print("\n❌ Falló alguna verificación")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark de throughput con 1, 2, 4 y 8 workers de Gunicorn
+
+Para cada cantidad de workers levanta `gunicorn -c gunicorn.conf.py` con
+benchmarks/app_carga.py, le aplica carga concurrente durante unos segundos y
+mide peticiones por segundo y latencias. Al final verifica:
+- el reciclado de workers (MAX_REQUESTS bajo: deben aparecer pids nuevos)
+- el drenaje en SIGTERM (las peticiones en curso terminan con 200)
+
+Uso:
+    python benchmarks/benchmark_workers.py [--workers 1 2 4 8] [--duracion 10] [--concurrencia 64]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUERTO = 8765
+URL = f"http://127.0.0.1:{PUERTO}"
+
+
+def levantar(workers: int, **entorno) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "BIND": f"127.0.0.1:{PUERTO}",
+        "WEB_CONCURRENCY": str(workers),
+        "LOG_LEVEL": "warning",
+        **entorno,
+    }
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "benchmarks.app_carga:app"],
+        cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"{URL}/health", timeout=1).json().get("ready"):
+                return proceso
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.2)
+    proceso.kill()
+    raise SystemExit("❌ El servidor no arrancó")
+
+
+def detener(proceso: subprocess.Popen) -> int:
+    proceso.send_signal(signal.SIGTERM)
+    return proceso.wait(timeout=60)
+
+
+async def cargar(duracion: float, concurrencia: int):
+    latencias, errores = [], 0
+    fin = time.monotonic() + duracion
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=URL, limits=limites, timeout=30) as cliente:
+        async def usuario():
+            nonlocal errores
+            while time.monotonic() < fin:
+                inicio = time.perf_counter()
+                try:
+                    respuesta = await cliente.get("/carga")
+                    if respuesta.status_code != 200:
+                        errores += 1
+                except httpx.HTTPError:
+                    errores += 1
+                latencias.append((time.perf_counter() - inicio) * 1000)
+        inicio = time.monotonic()
+        await asyncio.gather(*(usuario() for _ in range(concurrencia)))
+        transcurrido = time.monotonic() - inicio
+    latencias.sort()
+    return {
+        "rps": len(latencias) / transcurrido,
+        "p50": latencias[len(latencias) // 2],
+        "p95": latencias[int(len(latencias) * 0.95)],
+        "errores": errores,
+    }
+
+
+async def pids_vistos(muestras: int = 40) -> set:
+    async with httpx.AsyncClient(base_url=URL, timeout=5) as cliente:
+        respuestas = await asyncio.gather(*(cliente.get("/health") for _ in range(muestras)))
+    return {r.json()["worker"]["pid"] for r in respuestas}
+
+
+async def verificar_drenaje(proceso: subprocess.Popen) -> str:
+    """Manda SIGTERM con peticiones lentas en curso y revisa que todas terminen"""
+    async with httpx.AsyncClient(base_url=URL, timeout=30) as cliente:
+        pendientes = [asyncio.create_task(cliente.get("/carga", params={"ms": 1500})) for _ in range(4)]
+        await asyncio.sleep(0.3)
+        proceso.send_signal(signal.SIGTERM)
+        resultados = await asyncio.gather(*pendientes, return_exceptions=True)
+    correctas = sum(1 for r in resultados if not isinstance(r, Exception) and r.status_code == 200)
+    codigo = proceso.wait(timeout=60)
+    return f"{correctas}/{len(pendientes)} peticiones en curso completadas, código de salida {codigo}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput por cantidad de workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duracion", type=float, default=10)
+    parser.add_argument("--concurrencia", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"Núcleos: {os.cpu_count()}  duración: {args.duracion}s  concurrencia: {args.concurrencia}\n")
+    print(f"| workers | req/s | p50 ms | p95 ms | errores |")
+    print(f"|--------:|------:|-------:|-------:|--------:|")
+    for workers in args.workers:
+        proceso = levantar(workers, MAX_REQUESTS="0")
+        try:
+            r = asyncio.run(cargar(args.duracion, args.concurrencia))
+        finally:
+            detener(proceso)
+        print(f"| {workers} | {r['rps']:.0f} | {r['p50']:.1f} | {r['p95']:.1f} | {r['errores']} |")
+
+    print("\nReciclado de workers (2 workers, MAX_REQUESTS=200):")
+    proceso = levantar(2, MAX_REQUESTS="200", MAX_REQUESTS_JITTER="20")
+    try:
+        antes = asyncio.run(pids_vistos())
+        asyncio.run(cargar(3, 16))
+        despues = asyncio.run(pids_vistos())
+        print(f"  pids antes: {sorted(antes)}  después: {sorted(despues)}")
+    finally:
+        detener(proceso)
+
+    print("\nDrenaje en SIGTERM (2 workers):")
+    proceso = levantar(2, MAX_REQUESTS="0")
+    print(f"  {asyncio.run(verificar_drenaje(proceso))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Perfil de imports al arranque y verificación del presupuesto de tiempo
+
+Importa app.main en un proceso nuevo con `python -X importtime`, muestra los
+módulos que más tardan y termina con código 1 si el import supera
+STARTUP_IMPORT_BUDGET_MS, para poder usarlo como verificación en CI.
+
+Se toma el mejor de varios intentos para no fallar por ruido de la máquina.
+
+Uso:
+    python benchmarks/perfil_arranque.py [--lazy] [--intentos N] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+from app.config import settings
+
+CODIGO_IMPORT = (
+    "import time; inicio = time.perf_counter(); import app.main; "
+    "print((time.perf_counter() - inicio) * 1000)"
+)
+
+
+def medir_import(lazy: bool):
+    """
+    Importa app.main en un subproceso
+
+    Returns:
+        Tupla (milisegundos, líneas de -X importtime)
+    """
+    env = {**os.environ, "LAZY_STARTUP": "true" if lazy else "false"}
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CODIGO_IMPORT],
+        cwd=RAIZ, env=env, capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        print(proceso.stderr[-2000:])
+        raise SystemExit(f"❌ No se pudo importar app.main (código {proceso.returncode})")
+    return float(proceso.stdout.strip().splitlines()[-1]), proceso.stderr.splitlines()
+
+
+def modulos_mas_lentos(lineas, top: int):
+    """
+    Módulos importados directamente por app.main ordenados por tiempo acumulado
+
+    Returns:
+        Lista de (milisegundos acumulados, módulo)
+    """
+    # -X importtime escribe los hijos antes que el padre: se juntan los de
+    # primer nivel de sangría hasta llegar a la línea de app.main
+    modulos, pendientes = {}, {}
+    for linea in lineas:
+        if not linea.startswith("import time:") or "|" not in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        if not acumulado.strip().isdigit():
+            continue
+        profundidad = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        if profundidad == 1:
+            pendientes[nombre.strip()] = int(acumulado) / 1000
+        elif profundidad == 0:
+            if nombre.strip() == "app.main":
+                modulos = pendientes
+            pendientes = {}
+    return sorted(((ms, nombre) for nombre, ms in modulos.items()), reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de imports de app.main")
+    parser.add_argument("--lazy", action="store_true", help="Medir con LAZY_STARTUP=true")
+    parser.add_argument("--intentos", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    mejor, lineas = None, []
+    for _ in range(args.intentos):
+        ms, salida = medir_import(args.lazy)
+        if mejor is None or ms < mejor:
+            mejor, lineas = ms, salida
+
+    modo = "diferido (LAZY_STARTUP)" if args.lazy else "completo"
+    print(f"Arranque {modo}: import de app.main en {mejor:.0f} ms (mejor de {args.intentos})\n")
+    print(f"{'ms':>8}  módulo")
+    for ms, nombre in modulos_mas_lentos(lineas, args.top):
+        print(f"{ms:8.1f}  {nombre}")
+
+    presupuesto = settings.STARTUP_IMPORT_BUDGET_MS
+    if mejor > presupuesto:
+        print(f"\n❌ El arranque supera el presupuesto de {presupuesto} ms")
+        sys.exit(1)
+    print(f"\n✅ Dentro del presupuesto de {presupuesto} ms")
+
+
+if __name__ == "__main__":
+    main()
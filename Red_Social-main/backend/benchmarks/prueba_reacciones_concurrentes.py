@@ -0,0 +1,128 @@
+"""
+Prueba de concurrencia de alternar_reaccion contra una base real
+
+Necesita PostgreSQL de verdad (los índices únicos y la transacción son los
+que se prueban), con reacciones_atomicas.sql aplicado: por ejemplo
+`supabase start` y --url http://localhost:54321 --key <service key>.
+Usa una publicación existente y usuarios existentes, y no envía
+notificaciones.
+
+Dispara 100 toques a la vez (todos esperan en una barrera):
+
+1. Doble toque: el mismo usuario alterna la misma reacción 100 veces. Al
+   final la reacción queda como estaba (cantidad par), sin duplicados, y
+   las respuestas activas menos las inactivas suman el cambio.
+2. Muchos usuarios: hasta 100 usuarios distintos reaccionan a la vez; el
+   conteo guardado coincide con COUNT(*) y con lo que devolvió el último.
+3. Los mismos usuarios vuelven a tocar a la vez y todo vuelve al inicio.
+
+Uso:
+    python benchmarks/prueba_reacciones_concurrentes.py --url URL --key KEY [--publicacion ID] [--tipo wow]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase import create_client
+
+from app.services.reacciones import alternar_reaccion
+
+TOQUES = 100
+
+
+def en_simultaneo(args, llamadas):
+    """Ejecuta las llamadas a la vez, cada una con su propio cliente"""
+    clientes = [create_client(args.url, args.key) for _ in llamadas]
+    barrera = threading.Barrier(len(llamadas))
+
+    def tocar(indice):
+        barrera.wait()
+        return alternar_reaccion(clientes[indice], *llamadas[indice])
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(llamadas)) as pool:
+        resultados = list(pool.map(tocar, range(len(llamadas))))
+    return resultados, time.perf_counter() - inicio
+
+
+def estado(db, id_publicacion, tipo):
+    """Filas de reacción del tipo y el conteo guardado en la publicación"""
+    filas = db.table("reaccion").select("id_user") \
+        .eq("id_publicacion", id_publicacion).eq("tipo_reac", tipo).execute().data
+    publicacion = db.table("publicacion").select("conteo_reacciones") \
+        .eq("id_publicacion", id_publicacion).execute().data[0]
+    return filas, (publicacion["conteo_reacciones"] or {}).get(tipo, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Toques simultáneos sobre alternar_reaccion")
+    parser.add_argument("--url", required=True, help="URL de Supabase")
+    parser.add_argument("--key", required=True, help="Service key")
+    parser.add_argument("--publicacion", help="Publicación (por defecto la más reciente)")
+    parser.add_argument("--tipo", default="wow", help="Tipo de reacción a alternar")
+    args = parser.parse_args()
+
+    db = create_client(args.url, args.key)
+    id_publicacion = args.publicacion or db.table("publicacion").select("id_publicacion") \
+        .order("fecha_creacion", desc=True).limit(1).execute().data[0]["id_publicacion"]
+    usuarios = [u["id_user"] for u in db.table("usuario").select("id_user").limit(TOQUES).execute().data]
+    print(f"Publicación {id_publicacion}, tipo '{args.tipo}', {len(usuarios)} usuarios")
+
+    ok = True
+    filas, conteo_inicial = estado(db, id_publicacion, args.tipo)
+    iniciales = {f["id_user"] for f in filas}
+
+    # 1. Doble toque del mismo usuario
+    yo = usuarios[0]
+    llamadas = [(yo, args.tipo, id_publicacion, None, None)] * TOQUES
+    resultados, duracion = en_simultaneo(args, llamadas)
+    activas = sum(1 for r in resultados if r["activa"])
+    filas, conteo = estado(db, id_publicacion, args.tipo)
+    mias = sum(1 for f in filas if f["id_user"] == yo)
+    print(f"\n1. {TOQUES} toques del mismo usuario en {duracion:.2f}s: {activas} crearon, {TOQUES - activas} quitaron")
+    if mias != (yo in iniciales):
+        print(f"❌ Quedaron {mias} reacciones del usuario (esperaba {int(yo in iniciales)})")
+        ok = False
+    if activas - (TOQUES - activas) != 0:
+        print("❌ Los toques que crearon y los que quitaron no se compensan")
+        ok = False
+    if conteo != len(filas):
+        print(f"❌ Conteo guardado {conteo}, filas {len(filas)}")
+        ok = False
+
+    # 2. Muchos usuarios a la vez
+    llamadas = [(u, args.tipo, id_publicacion, None, None) for u in usuarios]
+    resultados, duracion = en_simultaneo(args, llamadas)
+    filas, conteo = estado(db, id_publicacion, args.tipo)
+    esperadas = len(iniciales ^ set(usuarios))
+    print(f"2. {len(usuarios)} usuarios a la vez en {duracion:.2f}s: {len(filas)} filas, conteo {conteo}")
+    if len(filas) != esperadas or conteo != esperadas:
+        print(f"❌ Esperaba {esperadas} filas y conteo")
+        ok = False
+    if len({f["id_user"] for f in filas}) != len(filas):
+        print("❌ Hay reacciones duplicadas")
+        ok = False
+
+    # 3. Deshacer
+    resultados, duracion = en_simultaneo(args, llamadas)
+    filas, conteo = estado(db, id_publicacion, args.tipo)
+    print(f"3. Deshacer en {duracion:.2f}s: {len(filas)} filas, conteo {conteo}")
+    if {f["id_user"] for f in filas} != iniciales or conteo != conteo_inicial:
+        print("❌ No se volvió al estado inicial")
+        ok = False
+
+    if ok:
+        print("\n✅ Sin duplicados y con conteos exactos bajo toques simultáneos")
+    else:
+        print("\n❌ Falló alguna verificación")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
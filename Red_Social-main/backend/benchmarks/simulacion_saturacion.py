@@ -0,0 +1,254 @@
+"""
+Simulación de saturación de la base de datos con y sin control de admisión
+
+Levanta con Uvicorn una app de reemplazo con las mismas rutas críticas que la
+API (login, envío de mensajes, feed, búsqueda, listados, no leídas) sobre una
+base de datos simulada cuya latencia se dispara durante unos segundos. Genera
+carga mixta (muchos clientes de baja prioridad, pocos de login y mensajes) y
+compara por clase, durante el pico: respuestas correctas, 503, timeouts y p95.
+Algunos clientes mandan sus búsquedas y listados en un /batch: cada
+sub-petición cuenta en la fila "baja (lote)" con su propio estado (o con el
+del lote entero si se descartó en la puerta).
+
+Modos de la base simulada:
+- bloqueante: time.sleep dentro de la ruta async, como el cliente síncrono de
+  Supabase en las rutas actuales (bloquea el event loop)
+- async: un pool de conexiones acotado con await, como quedaría con un
+  cliente asíncrono
+
+Termina con código 1 si con control de admisión login o envío de mensajes
+tienen menos de 95% de éxito durante el pico, o si no se descarta ninguna
+sub-petición de los lotes de baja prioridad.
+
+Uso:
+    python benchmarks/simulacion_saturacion.py [--modo bloqueante|async] [--pico-ms 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Agregar el directorio raíz al path para importar app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Solo se mide la admisión: sin límite de peticiones para las sub-peticiones de /batch
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+from app.config import settings
+from app.utils.admision import ControlAdmision, clase_de_peticion
+from app.utils.lotes import ejecutar_lote
+
+PUERTO = 8766
+API = settings.API_V1_STR
+FASES = (("normal", 2.0), ("pico", 6.0), ("recuperación", 2.0))
+
+# (método, ruta, clientes en bucle, pausa entre peticiones en s)
+CLIENTES = (
+    ("POST", "/auth/login", 3, 0.2),
+    ("POST", "/mensajes", 3, 0.2),
+    ("GET", "/publicaciones", 6, 0.1),
+    ("GET", "/busqueda", 12, 0.02),
+    ("GET", "/usuarios", 8, 0.02),
+    ("GET", "/notificaciones/no-leidas", 10, 0.02),
+    ("POST", "/batch", 4, 0.02),
+)
+
+# Lo que manda cada cliente de /batch: solo rutas de prioridad baja
+LOTE_BAJA = [
+    {"id": "busqueda", "metodo": "GET", "ruta": "/busqueda"},
+    {"id": "usuarios", "metodo": "GET", "ruta": "/usuarios"},
+    {"id": "no_leidas", "metodo": "GET", "ruta": "/notificaciones/no-leidas"},
+]
+CLASE_LOTE = "baja (lote)"
+
+
+class BaseSimulada:
+    """Latencia normal de 10 ms que pasa a `pico_ms` mientras dura el pico"""
+
+    def __init__(self, modo: str, pico_ms: float, conexiones: int = 10):
+        self.modo = modo
+        self.pico = pico_ms / 1000
+        self.en_pico = False
+        self.conexiones = conexiones
+        self._pool = None
+        self._loop = None
+
+    def latencia(self) -> float:
+        return self.pico if self.en_pico else 0.01
+
+    async def consulta(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        # Las sub-peticiones de /batch corren en un hilo con su propio loop
+        # (ver app/utils/lotes.py): ahí bloquear solo frena ese hilo
+        if self.modo == "bloqueante" or asyncio.get_running_loop() is not self._loop:
+            time.sleep(self.latencia())
+            return
+        if self._pool is None:
+            self._pool = asyncio.Semaphore(self.conexiones)
+        async with self._pool:
+            await asyncio.sleep(self.latencia())
+
+
+def crear_app(bd: BaseSimulada, control: bool) -> FastAPI:
+    app = FastAPI()
+    if control:
+        app.add_middleware(ControlAdmision)
+
+    @app.post(f"{API}/auth/login")
+    async def login():
+        await bd.consulta()  # buscar usuario
+        return {"access_token": "x"}
+
+    @app.post(f"{API}/mensajes")
+    async def enviar_mensaje():
+        await bd.consulta()  # verificar conversación
+        await bd.consulta()  # insertar mensaje
+        return {"ok": True}
+
+    @app.get(f"{API}/publicaciones")
+    async def feed():
+        await bd.consulta()  # publicaciones
+        await bd.consulta()  # autores
+        return []
+
+    @app.get(f"{API}/busqueda")
+    async def busqueda():
+        await bd.consulta()
+        return {"resultados": []}
+
+    @app.get(f"{API}/usuarios")
+    async def usuarios():
+        await bd.consulta()
+        return []
+
+    @app.get(f"{API}/notificaciones/no-leidas")
+    async def no_leidas():
+        await bd.consulta()
+        return {"total": 0}
+
+    @app.post(f"{API}/batch")
+    async def lote(request: Request):
+        datos = await request.json()
+        respuestas = await ejecutar_lote(request.app.router, request.scope, {"id_user": "simulado"}, datos["peticiones"])
+        return {"respuestas": respuestas}
+
+    return app
+
+
+def levantar(app: FastAPI):
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=PUERTO, log_level="error"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor, hilo
+
+
+async def generar_carga(bd: BaseSimulada):
+    """Corre las fases y devuelve los resultados de la fase de pico por clase"""
+    resultados = {}
+    fase = {"nombre": None}
+    detener = asyncio.Event()
+    limites = httpx.Limits(max_connections=200, max_keepalive_connections=200)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PUERTO}", limits=limites, timeout=5) as cliente:
+        async def bucle(metodo, ruta, pausa):
+            es_lote = ruta == "/batch"
+            clase = CLASE_LOTE if es_lote else clase_de_peticion(metodo, API + ruta)
+            cuerpo = {"peticiones": LOTE_BAJA} if es_lote else None
+            while not detener.is_set():
+                inicio = time.perf_counter()
+                try:
+                    respuesta = await cliente.request(metodo, API + ruta, json=cuerpo)
+                    codigos = [respuesta.status_code] * (len(LOTE_BAJA) if es_lote else 1)
+                    if es_lote and respuesta.status_code == 200:
+                        codigos = [r["estado"] for r in respuesta.json()["respuestas"]]
+                except httpx.TimeoutException:
+                    codigos = ["timeout"] * (len(LOTE_BAJA) if es_lote else 1)
+                except httpx.HTTPError:
+                    codigos = ["error"] * (len(LOTE_BAJA) if es_lote else 1)
+                if fase["nombre"] == "pico":
+                    datos = resultados.setdefault(clase, {"latencias": [], "codigos": []})
+                    datos["codigos"].extend(codigos)
+                    if codigos == [200] * len(codigos):
+                        datos["latencias"].append((time.perf_counter() - inicio) * 1000)
+                await asyncio.sleep(pausa)
+
+        tareas = [
+            asyncio.create_task(bucle(metodo, ruta, pausa))
+            for metodo, ruta, cantidad, pausa in CLIENTES
+            for _ in range(cantidad)
+        ]
+        for nombre, duracion in FASES:
+            fase["nombre"] = nombre
+            bd.en_pico = nombre == "pico"
+            await asyncio.sleep(duracion)
+        detener.set()
+        await asyncio.gather(*tareas)
+    return resultados
+
+
+def resumir(resultados):
+    filas = {}
+    for clase, datos in sorted(resultados.items()):
+        codigos, latencias = datos["codigos"], sorted(datos["latencias"])
+        total = len(codigos)
+        filas[clase] = {
+            "total": total,
+            "ok": codigos.count(200) / total if total else 0,
+            "503": codigos.count(503),
+            "timeouts": codigos.count("timeout") + codigos.count("error"),
+            "p95": latencias[int(len(latencias) * 0.95)] if latencias else float("nan"),
+        }
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación de saturación de la BD")
+    parser.add_argument("--modo", choices=("bloqueante", "async"), default="bloqueante")
+    parser.add_argument("--pico-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    print(f"Base simulada {args.modo}: 10 ms normal, {args.pico_ms:.0f} ms en el pico")
+    print(f"Fases: {', '.join(f'{n} {d:.0f}s' for n, d in FASES)}\n")
+
+    resumenes = {}
+    for control in (False, True):
+        bd = BaseSimulada(args.modo, args.pico_ms)
+        servidor, hilo = levantar(crear_app(bd, control))
+        try:
+            resumenes[control] = resumir(asyncio.run(generar_carga(bd)))
+        finally:
+            servidor.should_exit = True
+            hilo.join(timeout=10)
+
+        titulo = "Con control de admisión" if control else "Sin control de admisión"
+        print(f"{titulo} (durante el pico):")
+        print(f"  {'clase':12} {'peticiones':>10} {'éxito':>7} {'503':>6} {'timeouts':>9} {'p95 ms':>8}")
+        for clase, fila in resumenes[control].items():
+            print(
+                f"  {clase:12} {fila['total']:10} {fila['ok']:7.0%} {fila['503']:6} "
+                f"{fila['timeouts']:9} {fila['p95']:8.0f}"
+            )
+        print()
+
+    criticas = [resumenes[True].get(clase, {"ok": 0})["ok"] for clase in ("auth", "mensajeria")]
+    if min(criticas) < 0.95:
+        print("❌ Login o envío de mensajes por debajo de 95% de éxito con control de admisión")
+        sys.exit(1)
+    if not resumenes[True].get(CLASE_LOTE, {"503": 0})["503"]:
+        print("❌ Los lotes de prioridad baja no se descartan: /batch esquiva el control de admisión")
+        sys.exit(1)
+    print("✅ Login y envío de mensajes se mantienen durante el pico")
+    print("✅ Las sub-peticiones de los lotes de prioridad baja se descartan como las sueltas")
+
+
+if __name__ == "__main__":
+    main()
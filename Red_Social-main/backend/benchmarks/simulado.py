@@ -0,0 +1,395 @@
+"""
+Cliente de Supabase simulado para los benchmarks
+
+Tablas en memoria detrás de lo que usan las rutas y servicios de la API
+encadenada de postgrest: select (columnas, embebidos y count="exact"), eq,
+in_, gt, lt, or_, order, limit, range, upsert, delete y execute. Cada
+execute() espera `latencia` y suma uno en `consultas`; rpc() llama al
+método de la base con el nombre de la función.
+
+Cada benchmark hereda BaseSimulada y solo arma sus tablas (y sus funciones
+de la BD, si las usa). Una tabla es una lista de filas o un diccionario
+por clave primaria; en los diccionarios, los filtros eq e in_ sobre la clave
+primaria van directo a las filas, como con un índice.
+"""
+import functools
+import heapq
+import itertools
+import operator
+import re
+import threading
+import time
+
+# Claves primarias que no siguen el patrón id_<tabla>
+CLAVES = {
+    "usuario": "id_user",
+    "estudiante": "ci_est",
+    "docente": "ci_doc",
+    "relacionusuario": "id_relacion_usuario",
+    "pasajeroruta": "id_pasajero_ruta",
+}
+
+# Restricciones únicas además de la clave primaria
+UNICAS = {
+    "estudiante": (("id_user",),),
+    "docente": (("id_user",),),
+    "nota": (("id_user", "id_materia", "tipo_nota"),),
+}
+
+OPERADORES = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda valor, valores: valor in valores,
+}
+
+EMBEBIDO = re.compile(r"(?:(\w+):)?(\w+)(?:!\w+)?\((.*)\)", re.S)
+
+
+def clave(tabla: str) -> str:
+    return CLAVES.get(tabla, f"id_{tabla}")
+
+
+def partir(texto: str) -> list:
+    """Separa por comas de primer nivel (las de dentro de paréntesis no cuentan)"""
+    partes, nivel, actual = [], 0, ""
+    for caracter in texto:
+        if caracter == "," and nivel == 0:
+            partes.append(actual.strip())
+            actual = ""
+            continue
+        nivel += {"(": 1, ")": -1}.get(caracter, 0)
+        actual += caracter
+    if actual.strip():
+        partes.append(actual.strip())
+    return partes
+
+
+@functools.lru_cache(maxsize=None)
+def parsear_columnas(columnas: str) -> tuple:
+    """
+    Columnas de un select
+
+    Returns:
+        (si pide `*`, columnas simples, embebidos como (nombre, tabla, columnas))
+    """
+    planas, embebidos = [], []
+    for parte in partir(columnas):
+        embebido = EMBEBIDO.fullmatch(parte)
+        if embebido:
+            alias, destino, columnas_destino = embebido.groups()
+            embebidos.append((alias or destino, destino, columnas_destino))
+        elif parte != "*":
+            planas.append(parte)
+    return "*" in partir(columnas), tuple(planas), tuple(embebidos)
+
+
+def valores(fila: dict, columnas: tuple):
+    """Valor de una fila en una o varias columnas (tupla si son varias)"""
+    if len(columnas) == 1:
+        return fila.get(columnas[0])
+    return tuple(fila.get(c) for c in columnas)
+
+
+def cumple(fila: dict, filtro: tuple) -> bool:
+    operador, columna, valor = filtro
+    if operador == "or":
+        return any(cumple(fila, f) for f in valor)
+    if operador == "and":
+        return all(cumple(fila, f) for f in valor)
+    actual = fila.get(columna)
+    if actual is None and operador not in ("eq", "neq"):
+        # Como en SQL: NULL no cumple ninguna comparación
+        return False
+    return OPERADORES[operador](actual, valor)
+
+
+def parsear_or(texto: str) -> tuple:
+    """`a.lt.X,and(a.eq.X,b.lt.Y)` como filtro; los valores quedan como texto"""
+    filtros = []
+    for parte in partir(texto):
+        if parte.startswith("and(") or parte.startswith("or("):
+            operador, resto = parte.split("(", 1)
+            filtros.append((operador, None, parsear_or(resto[:-1])[2]))
+        else:
+            columna, operador, valor = parte.split(".", 2)
+            filtros.append((operador, columna, valor))
+    return ("or", None, filtros)
+
+
+class Respuesta:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class ConsultaSimulada:
+    """Lo mínimo de la API encadenada de postgrest sobre las tablas de la base"""
+
+    def __init__(self, base: "BaseSimulada", tabla: str):
+        self.base = base
+        self.tabla = tabla
+        self.operacion = "select"
+        self.columnas = "*"
+        self.contar = False
+        self.filtros = []
+        self.orden = []
+        self.desde, self.limite = 0, None
+        self.filas = None
+        self.conflicto = None
+        self.ignorar = False
+        self.minima = False
+
+    def select(self, columnas="*", count=None):
+        self.columnas = columnas
+        self.contar = count == "exact"
+        return self
+
+    def upsert(self, filas, on_conflict="", ignore_duplicates=False, returning=None):
+        self.operacion = "upsert"
+        self.filas = filas if isinstance(filas, list) else [filas]
+        self.conflicto = tuple(c.strip() for c in on_conflict.split(",") if c.strip()) or (clave(self.tabla),)
+        self.ignorar = ignore_duplicates
+        self.minima = getattr(returning, "value", returning) == "minimal"
+        return self
+
+    def delete(self, returning=None):
+        self.operacion = "delete"
+        self.minima = getattr(returning, "value", returning) == "minimal"
+        return self
+
+    def eq(self, columna, valor):
+        self.filtros.append(("eq", columna, valor))
+        return self
+
+    def in_(self, columna, valores):
+        self.filtros.append(("in", columna, set(valores)))
+        return self
+
+    def gt(self, columna, valor):
+        self.filtros.append(("gt", columna, valor))
+        return self
+
+    def lt(self, columna, valor):
+        self.filtros.append(("lt", columna, valor))
+        return self
+
+    def or_(self, filtros):
+        self.filtros.append(parsear_or(filtros))
+        return self
+
+    def order(self, columna, desc=False):
+        self.orden.append((columna, desc))
+        return self
+
+    def limit(self, cantidad):
+        self.limite = cantidad
+        return self
+
+    def range(self, desde, hasta):
+        self.desde, self.limite = desde, hasta - desde + 1
+        return self
+
+    def execute(self):
+        time.sleep(self.base.latencia)
+        with self.base.candado:
+            self.base.consultas += 1
+            self.base.antes_de_ejecutar(self)
+            if self.operacion == "upsert":
+                return self._upsert()
+            if self.operacion == "delete":
+                return self._borrar()
+            return self._leer()
+
+    def _leer(self) -> Respuesta:
+        filas = (f for f in self.base.filas(self) if all(cumple(f, filtro) for filtro in self.filtros))
+        cantidad = None
+        if self.contar:
+            filas = list(filas)
+            cantidad = len(filas)
+        filas = self._ordenar(filas)
+        return Respuesta([proyectar(self.base, self.tabla, f, self.columnas) for f in filas], count=cantidad)
+
+    def _ordenar(self, filas) -> list:
+        hasta = None if self.limite is None else self.desde + self.limite
+        columnas = [c for c, _ in self.orden]
+        # NULL al final en orden ascendente y al principio en descendente, como en Postgres
+        if len(columnas) == 1:
+            claves = lambda fila, c=columnas[0]: (fila.get(c) is None, fila.get(c))
+        else:
+            claves = lambda fila: tuple((fila.get(c) is None, fila.get(c)) for c in columnas)
+        if not self.orden or self.base.en_orden(self):
+            filas = list(itertools.islice(filas, hasta))
+        elif len({desc for _, desc in self.orden}) == 1 and hasta is not None:
+            # Misma dirección en todas las columnas: solo se guardan las primeras `hasta`
+            elegir = heapq.nlargest if self.orden[0][1] else heapq.nsmallest
+            filas = elegir(hasta, filas, key=claves)
+        else:
+            filas = list(filas)
+            for columna, desc in reversed(self.orden):
+                filas.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+        return filas[self.desde:hasta]
+
+    def _upsert(self) -> Respuesta:
+        tabla = self.base.tablas.setdefault(self.tabla, {})
+        primaria = clave(self.tabla)
+        if isinstance(tabla, dict) and self.conflicto == (primaria,):
+            existentes = tabla
+        else:
+            existentes = {self._clave(f): f for f in self.base.filas_de(self.tabla)}
+        indices = {columnas: self.base.indice_unico(self.tabla, columnas) for columnas in UNICAS.get(self.tabla, ())}
+
+        # Todo el lote o nada, como una sentencia
+        nuevas, en_lote = {}, {columnas: {} for columnas in indices}
+        for fila in self.filas:
+            clave_fila = self._clave(fila)
+            if self.ignorar and (clave_fila in existentes or clave_fila in nuevas):
+                continue
+            previa = existentes.get(clave_fila)
+            for columnas, indice in indices.items():
+                valor = valores(fila, columnas)
+                if columnas == self.conflicto or valor is None:
+                    continue
+                dueno = indice.get(valor)
+                if (dueno is not None and dueno is not previa) or en_lote[columnas].setdefault(valor, clave_fila) != clave_fila:
+                    raise Exception(f"duplicate key value violates unique constraint ({self.tabla}.{','.join(columnas)}={valor})")
+            nuevas[clave_fila] = {**(previa or {}), **nuevas.get(clave_fila, {}), **fila}
+
+        posiciones = None if isinstance(tabla, dict) else {id(f): i for i, f in enumerate(tabla)}
+        for clave_fila, fila in nuevas.items():
+            previa = existentes.get(clave_fila)
+            for columnas, indice in indices.items():
+                if previa is not None and indice.get(valores(previa, columnas)) is previa:
+                    del indice[valores(previa, columnas)]
+                if valores(fila, columnas) is not None:
+                    indice[valores(fila, columnas)] = fila
+            if posiciones is None:
+                if previa is not None:
+                    del tabla[previa[primaria]]
+                tabla[fila[primaria]] = fila
+            elif previa is not None:
+                tabla[posiciones[id(previa)]] = fila
+            else:
+                tabla.append(fila)
+        return Respuesta([] if self.minima else list(nuevas.values()))
+
+    def _borrar(self) -> Respuesta:
+        tabla = self.base.tablas.get(self.tabla, [])
+        borradas = [f for f in self.base.filas(self) if all(cumple(f, filtro) for filtro in self.filtros)]
+        for columnas in UNICAS.get(self.tabla, ()):
+            indice = self.base.indice_unico(self.tabla, columnas)
+            for fila in borradas:
+                if indice.get(valores(fila, columnas)) is fila:
+                    del indice[valores(fila, columnas)]
+        if isinstance(tabla, dict):
+            for fila in borradas:
+                del tabla[fila[clave(self.tabla)]]
+        else:
+            ids = {id(f) for f in borradas}
+            tabla[:] = [f for f in tabla if id(f) not in ids]
+        return Respuesta([] if self.minima else borradas)
+
+    def _clave(self, fila: dict):
+        return valores(fila, self.conflicto)
+
+
+def proyectar(base: "BaseSimulada", tabla: str, fila: dict, columnas: str) -> dict:
+    """
+    Columnas pedidas de una fila, con sus embebidos
+
+    Un embebido trae la fila referenciada si la fila tiene su clave (usuario
+    por id_user) o si no, las filas que referencian a esta (media por
+    id_publicacion). Los de tablas que la base no tiene quedan como estén.
+    """
+    todas, planas, embebidos = parsear_columnas(columnas)
+    resultado = dict(fila) if todas else {c: fila.get(c) for c in planas}
+    for nombre, destino, columnas_destino in embebidos:
+        if destino not in base.tablas:
+            if nombre in fila:
+                resultado[nombre] = fila[nombre]
+            continue
+        if clave(destino) in fila:
+            relacionada = base.buscar(destino, fila[clave(destino)])
+            valor = proyectar(base, destino, relacionada, columnas_destino) if relacionada else None
+        else:
+            valor = [
+                proyectar(base, destino, f, columnas_destino)
+                for f in base.filas_de(destino) if f.get(clave(tabla)) == fila.get(clave(tabla))
+            ]
+        resultado[nombre] = valor
+    return resultado
+
+
+class BaseSimulada:
+    """
+    Tablas en memoria con latencia fija por llamada
+
+    Las subclases llenan `self.tablas` en su __init__ y pueden redefinir
+    filas() o buscar() si generan las filas al vuelo o tienen un índice.
+    """
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+        self.consultas = 0
+        self.candado = threading.Lock()
+        self.tablas = {}
+        self._indices = {}
+
+    def table(self, nombre: str) -> ConsultaSimulada:
+        return ConsultaSimulada(self, nombre)
+
+    def rpc(self, nombre: str, parametros: dict):
+        base = self
+
+        class Llamada:
+            def execute(self):
+                time.sleep(base.latencia)
+                with base.candado:
+                    base.consultas += 1
+                return Respuesta(getattr(base, nombre)(parametros))
+
+        return Llamada()
+
+    def filas_de(self, tabla: str):
+        filas = self.tablas.get(tabla, [])
+        return filas.values() if isinstance(filas, dict) else filas
+
+    def filas(self, consulta: ConsultaSimulada):
+        """Filas candidatas de una consulta (antes de aplicar sus filtros)"""
+        filas = self.tablas.get(consulta.tabla, [])
+        if isinstance(filas, dict):
+            for operador, columna, valor in consulta.filtros:
+                if columna == clave(consulta.tabla) and operador in ("eq", "in"):
+                    return [filas[k] for k in (valor if operador == "in" else (valor,)) if k in filas]
+        return self.filas_de(consulta.tabla)
+
+    def en_orden(self, consulta: ConsultaSimulada) -> bool:
+        """Si filas() ya devuelve las filas en el orden que pide la consulta"""
+        return False
+
+    def indice_unico(self, tabla: str, columnas: tuple) -> dict:
+        """
+        Fila dueña de cada valor de una restricción única, como su índice
+
+        Lo mantienen upsert y delete; se vuelve a armar si la tabla es otro
+        objeto (por ejemplo en una copia de la base).
+        """
+        filas = self.tablas.get(tabla)
+        objeto, indice = self._indices.get((tabla, columnas), (None, None))
+        if objeto is not filas:
+            indice = {valores(f, columnas): f for f in self.filas_de(tabla) if valores(f, columnas) is not None}
+            self._indices[(tabla, columnas)] = (filas, indice)
+        return indice
+
+    def buscar(self, tabla: str, valor):
+        """Fila de `tabla` con esa clave primaria (para los embebidos)"""
+        filas = self.tablas.get(tabla)
+        if isinstance(filas, dict):
+            return filas.get(valor)
+        return next((f for f in filas or [] if f.get(clave(tabla)) == valor), None)
+
+    def antes_de_ejecutar(self, consulta: ConsultaSimulada) -> None:
+        """Se llama en cada execute() con el candado tomado (para simular fallas)"""
@@ -0,0 +1,162 @@
+-- Contadores de comentarios y reacciones guardados en la publicación
+-- Requiere reacciones_atomicas.sql (redefine su trigger de conteos).
+--
+-- El feed contaba comentarios y reacciones en cada lectura (una consulta
+-- COUNT por publicación en /publicaciones, dos consultas con todas las filas
+-- de la página en /publicaciones/timeline). Ahora publicacion guarda
+-- comentarios_count y reacciones_count (y comentario su reacciones_count);
+-- los triggers los ajustan en +1/-1 en la misma transacción en que
+-- create_comentario/delete_comentario y las rutas de reacciones escriben, y
+-- el feed solo los lee.
+--
+-- Lo que se escape de los triggers (borrados en cascada de un usuario,
+-- cambios hechos con los triggers desactivados, restauraciones) lo corrige
+-- reparar_contadores, en lotes (ver reparar_contadores.py).
+
+ALTER TABLE publicacion ADD COLUMN IF NOT EXISTS comentarios_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE publicacion ADD COLUMN IF NOT EXISTS reacciones_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE comentario ADD COLUMN IF NOT EXISTS reacciones_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION actualizar_comentarios_count()
+RETURNS TRIGGER AS $$
+DECLARE
+    fila comentario%ROWTYPE;
+    delta INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := OLD;
+        delta := -1;
+    ELSE
+        fila := NEW;
+        delta := 1;
+    END IF;
+    UPDATE publicacion
+    SET comentarios_count = GREATEST(comentarios_count + delta, 0)
+    WHERE id_publicacion = fila.id_publicacion;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_comentarios_count ON comentario;
+CREATE TRIGGER trg_comentarios_count
+    AFTER INSERT OR DELETE ON comentario
+    FOR EACH ROW EXECUTE FUNCTION actualizar_comentarios_count();
+
+-- Misma función que en reacciones_atomicas.sql, ahora también con el total
+CREATE OR REPLACE FUNCTION actualizar_conteo_reacciones()
+RETURNS TRIGGER AS $$
+DECLARE
+    fila reaccion%ROWTYPE;
+    delta INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := OLD;
+        delta := -1;
+    ELSE
+        fila := NEW;
+        delta := 1;
+    END IF;
+    IF fila.id_publicacion IS NOT NULL THEN
+        UPDATE publicacion
+        SET conteo_reacciones = sumar_conteo(conteo_reacciones, fila.tipo_reac, delta),
+            reacciones_count = GREATEST(reacciones_count + delta, 0)
+        WHERE id_publicacion = fila.id_publicacion;
+    ELSE
+        UPDATE comentario
+        SET conteo_reacciones = sumar_conteo(conteo_reacciones, fila.tipo_reac, delta),
+            reacciones_count = GREATEST(reacciones_count + delta, 0)
+        WHERE id_comentario = fila.id_comentario;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Conteos de reacciones por tipo de una publicación o comentario, contando filas
+CREATE OR REPLACE FUNCTION contar_reacciones(p_id_publicacion VARCHAR, p_id_comentario VARCHAR)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_object_agg(tipo_reac, cantidad), '{}')
+    FROM (
+        SELECT tipo_reac, COUNT(*) AS cantidad
+        FROM reaccion
+        WHERE id_publicacion = p_id_publicacion OR id_comentario = p_id_comentario
+        GROUP BY tipo_reac
+    ) t;
+$$ LANGUAGE sql STABLE;
+
+-- Total de un JSON de conteos por tipo
+CREATE OR REPLACE FUNCTION total_conteo(p_conteos JSONB)
+RETURNS INTEGER AS $$
+    SELECT COALESCE(SUM(value::INTEGER), 0)::INTEGER FROM jsonb_each_text(p_conteos);
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Recuenta un lote de publicaciones (las p_limite siguientes a p_despues por
+-- id_publicacion) y sus comentarios, y corrige solo las filas con diferencias.
+-- Cada lote es una transacción corta; para recorrer toda la tabla se llama
+-- otra vez con el "ultimo" devuelto hasta que "revisadas" sea 0.
+-- Devuelve {"ultimo", "revisadas", "corregidas", "comentarios_corregidos"}.
+CREATE OR REPLACE FUNCTION reparar_contadores(p_despues VARCHAR, p_limite INTEGER)
+RETURNS JSONB AS $$
+DECLARE
+    ids VARCHAR[];
+    ultimo VARCHAR;
+    revisadas INTEGER;
+    corregidas INTEGER;
+    comentarios_corregidos INTEGER;
+BEGIN
+    SELECT array_agg(id_publicacion ORDER BY id_publicacion) INTO ids
+    FROM (
+        SELECT id_publicacion
+        FROM publicacion
+        WHERE p_despues IS NULL OR id_publicacion > p_despues
+        ORDER BY id_publicacion
+        LIMIT p_limite
+    ) siguientes;
+    revisadas := COALESCE(array_length(ids, 1), 0);
+    ultimo := ids[revisadas];
+
+    WITH recuento AS (
+        SELECT l.id_publicacion,
+               (SELECT COUNT(*) FROM comentario c WHERE c.id_publicacion = l.id_publicacion)::INTEGER AS comentarios,
+               contar_reacciones(l.id_publicacion, NULL) AS conteos
+        FROM unnest(ids) AS l(id_publicacion)
+    )
+    UPDATE publicacion p
+    SET comentarios_count = r.comentarios,
+        conteo_reacciones = r.conteos,
+        reacciones_count = total_conteo(r.conteos)
+    FROM recuento r
+    WHERE p.id_publicacion = r.id_publicacion
+      AND (p.comentarios_count <> r.comentarios
+           OR p.conteo_reacciones <> r.conteos
+           OR p.reacciones_count <> total_conteo(r.conteos));
+    GET DIAGNOSTICS corregidas = ROW_COUNT;
+
+    WITH recuento AS (
+        SELECT c.id_comentario, contar_reacciones(NULL, c.id_comentario) AS conteos
+        FROM comentario c
+        WHERE c.id_publicacion = ANY(ids)
+    )
+    UPDATE comentario c
+    SET conteo_reacciones = r.conteos,
+        reacciones_count = total_conteo(r.conteos)
+    FROM recuento r
+    WHERE c.id_comentario = r.id_comentario
+      AND (c.conteo_reacciones <> r.conteos OR c.reacciones_count <> total_conteo(r.conteos));
+    GET DIAGNOSTICS comentarios_corregidos = ROW_COUNT;
+
+    RETURN jsonb_build_object(
+        'ultimo', ultimo,
+        'revisadas', revisadas,
+        'corregidas', corregidas,
+        'comentarios_corregidos', comentarios_corregidos
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- Conteos iniciales
+UPDATE publicacion p
+SET comentarios_count = (SELECT COUNT(*) FROM comentario c WHERE c.id_publicacion = p.id_publicacion),
+    reacciones_count = (SELECT COUNT(*) FROM reaccion r WHERE r.id_publicacion = p.id_publicacion);
+
+UPDATE comentario c
+SET reacciones_count = (SELECT COUNT(*) FROM reaccion r WHERE r.id_comentario = c.id_comentario);
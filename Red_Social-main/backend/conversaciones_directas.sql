@@ -0,0 +1,49 @@
+-- Conversaciones directas (privadas entre dos usuarios) sin duplicados
+-- clave_directa = "<id menor>:<id mayor>" de los dos participantes; solo la
+-- tienen las conversaciones privadas de dos personas. El índice único hace que
+-- "abrir chat con X" sea una búsqueda por índice y que dos pedidos simultáneos
+-- no puedan crear dos conversaciones (ver app/services/conversaciones.py)
+ALTER TABLE conversacion ADD COLUMN IF NOT EXISTS clave_directa VARCHAR(80);
+
+-- Participantes de una conversación (las de un usuario ya usan el UNIQUE(id_usuario, id_conversacion))
+CREATE INDEX IF NOT EXISTS idx_usuarioconversacion_conversacion
+    ON usuarioconversacion(id_conversacion);
+
+-- Unificar los chats directos duplicados que ya existen: por cada par se
+-- conserva la conversación más antigua y se le pasan los mensajes de las demás
+CREATE TEMP TABLE pares_directos AS
+SELECT c.id_conversacion,
+       c.fecha_creacion,
+       MIN(uc.id_usuario COLLATE "C") || ':' || MAX(uc.id_usuario COLLATE "C") AS clave
+FROM conversacion c
+JOIN usuarioconversacion uc ON uc.id_conversacion = c.id_conversacion
+WHERE c.tipo = 'privada'
+GROUP BY c.id_conversacion, c.fecha_creacion
+HAVING COUNT(DISTINCT uc.id_usuario) = 2;
+
+CREATE TEMP TABLE duplicados_directos AS
+SELECT id_conversacion,
+       FIRST_VALUE(id_conversacion) OVER (
+           PARTITION BY clave ORDER BY fecha_creacion NULLS LAST, id_conversacion
+       ) AS conservar
+FROM pares_directos;
+
+UPDATE mensaje m
+SET id_conversacion = d.conservar
+FROM duplicados_directos d
+WHERE m.id_conversacion = d.id_conversacion
+  AND d.id_conversacion <> d.conservar;
+
+DELETE FROM conversacion c
+USING duplicados_directos d
+WHERE c.id_conversacion = d.id_conversacion
+  AND d.id_conversacion <> d.conservar;
+
+UPDATE conversacion c
+SET clave_directa = p.clave
+FROM pares_directos p
+WHERE c.id_conversacion = p.id_conversacion;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_conversacion_clave_directa
+    ON conversacion(clave_directa)
+    WHERE clave_directa IS NOT NULL;
@@ -0,0 +1,116 @@
+-- Orden "relevante" del timeline (ver app/services/relevancia.py)
+-- Requiere crear_timeline.sql.
+--
+-- publicacion.relevancia = ln( Σ peso · e^(λ·t) ) de sus interacciones, con
+-- λ = ln 2 / vida media. Ordenar por esta columna equivale a ordenar por el
+-- puntaje decaído al instante actual.
+-- timeline.puntaje = timeline.afinidad + publicacion.relevancia, precalculado
+-- por lector para leer una página ordenada con un solo índice.
+ALTER TABLE publicacion ADD COLUMN IF NOT EXISTS relevancia DOUBLE PRECISION;
+ALTER TABLE timeline ADD COLUMN IF NOT EXISTS afinidad DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE timeline ADD COLUMN IF NOT EXISTS puntaje DOUBLE PRECISION;
+
+-- Página relevante del timeline de un usuario (paginación con cursor por puntaje)
+CREATE INDEX IF NOT EXISTS idx_timeline_user_puntaje ON timeline(id_user, puntaje DESC);
+
+-- Actualizar las filas de una publicación cuando recibe una interacción
+CREATE INDEX IF NOT EXISTS idx_timeline_publicacion ON timeline(id_publicacion);
+
+-- Publicaciones más relevantes de los docentes que se mezclan al leer
+CREATE INDEX IF NOT EXISTS idx_publicacion_user_relevancia ON publicacion(id_user, relevancia DESC);
+
+-- Suma (p_signo = 1) o resta (p_signo = -1) una interacción ya expresada como
+-- ln(peso) + λ·t, y propaga el resultado a las filas del timeline
+CREATE OR REPLACE FUNCTION sumar_relevancia(
+    p_id_publicacion VARCHAR,
+    p_log_peso DOUBLE PRECISION,
+    p_signo INTEGER
+)
+RETURNS DOUBLE PRECISION AS $$
+DECLARE
+    actual DOUBLE PRECISION;
+    nueva DOUBLE PRECISION;
+BEGIN
+    SELECT relevancia INTO actual
+    FROM publicacion
+    WHERE id_publicacion = p_id_publicacion
+    FOR UPDATE;
+
+    IF actual IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    IF p_signo > 0 THEN
+        -- ln(e^a + e^b) sin desbordar
+        nueva := GREATEST(actual, p_log_peso) + ln(1 + exp(GREATEST(-abs(actual - p_log_peso), -700)));
+    ELSIF p_log_peso < actual - 1e-9 THEN
+        -- ln(e^a - e^b), b < a
+        nueva := actual + ln(1 - exp(GREATEST(p_log_peso - actual, -700)));
+    ELSE
+        -- Interacción anterior al recálculo: nunca bajar de lo que hay
+        RETURN actual;
+    END IF;
+
+    UPDATE publicacion SET relevancia = nueva WHERE id_publicacion = p_id_publicacion;
+    UPDATE timeline SET puntaje = afinidad + nueva WHERE id_publicacion = p_id_publicacion;
+    RETURN nueva;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recalcula todo desde los conteos actuales (instalación y cambios de
+-- RELEVANCE_HALF_LIFE_HOURS). Aproxima cada comentario y reacción con su fecha
+-- real; los pesos deben coincidir con PESO_* y AFINIDAD de relevancia.py.
+CREATE OR REPLACE FUNCTION recalcular_relevancia(p_vida_media_horas DOUBLE PRECISION)
+RETURNS INTEGER AS $$
+DECLARE
+    lambda DOUBLE PRECISION := ln(2) / (p_vida_media_horas * 3600);
+    actualizadas INTEGER;
+BEGIN
+    UPDATE publicacion p
+    SET relevancia = ln(
+        exp(GREATEST(lambda * extract(epoch FROM p.fecha_creacion) - base.origen, -700))
+        + COALESCE((
+            SELECT SUM(3 * exp(GREATEST(lambda * extract(epoch FROM c.fecha_creacion) - base.origen, -700)))
+            FROM comentario c WHERE c.id_publicacion = p.id_publicacion
+        ), 0)
+        + COALESCE((
+            SELECT SUM(exp(GREATEST(lambda * extract(epoch FROM r.fecha_creacion_reac) - base.origen, -700)))
+            FROM reaccion r WHERE r.id_publicacion = p.id_publicacion
+        ), 0)
+    ) + base.origen
+    -- Origen en la última interacción de cada publicación: exp() nunca pasa de 1
+    -- (y GREATEST(..., -700) evita el error de underflow de exp() en Postgres)
+    FROM (
+        SELECT pub.id_publicacion, lambda * extract(epoch FROM GREATEST(
+            pub.fecha_creacion,
+            (SELECT MAX(c.fecha_creacion) FROM comentario c WHERE c.id_publicacion = pub.id_publicacion),
+            (SELECT MAX(r.fecha_creacion_reac) FROM reaccion r WHERE r.id_publicacion = pub.id_publicacion)
+        )) AS origen
+        FROM publicacion pub
+    ) base
+    WHERE base.id_publicacion = p.id_publicacion;
+    GET DIAGNOSTICS actualizadas = ROW_COUNT;
+
+    -- Las filas copiadas son propias, de amigos o de compañeros de grupo
+    UPDATE timeline t
+    SET afinidad = CASE
+        WHEN t.id_user = t.id_autor THEN ln(1.2)
+        WHEN EXISTS (
+            SELECT 1 FROM relacionusuario r
+            WHERE r.tipo = 'amistad' AND r.estado = 'aceptado'
+              AND ((r.id_usuario1 = t.id_user AND r.id_usuario2 = t.id_autor)
+                OR (r.id_usuario1 = t.id_autor AND r.id_usuario2 = t.id_user))
+        ) THEN ln(1.6)
+        ELSE ln(1.3)
+    END;
+
+    UPDATE timeline t
+    SET puntaje = t.afinidad + p.relevancia
+    FROM publicacion p
+    WHERE p.id_publicacion = t.id_publicacion;
+
+    RETURN actualizadas;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT recalcular_relevancia(24);
@@ -0,0 +1,42 @@
+-- Timeline personalizado precalculado (fan-out on write)
+-- Una fila por publicación que debe ver cada usuario: las propias, las de sus
+-- amigos aceptados y las de compañeros de su grupo. Las de docentes y
+-- administradores no se copian: se mezclan al leer (ver app/services/timeline.py)
+CREATE TABLE IF NOT EXISTS timeline (
+    id_user VARCHAR(36) NOT NULL REFERENCES usuario(id_user) ON DELETE CASCADE,
+    id_publicacion VARCHAR(36) NOT NULL REFERENCES publicacion(id_publicacion) ON DELETE CASCADE,
+    id_autor VARCHAR(36) NOT NULL REFERENCES usuario(id_user) ON DELETE CASCADE,
+    fecha_creacion TIMESTAMP NOT NULL,
+    PRIMARY KEY (id_user, id_publicacion)
+);
+
+-- Lectura del timeline de un usuario por fecha (paginación con cursor)
+CREATE INDEX IF NOT EXISTS idx_timeline_user_fecha ON timeline(id_user, fecha_creacion DESC);
+
+-- Quitar las publicaciones de un ex amigo del timeline
+CREATE INDEX IF NOT EXISTS idx_timeline_user_autor ON timeline(id_user, id_autor);
+
+-- Publicaciones recientes de un conjunto de autores (relleno y mezcla de docentes)
+CREATE INDEX IF NOT EXISTS idx_publicacion_user_fecha ON publicacion(id_user, fecha_creacion DESC);
+
+-- Mantiene como máximo p_max publicaciones por usuario (ver recortar_timelines.py)
+CREATE OR REPLACE FUNCTION recortar_timeline(p_max INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    eliminadas INTEGER;
+BEGIN
+    DELETE FROM timeline t
+    USING (
+        SELECT id_user, id_publicacion
+        FROM (
+            SELECT id_user, id_publicacion,
+                   ROW_NUMBER() OVER (PARTITION BY id_user ORDER BY fecha_creacion DESC) AS posicion
+            FROM timeline
+        ) numeradas
+        WHERE posicion > p_max
+    ) sobrantes
+    WHERE t.id_user = sobrantes.id_user AND t.id_publicacion = sobrantes.id_publicacion;
+    GET DIAGNOSTICS eliminadas = ROW_COUNT;
+    RETURN eliminadas;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,24 @@
+-- Cursores de sincronización por ID de transacción
+-- Los usan sincronizacion_mensajes.sql y sincronizacion.sql (correr este antes).
+--
+-- Una versión tomada de una secuencia al escribir no sirve de cursor: las
+-- transacciones se confirman en cualquier orden, así que un cliente que ya vio
+-- la versión 11 perdería la 10 si se confirma después. Cada fila guarda en
+-- cambio el ID de la transacción que la escribió (id_transaccion_actual) y el
+-- cursor que se entrega nunca pasa de cursor_confirmado(): el ID más alto por
+-- debajo de la transacción en curso más vieja. Todo lo que está por debajo ya
+-- se confirmó (o se descartó), así que lo que se confirme después siempre
+-- queda por encima del cursor.
+
+-- IDs de transacción desplazados en 2^40: quedan siempre por encima de las
+-- versiones que se entregaban como cursor antes, así esos cursores siguen
+-- sirviendo
+CREATE OR REPLACE FUNCTION id_transaccion_actual()
+RETURNS BIGINT AS $$
+    SELECT pg_current_xact_id()::TEXT::BIGINT + 1099511627776;
+$$ LANGUAGE sql VOLATILE;
+
+CREATE OR REPLACE FUNCTION cursor_confirmado()
+RETURNS BIGINT AS $$
+    SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT::BIGINT - 1 + 1099511627776;
+$$ LANGUAGE sql VOLATILE;
@@ -0,0 +1,61 @@
+"""
+Configuración de Gunicorn para producción
+
+Uso:
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Levanta N workers Uvicorn (por defecto 2 por núcleo, porque las rutas hacen
+llamadas síncronas a Supabase que bloquean el event loop del worker), importa
+la app una sola vez en el proceso maestro antes de hacer fork para compartir
+memoria, recicla cada worker después de MAX_REQUESTS peticiones y en SIGTERM
+espera a que terminen las peticiones en curso antes de salir.
+
+Variables de entorno:
+    BIND                 Dirección de escucha (por defecto 0.0.0.0:$PORT o 0.0.0.0:8000)
+    WEB_CONCURRENCY      Cantidad de workers
+    MAX_REQUESTS         Peticiones antes de reciclar un worker (0 = nunca)
+    MAX_REQUESTS_JITTER  Variación aleatoria para no reciclar todos a la vez
+    GRACEFUL_TIMEOUT     Segundos para drenar peticiones en SIGTERM
+    TIMEOUT              Segundos sin respuesta antes de reiniciar un worker
+    PRELOAD              "false" para importar la app en cada worker
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2)))
+worker_class = "app.worker.WorkerProduccion"
+
+# Importar la app en el maestro: el código y las rutas se comparten entre
+# workers (copy-on-write). El cliente de Supabase se crea en el lifespan de
+# cada worker, después del fork.
+preload_app = os.getenv("PRELOAD", "true").lower() in ("1", "true", "yes")
+if preload_app:
+    # Con preload no tiene sentido diferir imports: se hacen una sola vez
+    os.environ.setdefault("LAZY_STARTUP", "false")
+
+max_requests = int(os.getenv("MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "500"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    server.log.info(f"🚀 Servidor listo en {bind} con {workers} workers (preload={preload_app})")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} iniciado")
+
+
+def worker_int(worker):
+    worker.log.info(f"Worker {worker.pid} interrumpido")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} terminado")
@@ -0,0 +1,84 @@
+-- Estado de lectura por miembro de cada conversación (marca de agua)
+-- En lugar de mensaje.leido (un solo booleano por mensaje, que en un grupo
+-- marcaba como leído para todos lo que leyó uno), cada fila de
+-- usuarioconversacion guarda hasta dónde leyó ese usuario. Marcar una
+-- conversación como leída actualiza una fila y los no leídos son los mensajes
+-- de otros con fecha_envio posterior a la marca (ver app/services/lecturas.py).
+-- mensaje.leido queda sin uso; la API lo sigue devolviendo calculado.
+ALTER TABLE usuarioconversacion ADD COLUMN IF NOT EXISTS ultima_lectura TIMESTAMP;
+ALTER TABLE usuarioconversacion ADD COLUMN IF NOT EXISTS id_ultimo_leido VARCHAR(36);
+
+-- Mensajes de una conversación posteriores a una fecha (no leídos, paginación)
+CREATE INDEX IF NOT EXISTS idx_mensaje_conversacion_fecha ON mensaje(id_conversacion, fecha_envio);
+
+-- Marca inicial desde los flags actuales: el último mensaje de otros marcado
+-- como leído, o la fecha de unión si no había ninguno
+UPDATE usuarioconversacion uc
+SET ultima_lectura = COALESCE((
+        SELECT MAX(m.fecha_envio) FROM mensaje m
+        WHERE m.id_conversacion = uc.id_conversacion
+          AND m.id_user <> uc.id_usuario
+          AND m.leido
+    ), uc.fecha_union)
+WHERE uc.ultima_lectura IS NULL;
+
+-- Avanza la marca de un miembro hasta p_hasta (o hasta el último mensaje).
+-- Nunca retrocede. Devuelve cuántos mensajes de otros quedaron leídos, o NULL
+-- si el usuario no es miembro de la conversación.
+CREATE OR REPLACE FUNCTION marcar_leida(
+    p_id_usuario VARCHAR,
+    p_id_conversacion VARCHAR,
+    p_hasta TIMESTAMP DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    anterior TIMESTAMP;
+    hasta TIMESTAMP;
+    id_hasta VARCHAR(36);
+    leidos INTEGER;
+BEGIN
+    SELECT ultima_lectura INTO anterior
+    FROM usuarioconversacion
+    WHERE id_usuario = p_id_usuario AND id_conversacion = p_id_conversacion
+    FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT m.fecha_envio, m.id_mensaje INTO hasta, id_hasta
+    FROM mensaje m
+    WHERE m.id_conversacion = p_id_conversacion
+      AND (p_hasta IS NULL OR m.fecha_envio <= p_hasta)
+    ORDER BY m.fecha_envio DESC, m.id_mensaje DESC
+    LIMIT 1;
+
+    IF hasta IS NULL OR (anterior IS NOT NULL AND hasta <= anterior) THEN
+        RETURN 0;
+    END IF;
+
+    SELECT COUNT(*) INTO leidos
+    FROM mensaje m
+    WHERE m.id_conversacion = p_id_conversacion
+      AND m.id_user <> p_id_usuario
+      AND m.fecha_envio > COALESCE(anterior, '-infinity'::timestamp)
+      AND m.fecha_envio <= hasta;
+
+    UPDATE usuarioconversacion
+    SET ultima_lectura = hasta, id_ultimo_leido = id_hasta
+    WHERE id_usuario = p_id_usuario AND id_conversacion = p_id_conversacion;
+    RETURN leidos;
+END;
+$$ LANGUAGE plpgsql;
+
+-- No leídos de un usuario por conversación (solo las que tienen alguno)
+CREATE OR REPLACE FUNCTION contar_no_leidos(p_id_usuario VARCHAR)
+RETURNS TABLE(id_conversacion VARCHAR, no_leidos BIGINT) AS $$
+    SELECT uc.id_conversacion, COUNT(*)
+    FROM usuarioconversacion uc
+    JOIN mensaje m
+      ON m.id_conversacion = uc.id_conversacion
+     AND m.fecha_envio > COALESCE(uc.ultima_lectura, '-infinity'::timestamp)
+    WHERE uc.id_usuario = p_id_usuario
+      AND m.id_user <> p_id_usuario
+    GROUP BY uc.id_conversacion;
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,36 @@
+-- Una nota por estudiante, materia y tipo (por ejemplo "Primer Parcial")
+-- Permite que POST /notas/importar haga upsert: reimportar un archivo corrige
+-- las notas en lugar de duplicarlas (ver app/services/importacion_notas.py)
+--
+-- Las notas repetidas que ya existan no se pierden: se copian a
+-- nota_duplicada junto con el id_nota que se conservó, para que un docente
+-- revise si la nota correcta era otra y la corrija con PUT /notas/{id}.
+
+CREATE TABLE IF NOT EXISTS nota_duplicada (LIKE nota);
+ALTER TABLE nota_duplicada ADD COLUMN IF NOT EXISTS id_nota_conservada VARCHAR;
+ALTER TABLE nota_duplicada ADD COLUMN IF NOT EXISTS fecha_descarte TIMESTAMP NOT NULL DEFAULT NOW();
+
+-- Guardar las notas repetidas: se conserva la más reciente de cada combinación
+INSERT INTO nota_duplicada
+SELECT n.*, repetidas.id_nota_conservada, NOW()
+FROM nota n
+JOIN (
+    SELECT id_nota,
+           FIRST_VALUE(id_nota) OVER combinacion AS id_nota_conservada,
+           ROW_NUMBER() OVER combinacion AS orden
+    FROM nota
+    WINDOW combinacion AS (
+        PARTITION BY id_user, id_materia, tipo_nota
+        ORDER BY COALESCE(fecha_registro_nota, 'epoch') DESC, id_nota DESC
+    )
+) repetidas ON repetidas.id_nota = n.id_nota
+WHERE repetidas.orden > 1;
+
+DELETE FROM nota n
+USING nota_duplicada d
+WHERE n.id_nota = d.id_nota;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_nota_user_materia_tipo ON nota(id_user, id_materia, tipo_nota);
+
+-- Notas descartadas para revisar:
+-- SELECT * FROM nota_duplicada ORDER BY id_user, id_materia, tipo_nota;
@@ -0,0 +1,173 @@
+-- Reacciones: alternar en una sola operación y conteos por tipo
+-- Requiere crear_relevancia.sql (sumar_relevancia).
+--
+-- alternar_reaccion borra o inserta la reacción, actualiza la relevancia de
+-- la publicación y crea la notificación en una transacción, y devuelve los
+-- conteos nuevos (ver app/services/reacciones.py). Los conteos por tipo_reac
+-- se guardan en publicacion.conteo_reacciones y comentario.conteo_reacciones
+-- ({"like": 3, "love": 1}) y los mantiene un trigger de reaccion, así también
+-- cuadran al borrar con DELETE /reacciones/{id} o en cascada.
+
+-- Quitar reacciones repetidas (las creaba un doble toque): queda la más antigua
+DELETE FROM reaccion r
+USING reaccion otra
+WHERE r.id_user = otra.id_user
+  AND r.tipo_reac = otra.tipo_reac
+  AND (r.id_publicacion = otra.id_publicacion OR r.id_comentario = otra.id_comentario)
+  AND (r.fecha_creacion_reac, r.id_reaccion) > (otra.fecha_creacion_reac, otra.id_reaccion);
+
+-- Una reacción de cada tipo por usuario y publicación o comentario
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reaccion_publicacion
+    ON reaccion(id_publicacion, id_user, tipo_reac)
+    WHERE id_publicacion IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reaccion_comentario
+    ON reaccion(id_comentario, id_user, tipo_reac)
+    WHERE id_comentario IS NOT NULL;
+
+ALTER TABLE publicacion ADD COLUMN IF NOT EXISTS conteo_reacciones JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE comentario ADD COLUMN IF NOT EXISTS conteo_reacciones JSONB NOT NULL DEFAULT '{}';
+
+-- Suma p_delta al tipo en el JSON de conteos (un tipo en 0 se quita)
+CREATE OR REPLACE FUNCTION sumar_conteo(p_conteos JSONB, p_tipo VARCHAR, p_delta INTEGER)
+RETURNS JSONB AS $$
+    SELECT CASE
+        WHEN COALESCE((p_conteos ->> p_tipo)::INTEGER, 0) + p_delta > 0
+            THEN p_conteos || jsonb_build_object(p_tipo, COALESCE((p_conteos ->> p_tipo)::INTEGER, 0) + p_delta)
+        ELSE p_conteos - p_tipo
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION actualizar_conteo_reacciones()
+RETURNS TRIGGER AS $$
+DECLARE
+    fila reaccion%ROWTYPE;
+    delta INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := OLD;
+        delta := -1;
+    ELSE
+        fila := NEW;
+        delta := 1;
+    END IF;
+    IF fila.id_publicacion IS NOT NULL THEN
+        UPDATE publicacion
+        SET conteo_reacciones = sumar_conteo(conteo_reacciones, fila.tipo_reac, delta)
+        WHERE id_publicacion = fila.id_publicacion;
+    ELSE
+        UPDATE comentario
+        SET conteo_reacciones = sumar_conteo(conteo_reacciones, fila.tipo_reac, delta)
+        WHERE id_comentario = fila.id_comentario;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_conteo_reacciones ON reaccion;
+CREATE TRIGGER trg_conteo_reacciones
+    AFTER INSERT OR DELETE ON reaccion
+    FOR EACH ROW EXECUTE FUNCTION actualizar_conteo_reacciones();
+
+-- Conteos iniciales
+UPDATE publicacion p
+SET conteo_reacciones = COALESCE((
+    SELECT jsonb_object_agg(tipo_reac, cantidad)
+    FROM (
+        SELECT tipo_reac, COUNT(*) AS cantidad
+        FROM reaccion r WHERE r.id_publicacion = p.id_publicacion
+        GROUP BY tipo_reac
+    ) t
+), '{}');
+
+UPDATE comentario c
+SET conteo_reacciones = COALESCE((
+    SELECT jsonb_object_agg(tipo_reac, cantidad)
+    FROM (
+        SELECT tipo_reac, COUNT(*) AS cantidad
+        FROM reaccion r WHERE r.id_comentario = c.id_comentario
+        GROUP BY tipo_reac
+    ) t
+), '{}');
+
+-- Alterna la reacción de un usuario sobre una publicación (p_id_comentario
+-- NULL) o un comentario. Si no existía la crea y, si p_notificacion no es
+-- NULL y el autor es otro, le deja esa notificación; si existía la borra.
+-- La relevancia usa los mismos PESO_REACCION y λ que app/services/relevancia.py.
+-- Devuelve {"activa", "reaccion", "conteos", "autor"}, o NULL si el destino no existe.
+CREATE OR REPLACE FUNCTION alternar_reaccion(
+    p_id_user VARCHAR,
+    p_tipo_reac VARCHAR,
+    p_id_publicacion VARCHAR,
+    p_id_comentario VARCHAR,
+    p_peso DOUBLE PRECISION,
+    p_lambda DOUBLE PRECISION,
+    p_notificacion TEXT DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+    fila reaccion%ROWTYPE;
+    activa BOOLEAN;
+    autor VARCHAR(36);
+    conteos JSONB;
+    intentos INTEGER := 0;
+BEGIN
+    IF p_id_publicacion IS NOT NULL THEN
+        SELECT id_user INTO autor FROM publicacion WHERE id_publicacion = p_id_publicacion;
+    ELSE
+        SELECT id_user INTO autor FROM comentario WHERE id_comentario = p_id_comentario;
+    END IF;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    LOOP
+        DELETE FROM reaccion
+        WHERE id_user = p_id_user
+          AND tipo_reac = p_tipo_reac
+          AND (id_publicacion = p_id_publicacion OR id_comentario = p_id_comentario)
+        RETURNING * INTO fila;
+        IF FOUND THEN
+            activa := FALSE;
+            EXIT;
+        END IF;
+
+        INSERT INTO reaccion (id_user, tipo_reac, id_publicacion, id_comentario)
+        VALUES (p_id_user, p_tipo_reac, p_id_publicacion, p_id_comentario)
+        ON CONFLICT DO NOTHING
+        RETURNING * INTO fila;
+        IF FOUND THEN
+            activa := TRUE;
+            EXIT;
+        END IF;
+
+        -- Otro toque la insertó entre el DELETE y el INSERT: alternar esa
+        intentos := intentos + 1;
+        IF intentos >= 5 THEN
+            RAISE EXCEPTION 'No se pudo alternar la reacción por concurrencia';
+        END IF;
+    END LOOP;
+
+    IF p_id_publicacion IS NOT NULL THEN
+        PERFORM sumar_relevancia(
+            p_id_publicacion,
+            ln(p_peso) + p_lambda * extract(epoch FROM fila.fecha_creacion_reac),
+            CASE WHEN activa THEN 1 ELSE -1 END
+        );
+        SELECT conteo_reacciones INTO conteos FROM publicacion WHERE id_publicacion = p_id_publicacion;
+    ELSE
+        SELECT conteo_reacciones INTO conteos FROM comentario WHERE id_comentario = p_id_comentario;
+    END IF;
+
+    IF activa AND p_notificacion IS NOT NULL AND autor <> p_id_user THEN
+        INSERT INTO notificacion (contenido, tipo, id_user, leida)
+        VALUES (p_notificacion, 'reaccion', autor, FALSE);
+    END IF;
+
+    RETURN jsonb_build_object(
+        'activa', activa,
+        'reaccion', to_jsonb(fila),
+        'conteos', conteos,
+        'autor', autor
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,140 @@
+"""
+Reconcilia usuario con estudiante y docente (reemplaza a los scripts sync_*)
+
+Crea las filas de estudiante/docente que faltan, corrige CIs de estudiante
+inválidos y, con --eliminar-sobrantes, borra las filas de usuarios que ya no
+tienen ese rol. Las diferencias se calculan en memoria y se aplican en lotes
+(ver app/services/reconciliacion.py).
+
+El avance se guarda en un punto de control: si se corta, volver a correr con
+--reanudar continúa el mismo plan desde el último lote terminado.
+
+Para probar contra una base local (por ejemplo `supabase start`), pasar
+--url http://localhost:54321 y --key con la service key local.
+
+Uso:
+    python reconciliar_usuarios.py --dry-run
+    python reconciliar_usuarios.py [--lote 500] [--concurrencia 4]
+    python reconciliar_usuarios.py --reanudar
+"""
+import argparse
+import sys
+import time
+
+from app.config import settings
+from app.services.reconciliacion import PuntoControl, aplicar, dividir_en_lotes, planificar
+
+PUNTO_CONTROL = ".reconciliacion_usuarios.json"
+
+# Filas de ejemplo por operación en --dry-run
+MUESTRA = 5
+
+
+def cliente(args):
+    if args.url:
+        from supabase import create_client
+        return create_client(args.url, args.key or settings.SUPABASE_SERVICE_KEY or settings.SUPABASE_KEY)
+    from app.database import get_supabase_client
+    return get_supabase_client()
+
+
+def mostrar_plan(plan: dict) -> None:
+    for tabla, conteos in plan["resumen"].items():
+        print(f"\n📋 {tabla}: {conteos['usuarios']} usuarios con el rol, {conteos['registros']} registros")
+        print(f"   - Sin registro: {conteos['faltantes']}")
+        print(f"   - CI inválido: {conteos['ci_invalidos']}")
+        print(f"   - Registro sin el rol: {conteos['sobrantes']}")
+    tipos = {operacion["tipo"] for operacion in plan["operaciones"]}
+    if "eliminar" not in tipos and any(c["sobrantes"] for c in plan["resumen"].values()):
+        print("\nℹ️  Los registros sin el rol solo se borran con --eliminar-sobrantes")
+    if plan["resumen"].get("docente", {}).get("ci_invalidos"):
+        print("\n⚠️  Los CIs inválidos de docente no se corrigen (materia.id_doc los referencia)")
+
+    for operacion in plan["operaciones"]:
+        print(f"\n🔧 {operacion['tipo']} en {operacion['tabla']}: {len(operacion['filas'])} filas")
+        for fila in operacion["filas"][:MUESTRA]:
+            if operacion["tipo"] == "corregir_ci":
+                print(f"   - {fila['fila']['id_user']}: {fila['anterior']} → {fila['fila']['ci_est']}")
+            else:
+                print(f"   - {fila}")
+        if len(operacion["filas"]) > MUESTRA:
+            print(f"   ... y {len(operacion['filas']) - MUESTRA} más")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcilia usuario con estudiante y docente")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar las diferencias, sin escribir")
+    parser.add_argument("--reanudar", action="store_true", help="Continuar el plan del punto de control")
+    parser.add_argument("--eliminar-sobrantes", action="store_true",
+                        help="Borrar filas de estudiante/docente cuyo usuario ya no tiene ese rol")
+    parser.add_argument("--lote", type=int, default=settings.RECONCILE_BATCH_SIZE, help="Filas por lote")
+    parser.add_argument("--concurrencia", type=int, default=settings.RECONCILE_CONCURRENCY, help="Lotes a la vez")
+    parser.add_argument("--punto-control", default=PUNTO_CONTROL, help="Archivo del punto de control")
+    parser.add_argument("--url", help="URL de Supabase (por defecto SUPABASE_URL)")
+    parser.add_argument("--key", help="Key de Supabase para --url (por defecto SUPABASE_SERVICE_KEY)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("  🔄 RECONCILIACIÓN DE USUARIOS CON ESTUDIANTES/DOCENTES")
+    print("=" * 60)
+
+    punto_control = PuntoControl(args.punto_control)
+    if args.reanudar:
+        if not punto_control.existe():
+            print(f"❌ No hay punto de control en {args.punto_control}")
+            sys.exit(1)
+        estado = punto_control.cargar()
+        print(f"\n↩️  Reanudando: {len(estado['hechos'])} lotes ya aplicados")
+    elif punto_control.existe() and not args.dry_run:
+        print(f"❌ Hay una reconciliación sin terminar en {args.punto_control}.")
+        print("   Usar --reanudar para continuarla (o borrar el archivo para empezar de nuevo)")
+        sys.exit(1)
+    else:
+        inicio = time.perf_counter()
+        try:
+            plan = planificar(cliente(args), eliminar_sobrantes=args.eliminar_sobrantes)
+        except Exception as e:
+            print(f"❌ Error al leer las tablas: {e}")
+            sys.exit(1)
+        print(f"\n🔍 Diferencias calculadas en {time.perf_counter() - inicio:.2f}s")
+        mostrar_plan(plan)
+        if args.dry_run:
+            print("\nℹ️  --dry-run: no se escribió nada")
+            return
+        if not plan["operaciones"]:
+            print("\n✅ Todo está sincronizado")
+            return
+        estado = punto_control.iniciar(plan, args.lote)
+
+    lotes = len(dividir_en_lotes(estado["plan"], estado["tamano_lote"]))
+    print(f"\n🚀 Aplicando {lotes} lotes de hasta {estado['tamano_lote']} filas, {args.concurrencia} a la vez")
+    inicio = time.perf_counter()
+
+    def progreso(hechas: int, total: int, lote: dict) -> None:
+        transcurrido = time.perf_counter() - inicio
+        print(f"   {hechas}/{total} filas ({hechas * 100 // max(total, 1)}%) "
+              f"- lote {lote['id']} - {transcurrido:.1f}s")
+
+    try:
+        estado = aplicar(cliente(args), estado, punto_control, args.concurrencia, progreso)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrumpido. Continuar con: python reconciliar_usuarios.py --reanudar")
+        sys.exit(130)
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        print("   El avance quedó guardado; continuar con --reanudar")
+        sys.exit(1)
+
+    if estado["cantidad_errores"]:
+        print(f"\n⚠️  {estado['cantidad_errores']} filas no se pudieron aplicar:")
+        for error in estado["errores"][:20]:
+            print(f"   - [{error['lote']}] {error['clave']}: {error['error']}")
+    punto_control.borrar()
+    print(f"\n✅ Reconciliación terminada en {time.perf_counter() - inicio:.2f}s")
+    print("=" * 60)
+    if estado["cantidad_errores"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Reconstruye fuera de línea el índice de búsqueda de publicaciones y comentarios
+
+Lee las tablas publicacion y comentario completas, arma el índice y lo guarda
+en CONTENT_INDEX_SNAPSHOT. Los workers cargan ese archivo al arrancar en lugar
+de leer las tablas, y lo refrescan solos cuando queda viejo.
+
+Uso:
+    python reconstruir_indice_contenido.py [ruta_instantanea]
+"""
+import sys
+import time
+
+from app.config import settings
+from app.database import get_supabase_client
+from app.services.busqueda_contenido import construir_indice, guardar_instantanea
+
+
+def main():
+    ruta = sys.argv[1] if len(sys.argv) > 1 else settings.CONTENT_INDEX_SNAPSHOT
+
+    print("🔄 Reconstruyendo índice de publicaciones y comentarios...")
+    inicio = time.perf_counter()
+    try:
+        indice = construir_indice(get_supabase_client())
+        guardar_instantanea(indice, ruta)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    print(f"✅ {len(indice)} documentos indexados en {time.perf_counter() - inicio:.2f}s")
+    print(f"💾 Instantánea guardada en {ruta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Recorta la tabla timeline a TIMELINE_MAX_POSTS publicaciones por usuario
+
+Las lecturas del timeline nunca pasan de ese tamaño, así que las filas más
+viejas solo ocupan espacio. Pensado para correr periódicamente (cron).
+
+Requiere la función recortar_timeline de crear_timeline.sql.
+
+Uso:
+    python recortar_timelines.py
+"""
+import sys
+
+from app.config import settings
+from app.database import get_supabase_client
+
+
+def main():
+    db = get_supabase_client()
+    try:
+        resultado = db.rpc("recortar_timeline", {"p_max": settings.TIMELINE_MAX_POSTS}).execute()
+        print(f"✅ Eliminadas {resultado.data or 0} filas de timeline "
+              f"(máximo {settings.TIMELINE_MAX_POSTS} por usuario)")
+    except Exception as e:
+        print(f"❌ Error al recortar timelines: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Recuenta comentarios y reacciones de cada publicación y corrige las diferencias
+
+Los contadores de publicacion y comentario los mantienen triggers; este
+script corrige lo que se les haya escapado (borrados en cascada, cargas
+masivas, restauraciones). Recorre las publicaciones en lotes de
+COUNTER_REPAIR_BATCH_SIZE, cada uno en una transacción corta, así que puede
+correr con la aplicación en uso. Pensado para correr periódicamente (cron).
+
+Requiere la función reparar_contadores de contadores_publicacion.sql.
+
+Uso:
+    python reparar_contadores.py [--lote 1000] [--desde ID]
+"""
+import argparse
+import sys
+import time
+
+from app.config import settings
+from app.database import get_supabase_client
+from app.services.contadores import reparar
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repara los contadores de publicaciones")
+    parser.add_argument("--lote", type=int, default=settings.COUNTER_REPAIR_BATCH_SIZE, help="Publicaciones por lote")
+    parser.add_argument("--desde", help="Continuar después de este id_publicacion")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ultimo = args.desde
+
+    def progreso(lote: dict) -> None:
+        nonlocal ultimo
+        ultimo = lote["ultimo"]
+        if lote["corregidas"] or lote["comentarios_corregidos"]:
+            print(f"   hasta {lote['ultimo']}: {lote['corregidas']} publicaciones y "
+                  f"{lote['comentarios_corregidos']} comentarios corregidos")
+
+    try:
+        totales = reparar(get_supabase_client(), args.lote, args.desde, progreso)
+    except Exception as e:
+        print(f"❌ Error al reparar contadores: {e}")
+        if ultimo:
+            print(f"   Continuar con: python reparar_contadores.py --desde {ultimo}")
+        sys.exit(1)
+    print(f"✅ Revisadas {totales['revisadas']} publicaciones en {totales['lotes']} lotes "
+          f"({time.perf_counter() - inicio:.1f}s): {totales['corregidas']} publicaciones y "
+          f"{totales['comentarios_corregidos']} comentarios corregidos")
+
+
+if __name__ == "__main__":
+    main()
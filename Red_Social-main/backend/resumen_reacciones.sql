@@ -0,0 +1,82 @@
+-- Resumen de reacciones por publicación o comentario
+-- Requiere reacciones_atomicas.sql (conteo_reacciones).
+--
+-- GET /reacciones/publicacion/{id} devolvía todas las filas de reaccion (una
+-- publicación con 2.000 likes eran 2.000 objetos para contar emojis). Ahora
+-- devuelve un resumen: conteos por tipo (ya guardados en la fila), las
+-- reacciones del usuario que pregunta y los perfiles de los últimos N que
+-- reaccionaron. resumen_reacciones arma los resúmenes de muchas
+-- publicaciones y comentarios en una sola llamada (ver
+-- app/services/reacciones.py); el listado completo se pagina por fecha e ID.
+
+-- Últimas reacciones de cada destino (resumen y listado paginado)
+CREATE INDEX IF NOT EXISTS idx_reaccion_publicacion_fecha
+    ON reaccion(id_publicacion, fecha_creacion_reac DESC, id_reaccion DESC)
+    WHERE id_publicacion IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_reaccion_comentario_fecha
+    ON reaccion(id_comentario, fecha_creacion_reac DESC, id_reaccion DESC)
+    WHERE id_comentario IS NOT NULL;
+
+-- Perfiles de los últimos p_usuarios usuarios distintos que reaccionaron.
+-- Cada usuario tiene a lo sumo una reacción por tipo (6 tipos), así que
+-- alcanza con mirar las últimas p_usuarios * 6 filas.
+CREATE OR REPLACE FUNCTION ultimos_reaccionantes(p_id_publicacion VARCHAR, p_id_comentario VARCHAR, p_usuarios INTEGER)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'id_user', u.id_user,
+        'nombre', u.nombre,
+        'apellido', u.apellido,
+        'foto_perfil', u.foto_perfil
+    ) ORDER BY ultimos.fecha DESC), '[]')
+    FROM (
+        SELECT id_user, MAX(fecha_creacion_reac) AS fecha
+        FROM (
+            SELECT id_user, fecha_creacion_reac
+            FROM reaccion
+            WHERE (p_id_publicacion IS NOT NULL AND id_publicacion = p_id_publicacion)
+               OR (p_id_comentario IS NOT NULL AND id_comentario = p_id_comentario)
+            ORDER BY fecha_creacion_reac DESC
+            LIMIT p_usuarios * 6
+        ) recientes
+        GROUP BY id_user
+        ORDER BY fecha DESC
+        LIMIT p_usuarios
+    ) ultimos
+    JOIN usuario u ON u.id_user = ultimos.id_user;
+$$ LANGUAGE sql STABLE;
+
+-- Un resumen por cada publicación y comentario que exista:
+-- conteos por tipo, tipos con los que reaccionó p_id_user y últimos perfiles
+CREATE OR REPLACE FUNCTION resumen_reacciones(
+    p_publicaciones VARCHAR[],
+    p_comentarios VARCHAR[],
+    p_id_user VARCHAR,
+    p_usuarios INTEGER
+)
+RETURNS TABLE (
+    id_publicacion VARCHAR,
+    id_comentario VARCHAR,
+    conteos JSONB,
+    mis_reacciones VARCHAR[],
+    usuarios JSONB
+) AS $$
+    SELECT p.id_publicacion, NULL::VARCHAR, p.conteo_reacciones,
+           ARRAY(
+               SELECT r.tipo_reac::VARCHAR FROM reaccion r
+               WHERE r.id_publicacion = p.id_publicacion AND r.id_user = p_id_user
+               ORDER BY r.tipo_reac
+           ),
+           ultimos_reaccionantes(p.id_publicacion, NULL, p_usuarios)
+    FROM publicacion p
+    WHERE p.id_publicacion = ANY(p_publicaciones)
+    UNION ALL
+    SELECT NULL::VARCHAR, c.id_comentario, c.conteo_reacciones,
+           ARRAY(
+               SELECT r.tipo_reac::VARCHAR FROM reaccion r
+               WHERE r.id_comentario = c.id_comentario AND r.id_user = p_id_user
+               ORDER BY r.tipo_reac
+           ),
+           ultimos_reaccionantes(NULL, c.id_comentario, p_usuarios)
+    FROM comentario c
+    WHERE c.id_comentario = ANY(p_comentarios);
+$$ LANGUAGE sql STABLE;
@@ -0,0 +1,127 @@
+-- Registro de cambios para /sync (sincronización delta de la app móvil)
+-- Cada escritura en notificacion, relacionusuario, ruta o pasajeroruta deja
+-- una fila por usuario afectado con el ID de la entidad que cambió. /sync lee
+-- las filas posteriores al cursor del cliente y devuelve el estado actual de
+-- esas entidades, o su ID como eliminado si ya no le corresponden
+-- (ver app/services/sincronizacion.py). Lo escriben triggers, así ningún
+-- camino de escritura (rutas, scripts, consola) queda sin registrar.
+-- Requiere cursor_transacciones.sql (id_transaccion_actual, cursor_confirmado).
+--
+-- El cursor no es la versión (BIGSERIAL se confirma en cualquier orden) sino
+-- el ID de la transacción que escribió cada fila, y nunca pasa de
+-- cursor_confirmado().
+
+CREATE TABLE IF NOT EXISTS cambio_sincronizacion (
+    version BIGSERIAL PRIMARY KEY,
+    id_user VARCHAR(36) NOT NULL,
+    fuente VARCHAR(20) NOT NULL,
+    id_entidad VARCHAR(36) NOT NULL,
+    fecha TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Las filas anteriores quedan con su versión como ID de transacción
+ALTER TABLE cambio_sincronizacion ADD COLUMN IF NOT EXISTS id_transaccion BIGINT;
+UPDATE cambio_sincronizacion SET id_transaccion = version WHERE id_transaccion IS NULL;
+ALTER TABLE cambio_sincronizacion ALTER COLUMN id_transaccion SET DEFAULT id_transaccion_actual();
+ALTER TABLE cambio_sincronizacion ALTER COLUMN id_transaccion SET NOT NULL;
+
+DROP INDEX IF EXISTS idx_cambio_sincronizacion_usuario;
+CREATE INDEX IF NOT EXISTS idx_cambio_sincronizacion_usuario_transaccion
+    ON cambio_sincronizacion(id_user, id_transaccion, version);
+
+-- Notificaciones: solo su destinatario
+CREATE OR REPLACE FUNCTION registrar_cambio_notificacion()
+RETURNS TRIGGER AS $$
+DECLARE
+    fila notificacion%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := OLD;
+    ELSE
+        fila := NEW;
+    END IF;
+    INSERT INTO cambio_sincronizacion (id_user, fuente, id_entidad)
+    VALUES (fila.id_user, 'notificaciones', fila.id_notificacion);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cambio_notificacion ON notificacion;
+CREATE TRIGGER trg_cambio_notificacion
+    AFTER INSERT OR UPDATE OR DELETE ON notificacion
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio_notificacion();
+
+-- Solicitudes y amistades: los dos usuarios de la relación
+CREATE OR REPLACE FUNCTION registrar_cambio_relacion()
+RETURNS TRIGGER AS $$
+DECLARE
+    fila relacionusuario%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := OLD;
+    ELSE
+        fila := NEW;
+    END IF;
+    INSERT INTO cambio_sincronizacion (id_user, fuente, id_entidad)
+    VALUES (fila.id_usuario1, 'amistades', fila.id_relacion_usuario),
+           (fila.id_usuario2, 'amistades', fila.id_relacion_usuario);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cambio_relacion ON relacionusuario;
+CREATE TRIGGER trg_cambio_relacion
+    AFTER INSERT OR UPDATE OR DELETE ON relacionusuario
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio_relacion();
+
+-- Rutas: el conductor y los pasajeros (que la reciben embebida)
+CREATE OR REPLACE FUNCTION registrar_cambio_ruta()
+RETURNS TRIGGER AS $$
+DECLARE
+    fila ruta%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := OLD;
+    ELSE
+        fila := NEW;
+    END IF;
+    INSERT INTO cambio_sincronizacion (id_user, fuente, id_entidad)
+    VALUES (fila.id_user, 'rutas_conductor', fila.id_ruta);
+    INSERT INTO cambio_sincronizacion (id_user, fuente, id_entidad)
+    SELECT p.id_user, 'rutas_pasajero', p.id_pasajero_ruta
+    FROM pasajeroruta p
+    WHERE p.id_ruta = fila.id_ruta;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cambio_ruta ON ruta;
+CREATE TRIGGER trg_cambio_ruta
+    AFTER INSERT OR UPDATE OR DELETE ON ruta
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio_ruta();
+
+-- Pasajeros: el pasajero y el conductor (cambian sus lugares disponibles)
+CREATE OR REPLACE FUNCTION registrar_cambio_pasajero()
+RETURNS TRIGGER AS $$
+DECLARE
+    fila pasajeroruta%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        fila := OLD;
+    ELSE
+        fila := NEW;
+    END IF;
+    INSERT INTO cambio_sincronizacion (id_user, fuente, id_entidad)
+    VALUES (fila.id_user, 'rutas_pasajero', fila.id_pasajero_ruta);
+    INSERT INTO cambio_sincronizacion (id_user, fuente, id_entidad)
+    SELECT r.id_user, 'rutas_conductor', r.id_ruta
+    FROM ruta r
+    WHERE r.id_ruta = fila.id_ruta;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_cambio_pasajero ON pasajeroruta;
+CREATE TRIGGER trg_cambio_pasajero
+    AFTER INSERT OR UPDATE OR DELETE ON pasajeroruta
+    FOR EACH ROW EXECUTE FUNCTION registrar_cambio_pasajero();
@@ -0,0 +1,88 @@
+-- Sincronización incremental de mensajes (cursor `since`)
+-- Cada alta o edición de un mensaje toma un número nuevo de la secuencia
+-- mensaje_version_seq y cada borrado deja una lápida con otro número.
+-- Requiere cursor_transacciones.sql (id_transaccion_actual, cursor_confirmado).
+--
+-- El cursor no es la versión sino el ID de la transacción que escribió cada
+-- fila (id_transaccion): un cliente pide lo que está entre su cursor y
+-- cursor_confirmado() sin perder nada (ver app/services/sincronizacion_mensajes.py).
+
+CREATE SEQUENCE IF NOT EXISTS mensaje_version_seq;
+
+ALTER TABLE mensaje ADD COLUMN IF NOT EXISTS version BIGINT;
+
+-- Versión inicial en orden de envío
+UPDATE mensaje m
+SET version = numerados.version
+FROM (
+    SELECT id_mensaje, nextval('mensaje_version_seq') AS version
+    FROM (SELECT id_mensaje FROM mensaje ORDER BY fecha_envio, id_mensaje) ordenados
+) numerados
+WHERE m.id_mensaje = numerados.id_mensaje
+  AND m.version IS NULL;
+
+ALTER TABLE mensaje ALTER COLUMN version SET DEFAULT nextval('mensaje_version_seq');
+ALTER TABLE mensaje ALTER COLUMN version SET NOT NULL;
+
+-- Las filas anteriores quedan con su versión como ID de transacción
+ALTER TABLE mensaje ADD COLUMN IF NOT EXISTS id_transaccion BIGINT;
+UPDATE mensaje SET id_transaccion = version WHERE id_transaccion IS NULL;
+ALTER TABLE mensaje ALTER COLUMN id_transaccion SET DEFAULT id_transaccion_actual();
+ALTER TABLE mensaje ALTER COLUMN id_transaccion SET NOT NULL;
+
+-- Cambios de una conversación posteriores a un cursor
+DROP INDEX IF EXISTS idx_mensaje_conversacion_version;
+CREATE INDEX IF NOT EXISTS idx_mensaje_conversacion_transaccion
+    ON mensaje(id_conversacion, id_transaccion, version);
+
+-- Mensajes borrados (lápidas). Solo guardan lo necesario para que el cliente
+-- quite el mensaje de su copia
+CREATE TABLE IF NOT EXISTS mensaje_eliminado (
+    id_mensaje VARCHAR(36) PRIMARY KEY,
+    id_conversacion VARCHAR(36) NOT NULL,
+    version BIGINT NOT NULL DEFAULT nextval('mensaje_version_seq'),
+    fecha_eliminacion TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE mensaje_eliminado ADD COLUMN IF NOT EXISTS id_transaccion BIGINT;
+UPDATE mensaje_eliminado SET id_transaccion = version WHERE id_transaccion IS NULL;
+ALTER TABLE mensaje_eliminado ALTER COLUMN id_transaccion SET DEFAULT id_transaccion_actual();
+ALTER TABLE mensaje_eliminado ALTER COLUMN id_transaccion SET NOT NULL;
+
+DROP INDEX IF EXISTS idx_mensaje_eliminado_conversacion_version;
+CREATE INDEX IF NOT EXISTS idx_mensaje_eliminado_conversacion_transaccion
+    ON mensaje_eliminado(id_conversacion, id_transaccion, version);
+
+-- Toda edición avanza la versión (editar_mensaje no tiene que hacer nada)
+CREATE OR REPLACE FUNCTION versionar_mensaje()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.version := nextval('mensaje_version_seq');
+    NEW.id_transaccion := id_transaccion_actual();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_mensaje_version ON mensaje;
+CREATE TRIGGER trg_mensaje_version
+    BEFORE UPDATE OF contenido, editado ON mensaje
+    FOR EACH ROW EXECUTE FUNCTION versionar_mensaje();
+
+-- Todo borrado deja su lápida (eliminar_mensaje y los borrados en cascada)
+CREATE OR REPLACE FUNCTION registrar_mensaje_eliminado()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO mensaje_eliminado (id_mensaje, id_conversacion)
+    VALUES (OLD.id_mensaje, OLD.id_conversacion)
+    ON CONFLICT (id_mensaje) DO UPDATE
+    SET version = nextval('mensaje_version_seq'),
+        id_transaccion = id_transaccion_actual(),
+        fecha_eliminacion = NOW();
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_mensaje_eliminado ON mensaje;
+CREATE TRIGGER trg_mensaje_eliminado
+    AFTER DELETE ON mensaje
+    FOR EACH ROW EXECUTE FUNCTION registrar_mensaje_eliminado();